@@ -0,0 +1,36 @@
+from django.contrib import admin
+
+from .models import ArchivedRecord, YearArchive
+
+
+@admin.register(YearArchive)
+class YearArchiveAdmin(admin.ModelAdmin):
+    """Administration des archives d'années (lecture seule)"""
+    list_display = ['year', 'archived_at', 'archived_by', 'total']
+    readonly_fields = ['year', 'archived_at', 'archived_by', 'counts']
+
+    def has_add_permission(self, request):
+        """Les archives sont créées par la commande archive_year"""
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedRecord)
+class ArchivedRecordAdmin(admin.ModelAdmin):
+    """Consultation des enregistrements archivés"""
+    list_display = ['kind', 'student', 'parent_user', 'record_date', 'archive']
+    list_filter = ['kind', 'archive__year']
+    search_fields = ['student__last_name', 'student__first_name', 'student__matricule', 'parent_user__email']
+    raw_id_fields = ['student', 'parent_user']
+    list_select_related = ['student', 'parent_user', 'archive__year']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
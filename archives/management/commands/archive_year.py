@@ -0,0 +1,63 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from archives.models import ArchivedRecord
+from archives.services import ArchiveService
+from school.models import SchoolYear
+
+class Command(BaseCommand):
+    """
+    Commande pour archiver les données des années scolaires clôturées
+    """
+    help = 'Déplace notes, bulletins, paiements, présences et notifications des années clôturées vers les archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            help='Année à archiver (ex: 2023-2024). Par défaut toutes les années clôturées',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ArchiveService.BATCH_SIZE,
+            help=f'Nombre de lignes déplacées par transaction (défaut: {ArchiveService.BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche le nombre de lignes à archiver sans rien déplacer',
+        )
+
+    def handle(self, *args, **options):
+        years = SchoolYear.objects.filter(statut='CLOTUREE')
+        if options['year']:
+            years = SchoolYear.objects.filter(annee=options['year'])
+            if not years.exists():
+                raise CommandError(f"Année {options['year']} introuvable")
+
+        if not years.exists():
+            self.stdout.write(self.style.WARNING('Aucune année clôturée à archiver'))
+            return
+
+        labels = dict(ArchivedRecord.KIND_CHOICES)
+        for year in years:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n📦 Année {year.annee}'))
+            try:
+                counts = ArchiveService.archive_year(
+                    year,
+                    dry_run=options['dry_run'],
+                    batch_size=options['batch_size'],
+                    progress=self._progress if options['verbosity'] > 1 else None,
+                )
+            except ValidationError as e:
+                raise CommandError(' '.join(e.messages))
+
+            for kind, count in counts.items():
+                self.stdout.write(f'  {labels[kind]:<22} {count:>8}')
+            if options['dry_run']:
+                self.stdout.write(self.style.WARNING('  🔍 Simulation : aucune donnée déplacée'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'  ✅ {sum(counts.values())} enregistrement(s) archivé(s)'))
+
+    def _progress(self, kind, count):
+        self.stdout.write(f'    {kind} : {count}')
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:29
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('parents_portal', '0003_parentcredentialemail'),
+        ('school', '0004_add_matricule_sequence'),
+        ('students', '0003_alter_student_matricule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YearArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('counts', models.JSONField(blank=True, default=dict, verbose_name="Nombre d'enregistrements archivés")),
+                ('archived_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('year', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='school.schoolyear')),
+            ],
+            options={
+                'verbose_name': "Archive d'année",
+                'verbose_name_plural': "Archives d'années",
+                'ordering': ['-year__annee'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('GRADE', 'Note'), ('BULLETIN', 'Bulletin'), ('TRANCHE_PAYMENT', 'Paiement de tranche'), ('ATTENDANCE', 'Présence'), ('NOTIFICATION', 'Notification parent')], max_length=20)),
+                ('original_id', models.PositiveIntegerField()),
+                ('record_date', models.DateField(blank=True, null=True)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('parent_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_records', to='parents_portal.parentuser')),
+                ('student', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_records', to='students.student')),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='archives.yeararchive')),
+            ],
+            options={
+                'verbose_name': 'Enregistrement archivé',
+                'verbose_name_plural': 'Enregistrements archivés',
+                'ordering': ['-record_date', '-id'],
+                'indexes': [models.Index(fields=['student', 'kind'], name='archives_ar_student_a05ccc_idx'), models.Index(fields=['parent_user', 'kind'], name='archives_ar_parent__723fcb_idx'), models.Index(fields=['archive', 'kind'], name='archives_ar_archive_b324c9_idx')],
+            },
+        ),
+    ]
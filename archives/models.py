@@ -0,0 +1,69 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from authentication.models import User
+from school.models import SchoolYear
+
+
+class YearArchive(models.Model):
+    """
+    Archivage d'une année scolaire clôturée
+
+    Les notes, bulletins, paiements de tranches, présences et notifications lues
+    de l'année sont déplacés dans ArchivedRecord : les tables courantes ne
+    contiennent plus que les années en activité.
+    """
+    year = models.OneToOneField(SchoolYear, on_delete=models.CASCADE, related_name='archive')
+    archived_at = models.DateTimeField(auto_now_add=True)
+    archived_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    counts = models.JSONField(default=dict, blank=True, verbose_name="Nombre d'enregistrements archivés")
+
+    class Meta:
+        verbose_name = "Archive d'année"
+        verbose_name_plural = "Archives d'années"
+        ordering = ['-year__annee']
+
+    def __str__(self):
+        return f"Archive {self.year.annee}"
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+
+class ArchivedRecord(models.Model):
+    """
+    Enregistrement archivé, en lecture seule
+
+    `data` contient un instantané dénormalisé de la ligne d'origine (libellés de
+    classe, de matière, de tranche...) afin de pouvoir l'afficher sans les
+    tables courantes.
+    """
+    KIND_CHOICES = [
+        ('GRADE', 'Note'),
+        ('BULLETIN', 'Bulletin'),
+        ('TRANCHE_PAYMENT', 'Paiement de tranche'),
+        ('ATTENDANCE', 'Présence'),
+        ('NOTIFICATION', 'Notification parent'),
+    ]
+
+    archive = models.ForeignKey(YearArchive, on_delete=models.CASCADE, related_name='records')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    original_id = models.PositiveIntegerField()
+    student = models.ForeignKey('students.Student', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_records')
+    parent_user = models.ForeignKey('parents_portal.ParentUser', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_records')
+    record_date = models.DateField(null=True, blank=True)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        verbose_name = "Enregistrement archivé"
+        verbose_name_plural = "Enregistrements archivés"
+        ordering = ['-record_date', '-id']
+        indexes = [
+            models.Index(fields=['student', 'kind']),
+            models.Index(fields=['parent_user', 'kind']),
+            models.Index(fields=['archive', 'kind']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.original_id} ({self.archive.year.annee})"
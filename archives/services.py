@@ -0,0 +1,259 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from scolaris.fragments import bump_version
+from .models import ArchivedRecord, YearArchive
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveService:
+    """
+    Service d'archivage des années scolaires clôturées
+
+    Chaque lot est copié dans ArchivedRecord puis supprimé des tables courantes
+    dans la même transaction : une interruption laisse l'archivage dans un état
+    cohérent et il suffit de relancer la commande pour le terminer.
+    """
+
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def get_sources(year):
+        """
+        Tables archivées pour une année : {kind: (queryset, fonction d'instantané)}
+        """
+        from finances.models import TranchePayment
+        from notes.models import Bulletin, StudentGrade
+        from parents_portal.models import ParentNotification
+        from students.models import Attendance
+
+        sources = {
+            'GRADE': (
+                StudentGrade.objects.filter(evaluation__trimester__year=year).select_related(
+                    'evaluation__trimester', 'evaluation__subject', 'evaluation__school_class', 'graded_by'
+                ),
+                ArchiveService._snapshot_grade,
+            ),
+            'BULLETIN': (
+                Bulletin.objects.filter(trimester__year=year).select_related('trimester').prefetch_related('lines__subject'),
+                ArchiveService._snapshot_bulletin,
+            ),
+            'TRANCHE_PAYMENT': (
+                TranchePayment.objects.filter(tranche__fee_structure__year=year).select_related(
+                    'tranche__fee_structure__school_class'
+                ).prefetch_related('refunds'),
+                ArchiveService._snapshot_tranche_payment,
+            ),
+            'ATTENDANCE': (
+                Attendance.objects.filter(year=year),
+                ArchiveService._snapshot_attendance,
+            ),
+        }
+
+        # Les notifications n'ont pas d'année : on archive celles déjà lues,
+        # émises avant la clôture
+        closure = getattr(year, 'cloture', None)
+        if closure is not None:
+            sources['NOTIFICATION'] = (
+                ParentNotification.objects.filter(is_read=True, created_at__lte=closure.date_cloture),
+                ArchiveService._snapshot_notification,
+            )
+        return sources
+
+    @staticmethod
+    def archive_year(year, user=None, dry_run=False, batch_size=None, progress=None):
+        """
+        Déplace les données d'une année clôturée vers les tables d'archive
+
+        Args:
+            year (SchoolYear): Année à archiver (doit être clôturée)
+            user (User, optional): Utilisateur à l'origine de l'archivage
+            dry_run (bool): Si True, compte seulement les enregistrements
+            batch_size (int, optional): Taille des lots
+            progress (callable, optional): Appelé avec (kind, nombre archivé)
+
+        Returns:
+            dict: Nombre d'enregistrements (à) archiver par type
+        """
+        if year.statut != 'CLOTUREE':
+            raise ValidationError(f"L'année {year.annee} n'est pas clôturée.")
+
+        batch_size = batch_size or ArchiveService.BATCH_SIZE
+        sources = ArchiveService.get_sources(year)
+        if dry_run:
+            return {kind: queryset.count() for kind, (queryset, _) in sources.items()}
+
+        archive, _ = YearArchive.objects.get_or_create(year=year, defaults={'archived_by': user})
+        counts = dict(archive.counts)
+        for kind, (queryset, snapshot) in sources.items():
+            archived = 0
+            while True:
+                with transaction.atomic():
+                    rows = list(queryset.order_by('pk')[:batch_size])
+                    if not rows:
+                        break
+                    ArchivedRecord.objects.bulk_create([
+                        ArchivedRecord(archive=archive, kind=kind, original_id=row.pk, **snapshot(row))
+                        for row in rows
+                    ])
+                    queryset.model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+                archived += len(rows)
+                if progress:
+                    progress(kind, archived)
+            counts[kind] = counts.get(kind, 0) + archived
+
+        archive.counts = counts
+        archive.save(update_fields=['counts'])
+        # Historique archivé affiché dans l'onglet « Historique » des fiches élèves
+        bump_version('student')
+        logger.info(f"Année {year.annee} archivée : {counts}")
+        return counts
+
+    @staticmethod
+    def get_student_history(student, kind=None, year=None):
+        """
+        Historique archivé d'un élève (lecture seule)
+
+        Args:
+            student (Student): L'élève
+            kind (str, optional): Type d'enregistrement (GRADE, BULLETIN, ...)
+            year (SchoolYear, optional): Année archivée
+
+        Returns:
+            QuerySet: ArchivedRecord, du plus récent au plus ancien
+        """
+        records = ArchivedRecord.objects.filter(student=student).select_related('archive__year')
+        if kind:
+            records = records.filter(kind=kind)
+        if year:
+            records = records.filter(archive__year=year)
+        return records
+
+    @staticmethod
+    def get_parent_history(parent_user, kind=None):
+        """
+        Historique archivé visible par un parent : bulletins et paiements de ses
+        enfants, et ses propres notifications
+        """
+        from parents_portal.models import ParentStudentRelation
+
+        student_ids = ParentStudentRelation.objects.filter(
+            parent_user=parent_user, is_active=True
+        ).values('student_id')
+        records = ArchivedRecord.objects.filter(
+            kind__in=['BULLETIN', 'TRANCHE_PAYMENT'], student_id__in=student_ids
+        ) | ArchivedRecord.objects.filter(kind='NOTIFICATION', parent_user=parent_user)
+        if kind:
+            records = records.filter(kind=kind)
+        return records.select_related('archive__year', 'student')
+
+    # ---------------------------------------------------------------------
+    # Instantanés
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def _snapshot_grade(grade):
+        evaluation = grade.evaluation
+        return {
+            'student_id': grade.student_id,
+            'record_date': evaluation.eval_date,
+            'data': {
+                'eval_type': evaluation.eval_type,
+                'evaluation': evaluation.get_eval_type_display(),
+                'trimester': evaluation.trimester.get_trimester_display(),
+                'subject': evaluation.subject.name,
+                'school_class': evaluation.school_class.name,
+                'max_score': evaluation.max_score,
+                'coefficient': evaluation.coefficient,
+                'score': grade.score,
+                'remarks': grade.remarks,
+                'graded_by': str(grade.graded_by) if grade.graded_by else '',
+                'graded_at': grade.graded_at,
+            },
+        }
+
+    @staticmethod
+    def _snapshot_bulletin(bulletin):
+        return {
+            'student_id': bulletin.student_id,
+            'record_date': bulletin.trimester.end_date,
+            'data': {
+                'trimester': bulletin.trimester.get_trimester_display(),
+                'class_size': bulletin.class_size,
+                'student_rank': bulletin.student_rank,
+                'class_average': bulletin.class_average,
+                'student_average': bulletin.student_average,
+                'total_points': bulletin.total_points,
+                'total_coefficients': bulletin.total_coefficients,
+                'success_rate': bulletin.success_rate,
+                'appreciation': bulletin.appreciation,
+                'is_approved': bulletin.is_approved,
+                'generated_at': bulletin.generated_at,
+                'lines': [
+                    {
+                        'subject': line.subject.name,
+                        'coefficient': line.coefficient,
+                        'average': line.average,
+                        'total_points': line.total_points,
+                        'appreciation': line.appreciation,
+                    }
+                    for line in bulletin.lines.all()
+                ],
+            },
+        }
+
+    @staticmethod
+    def _snapshot_tranche_payment(payment):
+        tranche = payment.tranche
+        return {
+            'student_id': payment.student_id,
+            'record_date': payment.payment_date,
+            'data': {
+                'amount': payment.amount,
+                'payment_date': payment.payment_date,
+                'mode': payment.mode,
+                'mode_display': payment.get_mode_display(),
+                'receipt': payment.receipt,
+                'document': payment.document.name if payment.document else '',
+                'tranche': tranche.number,
+                'tranche_amount': tranche.amount,
+                'due_date': tranche.due_date,
+                'school_class': tranche.fee_structure.school_class.name,
+                'refunds': [
+                    {'amount': refund.amount, 'reason': refund.reason, 'refund_date': refund.refund_date}
+                    for refund in payment.refunds.all()
+                ],
+            },
+        }
+
+    @staticmethod
+    def _snapshot_attendance(attendance):
+        return {
+            'student_id': attendance.student_id,
+            'record_date': attendance.date,
+            'data': {
+                'present': attendance.present,
+                'reason': attendance.reason,
+                'justificatif': attendance.justificatif.name if attendance.justificatif else '',
+            },
+        }
+
+    @staticmethod
+    def _snapshot_notification(notification):
+        return {
+            'student_id': notification.related_student_id,
+            'parent_user_id': notification.parent_user_id,
+            'record_date': timezone.localdate(notification.created_at),
+            'data': {
+                'notification_type': notification.notification_type,
+                'type_display': notification.get_notification_type_display(),
+                'title': notification.title,
+                'message': notification.message,
+                'related_url': notification.related_url,
+                'read_at': notification.read_at,
+                'created_at': notification.created_at,
+            },
+        }
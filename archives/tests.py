@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from classes.models import SchoolClass
+from finances.models import FeeStructure, FeeTranche, TranchePayment
+from school.models import EducationSystem, School, SchoolLevel, SchoolType, SchoolYear
+from students.models import Attendance, Student
+
+from .models import ArchivedRecord, YearArchive
+from .services import ArchiveService
+
+
+class ArchiveServiceTestCase(TestCase):
+    """Tests de l'archivage des années clôturées"""
+
+    def setUp(self):
+        self.year = SchoolYear.objects.create(annee="2023-2024", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        school = School.objects.create(
+            name="École Test", code="ET01", address="Douala",
+            type=SchoolType.objects.create(name="Public", code="PUB"), education_system=system,
+        )
+        level = SchoolLevel.objects.create(name="Sixième", system=system, order=1)
+        school_class = SchoolClass.objects.create(name="6e M1", level=level, year=self.year, school=school)
+        self.student = Student.objects.create(
+            matricule="STU1", first_name="Awa", last_name="Test", birth_date=date(2012, 1, 1),
+            birth_place="Douala", gender='F', year=self.year, school=school, current_class=school_class,
+        )
+        structure = FeeStructure.objects.create(
+            school_class=school_class, year=self.year, inscription_fee=10000, tuition_total=60000,
+        )
+        tranche = FeeTranche.objects.create(fee_structure=structure, number=1, amount=30000, due_date=date(2023, 10, 15))
+        TranchePayment.objects.create(student=self.student, tranche=tranche, amount=30000, mode='cash', receipt='REC-1')
+        Attendance.objects.create(student=self.student, date=date(2023, 11, 2), present=False, year=self.year, school=school)
+
+    def test_refuses_open_year(self):
+        with self.assertRaises(ValidationError):
+            ArchiveService.archive_year(self.year)
+
+    def test_moves_rows_to_archive(self):
+        self.year.close("2024-2025")
+        self.assertEqual(ArchiveService.archive_year(self.year, dry_run=True)['TRANCHE_PAYMENT'], 1)
+
+        counts = ArchiveService.archive_year(self.year, batch_size=1)
+        self.assertEqual(counts['TRANCHE_PAYMENT'], 1)
+        self.assertEqual(counts['ATTENDANCE'], 1)
+        self.assertFalse(TranchePayment.objects.exists())
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual(YearArchive.objects.get(year=self.year).total, 2)
+
+        payment = ArchiveService.get_student_history(self.student, kind='TRANCHE_PAYMENT').get()
+        self.assertEqual(payment.data['receipt'], 'REC-1')
+        self.assertEqual(payment.data['school_class'], '6e M1')
+
+        # Relancer l'archivage ne duplique rien
+        ArchiveService.archive_year(self.year)
+        self.assertEqual(ArchivedRecord.objects.count(), 2)
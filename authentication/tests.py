@@ -1,3 +1,95 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse, HttpResponseRedirect
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from scolaris.middleware import AutoLogoutMiddleware, LastVisitedMiddleware
+from .models import User
+
+
+# Sessions plus longues que le délai : la déconnexion vient du middleware, pas de l'expiration
+@override_settings(AUTO_LOGOUT_DELAY=300, SESSION_ACTIVITY_WRITE_INTERVAL=60, SESSION_COOKIE_AGE=3600)
+class SessionActivityMiddlewareTestCase(TestCase):
+    """Tests du suivi d'activité (pages visitées, déconnexion automatique)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="secretariat", password="x")
+        self.factory = RequestFactory()
+        self.session_key = None
+        self.start = timezone.now()
+
+        def authenticate(get_response):
+            def middleware(request):
+                request.user = self.user
+                return get_response(request)
+            return middleware
+
+        self.handler = SessionMiddleware(MessageMiddleware(authenticate(
+            LastVisitedMiddleware(AutoLogoutMiddleware(lambda request: HttpResponse("ok")))
+        )))
+
+    def get(self, path, seconds):
+        """Requête GET `seconds` secondes après le début du test, avec le cookie de session"""
+        request = self.factory.get(path)
+        if self.session_key:
+            request.COOKIES['sessionid'] = self.session_key
+        with mock.patch('django.utils.timezone.now', return_value=self.start + datetime.timedelta(seconds=seconds)):
+            response = self.handler(request)
+        if 'sessionid' in response.cookies:
+            self.session_key = response.cookies['sessionid'].value
+        return request, response
+
+    def test_one_session_write_per_interval(self):
+        saves = []
+        original_save = SessionStore.save
+
+        def save(store, must_create=False):
+            # Une création de session rappelle save(must_create=True) : comptée une fois
+            if not must_create:
+                saves.append(store.session_key)
+            return original_save(store, must_create)
+
+        with mock.patch.object(SessionStore, 'save', save):
+            self.get('/eleves/', 0)
+            for seconds, path in ((10, '/classes/'), (20, '/notes/'), (59, '/finances/')):
+                self.get(path, seconds)
+            self.assertEqual(len(saves), 1)
+
+            self.get('/eleves/', 61)
+            self.assertEqual(len(saves), 2)
+
+        session = SessionStore(session_key=self.session_key)
+        self.assertEqual(session['last_visited_url'], '/eleves/')
+
+    def test_no_write_query_within_interval(self):
+        self.get('/eleves/', 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.get('/classes/', 30)
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if not query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+        self.assertEqual(writes, [])
+
+    @mock.patch('scolaris.middleware.redirect', return_value=HttpResponseRedirect('/login/'))
+    def test_logout_after_inactivity_delay(self, redirect):
+        self.get('/eleves/', 0)
+        # Activité non réécrite avant l'intervalle : la session garde 0, la
+        # tolérance d'un intervalle évite une déconnexion prématurée
+        self.get('/classes/', 30)
+        request, response = self.get('/notes/', 320)
+        self.assertTrue(request.user.is_authenticated)
+        self.assertEqual(response.status_code, 200)
+
+        # Plus de AUTO_LOGOUT_DELAY + SESSION_ACTIVITY_WRITE_INTERVAL secondes après la dernière écriture
+        request, response = self.get('/notes/', 681)
+        self.assertFalse(request.user.is_authenticated)
+        self.assertEqual(response.status_code, 302)
+        redirect.assert_called_once_with('login')
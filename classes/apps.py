@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ClassesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'classes'
+
+    def ready(self):
+        """Invalidation du cache des onglets des fiches (scolaris/fragments.py)"""
+        import classes.signals
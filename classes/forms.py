@@ -51,7 +51,8 @@ class TimetableSlotForm(forms.ModelForm):
     )
     class Meta:
         model = TimetableSlot
-        fields = ['subject', 'teacher', 'duration']
+        fields = ['subject', 'teacher', 'duration', 'is_pinned']
+        labels = {'is_pinned': "Épingler (conservé par la génération automatique)"}
         widgets = {
             'subject': forms.Select(attrs={'class': 'w-full border rounded px-2 py-1'}),
             'teacher': forms.Select(attrs={'class': 'w-full border rounded px-2 py-1'}),
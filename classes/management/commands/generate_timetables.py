@@ -0,0 +1,56 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from classes.models import SchoolClass
+from classes.services import TimetableGenerationService
+from school.models import SchoolYear
+
+
+class Command(BaseCommand):
+    """
+    Commande de génération automatique des emplois du temps
+    """
+    help = "Génère les emplois du temps de toutes les classes à partir des heures des affectations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=str, help="Année scolaire (ex: 2024-2025), l'année en cours par défaut")
+        parser.add_argument('--class', dest='classes', action='append', type=int,
+                            help="Identifiant d'une classe à générer (répétable), toutes les classes actives par défaut")
+        parser.add_argument('--time-limit', type=int, help="Durée maximale de recherche en secondes")
+        parser.add_argument('--seed', type=int, help="Graine aléatoire, pour un résultat reproductible")
+        parser.add_argument('--dry-run', action='store_true', help="Calcule sans enregistrer les créneaux")
+
+    def handle(self, *args, **options):
+        year = None
+        if options['year']:
+            year = SchoolYear.objects.filter(annee=options['year']).first()
+            if year is None:
+                raise CommandError(f"Année scolaire {options['year']} introuvable")
+
+        classes = None
+        if options['classes']:
+            classes = SchoolClass.objects.filter(pk__in=options['classes'])
+
+        try:
+            result = TimetableGenerationService.generate(
+                year=year, classes=classes, time_limit=options['time_limit'], seed=options['seed'],
+                dry_run=options['dry_run'],
+            )
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+
+        for item in result['skipped']:
+            self.stdout.write(self.style.WARNING(f"⚠️ Affectation sans enseignant ignorée : {item}"))
+        for item in result['unplaced']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Bloc de {item['length']}h non placé : {item['class']} - {item['subject']}"
+            ))
+        if result['unlinked_lessons']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {result['unlinked_lessons']} leçon(s) planifiée(s) sans créneau correspondant, à replanifier"
+            ))
+        prefix = "🔍 Simulation : " if options['dry_run'] else "✅ "
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{result['created']} créneau(x) placé(s), {result['pinned']} épinglé(s) conservé(s), "
+            f"{len(result['unplaced'])} bloc(s) non placé(s) en {result['elapsed']:.1f}s"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_schoolclass_name_en_schoolclass_name_fr'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timetableslot',
+            name='is_pinned',
+            field=models.BooleanField(default=False, help_text='Créneau fixé : conservé tel quel par la génération automatique des emplois du temps.'),
+        ),
+    ]
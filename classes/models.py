@@ -147,6 +147,10 @@ class TimetableSlot(models.Model):
         default=1,
         help_text="Nombre de périodes consécutives occupées par ce créneau (ex: 2 pour 2h)."
     )
+    is_pinned = models.BooleanField(
+        default=False,
+        help_text="Créneau fixé : conservé tel quel par la génération automatique des emplois du temps."
+    )
 
     class Meta:
         unique_together = ('class_obj', 'year', 'day', 'period')
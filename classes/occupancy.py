@@ -0,0 +1,291 @@
+"""
+Index d'occupation des emplois du temps d'une année scolaire
+
+Pour chaque enseignant et chaque classe, les périodes occupées de la semaine
+sont tenues dans un entier utilisé comme champ de bits (un bit par jour ×
+période, DAY_STRIDE bits par jour). Un créneau de `duration` périodes occupe
+`duration` bits consécutifs : le chevauchement de deux créneaux se teste par
+un simple ET binaire, sans requête.
+
+L'index est construit par processus et par année (une requête), et conservé
+tant que la version des créneaux de l'année, dans le cache partagé, n'a pas
+changé. Chaque transaction qui enregistre ou supprime un créneau renouvelle
+cette version à sa validation (classes/signals.py) : tous les processus
+reconstruisent alors leur index à la lecture suivante. Sans cache partagé (voir
+scolaris/db.py), l'index est reconstruit à chaque utilisation. Un index
+construit dans une transaction n'est conservé qu'à sa validation. Les écritures
+en masse qui ne déclenchent pas de signaux (bulk_create, update) doivent
+appeler invalidate().
+
+L'index sert à chercher des périodes ou des enseignants libres. La validation
+d'un créneau avant enregistrement (validate_slot) relit les cellules visées en
+base, dans la transaction d'écriture, après verrouillage de la classe et de
+l'enseignant : deux processus ne peuvent pas occuper la même cellule.
+"""
+from contextlib import contextmanager
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+
+from scolaris.db import is_shared_cache
+
+# Bits réservés par jour (au-delà du nombre de périodes d'une journée)
+DAY_STRIDE = 16
+
+_indexes = {}
+_lock = threading.RLock()
+
+
+def get_periods_per_day():
+    return getattr(settings, 'TIMETABLE_PERIODS_PER_DAY', 8)
+
+
+def slot_mask(day, period, duration=1):
+    """Bits occupés par un créneau de `duration` périodes à partir de (day, period)"""
+    return ((1 << max(int(duration), 1)) - 1) << (int(day) * DAY_STRIDE + int(period))
+
+
+class OccupancyIndex:
+    """Occupation des enseignants et des classes d'une année scolaire"""
+
+    def __init__(self, year_id, version=0):
+        self.year_id = year_id
+        self.version = version
+        self.slots = {}          # pk du créneau -> (classe, enseignant, bits)
+        self.class_slots = {}    # classe -> {pk du créneau: bits}
+        self.teacher_slots = {}  # enseignant -> {pk du créneau: bits}
+        self.class_bits = {}
+        self.teacher_bits = {}
+
+    @classmethod
+    def build(cls, year_id, version=0):
+        from .models import TimetableSlot
+
+        index = cls(year_id, version)
+        rows = TimetableSlot.objects.filter(year_id=year_id).values_list(
+            'pk', 'class_obj_id', 'teacher_id', 'day', 'period', 'duration'
+        ).order_by()
+        for row in rows:
+            index.add(*row)
+        return index
+
+    def add(self, slot_id, class_id, teacher_id, day, period, duration=1):
+        slot_id, class_id, teacher_id = int(slot_id), int(class_id), int(teacher_id)
+        self.remove(slot_id)
+        mask = slot_mask(day, period, duration)
+        self.slots[slot_id] = (class_id, teacher_id, mask)
+        self.class_slots.setdefault(class_id, {})[slot_id] = mask
+        self.class_bits[class_id] = self.class_bits.get(class_id, 0) | mask
+        self.teacher_slots.setdefault(teacher_id, {})[slot_id] = mask
+        self.teacher_bits[teacher_id] = self.teacher_bits.get(teacher_id, 0) | mask
+
+    def remove(self, slot_id):
+        entry = self.slots.pop(int(slot_id), None)
+        if entry is None:
+            return
+        class_id, teacher_id, _ = entry
+        # Recalcul à partir des créneaux restants : deux créneaux existants
+        # peuvent se chevaucher, un XOR libérerait des bits encore occupés
+        for owners, bits, key in ((self.class_slots, self.class_bits, class_id),
+                                  (self.teacher_slots, self.teacher_bits, teacher_id)):
+            owned = owners.get(key, {})
+            owned.pop(int(slot_id), None)
+            bits[key] = self._union(owned.values())
+
+    @staticmethod
+    def _union(masks):
+        bits = 0
+        for mask in masks:
+            bits |= mask
+        return bits
+
+    @staticmethod
+    def _overlapping(owned, mask, exclude):
+        return [slot_id for slot_id, bits in owned.items() if bits & mask and slot_id not in exclude]
+
+    def _busy(self, owners, bits, key, mask, exclude):
+        if key is None or not bits.get(int(key), 0) & mask:
+            return []
+        return self._overlapping(owners.get(int(key), {}), mask, exclude)
+
+    def conflicts(self, class_id, teacher_id, day, period, duration=1, exclude=()):
+        """
+        Créneaux en conflit avec un créneau (nouveau ou déplacé)
+
+        Args:
+            exclude: pk des créneaux à ignorer (le créneau déplacé, ceux remplacés)
+
+        Returns:
+            dict: {'class': [pk], 'teacher': [pk]}, listes vides si le créneau est libre
+        """
+        mask = slot_mask(day, period, duration)
+        exclude = {int(exclude)} if isinstance(exclude, (int, str)) else {int(pk) for pk in exclude or ()}
+        return {
+            'class': self._busy(self.class_slots, self.class_bits, class_id, mask, exclude),
+            'teacher': self._busy(self.teacher_slots, self.teacher_bits, teacher_id, mask, exclude),
+        }
+
+    def is_free(self, class_id, teacher_id, day, period, duration=1, exclude=()):
+        conflicts = self.conflicts(class_id, teacher_id, day, period, duration, exclude)
+        return not conflicts['class'] and not conflicts['teacher']
+
+    def free_teachers(self, day, period, duration=1, teacher_ids=None):
+        """
+        Enseignants libres sur les périodes demandées
+
+        Args:
+            teacher_ids: Enseignants candidats (par défaut ceux ayant au moins un créneau dans l'année)
+        """
+        mask = slot_mask(day, period, duration)
+        candidates = self.teacher_bits.keys() if teacher_ids is None else teacher_ids
+        return [teacher_id for teacher_id in candidates if not self.teacher_bits.get(int(teacher_id), 0) & mask]
+
+    def free_periods(self, class_id, teacher_id, day, duration=1, exclude=()):
+        """Périodes de début possibles pour un créneau de `duration` périodes ce jour-là"""
+        last = get_periods_per_day() - max(int(duration), 1) + 1
+        return [
+            period for period in range(1, last + 1)
+            if self.is_free(class_id, teacher_id, day, period, duration, exclude)
+        ]
+
+
+def _version_key(year_id):
+    return f"timetable:occupancy:{int(year_id)}"
+
+
+def get_version(year_id):
+    """Version des créneaux de l'année, renouvelée à chaque écriture validée"""
+    key = _version_key(year_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _renew_version(year_id):
+    # Jeton unique plutôt qu'un compteur : cache.incr n'est pas atomique avec le
+    # cache en base, deux écritures simultanées y produiraient la même valeur
+    year_id = int(year_id)
+    with _lock:
+        cache.set(_version_key(year_id), uuid.uuid4().hex, None)
+        _indexes.pop(year_id, None)
+
+
+def get_index(year_id):
+    """
+    Index à jour de l'année (reconstruit si un créneau a changé depuis sa construction)
+
+    Sans cache partagé, la version ne reflète pas les écritures des autres
+    processus : l'index est alors reconstruit à chaque appel.
+    """
+    year_id = int(year_id)
+    if not is_shared_cache():
+        return OccupancyIndex.build(year_id)
+    with _lock:
+        version = get_version(year_id)
+        index = _indexes.get(year_id)
+        if index is not None and index.version == version:
+            return index
+    index = OccupancyIndex.build(year_id, version)
+    # Conservé à la validation seulement (tout de suite hors transaction) : un index
+    # construit sur des écritures ensuite annulées ne doit pas survivre à la transaction
+    transaction.on_commit(lambda: _store(index))
+    return index
+
+
+def _store(index):
+    with _lock:
+        if get_version(index.year_id) == index.version:
+            _indexes[index.year_id] = index
+
+
+def record_slot(slot):
+    """Périme l'index de l'année du créneau (et de son ancienne année) à la validation (appelé par les signaux)"""
+    invalidate(getattr(slot, '_occupancy_year_id', None), slot.year_id)
+
+
+def forget_slot(slot):
+    """Périme l'index de l'année d'un créneau supprimé à la validation (appelé par les signaux)"""
+    invalidate(slot.year_id)
+
+
+def invalidate(*year_ids):
+    """Périme l'index des années données à la validation de la transaction en cours"""
+    year_ids = {int(year_id) for year_id in year_ids if year_id is not None}
+    if year_ids:
+        transaction.on_commit(lambda: [_renew_version(year_id) for year_id in year_ids])
+
+
+@contextmanager
+def atomic(year_id):
+    """
+    Transaction de modification d'emploi du temps
+
+    L'index n'est mis à jour qu'à la validation ; en cas d'erreur, il est périmé
+    par précaution (index reconstruit à la prochaine lecture).
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except Exception:
+        invalidate(year_id)
+        raise
+
+
+def validate_slot(year_id, class_id, teacher_id, day, period, duration=1, exclude=()):
+    """
+    Vérifie qu'un créneau peut être placé (ou déplacé)
+
+    À appeler dans la transaction qui enregistre le créneau : la classe et
+    l'enseignant sont verrouillés (select_for_update) puis les cellules visées
+    relues en base, y compris les écritures de la transaction en cours.
+
+    Raises:
+        ValidationError: Période hors de la journée, classe ou enseignant déjà occupé
+    """
+    from teachers.models import Teacher
+    from .models import SchoolClass, TimetableSlot
+
+    day, period, duration = int(day), int(period), int(duration or 1)
+    days = dict(TimetableSlot.DAY_CHOICES)
+    if day not in days:
+        raise ValidationError("Jour invalide.")
+    if period < 1 or duration < 1 or period + duration - 1 > get_periods_per_day():
+        raise ValidationError(
+            f"Le créneau dépasse la journée ({get_periods_per_day()} périodes au maximum)."
+        )
+
+    # Verrous pris toujours dans le même ordre (classe puis enseignant)
+    list(SchoolClass.objects.select_for_update().filter(pk=class_id).values_list('pk', flat=True))
+    if teacher_id is not None:
+        list(Teacher.objects.select_for_update().filter(pk=teacher_id).values_list('pk', flat=True))
+
+    exclude = [exclude] if isinstance(exclude, (int, str)) else list(exclude or ())
+    owners = Q(class_obj_id=class_id)
+    if teacher_id is not None:
+        owners |= Q(teacher_id=teacher_id)
+    slots = TimetableSlot.objects.filter(
+        owners, year_id=year_id, day=day, period__lt=period + duration
+    ).alias(end=F('period') + F('duration')).filter(end__gt=period).exclude(pk__in=exclude).select_related(
+        'class_obj', 'subject', 'teacher'
+    ).order_by('period')
+
+    errors = []
+    for slot in slots:
+        if slot.class_obj_id == int(class_id):
+            errors.append(
+                f"La classe a déjà cours le {slot.get_day_display()} en période {slot.period} ({slot.subject.name})."
+            )
+        if teacher_id is not None and slot.teacher_id == int(teacher_id):
+            errors.append(
+                f"{slot.teacher.last_name.upper()} {slot.teacher.first_name} est déjà en cours le {slot.get_day_display()} "
+                f"en période {slot.period} ({slot.class_obj.name})."
+            )
+    if errors:
+        raise ValidationError(errors)
@@ -0,0 +1,315 @@
+"""
+Génération automatique des emplois du temps
+
+La semaine est une grille jours × périodes de cours. Les pauses découpent
+chaque journée en séances (ex: 1-3, 4-5, 6-7) : un bloc de plusieurs périodes
+ne peut pas chevaucher une pause. Chaque affectation (classe, matière,
+enseignant) est découpée en blocs à placer.
+
+TimetableSolver place tous les blocs de toutes les classes à la fois :
+1. construction gloutonne, des blocs les plus contraints aux moins contraints ;
+2. recherche locale (min-conflits avec liste tabou) tant qu'une classe ou un
+   enseignant a deux cours sur une même période ;
+3. les blocs encore en conflit à la fin du temps imparti sont retirés et
+   signalés comme non placés : le résultat est toujours sans conflit.
+
+Les créneaux fixés (créneaux épinglés, emplois du temps des classes non
+générées) et les indisponibilités des enseignants ne sont jamais déplacés :
+ils retirent simplement des positions possibles aux blocs.
+
+Contrainte souple : éviter deux blocs de la même matière le même jour.
+"""
+import random
+import time
+
+from django.conf import settings
+
+# Grille horaire affichée par l'emploi du temps interactif (classes.views.timetable_interactive)
+HORAIRES = [
+    {'type': 'cours', 'label': '07h30 - 08h30', 'period': 1},
+    {'type': 'cours', 'label': '08h30 - 09h30', 'period': 2},
+    {'type': 'cours', 'label': '09h30 - 10h30', 'period': 3},
+    {'type': 'pause', 'label': 'Pause (10h30 - 10h45)'},
+    {'type': 'cours', 'label': '10h45 - 11h45', 'period': 4},
+    {'type': 'cours', 'label': '11h45 - 12h45', 'period': 5},
+    {'type': 'pause', 'label': 'Pause déjeuner (12h45 - 14h15)'},
+    {'type': 'cours', 'label': '14h15 - 15h15', 'period': 6},
+    {'type': 'cours', 'label': '15h15 - 16h00', 'period': 7},
+]
+
+HARD_WEIGHT = 1000
+TABU_TENURE = 10
+NOISE = 0.02
+
+
+def get_sessions(horaires=None):
+    """Séances de la journée : périodes consécutives entre deux pauses"""
+    sessions, current = [], []
+    for horaire in horaires or HORAIRES:
+        if horaire['type'] == 'pause':
+            if current:
+                sessions.append(current)
+            current = []
+        else:
+            current.append(horaire['period'])
+    if current:
+        sessions.append(current)
+    return sessions
+
+
+def get_days():
+    """Jours ouvrés de génération (lundi à vendredi par défaut)"""
+    return list(getattr(settings, 'TIMETABLE_DAYS', [1, 2, 3, 4, 5]))
+
+
+def split_hours(hours, max_block=None):
+    """
+    Découpe un volume horaire hebdomadaire en blocs de périodes consécutives
+
+    Ex: 5h -> [2, 2, 1] ; 2h -> [1, 1] (un volume de moins de 3h reste en heures isolées)
+    """
+    max_block = max_block or getattr(settings, 'TIMETABLE_MAX_BLOCK', 2)
+    hours = int(round(hours or 0))
+    if hours < 3 or max_block < 2:
+        return [1] * max(hours, 0)
+    return [max_block] * (hours // max_block) + [1] * (hours % max_block)
+
+
+class TimetableSolver:
+    """
+    Placement de blocs sur la grille de toutes les classes
+
+    Usage:
+        solver = TimetableSolver(days=[1, 2, 3, 4, 5], sessions=get_sessions())
+        solver.add_fixed(class_id, teacher_id, day, period, duration)
+        solver.add_unavailable(teacher_id, day, period)
+        solver.add_block(key, class_id, teacher_id, subject_id, length)
+        result = solver.solve(time_limit=50)
+    """
+
+    def __init__(self, days=None, sessions=None, seed=None):
+        self.days = list(days or get_days())
+        self.sessions = sessions or get_sessions()
+        periods = [period for session in self.sessions for period in session]
+        self.period_index = {period: i for i, period in enumerate(periods)}
+        self.day_index = {day: i for i, day in enumerate(self.days)}
+        self.width = len(periods)
+        self.size = len(self.days) * self.width
+        self.rng = random.Random(seed)
+
+        self.blocks = []
+        self.fixed_class = {}
+        self.fixed_teacher = {}
+        self._starts = {}
+
+    # -- Données d'entrée ----------------------------------------------------
+
+    def _cell(self, day, period):
+        if day not in self.day_index or period not in self.period_index:
+            return None
+        return self.day_index[day] * self.width + self.period_index[period]
+
+    def _mark(self, owners, key, day, period, duration):
+        if key is None:
+            return
+        cells = owners.setdefault(key, set())
+        for offset in range(max(int(duration), 1)):
+            cell = self._cell(day, period + offset)
+            if cell is not None:
+                cells.add(cell)
+
+    def add_fixed(self, class_id, teacher_id, day, period, duration=1):
+        """Créneau existant conservé : occupe la classe et l'enseignant"""
+        self._mark(self.fixed_class, class_id, day, period, duration)
+        self._mark(self.fixed_teacher, teacher_id, day, period, duration)
+
+    def add_unavailable(self, teacher_id, day, period):
+        """Période où l'enseignant ne peut pas avoir cours"""
+        self._mark(self.fixed_teacher, teacher_id, day, period, 1)
+
+    def add_block(self, key, class_id, teacher_id, subject_id, length=1):
+        self.blocks.append({
+            'key': key, 'class': class_id, 'teacher': teacher_id,
+            'subject': subject_id, 'length': int(length),
+        })
+
+    def starts(self, length):
+        """Positions possibles d'un bloc : (jour, période, indice du jour, cellules)"""
+        if length not in self._starts:
+            starts = []
+            for day in self.days:
+                for session in self.sessions:
+                    for i in range(len(session) - length + 1):
+                        period = session[i]
+                        cells = tuple(self._cell(day, p) for p in session[i:i + length])
+                        starts.append((day, period, self.day_index[day], cells))
+            self._starts[length] = starts
+        return self._starts[length]
+
+    # -- Résolution ----------------------------------------------------------
+
+    def solve(self, time_limit=50):
+        """
+        Returns:
+            dict: placements [{'key', 'class', 'teacher', 'subject', 'day', 'period', 'length'}],
+            unplaced [clés], iterations, elapsed (secondes)
+        """
+        started = time.monotonic()
+        deadline = started + time_limit
+        unplaced = []
+
+        # Domaine de chaque bloc : positions compatibles avec les créneaux fixés
+        blocks = []
+        for block in self.blocks:
+            blocked = self.fixed_class.get(block['class'], set()) | self.fixed_teacher.get(block['teacher'], set())
+            domain = [start for start in self.starts(block['length'])
+                      if not blocked.intersection(start[3])]
+            if domain:
+                blocks.append({**block, 'domain': domain, 'start': None})
+            else:
+                unplaced.append(block['key'])
+        self._state(blocks)
+
+        # 1. Construction gloutonne
+        order = sorted(range(len(blocks)), key=lambda b: (len(blocks[b]['domain']), -blocks[b]['length']))
+        for b in order:
+            self._place(b, self._best(b, tabu={}, iteration=0))
+
+        # 2. Recherche locale sur les blocs en conflit
+        conflicted = {b for b in range(len(blocks)) if self._conflicted(b)}
+        tabu = {}
+        iteration = 0
+        while conflicted and (iteration % 100 or time.monotonic() < deadline):
+            iteration += 1
+            b = self.rng.choice(tuple(conflicted))
+            previous = blocks[b]['start']
+            affected = self._remove(b)
+            if self.rng.random() < NOISE:
+                start = self.rng.randrange(len(blocks[b]['domain']))
+            else:
+                start = self._best(b, tabu, iteration)
+            tabu[(b, previous)] = iteration + TABU_TENURE
+            affected |= self._place(b, start)
+            for other in affected:
+                if self._conflicted(other):
+                    conflicted.add(other)
+                else:
+                    conflicted.discard(other)
+
+        # 3. Retrait des blocs encore en conflit, du plus conflictuel au moins conflictuel
+        while conflicted:
+            b = max(conflicted, key=self._conflicts)
+            affected = self._remove(b)
+            conflicted.discard(b)
+            unplaced.append(blocks[b]['key'])
+            for other in affected:
+                if not self._conflicted(other):
+                    conflicted.discard(other)
+
+        # 4. Amélioration de la contrainte souple sans créer de conflit
+        self._improve(deadline)
+
+        placements = []
+        for block in blocks:
+            if block['start'] is None:
+                continue
+            day, period, _, _ = block['domain'][block['start']]
+            placements.append({
+                'key': block['key'], 'class': block['class'], 'teacher': block['teacher'],
+                'subject': block['subject'], 'day': day, 'period': period, 'length': block['length'],
+            })
+        return {
+            'placements': placements,
+            'unplaced': unplaced,
+            'iterations': iteration,
+            'elapsed': round(time.monotonic() - started, 2),
+        }
+
+    def _state(self, blocks):
+        self._blocks = blocks
+        self._class_cells = {}
+        self._teacher_cells = {}
+        self._subject_days = {}
+        for block in blocks:
+            self._class_cells.setdefault(block['class'], [set() for _ in range(self.size)])
+            self._teacher_cells.setdefault(block['teacher'], [set() for _ in range(self.size)])
+            self._subject_days.setdefault((block['class'], block['subject']), [0] * len(self.days))
+
+    def _occupants(self, block, cells):
+        class_cells = self._class_cells[block['class']]
+        teacher_cells = self._teacher_cells[block['teacher']]
+        occupants = set()
+        for cell in cells:
+            occupants |= class_cells[cell]
+            occupants |= teacher_cells[cell]
+        return occupants
+
+    def _cost(self, block, start):
+        _, _, day, cells = start
+        class_cells = self._class_cells[block['class']]
+        teacher_cells = self._teacher_cells[block['teacher']]
+        hard = sum(len(class_cells[cell]) + len(teacher_cells[cell]) for cell in cells)
+        return hard * HARD_WEIGHT + self._subject_days[(block['class'], block['subject'])][day]
+
+    def _best(self, b, tabu, iteration):
+        block = self._blocks[b]
+        best, best_cost = [], None
+        for i, start in enumerate(block['domain']):
+            cost = self._cost(block, start)
+            # Une position tabou reste permise si elle supprime tout conflit
+            if tabu.get((b, i), 0) > iteration and cost >= HARD_WEIGHT:
+                continue
+            if best_cost is None or cost < best_cost:
+                best, best_cost = [i], cost
+            elif cost == best_cost:
+                best.append(i)
+        if not best:
+            return self.rng.randrange(len(block['domain']))
+        return self.rng.choice(best)
+
+    def _place(self, b, start):
+        block = self._blocks[b]
+        block['start'] = start
+        _, _, day, cells = block['domain'][start]
+        affected = self._occupants(block, cells)
+        for cell in cells:
+            self._class_cells[block['class']][cell].add(b)
+            self._teacher_cells[block['teacher']][cell].add(b)
+        self._subject_days[(block['class'], block['subject'])][day] += 1
+        return affected | {b}
+
+    def _remove(self, b):
+        block = self._blocks[b]
+        _, _, day, cells = block['domain'][block['start']]
+        for cell in cells:
+            self._class_cells[block['class']][cell].discard(b)
+            self._teacher_cells[block['teacher']][cell].discard(b)
+        self._subject_days[(block['class'], block['subject'])][day] -= 1
+        block['start'] = None
+        return self._occupants(block, cells)
+
+    def _conflicts(self, b):
+        block = self._blocks[b]
+        if block['start'] is None:
+            return 0
+        cells = block['domain'][block['start']][3]
+        return len(self._occupants(block, cells) - {b})
+
+    def _conflicted(self, b):
+        return self._conflicts(b) > 0
+
+    def _improve(self, deadline):
+        for b, block in enumerate(self._blocks):
+            if time.monotonic() > deadline:
+                return
+            if block['start'] is None:
+                continue
+            _, _, day, _ = block['domain'][block['start']]
+            if self._subject_days[(block['class'], block['subject'])][day] <= 1:
+                continue
+            current = block['start']
+            self._remove(b)
+            costs = [(self._cost(block, start), i) for i, start in enumerate(block['domain'])]
+            cost, best = min(costs)
+            current_cost = self._cost(block, block['domain'][current])
+            self._place(b, best if cost < current_cost else current)
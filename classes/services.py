@@ -0,0 +1,179 @@
+from collections import Counter
+from django.conf import settings
+from django.core.exceptions import ValidationError
+import logging
+
+from scolaris.fragments import bump_version
+from school.models import SchoolYear
+from . import occupancy
+from .models import SchoolClass, TimetableSlot
+from .scheduling import TimetableSolver, split_hours
+
+logger = logging.getLogger(__name__)
+
+
+class TimetableGenerationService:
+    """
+    Génération des emplois du temps de toutes les classes d'une année
+
+    Chaque affectation (TeachingAssignment) doit recevoir hours_per_week
+    périodes, découpées en blocs (classes/scheduling.py). Les créneaux épinglés
+    (is_pinned) des classes générées sont conservés et déduits des heures à
+    placer ; les emplois du temps des autres classes de l'année restent
+    inchangés et occupent leurs enseignants.
+
+    Les leçons planifiées (subjects.Lesson) sur un créneau remplacé sont
+    rattachées à un nouveau créneau de la même classe, matière et enseignant,
+    le même jour si possible ; sans créneau correspondant, la leçon reste
+    sans créneau et est comptée dans 'unlinked_lessons'.
+    """
+
+    @staticmethod
+    def generate(year=None, classes=None, time_limit=None, seed=None, unavailable=None, dry_run=False):
+        """
+        Génère et enregistre les emplois du temps
+
+        Args:
+            year (SchoolYear, optional): Année scolaire (l'année en cours par défaut)
+            classes (QuerySet, optional): Classes à générer (toutes les classes actives de l'année par défaut)
+            time_limit (int, optional): Durée maximale de recherche en secondes
+            seed (int, optional): Graine aléatoire, pour un résultat reproductible
+            unavailable (dict, optional): {teacher_id: [(jour, période), ...]} indisponibilités
+            dry_run (bool): Calcule sans rien enregistrer
+
+        Returns:
+            dict: {'created', 'pinned', 'unplaced' [{'class', 'subject', 'length'}],
+            'skipped' [affectations sans enseignant], 'relinked_lessons', 'unlinked_lessons',
+            'iterations', 'elapsed'}
+        """
+        from teachers.models import TeachingAssignment
+
+        year = year or SchoolYear.get_active_year()
+        if year is None:
+            raise ValidationError("Aucune année scolaire en cours.")
+        if classes is None:
+            classes = SchoolClass.objects.filter(year=year, is_active=True)
+        class_ids = set(classes.values_list('pk', flat=True))
+        if time_limit is None:
+            time_limit = getattr(settings, 'TIMETABLE_SOLVER_TIME_LIMIT', 50)
+
+        solver = TimetableSolver(seed=seed)
+        pinned_hours = Counter()
+        pinned = 0
+        slots = TimetableSlot.objects.filter(year=year).values_list(
+            'class_obj_id', 'subject_id', 'teacher_id', 'day', 'period', 'duration', 'is_pinned'
+        ).order_by()
+        for class_id, subject_id, teacher_id, day, period, duration, is_pinned in slots:
+            if class_id in class_ids and not is_pinned:
+                continue
+            solver.add_fixed(class_id, teacher_id, day, period, duration)
+            if class_id in class_ids:
+                pinned_hours[(class_id, subject_id, teacher_id)] += duration
+                pinned += 1
+        for teacher_id, periods in (unavailable or {}).items():
+            for day, period in periods:
+                solver.add_unavailable(teacher_id, day, period)
+
+        assignments = {}
+        skipped = []
+        for assignment in TeachingAssignment.objects.filter(
+            year=year, school_class_id__in=class_ids, hours_per_week__gt=0
+        ).select_related('school_class', 'subject'):
+            if assignment.teacher_id is None:
+                skipped.append(f"{assignment.school_class.name} - {assignment.subject.name}")
+                continue
+            assignments[assignment.pk] = assignment
+            key = (assignment.school_class_id, assignment.subject_id, assignment.teacher_id)
+            hours = round(assignment.hours_per_week) - pinned_hours[key]
+            for i, length in enumerate(split_hours(hours)):
+                solver.add_block(
+                    (assignment.pk, i), assignment.school_class_id, assignment.teacher_id,
+                    assignment.subject_id, length,
+                )
+
+        result = solver.solve(time_limit=time_limit)
+        new_slots = [
+            TimetableSlot(
+                class_obj_id=placement['class'], year=year, day=placement['day'], period=placement['period'],
+                subject_id=placement['subject'], teacher_id=placement['teacher'], duration=placement['length'],
+            )
+            for placement in result['placements']
+        ]
+
+        replaced = TimetableSlot.objects.filter(year=year, class_obj_id__in=class_ids, is_pinned=False)
+        lessons = TimetableGenerationService._planned_lessons(replaced)
+        relinked = 0
+        if not dry_run:
+            with occupancy.atomic(year.pk):
+                replaced.delete()
+                TimetableSlot.objects.bulk_create(new_slots, batch_size=500)
+                relinked = TimetableGenerationService._relink_lessons(lessons, year, class_ids)
+            # bulk_create ne déclenche pas les signaux
+            occupancy.invalidate(year.pk)
+            bump_version('class', *class_ids)
+
+        unplaced = []
+        for assignment_id, i in result['unplaced']:
+            assignment = assignments[assignment_id]
+            unplaced.append({
+                'class': assignment.school_class.name,
+                'subject': assignment.subject.name,
+                'length': split_hours(round(assignment.hours_per_week) - pinned_hours[
+                    (assignment.school_class_id, assignment.subject_id, assignment.teacher_id)
+                ])[i],
+            })
+
+        logger.info(
+            f"Emplois du temps {year} : {len(new_slots)} créneau(x) placé(s), {len(unplaced)} bloc(s) non placé(s) "
+            f"en {result['elapsed']}s ({result['iterations']} itérations)"
+        )
+        return {
+            'created': len(new_slots),
+            'pinned': pinned,
+            'unplaced': unplaced,
+            'skipped': skipped,
+            'relinked_lessons': relinked,
+            'unlinked_lessons': len(lessons) - relinked,
+            'iterations': result['iterations'],
+            'elapsed': result['elapsed'],
+        }
+
+    @staticmethod
+    def _planned_lessons(slots):
+        """Leçons rattachées aux créneaux donnés : [(pk, (classe, matière, enseignant), jour)]"""
+        from subjects.models import Lesson
+
+        rows = Lesson.objects.filter(timetable_slot__in=slots).values_list(
+            'pk', 'timetable_slot__class_obj_id', 'timetable_slot__subject_id',
+            'timetable_slot__teacher_id', 'timetable_slot__day',
+        ).order_by()
+        return [(pk, (class_id, subject_id, teacher_id), day) for pk, class_id, subject_id, teacher_id, day in rows]
+
+    @staticmethod
+    def _relink_lessons(lessons, year, class_ids):
+        """
+        Rattache les leçons des créneaux remplacés aux nouveaux créneaux
+
+        Returns:
+            int: Nombre de leçons rattachées
+        """
+        from subjects.models import Lesson
+
+        if not lessons:
+            return 0
+        candidates = {}
+        for pk, class_id, subject_id, teacher_id, day in TimetableSlot.objects.filter(
+            year=year, class_obj_id__in=class_ids
+        ).values_list('pk', 'class_obj_id', 'subject_id', 'teacher_id', 'day').order_by('day', 'period'):
+            candidates.setdefault((class_id, subject_id, teacher_id), []).append((day, pk))
+
+        targets = {}
+        for lesson_id, key, day in lessons:
+            slots = candidates.get(key)
+            if not slots:
+                continue
+            slot_id = next((pk for slot_day, pk in slots if slot_day == day), slots[0][1])
+            targets.setdefault(slot_id, []).append(lesson_id)
+        for slot_id, lesson_ids in targets.items():
+            Lesson.objects.filter(pk__in=lesson_ids).update(timetable_slot_id=slot_id)
+        return sum(len(lesson_ids) for lesson_ids in targets.values())
@@ -0,0 +1,83 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from scolaris.fragments import bump_version
+from . import occupancy
+from .models import SchoolClass, TimetableSlot
+from students.models import Student
+from subjects.models import Subject, SubjectProgram, LearningUnit, Lesson
+from teachers.models import Teacher, TeachingAssignment
+
+
+@receiver([post_save, post_delete], sender=SchoolClass)
+def invalidate_class_fragments(sender, instance, **kwargs):
+    """Invalide les onglets de la fiche classe"""
+    bump_version('class', instance.pk)
+
+
+@receiver(post_init, sender=Student)
+def remember_student_class(sender, instance, **kwargs):
+    # Classe au chargement : un changement de classe invalide aussi l'ancienne
+    instance._fragment_class_id = instance.__dict__.get('current_class_id')
+
+
+@receiver([post_save, post_delete], sender=Student)
+def invalidate_student_class_fragments(sender, instance, **kwargs):
+    bump_version('class', instance.current_class_id, getattr(instance, '_fragment_class_id', None))
+
+
+@receiver([post_save, post_delete], sender=TeachingAssignment)
+@receiver([post_save, post_delete], sender=SubjectProgram)
+def invalidate_assignment_class_fragments(sender, instance, **kwargs):
+    bump_version('class', instance.school_class_id)
+
+
+@receiver([post_save, post_delete], sender=TimetableSlot)
+def invalidate_timetable_class_fragments(sender, instance, **kwargs):
+    bump_version('class', instance.class_obj_id)
+
+
+@receiver(post_init, sender=TimetableSlot)
+def remember_slot_year(sender, instance, **kwargs):
+    # Année au chargement : un créneau changé d'année quitte l'index de l'ancienne
+    instance._occupancy_year_id = instance.__dict__.get('year_id')
+
+
+@receiver(post_save, sender=TimetableSlot)
+def record_slot_occupancy(sender, instance, **kwargs):
+    occupancy.record_slot(instance)
+    instance._occupancy_year_id = instance.year_id
+
+
+@receiver(post_delete, sender=TimetableSlot)
+def forget_slot_occupancy(sender, instance, **kwargs):
+    occupancy.forget_slot(instance)
+
+
+@receiver([post_save, post_delete], sender=LearningUnit)
+def invalidate_unit_class_fragments(sender, instance, **kwargs):
+    class_id = SubjectProgram.objects.filter(pk=instance.subject_program_id).values_list('school_class_id', flat=True).first()
+    bump_version('class', class_id)
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_lesson_class_fragments(sender, instance, **kwargs):
+    class_id = LearningUnit.objects.filter(pk=instance.learning_unit_id).values_list(
+        'subject_program__school_class_id', flat=True
+    ).first()
+    bump_version('class', class_id)
+
+
+@receiver([post_save, post_delete], sender=Teacher)
+@receiver([post_save, post_delete], sender=Subject)
+def invalidate_all_class_fragments(sender, instance, **kwargs):
+    """Enseignants et matières apparaissent dans les onglets de toutes les classes"""
+    bump_version('class')
+
+
+@receiver([post_save, post_delete], sender=SchoolClass)
+@receiver([post_save, post_delete], sender=Teacher)
+@receiver([post_save, post_delete], sender=Subject)
+def invalidate_timetable_labels(sender, instance, **kwargs):
+    """Noms affichés dans les emplois du temps compilés (classes/timetables.py)"""
+    bump_version('timetable_labels')
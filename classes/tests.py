@@ -1,3 +1,212 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-# Create your tests here.
+from school.models import EducationSystem, School, SchoolLevel, SchoolType, SchoolYear
+from subjects.models import Subject
+from teachers.models import Teacher
+
+from . import occupancy
+from .models import SchoolClass, TimetableSlot
+from .scheduling import TimetableSolver, get_sessions, split_hours
+from .services import TimetableGenerationService
+
+
+class TimetableTestCase(TestCase):
+    """Deux classes, deux enseignants et un bloc de deux heures"""
+
+    def setUp(self):
+        self.year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        school = School.objects.create(
+            name="École Test", code="ET01", address="Douala",
+            type=SchoolType.objects.create(name="Public", code="PUB"), education_system=system,
+        )
+        level = SchoolLevel.objects.create(name="Sixième", system=system, order=1)
+        self.class_a, self.class_b = [
+            SchoolClass.objects.create(name=name, level=level, year=self.year, school=school)
+            for name in ("6e M1", "6e M2")
+        ]
+        self.teacher, self.other_teacher = [
+            Teacher.objects.create(
+                matricule=f"ENS{i}", first_name=f"Prof{i}", last_name="Test", birth_date=date(1980, 1, 1),
+                birth_place="Douala", gender='M', school=school, year=self.year,
+            )
+            for i in range(2)
+        ]
+        self.subject = Subject.objects.create(name="Mathématiques", code="MATH")
+        # Bloc de deux heures le lundi en périodes 2 et 3
+        self.slot = TimetableSlot.objects.create(
+            class_obj=self.class_a, year=self.year, day=1, period=2, duration=2,
+            subject=self.subject, teacher=self.teacher,
+        )
+
+
+class TimetableOccupancyTestCase(TimetableTestCase):
+    """Tests de l'index d'occupation des emplois du temps"""
+
+    def test_multi_period_overlap(self):
+        index = occupancy.get_index(self.year.pk)
+        conflicts = index.conflicts(self.class_b.pk, self.teacher.pk, 1, 3)
+        self.assertEqual(conflicts, {'class': [], 'teacher': [self.slot.pk]})
+        self.assertEqual(index.conflicts(self.class_a.pk, None, 1, 1, duration=2)['class'], [self.slot.pk])
+        self.assertTrue(index.is_free(self.class_a.pk, self.teacher.pk, 1, 4))
+        self.assertTrue(index.is_free(self.class_a.pk, self.teacher.pk, 1, 2, exclude=self.slot.pk))
+        self.assertEqual(index.free_periods(self.class_b.pk, self.teacher.pk, 1, duration=2), [4, 5, 6, 7])
+
+    def test_free_teachers(self):
+        index = occupancy.get_index(self.year.pk)
+        teacher_ids = [self.teacher.pk, self.other_teacher.pk]
+        self.assertEqual(index.free_teachers(1, 3, teacher_ids=teacher_ids), [self.other_teacher.pk])
+        self.assertEqual(index.free_teachers(2, 3, teacher_ids=teacher_ids), teacher_ids)
+
+    def test_index_follows_committed_slot_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            index = occupancy.get_index(self.year.pk)
+        self.assertIs(occupancy.get_index(self.year.pk), index)
+
+        # Index périmé à la validation de l'écriture seulement
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slot.day = 2
+            self.slot.save()
+            self.assertIs(occupancy.get_index(self.year.pk), index)
+        index = occupancy.get_index(self.year.pk)
+        self.assertTrue(index.is_free(self.class_a.pk, self.teacher.pk, 1, 2))
+        self.assertFalse(index.is_free(self.class_b.pk, self.teacher.pk, 2, 3))
+
+        # Une écriture sans signaux périme l'index
+        with self.captureOnCommitCallbacks(execute=True):
+            occupancy.invalidate(self.year.pk)
+        self.assertIsNot(occupancy.get_index(self.year.pk), index)
+
+    def test_validate_slot_reads_database(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            occupancy.get_index(self.year.pk)
+        # Créneau non encore validé : absent de l'index, vu par la relecture en base
+        TimetableSlot.objects.create(
+            class_obj=self.class_b, year=self.year, day=3, period=5, subject=self.subject, teacher=self.other_teacher,
+        )
+        self.assertTrue(occupancy.get_index(self.year.pk).is_free(self.class_b.pk, None, 3, 5))
+        with self.assertRaises(ValidationError):
+            occupancy.validate_slot(self.year.pk, self.class_b.pk, None, 3, 4, duration=2)
+
+    def test_validate_slot(self):
+        with self.assertRaises(ValidationError) as error:
+            occupancy.validate_slot(self.year.pk, self.class_b.pk, self.teacher.pk, 1, 1, duration=2)
+        self.assertIn("TEST Prof0", ' '.join(error.exception.messages))
+        with self.assertRaises(ValidationError):
+            occupancy.validate_slot(self.year.pk, self.class_b.pk, self.other_teacher.pk, 1, 8, duration=2)
+        occupancy.validate_slot(self.year.pk, self.class_b.pk, self.other_teacher.pk, 1, 2, duration=2)
+
+
+class TimetableGenerationTestCase(TimetableTestCase):
+    """Tests de la génération automatique des emplois du temps"""
+
+    def test_solver_respects_breaks_and_fixed_slots(self):
+        solver = TimetableSolver(days=[1, 2], seed=1)
+        # L'enseignant 1 est déjà pris le lundi matin par une autre classe
+        solver.add_fixed(99, 1, 1, 1, duration=3)
+        for i, length in enumerate([2, 2, 1]):
+            solver.add_block(('math', i), 10, 1, 1, length)
+        for i, length in enumerate([2, 1, 1]):
+            solver.add_block(('fr', i), 20, 1, 2, length)
+        result = solver.solve(time_limit=5)
+
+        self.assertEqual(result['unplaced'], [])
+        occupied = set()
+        sessions = get_sessions()
+        for placement in result['placements']:
+            periods = list(range(placement['period'], placement['period'] + placement['length']))
+            # Un bloc ne chevauche jamais une pause
+            self.assertTrue(any(set(periods) <= set(session) for session in sessions))
+            for period in periods:
+                cell = (placement['teacher'], placement['day'], period)
+                self.assertNotIn(cell, occupied)
+                self.assertFalse(placement['day'] == 1 and period <= 3)
+                occupied.add(cell)
+
+    def test_split_hours(self):
+        self.assertEqual(split_hours(5), [2, 2, 1])
+        self.assertEqual(split_hours(2), [1, 1])
+        self.assertEqual(split_hours(0), [])
+
+    def test_generate_keeps_pinned_slots(self):
+        from teachers.models import TeachingAssignment
+
+        self.slot.is_pinned = True
+        self.slot.save()
+        for school_class, hours in ((self.class_a, 5), (self.class_b, 4)):
+            TeachingAssignment.objects.create(
+                teacher=self.teacher, subject=self.subject, school_class=school_class, year=self.year,
+                hours_per_week=hours,
+            )
+
+        result = TimetableGenerationService.generate(year=self.year, seed=1, time_limit=5)
+
+        self.assertEqual(result['unplaced'], [])
+        self.assertEqual(result['pinned'], 1)
+        slots = TimetableSlot.objects.filter(year=self.year)
+        self.assertTrue(slots.filter(pk=self.slot.pk).exists())
+        self.assertEqual(sum(slots.filter(class_obj=self.class_a).values_list('duration', flat=True)), 5)
+        self.assertEqual(sum(slots.filter(class_obj=self.class_b).values_list('duration', flat=True)), 4)
+        # Aucun double cours de l'enseignant
+        index = occupancy.get_index(self.year.pk)
+        for slot in slots:
+            conflicts = index.conflicts(None, slot.teacher_id, slot.day, slot.period, slot.duration, exclude=slot.pk)
+            self.assertEqual(conflicts['teacher'], [])
+
+    def test_generate_relinks_planned_lessons(self):
+        from subjects.models import LearningUnit, Lesson, SubjectProgram
+        from teachers.models import TeachingAssignment
+
+        TeachingAssignment.objects.create(
+            teacher=self.teacher, subject=self.subject, school_class=self.class_a, year=self.year, hours_per_week=2,
+        )
+        program = SubjectProgram.objects.create(
+            subject=self.subject, school_class=self.class_a, school_year=self.year, title="Programme",
+            description="-", objectives="-", total_hours=10,
+        )
+        unit = LearningUnit.objects.create(
+            subject_program=program, title="Nombres", description="-", estimated_hours=4, order=1,
+        )
+        lesson = Lesson.objects.create(
+            learning_unit=unit, timetable_slot=self.slot, teacher=self.teacher, title="Fractions",
+            objectives="-", activities="-", planned_date=date(2024, 10, 7),
+        )
+
+        result = TimetableGenerationService.generate(year=self.year, classes=SchoolClass.objects.filter(
+            pk=self.class_a.pk
+        ), seed=1, time_limit=5)
+
+        self.assertEqual((result['relinked_lessons'], result['unlinked_lessons']), (1, 0))
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.timetable_slot.class_obj, self.class_a)
+        self.assertEqual(lesson.timetable_slot.subject, self.subject)
+
+
+class CompiledTimetableTestCase(TimetableTestCase):
+    """Tests des grilles compilées par classe et par enseignant"""
+
+    def test_grids_and_rows(self):
+        from .timetables import EMPTY, get_compiled_timetable
+
+        compiled = get_compiled_timetable(self.year.pk)
+        grid = compiled.grid('teacher', self.teacher.pk)
+        # Le bloc de deux heures occupe les périodes 2 et 3 du lundi
+        self.assertEqual(list(grid[0, :4]), [EMPTY, 0, 0, EMPTY])
+        self.assertEqual(compiled.weekly_periods('class', self.class_a.pk), 2)
+        self.assertEqual(compiled.weekly_periods('class', self.class_b.pk), 0)
+        self.assertNotIn((1, 2), compiled.free_periods('teacher', self.teacher.pk))
+        self.assertIn((1, 4), compiled.free_periods('teacher', self.teacher.pk))
+
+        days, rows = compiled.rows('class', self.class_a.pk)
+        self.assertEqual([day for day, _ in days], [1, 2, 3, 4, 5])
+        monday = {row['horaire']['period']: row['cells'][0] for row in rows if not row['is_pause']}
+        self.assertEqual((monday[2]['show'], monday[2]['rowspan']), (True, 2))
+        self.assertFalse(monday[3]['show'])
+
+        # Une écriture de créneau change la version : nouvelle compilation
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slot.delete()
+        self.assertEqual(get_compiled_timetable(self.year.pk).weekly_periods('class', self.class_a.pk), 0)
@@ -0,0 +1,196 @@
+"""
+Emplois du temps compilés d'une année scolaire
+
+Les créneaux de l'année sont chargés en une requête puis indexés par classe
+et par enseignant dans des tableaux denses jours × périodes (NumPy) : chaque
+case contient l'indice du créneau qui l'occupe, -1 si elle est libre. Un
+créneau de plusieurs périodes occupe toutes ses cases.
+
+Les grilles affichées (fiche classe, emploi du temps interactif, emploi du
+temps d'un enseignant, impressions PDF) sont construites par simple lecture
+de ces tableaux, sans parcourir les créneaux case par case.
+
+Le résultat est mis en cache et indexé par le compteur d'écritures des
+créneaux de l'année (classes/occupancy.py) et par la version des libellés
+(classes, matières, enseignants), incrémentée par classes/signals.py.
+"""
+from django.conf import settings
+from django.core.cache import cache
+import numpy as np
+
+from scolaris.fragments import get_versions
+from . import occupancy
+from .models import TimetableSlot
+from .scheduling import HORAIRES, get_days
+
+EMPTY = -1
+
+
+class CompiledTimetable:
+    """Grilles jours × périodes de toutes les classes et de tous les enseignants d'une année"""
+
+    def __init__(self, year_id, slots):
+        self.year_id = year_id
+        self.slots = slots
+        self.days = [day for day, _ in TimetableSlot.DAY_CHOICES]
+        last_period = max(
+            [occupancy.get_periods_per_day()]
+            + [horaire['period'] for horaire in HORAIRES if horaire['type'] == 'cours']
+            + [slot['period'] + slot['duration'] - 1 for slot in slots]
+        )
+        self.periods = list(range(1, last_period + 1))
+        self.class_index = {}
+        self.teacher_index = {}
+        for slot in slots:
+            self.class_index.setdefault(slot['class']['id'], len(self.class_index))
+            self.teacher_index.setdefault(slot['teacher']['id'], len(self.teacher_index))
+
+        shape = (len(self.days), len(self.periods))
+        self.class_grids = np.full((len(self.class_index),) + shape, EMPTY, dtype=np.int32)
+        self.teacher_grids = np.full((len(self.teacher_index),) + shape, EMPTY, dtype=np.int32)
+        day_positions = {day: i for i, day in enumerate(self.days)}
+        for i, slot in enumerate(slots):
+            day = day_positions.get(slot['day'])
+            if day is None or slot['period'] < 1:
+                continue
+            cells = slice(slot['period'] - 1, slot['period'] - 1 + max(slot['duration'], 1))
+            self.class_grids[self.class_index[slot['class']['id']], day, cells] = i
+            self.teacher_grids[self.teacher_index[slot['teacher']['id']], day, cells] = i
+
+    @classmethod
+    def build(cls, year_id):
+        rows = TimetableSlot.objects.filter(year_id=year_id).values_list(
+            'pk', 'day', 'period', 'duration', 'is_pinned',
+            'class_obj_id', 'class_obj__name', 'subject_id', 'subject__name',
+            'teacher_id', 'teacher__last_name', 'teacher__first_name',
+        ).order_by('day', 'period')
+        slots = [
+            {
+                'id': pk, 'day': day, 'period': period, 'duration': duration or 1, 'is_pinned': is_pinned,
+                'class': {'id': class_id, 'name': class_name},
+                'subject': {'id': subject_id, 'name': subject_name},
+                'teacher': {'id': teacher_id, 'name': f"{last_name.upper()} {first_name}"},
+            }
+            for (pk, day, period, duration, is_pinned, class_id, class_name, subject_id, subject_name,
+                 teacher_id, last_name, first_name) in rows
+        ]
+        return cls(year_id, slots)
+
+    def grid(self, kind, owner_id):
+        """Tableau jours × périodes d'une classe (kind='class') ou d'un enseignant (kind='teacher')"""
+        index, grids = (self.class_index, self.class_grids) if kind == 'class' else \
+            (self.teacher_index, self.teacher_grids)
+        position = index.get(owner_id)
+        if position is None:
+            return np.full((len(self.days), len(self.periods)), EMPTY, dtype=np.int32)
+        return grids[position]
+
+    def weekly_periods(self, kind, owner_id):
+        """Nombre de périodes de cours dans la semaine"""
+        return int(np.count_nonzero(self.grid(kind, owner_id) != EMPTY))
+
+    def free_periods(self, kind, owner_id, days=None):
+        """Périodes libres [(jour, période)] parmi les périodes de cours de la grille horaire"""
+        grid = self.grid(kind, owner_id)
+        days = days or get_days()
+        teaching = [horaire['period'] for horaire in HORAIRES if horaire['type'] == 'cours']
+        return [
+            (day, period)
+            for day in days
+            for period in teaching
+            if grid[self.days.index(day), period - 1] == EMPTY
+        ]
+
+    def rows(self, kind, owner_id, days=None):
+        """
+        Lignes d'affichage de la grille : une ligne par période ou par pause
+
+        Returns:
+            tuple: (jours affichés [(numéro, libellé)], lignes [{'horaire', 'is_pause',
+            'cells': [{'slot', 'show', 'rowspan', 'day_num', 'period'}]}])
+        """
+        grid = self.grid(kind, owner_id)
+        if days is None:
+            # Jours ouvrés, plus le samedi s'il a des cours
+            days = [day for day in self.days if day in get_days() or (grid[self.days.index(day)] != EMPTY).any()]
+        labels = dict(TimetableSlot.DAY_CHOICES)
+
+        horaires = list(HORAIRES)
+        listed = {horaire['period'] for horaire in HORAIRES if horaire['type'] == 'cours'}
+        used = set(np.nonzero((grid != EMPTY).any(axis=0))[0] + 1)
+        horaires += [
+            {'type': 'cours', 'label': f"Période {period}", 'period': period}
+            for period in sorted(used - listed)
+        ]
+
+        rows = []
+        previous = {}
+        for horaire in horaires:
+            if horaire['type'] == 'pause':
+                rows.append({'horaire': horaire, 'is_pause': True, 'cells': []})
+                previous = {}
+                continue
+            period = horaire['period']
+            cells = []
+            for day in days:
+                slot_index = int(grid[self.days.index(day), period - 1])
+                slot = self.slots[slot_index] if slot_index != EMPTY else None
+                # Case couverte par le créneau de la ligne précédente : fusion verticale
+                show = slot is None or previous.get(day) != slot_index
+                rowspan = self._span(horaires, slot, period) if slot is not None and show else 1
+                cells.append({'slot': slot, 'show': show, 'rowspan': rowspan, 'day_num': day, 'period': period})
+                previous[day] = slot_index
+            rows.append({'horaire': horaire, 'is_pause': False, 'cells': cells})
+        return [(day, labels[day]) for day in days], rows
+
+    @staticmethod
+    def _span(horaires, slot, period):
+        # Lignes de cours consécutives couvertes par le créneau, sans franchir une pause
+        end = slot['period'] + slot['duration'] - 1
+        span = 0
+        started = False
+        for horaire in horaires:
+            if horaire['type'] == 'pause':
+                if started:
+                    break
+                continue
+            if horaire['period'] == period:
+                started = True
+            if started:
+                if horaire['period'] > end:
+                    break
+                span += 1
+        return max(span, 1)
+
+
+def get_compiled_timetable(year_id):
+    """Emploi du temps compilé de l'année (mis en cache par version des créneaux et des libellés)"""
+    versions = [str(occupancy.get_version(year_id))] + get_versions([('timetable_labels', None)])
+    key = f"timetable:compiled:{year_id}:" + ':'.join(versions)
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = CompiledTimetable.build(year_id)
+        cache.set(key, compiled, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+    return compiled
+
+
+def timetable_pdf_response(request, context, filename):
+    """
+    Impression PDF d'une grille compilée
+
+    Args:
+        context (dict): title, subtitle, school, days, rows, mode ('class' ou 'teacher')
+    """
+    from django.http import HttpResponse
+    from django.template.loader import render_to_string
+
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        return HttpResponse("WeasyPrint n'est pas installé.", status=500)
+
+    html_string = render_to_string('classes/timetable_print_pdf.html', context, request=request)
+    pdf = HTML(string=html_string, base_url=request.build_absolute_uri('/')).write_pdf()
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename=emploi_du_temps_{filename}.pdf'
+    return response
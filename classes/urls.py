@@ -15,15 +15,18 @@ urlpatterns = [
     # Timetable list
     path('timetables/', views.timetable_list, name='timetable_list'),
     path('timetable/classes/', views.timetable_list_classes, name='timetable_list_classes'),
+    path('timetable/generate/', views.timetable_generate, name='timetable_generate'),
 
     # SchoolClass list & detail
     path('classes/', views.schoolclass_list, name='schoolclass_list'),
     path('classes/<int:pk>/', views.schoolclass_detail, name='schoolclass_detail'),
+    path('classes/<int:pk>/tab/<slug:tab>/', views.schoolclass_detail_tab, name='schoolclass_detail_tab'),
 
     path('<int:class_id>/export_students/', views.export_students_excel, name='export_students_excel'),
     path('<int:class_id>/print_pdf/', views.schoolclass_print_pdf, name='schoolclass_print_pdf'),
 
     path('classe/<int:class_id>/emploi-du-temps/', views.timetable_interactive, name='timetable_interactive'),
+    path('classe/<int:class_id>/emploi-du-temps/pdf/', views.timetable_pdf, name='timetable_pdf'),
 
     path('slot/add/', views.slot_add_htmx, name='slot_add_htmx'),
     path('slot/<int:slot_id>/edit/', views.slot_edit_htmx, name='slot_edit_htmx'),
@@ -1,9 +1,14 @@
 import logging
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseBadRequest
 from django.urls import reverse
+from django.db import transaction
+from django.db.models import Sum
 from django.views.decorators.http import require_http_methods, require_POST
+from django.core.exceptions import ValidationError
+from . import occupancy
 from .models import SchoolClass, Timetable, TimetableSlot
+from .timetables import get_compiled_timetable, timetable_pdf_response
 from .forms import SchoolClassForm, TimetableForm, TimetableSlotForm
 from django.contrib.auth.decorators import login_required
 import openpyxl
@@ -14,8 +19,11 @@ import tempfile
 from django.templatetags.static import static
 from io import BytesIO
 from teachers.models import TeachingAssignment, Teacher
+from teachers.services import TeacherWorkloadService
 from subjects.models import Subject
 from school.models import SchoolYear, EducationSystem, SchoolLevel
+from scolaris.fragments import render_fragment
+from authentication.mixins import admin_or_direction_required
 import json
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -115,6 +123,49 @@ def timetable_list_classes(request):
         'classes': classes,
     })
 
+@login_required
+@admin_or_direction_required
+@require_POST
+def timetable_generate(request):
+    """
+    Génère les emplois du temps de toutes les classes actives de l'année en cours
+    à partir des heures hebdomadaires des affectations (les créneaux épinglés sont conservés).
+
+    La recherche est limitée à TIMETABLE_WEB_TIME_LIMIT secondes (5 par défaut)
+    pour ne pas bloquer la requête ; une recherche plus longue passe par la
+    commande generate_timetables.
+    """
+    from django.contrib import messages
+    from .services import TimetableGenerationService
+
+    try:
+        result = TimetableGenerationService.generate(time_limit=getattr(settings, 'TIMETABLE_WEB_TIME_LIMIT', 5))
+    except ValidationError as e:
+        messages.error(request, ' '.join(e.messages))
+        return redirect('classes:timetable_list_classes')
+
+    messages.success(
+        request,
+        f"Emplois du temps générés : {result['created']} créneau(x) placé(s), "
+        f"{result['pinned']} créneau(x) épinglé(s) conservé(s), en {result['elapsed']:.1f}s."
+    )
+    if result['unplaced']:
+        details = ', '.join(f"{item['class']} - {item['subject']} ({item['length']}h)" for item in result['unplaced'][:10])
+        messages.warning(
+            request,
+            f"{len(result['unplaced'])} bloc(s) n'ont pas pu être placés : {details}. "
+            f"Une recherche plus longue est possible avec la commande « manage.py generate_timetables --time-limit »."
+        )
+    if result['unlinked_lessons']:
+        messages.warning(
+            request,
+            f"{result['unlinked_lessons']} leçon(s) planifiée(s) n'ont plus de créneau correspondant "
+            f"et doivent être replanifiées."
+        )
+    if result['skipped']:
+        messages.warning(request, f"Affectations sans enseignant ignorées : {', '.join(result['skipped'][:10])}")
+    return redirect('classes:timetable_list_classes')
+
 @login_required
 def schoolclass_list(request):
     # Vérifier les permissions du professeur
@@ -176,117 +227,108 @@ def schoolclass_list(request):
     
     return render(request, 'classes/schoolclass_list.html', context)
 
+SCHOOLCLASS_DETAIL_TABS = ['students', 'subjects', 'pedagogy', 'timetable']
+
+
 @login_required
 def schoolclass_detail(request, pk):
+    """
+    Fiche classe : seul l'onglet « Vue d'ensemble » est calculé ici, les autres
+    onglets sont chargés à la demande par schoolclass_detail_tab
+    """
     schoolclass = get_object_or_404(SchoolClass, pk=pk)
-    students = schoolclass.students.all()
-    free_places = schoolclass.capacity - students.count()
-
-    # Récupérer la liste des IDs de matières enseignées
-    subject_ids = schoolclass.subject_teached or []
-    subjects = list(Subject.objects.filter(id__in=subject_ids).order_by('name'))
+    students_count = schoolclass.students.count()
+    free_places = schoolclass.capacity - students_count
 
-    # Récupérer toutes les affectations matière-enseignant pour cette classe et cette année
+    # Matières réellement affectées à la classe (pour la modale emploi du temps)
+    assigned_subjects = []
     teaching_assignments = TeachingAssignment.objects.filter(
         school_class=schoolclass,
-        year=schoolclass.year
+        year=schoolclass.year,
+        hours_per_week__gt=0,
     ).select_related('teacher', 'subject')
-
-    # Pour chaque matière, construire la liste des enseignants principaux et secondaires
-    subject_teachers = {}
-    for subject in subjects:
-        # Enseignants principaux (main_subject)
-        main_teachers = list(Teacher.objects.filter(main_subject=subject, is_active=True))
-        # Enseignants affectés via TeachingAssignment
-        assigned_teachers = list(
-            ta.teacher for ta in teaching_assignments if ta.subject_id == subject.id and ta.teacher is not None
-        )
-        # Éviter les doublons (un enseignant peut être principal ET affecté)
-        assigned_teachers = [t for t in assigned_teachers if t not in main_teachers]
-        subject_teachers[subject.id] = {
-            'main': main_teachers,
-            'assigned': assigned_teachers,
-        }
-
-    # Titulaire de la classe (enseignant principal de la classe, pas d'une matière)
-    titulaire = schoolclass.main_teacher
-
-    # Récupérer tous les enseignants actifs de la même école et année pour le formulaire de professeur titulaire
-    teachers = Teacher.objects.filter(
-        is_active=True, 
-        school=schoolclass.school, 
-        year=schoolclass.year
-    ).order_by('last_name', 'first_name')
-
-    # Récupérer les données d'emploi du temps
-    from .models import TimetableSlot
-    timetable_slots = TimetableSlot.objects.filter(
-        class_obj=schoolclass, 
-        year=schoolclass.year
-    ).select_related('subject', 'teacher').order_by('day', 'period')
-
-    # Construire la grille d'emploi du temps
-    timetable_grid = {}
-    for day_num, day_name in TimetableSlot.DAY_CHOICES:
-        timetable_grid[day_num] = {
-            'name': day_name,
-            'periods': {}
-        }
-        for period in range(1, 9):  # 8 créneaux par jour
-            # Chercher le créneau correspondant
-            slot = None
-            for s in timetable_slots:
-                if s.day == day_num and s.period == period:
-                    slot = s
-                    break
-            timetable_grid[day_num]['periods'][period] = slot
-
-    # Calculer le total des heures par semaine
-    total_hours = sum(ta.hours_per_week or 0 for ta in teaching_assignments)
-
-    # Récupérer les données pédagogiques pour l'onglet pédagogique
-    from subjects.models import SubjectProgram, LearningUnit, Lesson
-    
-    # Programmes pédagogiques de la classe
-    programs = SubjectProgram.objects.filter(
-        school_class=schoolclass,
-        is_active=True
-    ).select_related('subject', 'school_year').prefetch_related('learning_units')
-    
-    # Matières réellement affectées à la classe (pour la modale emploi du temps)
-    assigned_subjects = []
     for assignment in teaching_assignments:
-        if assignment.subject and assignment.hours_per_week:
+        if assignment.subject:
             assigned_subjects.append({
                 'subject': assignment.subject,
                 'hours_per_week': assignment.hours_per_week,
                 'teacher': assignment.teacher
             })
-    
-    # Statistiques globales de la classe
-    total_subjects = programs.count()
-    total_units = sum(program.learning_units.count() for program in programs)
-    total_lessons = sum(
-        sum(unit.lessons.count() for unit in program.learning_units.all())
-        for program in programs
+
+    return render(request, 'classes/schoolclass_detail.html', {
+        'schoolclass': schoolclass,
+        'students_count': students_count,
+        'free_places': free_places,
+        'assigned_subjects': assigned_subjects,
+        'tab_urls': {
+            tab: reverse('classes:schoolclass_detail_tab', args=[schoolclass.pk, tab])
+            for tab in SCHOOLCLASS_DETAIL_TABS
+        },
+    })
+
+
+@login_required
+def schoolclass_detail_tab(request, pk, tab):
+    """
+    Onglet de la fiche classe chargé par HTMX, servi depuis le cache des
+    fragments (invalidé par classes/signals.py)
+    """
+    if tab not in SCHOOLCLASS_DETAIL_TABS:
+        raise Http404("Onglet inconnu")
+    schoolclass = get_object_or_404(SchoolClass, pk=pk)
+    get_context = {
+        'students': _get_students_tab_context,
+        'subjects': _get_subjects_tab_context,
+        'pedagogy': _get_pedagogy_tab_context,
+        'timetable': _get_timetable_tab_context,
+    }[tab]
+    return render_fragment(
+        request,
+        f'class:{tab}',
+        [('class', schoolclass.pk)],
+        f'classes/partials/tabs/{tab}.html',
+        lambda: {'schoolclass': schoolclass, **get_context(schoolclass)},
     )
-    
+
+
+def _get_students_tab_context(schoolclass):
+    return {'students': schoolclass.students.all()}
+
+
+def _get_subjects_tab_context(schoolclass):
+    # Affectations matière-enseignant pour cette classe et cette année
+    return {
+        'teaching_assignments': TeachingAssignment.objects.filter(
+            school_class=schoolclass,
+            year=schoolclass.year
+        ).select_related('teacher', 'subject'),
+    }
+
+
+def _get_pedagogy_tab_context(schoolclass):
+    from subjects.models import SubjectProgram, Lesson
+
+    # Programmes pédagogiques de la classe
+    programs = list(SubjectProgram.objects.filter(
+        school_class=schoolclass,
+        is_active=True
+    ).select_related('subject', 'school_year').with_progress())
+
     # Progression par matière
     subjects_progress = []
     for program in programs:
-        completion = program.get_completion_percentage()
         subjects_progress.append({
             'subject': program.subject,
-            'completion': completion,
-            'units_count': program.learning_units.count(),
-            'lessons_count': sum(unit.lessons.count() for unit in program.learning_units.all()),
+            'completion': program.get_completion_percentage(),
+            'units_count': program.get_units_count(),
+            'lessons_count': program.get_lessons_count(),
         })
-    
+
     # Calculer la progression moyenne
     avg_completion = 0
     if subjects_progress:
         avg_completion = sum(subject['completion'] for subject in subjects_progress) / len(subjects_progress)
-    
+
     # Leçons récentes de la classe
     recent_lessons = Lesson.objects.filter(
         learning_unit__subject_program__school_class=schoolclass
@@ -295,29 +337,35 @@ def schoolclass_detail(request, pk):
         'teacher'
     ).order_by('-created_at')[:10]
 
-    return render(request, 'classes/schoolclass_detail.html', {
-        'schoolclass': schoolclass,
-        'students': students,
-        'free_places': free_places,
-        'subjects': subjects,  # liste d'objets Subject
-        'subject_teachers': subject_teachers,  # dict {subject_id: {'main': [...], 'assigned': [...]}}
-        'teaching_assignments': teaching_assignments,
-        'titulaire': titulaire,
-        'teachers': teachers,  # Liste des enseignants disponibles pour le professeur titulaire
-        'timetable_grid': timetable_grid,  # Grille d'emploi du temps
-        'timetable_slots': timetable_slots,  # Créneaux d'emploi du temps
-        'total_hours': total_hours,  # Total des heures par semaine
-        
-        # Données pédagogiques pour l'onglet pédagogique
+    return {
         'programs': programs,
-        'assigned_subjects': assigned_subjects,  # Matières affectées pour l'emploi du temps
-        'total_subjects': total_subjects,
-        'total_units': total_units,
-        'total_lessons': total_lessons,
+        'total_subjects': len(programs),
+        'total_units': sum(row['units_count'] for row in subjects_progress),
+        'total_lessons': sum(row['lessons_count'] for row in subjects_progress),
         'subjects_progress': subjects_progress,
         'recent_lessons': recent_lessons,
         'avg_completion': round(avg_completion, 1),
-    })
+    }
+
+
+def _get_timetable_tab_context(schoolclass):
+    from subjects.models import SubjectProgram
+
+    compiled = get_compiled_timetable(schoolclass.year_id)
+    days, rows = compiled.rows('class', schoolclass.pk)
+    total_hours = TeachingAssignment.objects.filter(
+        school_class=schoolclass,
+        year=schoolclass.year
+    ).aggregate(total=Sum('hours_per_week'))['total'] or 0
+
+    return {
+        'timetable_days': days,
+        'timetable_rows': rows,
+        'slots_count': sum(1 for slot in compiled.slots if slot['class']['id'] == schoolclass.pk),
+        'weekly_periods': compiled.weekly_periods('class', schoolclass.pk),
+        'total_hours': total_hours,  # Total des heures par semaine
+        'programs': SubjectProgram.objects.filter(school_class=schoolclass, is_active=True),
+    }
 
 def export_students_excel(request, class_id):
     schoolclass = SchoolClass.objects.get(id=class_id)
@@ -398,73 +446,35 @@ def schoolclass_print_pdf(request, class_id):
 def timetable_interactive(request, class_id):
     """
     Affiche l'emploi du temps interactif d'une classe sous forme de tableau (jours x créneaux horaires).
-    Les créneaux sont récupérés depuis le modèle TimetableSlot.
+    Les créneaux sont lus dans l'emploi du temps compilé de l'année (classes/timetables.py).
     """
     schoolclass = get_object_or_404(SchoolClass, pk=class_id)
-    year = schoolclass.year
-    # Récupère tous les créneaux pour cette classe et cette année
-    slots = TimetableSlot.objects.filter(class_obj=schoolclass, year=year).select_related('subject', 'teacher')
-    # Structure les créneaux par jour et période pour affichage facile
-    timetable = {}
-    for day, _ in TimetableSlot.DAY_CHOICES:
-        timetable[day] = {}
-        for period in range(1, 9):  # 8 créneaux par jour par exemple
-            timetable[day][period] = None
-    for slot in slots:
-        timetable[slot.day][slot.period] = slot
-
-    # Définition des horaires et pauses
-    horaires = [
-        {'type': 'cours', 'label': '07h30 - 08h30', 'period': 1},
-        {'type': 'cours', 'label': '08h30 - 09h30', 'period': 2},
-        {'type': 'cours', 'label': '09h30 - 10h30', 'period': 3},
-        {'type': 'pause', 'label': 'Pause (10h30 - 10h45)'},
-        {'type': 'cours', 'label': '10h45 - 11h45', 'period': 4},
-        {'type': 'cours', 'label': '11h45 - 12h45', 'period': 5},
-        {'type': 'pause', 'label': 'Pause déjeuner (12h45 - 14h15)'},
-        {'type': 'cours', 'label': '14h15 - 15h15', 'period': 6},
-        {'type': 'cours', 'label': '15h15 - 16h00', 'period': 7},
-    ]
-
-    # Construction de la matrice d'affichage (table_cells)
-    table_cells = []
-    for idx, horaire in enumerate(horaires):
-        row = {'horaire': horaire, 'cells': []}
-        if horaire['type'] == 'pause':
-            row['is_pause'] = True
-            table_cells.append(row)
-            continue
-        period = horaire['period']
-        for day_num, _ in TimetableSlot.DAY_CHOICES:
-            slot = timetable[day_num].get(period)
-            show = True
-            rowspan = 1
-            if slot:
-                # Vérifier si ce slot a déjà été affiché plus haut (fusion verticale)
-                for prev_idx in range(idx):
-                    prev_horaire = horaires[prev_idx]
-                    if prev_horaire['type'] == 'cours':
-                        prev_period = prev_horaire['period']
-                        prev_slot = timetable[day_num].get(prev_period)
-                        if prev_slot and prev_slot.id == slot.id:
-                            show = False
-                            break
-                rowspan = slot.duration if show else 1
-            cell = {'slot': slot, 'show': show, 'rowspan': rowspan, 'day_num': day_num, 'period': period}
-            row['cells'].append(cell)
-        row['is_pause'] = False
-        table_cells.append(row)
+    # Grille lue dans l'emploi du temps compilé de l'année (un créneau de
+    # plusieurs périodes est fusionné verticalement, sans franchir une pause)
+    compiled = get_compiled_timetable(schoolclass.year_id)
+    day_choices, table_cells = compiled.rows('class', schoolclass.pk, days=compiled.days)
 
     context = {
         'schoolclass': schoolclass,
-        'timetable': timetable,
-        'day_choices': TimetableSlot.DAY_CHOICES,
-        'horaires': horaires,
+        'day_choices': day_choices,
         'table_cells': table_cells,
-        'is_wednesday': False,  # à utiliser dans le template si besoin
     }
     return render(request, 'classes/timetable_interactive.html', context)
 
+@login_required
+def timetable_pdf(request, class_id):
+    """Emploi du temps imprimable d'une classe"""
+    schoolclass = get_object_or_404(SchoolClass.objects.select_related('school', 'year'), pk=class_id)
+    days, rows = get_compiled_timetable(schoolclass.year_id).rows('class', schoolclass.pk)
+    return timetable_pdf_response(request, {
+        'title': schoolclass.name,
+        'subtitle': f"Année scolaire {schoolclass.year.annee}" if schoolclass.year else '',
+        'school': schoolclass.school,
+        'days': days,
+        'rows': rows,
+        'mode': 'class',
+    }, schoolclass.name)
+
 def slot_add_htmx(request):
     """
     Vue pour afficher et traiter le formulaire d'ajout d'un créneau d'emploi du temps.
@@ -481,7 +491,15 @@ def slot_add_htmx(request):
             slot.year_id = year_id
             slot.day = day
             slot.period = period
-            slot.save()
+            # Vérification et enregistrement dans la même transaction (verrous de validate_slot)
+            with transaction.atomic():
+                try:
+                    occupancy.validate_slot(year_id, class_id, slot.teacher_id, day, period, slot.duration)
+                except (ValueError, TypeError):
+                    return JsonResponse({'success': False, 'error': 'Créneau invalide'})
+                except ValidationError as e:
+                    return JsonResponse({'success': False, 'error': ' '.join(e.messages)})
+                slot.save()
             return JsonResponse({'success': True})
     else:
         form = TimetableSlotForm()
@@ -499,7 +517,15 @@ def slot_edit_htmx(request, slot_id):
     if request.method == 'POST':
         form = TimetableSlotForm(request.POST, instance=slot)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                try:
+                    occupancy.validate_slot(
+                        slot.year_id, slot.class_obj_id, slot.teacher_id, slot.day, slot.period, slot.duration,
+                        exclude=slot.pk,
+                    )
+                except ValidationError as e:
+                    return JsonResponse({'success': False, 'error': ' '.join(e.messages)})
+                form.save()
             return JsonResponse({'success': True})
     else:
         form = TimetableSlotForm(instance=slot)
@@ -665,7 +691,10 @@ def assign_main_teacher_htmx(request, class_id):
             year=school_class.year
         ).order_by('last_name', 'first_name')
         
-        logger.info(f"Enseignants trouvés: {teachers.count()}")
+        # Charge de chaque enseignant affichée dans la liste de choix
+        teachers = TeacherWorkloadService.attach(list(teachers.select_related('main_subject')))
+        
+        logger.info(f"Enseignants trouvés: {len(teachers)}")
         for teacher in teachers:
             logger.debug(f"  - {teacher.last_name} {teacher.first_name} (ID: {teacher.id})")
         
@@ -676,7 +705,7 @@ def assign_main_teacher_htmx(request, class_id):
             'teachers': teachers,
         }
         
-        logger.info(f"Formulaire d'affectation affiché pour la classe {school_class.name} avec {teachers.count()} enseignants disponibles")
+        logger.info(f"Formulaire d'affectation affiché pour la classe {school_class.name} avec {len(teachers)} enseignants disponibles")
         logger.info(f"=== FIN assign_main_teacher_htmx ===")
         
         # Retourner le template de la modale
@@ -708,24 +737,19 @@ def update_timetable_slot(request):
         # Récupérer le créneau
         slot = get_object_or_404(TimetableSlot, pk=slot_id)
         
-        # Vérifier que le nouveau créneau n'est pas déjà occupé
-        existing_slot = TimetableSlot.objects.filter(
-            class_obj=slot.class_obj,
-            day=day,
-            period=period,
-            year=slot.class_obj.year
-        ).exclude(pk=slot_id).first()
-        
-        if existing_slot:
-            return JsonResponse({
-                'success': False, 
-                'error': f'Le créneau {existing_slot.get_day_display()} {existing_slot.get_period_display()} est déjà occupé par {existing_slot.subject.name}'
-            })
-        
-        # Mettre à jour le créneau
-        slot.day = int(day)
-        slot.period = int(period)
-        slot.save()
+        # Vérifier que la classe et l'enseignant sont libres sur toute la durée du créneau,
+        # puis mettre à jour le créneau dans la même transaction
+        with transaction.atomic():
+            try:
+                occupancy.validate_slot(
+                    slot.year_id, slot.class_obj_id, slot.teacher_id, day, period, slot.duration, exclude=slot.pk
+                )
+            except ValidationError as e:
+                return JsonResponse({'success': False, 'error': ' '.join(e.messages)})
+
+            slot.day = int(day)
+            slot.period = int(period)
+            slot.save()
         
         return JsonResponse({
             'success': True, 
@@ -69,11 +69,15 @@ def deploy():
         print(f"❌ CSS non généré: {css_path}")
         return False
     
-    # 5. Collecte des fichiers statiques Django
+    # 5. Table du cache partagé entre les processus (sans effet si CACHE_URL pointe vers Redis)
+    if not run_command("python manage.py createcachetable", "Création de la table de cache"):
+        return False
+    
+    # 6. Collecte des fichiers statiques Django
     if not run_command("python manage.py collectstatic --noinput", "Collecte des fichiers statiques"):
         return False
     
-    # 6. Vérification finale
+    # 7. Vérification finale
     staticfiles_css = "staticfiles/src/dist/styles.css"
     if os.path.exists(staticfiles_css):
         size = os.path.getsize(staticfiles_css) / 1024
@@ -85,6 +89,7 @@ def deploy():
     print("🎉 Déploiement terminé avec succès!")
     print("📋 Résumé:")
     print("   • CSS Tailwind compilé")
+    print("   • Table de cache créée")
     print("   • Fichiers statiques collectés")
     print("   • Prêt pour la production")
     
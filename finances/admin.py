@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.db.models import Sum
 from .models import (
     FeeStructure, FeeTranche, TranchePayment, InscriptionPayment, FeeDiscount, 
-    Moratorium, PaymentRefund, ExtraFee, ExtraFeeType, ExtraFeePayment
+    Moratorium, PaymentRefund, ExtraFee, ExtraFeeType, ExtraFeePayment, ReceiptSequence
 )
 
 @admin.register(FeeStructure)
@@ -255,6 +255,18 @@ class ExtraFeePaymentAdmin(admin.ModelAdmin):
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
 
+@admin.register(ReceiptSequence)
+class ReceiptSequenceAdmin(admin.ModelAdmin):
+    list_display = ['prefix', 'day', 'last_number', 'updated_at']
+    list_filter = ['prefix']
+    search_fields = ['prefix']
+    readonly_fields = ['prefix', 'day', 'last_number', 'updated_at']
+    date_hierarchy = 'day'
+    
+    def has_add_permission(self, request):
+        """Les séquences sont créées au premier reçu du jour"""
+        return False
+
 # Configuration des permissions
 class FinancesPermissions:
     """Permissions personnalisées pour l'app finances"""
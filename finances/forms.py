@@ -518,6 +518,11 @@ class BulkTranchePaymentForm(forms.Form):
         required=False
     )
 
+    def clean_receipt_prefix(self):
+        from .services import ReceiptService
+        prefix = self.cleaned_data.get('receipt_prefix')
+        return ReceiptService.clean_prefix(prefix) if prefix else ''
+
 class FeeStructureSearchForm(forms.Form):
     """Formulaire de recherche pour les structures de frais"""
     year = forms.ModelChoiceField(
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0002_extrafeetype_alter_extrafee_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=20, verbose_name='Préfixe')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('last_number', models.PositiveIntegerField(default=0, verbose_name='Dernier numéro utilisé')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Séquence de reçus',
+                'verbose_name_plural': 'Séquences de reçus',
+                'ordering': ['-day', 'prefix'],
+                'constraints': [models.UniqueConstraint(fields=('prefix', 'day'), name='unique_receipt_sequence')],
+            },
+        ),
+    ]
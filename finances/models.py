@@ -207,10 +207,50 @@ class ExtraFeePayment(models.Model):
     def save(self, *args, **kwargs):
         # Générer automatiquement le numéro de reçu si vide
         if not self.receipt:
-            # S'assurer que payment_date est défini
-            if not self.payment_date:
-                from django.utils import timezone
-                self.payment_date = timezone.now().date()
-            
-            self.receipt = f"FRA-{self.extra_fee.id:04d}-{self.student.id:04d}-{self.payment_date.strftime('%Y%m%d')}"
+            from .services import ReceiptService
+            self.receipt = ReceiptService.next_receipt(ReceiptService.PREFIXES['EXTRA_FEE'], self.payment_date)
         super().save(*args, **kwargs)
+
+
+class ReceiptSequence(models.Model):
+    """
+    Compteur des numéros de reçus, par préfixe et par jour
+
+    Partagé par tous les types de paiement (voir ReceiptService) : les numéros
+    sont réservés par blocs via un UPDATE atomique, deux caisses ne peuvent
+    jamais recevoir le même numéro.
+    """
+    prefix = models.CharField(max_length=20, verbose_name="Préfixe")
+    day = models.DateField(verbose_name="Jour")
+    last_number = models.PositiveIntegerField(default=0, verbose_name="Dernier numéro utilisé")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Séquence de reçus"
+        verbose_name_plural = "Séquences de reçus"
+        ordering = ['-day', 'prefix']
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'day'], name='unique_receipt_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.prefix} {self.day:%d/%m/%Y} ({self.last_number})"
+
+    def reserve_block(self, count=1):
+        """
+        Réserve un bloc contigu de `count` numéros en une seule requête UPDATE
+
+        Returns:
+            tuple: (premier numéro, dernier numéro) du bloc réservé
+        """
+        from django.db import transaction
+        from django.db.models import F
+        from django.utils import timezone
+
+        with transaction.atomic():
+            ReceiptSequence.objects.filter(pk=self.pk).update(
+                last_number=F('last_number') + count, updated_at=timezone.now()
+            )
+            # La ligne reste verrouillée par l'UPDATE jusqu'au commit : la valeur relue est la nôtre
+            self.last_number = ReceiptSequence.objects.filter(pk=self.pk).values_list('last_number', flat=True).get()
+        return self.last_number - count + 1, self.last_number
@@ -15,6 +15,7 @@ from .models import (
 from classes.models import SchoolClass
 from students.models import Student
 from school.models import School
+from scolaris.routers import reporting_view
 
 
 # ==================== FONCTIONS UTILITAIRES POUR LES RAPPORTS ====================
@@ -68,6 +69,7 @@ def get_period_dates(request):
 
 
 @login_required
+@reporting_view
 def reports_dashboard(request):
     """Dashboard principal des rapports financiers"""
     current_year = SchoolYear.objects.filter(statut='EN_COURS').first()
@@ -109,6 +111,7 @@ def reports_dashboard(request):
 # ==================== RAPPORTS D'INSCRIPTION ====================
 
 @login_required
+@reporting_view
 def inscriptions_report(request):
     """Rapport des inscriptions"""
     start_date, end_date, period_name = get_period_dates(request)
@@ -169,6 +172,7 @@ def inscriptions_report(request):
 
 
 @login_required
+@reporting_view
 def inscriptions_report_class(request, class_id):
     """Rapport des inscriptions pour une classe spécifique"""
     school_class = get_object_or_404(SchoolClass, pk=class_id)
@@ -220,6 +224,7 @@ def inscriptions_report_class(request, class_id):
 
 
 @login_required
+@reporting_view
 def export_inscriptions_report(request):
     """Export PDF du rapport d'inscriptions"""
     start_date, end_date, period_name = get_period_dates(request)
@@ -286,6 +291,7 @@ def export_inscriptions_report(request):
 # ==================== RAPPORTS DE SCOLARITÉ ====================
 
 @login_required
+@reporting_view
 def tuition_report(request):
     """Rapport de scolarité global"""
     start_date, end_date, period_name = get_period_dates(request)
@@ -353,6 +359,7 @@ def tuition_report(request):
 
 
 @login_required
+@reporting_view
 def tuition_report_class(request, class_id):
     """Rapport de scolarité pour une classe spécifique"""
     school_class = get_object_or_404(SchoolClass, pk=class_id)
@@ -417,6 +424,7 @@ def tuition_report_class(request, class_id):
 
 
 @login_required
+@reporting_view
 def export_tuition_report(request):
     """Export PDF du rapport de scolarité"""
     start_date, end_date, period_name = get_period_dates(request)
@@ -483,6 +491,7 @@ def export_tuition_report(request):
 # ==================== RAPPORTS DE RETARDS ====================
 
 @login_required
+@reporting_view
 def overdue_report(request):
     """Rapport des retards d'échéance"""
     current_year = SchoolYear.objects.filter(statut='EN_COURS').first()
@@ -549,6 +558,7 @@ def overdue_report(request):
 
 
 @login_required
+@reporting_view
 def overdue_report_class(request, class_id):
     """Rapport des retards pour une classe spécifique"""
     school_class = get_object_or_404(SchoolClass, pk=class_id)
@@ -610,6 +620,7 @@ def overdue_report_class(request, class_id):
 
 
 @login_required
+@reporting_view
 def export_overdue_report(request):
     """Export PDF du rapport des retards"""
     current_year = SchoolYear.objects.filter(statut='EN_COURS').first()
@@ -689,6 +700,7 @@ def export_overdue_report(request):
 # ==================== RAPPORTS DE PERFORMANCE ====================
 
 @login_required
+@reporting_view
 def performance_report(request):
     """Rapport de performance financière"""
     current_year = SchoolYear.objects.filter(statut='EN_COURS').first()
@@ -774,6 +786,7 @@ def performance_report(request):
 
 
 @login_required
+@reporting_view
 def export_performance_report(request):
     """Export PDF du rapport de performance"""
     current_year = SchoolYear.objects.filter(statut='EN_COURS').first()
@@ -825,6 +838,7 @@ def export_performance_report(request):
 # ==================== RAPPORTS PAR ÉTUDIANT ====================
 
 @login_required
+@reporting_view
 def student_report(request, student_id):
     """Rapport financier détaillé par étudiant"""
     student = get_object_or_404(Student, pk=student_id)
@@ -897,6 +911,7 @@ def student_report(request, student_id):
 
 
 @login_required
+@reporting_view
 def export_student_report(request, student_id):
     """Export PDF du rapport étudiant"""
     student = get_object_or_404(Student, pk=student_id)
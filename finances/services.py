@@ -0,0 +1,122 @@
+import logging
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ExtraFeePayment, InscriptionPayment, ReceiptSequence, TranchePayment
+
+logger = logging.getLogger(__name__)
+
+
+class ReceiptService:
+    """
+    Numéros de reçus de tous les paiements : {préfixe}-{AAAAMMJJ}-{numéro}
+
+    Le numéro est tiré d'une ReceiptSequence par préfixe et par jour. Les
+    paiements en lot réservent un bloc de numéros en une seule écriture. À la
+    création de la séquence d'un jour, le compteur repart du plus grand numéro
+    déjà émis ce jour-là avec ce préfixe (reçus saisis avant l'introduction des
+    séquences), pour ne jamais réémettre un numéro existant.
+    """
+
+    PREFIXES = {
+        'TRANCHE': 'REC',
+        'INSCRIPTION': 'INS',
+        'EXTRA_FEE': 'FRA',
+    }
+    FORMAT = "{prefix}-{day:%Y%m%d}-{number:04d}"
+    PAYMENT_MODELS = (TranchePayment, InscriptionPayment, ExtraFeePayment)
+
+    @staticmethod
+    def clean_prefix(prefix):
+        """Préfixe en majuscules, limité aux lettres, chiffres et tirets"""
+        prefix = re.sub(r'[^A-Z0-9-]', '', str(prefix or '').upper()).strip('-')
+        if not prefix:
+            raise ValidationError("Préfixe de reçu invalide.")
+        return prefix[:20]
+
+    @staticmethod
+    def get_sequence(prefix, day):
+        """Séquence du préfixe pour le jour, créée au premier reçu du jour"""
+        sequence = ReceiptSequence.objects.filter(prefix=prefix, day=day).first()
+        if sequence is None:
+            with transaction.atomic():
+                # get_or_create : une autre caisse peut créer la même séquence au même instant
+                sequence, _ = ReceiptSequence.objects.get_or_create(
+                    prefix=prefix, day=day, defaults={'last_number': ReceiptService._last_issued(prefix, day)}
+                )
+        return sequence
+
+    @staticmethod
+    def _last_issued(prefix, day):
+        stem = f"{prefix}-{day:%Y%m%d}-"
+        pattern = re.compile(rf"^{re.escape(stem)}(\d+)$")
+        last = 0
+        for model in ReceiptService.PAYMENT_MODELS:
+            for receipt in model.objects.filter(receipt__startswith=stem).values_list('receipt', flat=True):
+                match = pattern.match(receipt)
+                if match:
+                    last = max(last, int(match.group(1)))
+        return last
+
+    @staticmethod
+    def reserve(prefix, count=1, day=None):
+        """
+        Réserve `count` numéros de reçus consécutifs
+
+        Args:
+            prefix (str): Préfixe (voir PREFIXES, ou préfixe saisi pour un lot)
+            count (int): Nombre de reçus
+            day (date): Jour des reçus (aujourd'hui par défaut)
+
+        Returns:
+            list: Numéros de reçus réservés
+        """
+        if count < 1:
+            return []
+        prefix = ReceiptService.clean_prefix(prefix)
+        day = day or timezone.localdate()
+        first, last = ReceiptService.get_sequence(prefix, day).reserve_block(count)
+        return [ReceiptService.FORMAT.format(prefix=prefix, day=day, number=number) for number in range(first, last + 1)]
+
+    @staticmethod
+    def next_receipt(prefix, day=None):
+        """Prochain numéro de reçu du préfixe"""
+        return ReceiptService.reserve(prefix, 1, day)[0]
+
+    @staticmethod
+    def create_class_tranche_payments(school_class, tranche, mode, created_by=None, prefix=None):
+        """
+        Enregistre le paiement intégral d'une tranche pour tous les élèves actifs
+        de la classe qui ne l'ont pas encore payée
+
+        Une requête pour les élèves restant à payer, un bloc de numéros de reçus,
+        une insertion groupée : le coût ne dépend pas de l'effectif de la classe.
+
+        Returns:
+            list: Paiements créés
+        """
+        from students.models import Student
+
+        with transaction.atomic():
+            student_ids = list(Student.objects.filter(current_class=school_class, is_active=True).exclude(
+                tranche_payments__tranche=tranche
+            ).order_by('last_name', 'first_name', 'pk').values_list('pk', flat=True))
+            receipts = ReceiptService.reserve(prefix or ReceiptService.PREFIXES['TRANCHE'], len(student_ids))
+            payments = TranchePayment.objects.bulk_create([
+                TranchePayment(
+                    student_id=student_id, tranche=tranche, amount=tranche.amount, mode=mode,
+                    receipt=receipt, created_by=created_by,
+                )
+                for student_id, receipt in zip(student_ids, receipts)
+            ])
+            if student_ids:
+                # Insertion sans signaux : soldes de l'API du portail parents et
+                # onglets des fiches élèves à recharger
+                from parents_portal.sync import touch
+                from scolaris.fragments import bump_version
+                touch('balance', *student_ids)
+                bump_version('student', *student_ids)
+        return payments
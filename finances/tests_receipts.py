@@ -0,0 +1,69 @@
+from datetime import date
+
+from django.test import TestCase
+from django.utils import timezone
+
+from classes.models import SchoolClass
+from school.models import EducationSystem, School, SchoolLevel, SchoolType, SchoolYear
+from scolaris.fragments import get_versions
+from students.models import Student
+
+from .models import FeeStructure, FeeTranche, TranchePayment
+from .services import ReceiptService
+
+
+class ReceiptServiceTests(TestCase):
+    """Tests de l'attribution des numéros de reçus"""
+
+    def setUp(self):
+        year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        school = School.objects.create(
+            name="École Test", code="ET01", address="Douala",
+            type=SchoolType.objects.create(name="Public", code="PUB"), education_system=system,
+        )
+        self.school_class = SchoolClass.objects.create(
+            name="6e M1", level=SchoolLevel.objects.create(name="Sixième", system=system, order=1),
+            year=year, school=school,
+        )
+        self.students = [
+            Student.objects.create(
+                matricule=f"STU{i}", first_name="Élève", last_name=f"Test{i}", birth_date=date(2012, 1, 1),
+                birth_place="Douala", gender='F', year=year, school=school, current_class=self.school_class,
+            )
+            for i in range(5)
+        ]
+        structure = FeeStructure.objects.create(
+            school_class=self.school_class, year=year, inscription_fee=10000, tuition_total=60000,
+        )
+        self.tranche = FeeTranche.objects.create(
+            fee_structure=structure, number=1, amount=20000, due_date=date(2024, 10, 1)
+        )
+
+    def test_class_payments_share_the_daily_sequence(self):
+        today = timezone.localdate()
+        # Reçu émis avant la création de la séquence du jour
+        TranchePayment.objects.create(
+            student=self.students[0], tranche=self.tranche, amount=20000, mode='cash',
+            receipt=f"REC-{today:%Y%m%d}-0007",
+        )
+        ReceiptService.get_sequence('REC', today)
+
+        # Élèves restant à payer, réservation du bloc (UPDATE + relecture), insertion groupée, savepoints
+        with self.assertNumQueries(9):
+            payments = ReceiptService.create_class_tranche_payments(self.school_class, self.tranche, 'cash')
+        self.assertEqual(len(payments), 4)
+        self.assertEqual(
+            [payment.receipt for payment in payments], [f"REC-{today:%Y%m%d}-{n:04d}" for n in range(8, 12)]
+        )
+        self.assertEqual(ReceiptService.create_class_tranche_payments(self.school_class, self.tranche, 'cash'), [])
+        self.assertEqual(ReceiptService.next_receipt('rec'), f"REC-{today:%Y%m%d}-0012")
+
+    def test_class_payments_refresh_student_tabs(self):
+        def student_versions():
+            return [get_versions([('student', student.pk)])[-1] for student in self.students]
+
+        versions = student_versions()
+        with self.captureOnCommitCallbacks(execute=True):
+            ReceiptService.create_class_tranche_payments(self.school_class, self.tranche, 'cash')
+        self.assertTrue(all(old != new for old, new in zip(versions, student_versions())))
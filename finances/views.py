@@ -30,10 +30,12 @@ from .forms import (
     MoratoriumForm, PaymentRefundForm, ExtraFeeForm, BulkTranchePaymentForm,
     FeeStructureSearchForm, PaymentSearchForm, ExtraFeeTypeForm, ExtraFeePaymentForm
 )
+from .services import ReceiptService
 from school.models import SchoolYear, School, CurrentSchoolYear
 from classes.models import SchoolClass
 from students.models import Student
 from authentication.models import User
+from scolaris.routers import reporting_view
 
 logger = logging.getLogger(__name__)
 
@@ -288,6 +290,7 @@ def student_financial_status(request, student_pk):
 
 
 @login_required
+@reporting_view
 def reports_dashboard(request):
     """Vue pour le tableau de bord des rapports"""
     logger.info(f"Utilisateur {request.user} accède au tableau de bord des rapports")
@@ -311,6 +314,7 @@ def reports_dashboard(request):
 
 
 @login_required
+@reporting_view
 def inscriptions_report(request):
     """Rapport des inscriptions"""
     logger.info(f"Utilisateur {request.user} consulte le rapport des inscriptions")
@@ -335,6 +339,7 @@ def inscriptions_report(request):
 
 
 @login_required
+@reporting_view
 def inscriptions_report_class(request, class_id):
     """Rapport des inscriptions par classe"""
     logger.info(f"Utilisateur {request.user} consulte le rapport des inscriptions pour la classe {class_id}")
@@ -361,6 +366,7 @@ def inscriptions_report_class(request, class_id):
 
 
 @login_required
+@reporting_view
 def export_inscriptions_report(request):
     """Export PDF du rapport des inscriptions"""
     logger.info(f"Utilisateur {request.user} exporte le rapport des inscriptions")
@@ -376,6 +382,7 @@ def export_inscriptions_report(request):
 
 
 @login_required
+@reporting_view
 def tuition_report(request):
     """Rapport des scolarités"""
     logger.info(f"Utilisateur {request.user} consulte le rapport des scolarités")
@@ -399,6 +406,7 @@ def tuition_report(request):
 
 
 @login_required
+@reporting_view
 def tuition_report_class(request, class_id):
     """Rapport des scolarités par classe"""
     logger.info(f"Utilisateur {request.user} consulte le rapport des scolarités pour la classe {class_id}")
@@ -425,6 +433,7 @@ def tuition_report_class(request, class_id):
 
 
 @login_required
+@reporting_view
 def export_tuition_report(request):
     """Export PDF du rapport des scolarités"""
     logger.info(f"Utilisateur {request.user} exporte le rapport des scolarités")
@@ -440,6 +449,7 @@ def export_tuition_report(request):
 
 
 @login_required
+@reporting_view
 def overdue_report(request):
     """Rapport des paiements en retard"""
     logger.info(f"Utilisateur {request.user} consulte le rapport des paiements en retard")
@@ -463,6 +473,7 @@ def overdue_report(request):
 
 
 @login_required
+@reporting_view
 def overdue_report_class(request, class_id):
     """Rapport des paiements en retard par classe"""
     logger.info(f"Utilisateur {request.user} consulte le rapport des paiements en retard pour la classe {class_id}")
@@ -489,6 +500,7 @@ def overdue_report_class(request, class_id):
 
 
 @login_required
+@reporting_view
 def export_overdue_report(request):
     """Export PDF du rapport des paiements en retard"""
     logger.info(f"Utilisateur {request.user} exporte le rapport des paiements en retard")
@@ -504,6 +516,7 @@ def export_overdue_report(request):
 
 
 @login_required
+@reporting_view
 def performance_report(request):
     """Rapport de performance financière"""
     logger.info(f"Utilisateur {request.user} consulte le rapport de performance financière")
@@ -527,6 +540,7 @@ def performance_report(request):
 
 
 @login_required
+@reporting_view
 def export_performance_report(request):
     """Export PDF du rapport de performance"""
     logger.info(f"Utilisateur {request.user} exporte le rapport de performance")
@@ -542,6 +556,7 @@ def export_performance_report(request):
 
 
 @login_required
+@reporting_view
 def student_report(request, student_id):
     """Rapport financier d'un étudiant"""
     logger.info(f"Utilisateur {request.user} consulte le rapport financier de l'étudiant {student_id}")
@@ -640,6 +655,7 @@ def student_report(request, student_id):
 
 
 @login_required
+@reporting_view
 def export_student_report(request, student_id):
     """Export PDF du rapport d'un étudiant"""
     logger.info(f"Utilisateur {request.user} exporte le rapport de l'étudiant {student_id}")
@@ -1374,7 +1390,7 @@ def payment_create(request):
                 
                 # Générer un numéro de reçu automatique si non fourni
                 if not payment.receipt:
-                    payment.receipt = f"REC-{timezone.now().strftime('%Y%m%d')}-{TranchePayment.objects.count() + 1:04d}"
+                    payment.receipt = ReceiptService.next_receipt(ReceiptService.PREFIXES['TRANCHE'])
                 
                 payment.save()
                 
@@ -1451,7 +1467,7 @@ def inscription_payment_create(request):
                 
                 # Générer un numéro de reçu automatique si non fourni
                 if not payment.receipt:
-                    payment.receipt = f"INS-{timezone.now().strftime('%Y%m%d')}-{InscriptionPayment.objects.count() + 1:04d}"
+                    payment.receipt = ReceiptService.next_receipt(ReceiptService.PREFIXES['INSCRIPTION'])
                 
                 payment.save()
                 
@@ -1730,34 +1746,19 @@ def bulk_payment_create(request):
         form = BulkTranchePaymentForm(request.POST)
         if form.is_valid():
             try:
-                with transaction.atomic():
-                    school_class = form.cleaned_data['school_class']
-                    tranche = form.cleaned_data['tranche']
-                    mode = form.cleaned_data['mode']
-                    receipt_prefix = form.cleaned_data.get('receipt_prefix', 'REC')
-                    
-                    # Récupérer tous les étudiants de la classe
-                    students = Student.objects.filter(current_class=school_class, is_active=True)
-                    
-                    payments_created = 0
-                    for student in students:
-                        # Vérifier si l'étudiant a déjà payé cette tranche
-                        if not TranchePayment.objects.filter(student=student, tranche=tranche).exists():
-                            receipt_number = f"{receipt_prefix}-{timezone.now().strftime('%Y%m%d')}-{payments_created + 1:04d}"
-                            
-                            TranchePayment.objects.create(
-                                student=student,
-                                tranche=tranche,
-                                amount=tranche.amount,
-                                mode=mode,
-                                receipt=receipt_number,
-                                created_by=request.user
-                            )
-                            payments_created += 1
-                    
-                    logger.info(f"Paiements en lot créés avec succès par {request.user}: {payments_created} paiements")
-                    messages.success(request, f"{payments_created} paiements créés avec succès.")
-                    return redirect('finances:payment_list')
+                # Élèves n'ayant pas encore payé la tranche, reçus réservés en bloc, insertion groupée
+                payments = ReceiptService.create_class_tranche_payments(
+                    form.cleaned_data['school_class'],
+                    form.cleaned_data['tranche'],
+                    form.cleaned_data['mode'],
+                    created_by=request.user,
+                    prefix=form.cleaned_data.get('receipt_prefix') or None,
+                )
+                payments_created = len(payments)
+                
+                logger.info(f"Paiements en lot créés avec succès par {request.user}: {payments_created} paiements")
+                messages.success(request, f"{payments_created} paiements créés avec succès.")
+                return redirect('finances:payment_list')
                     
             except Exception as e:
                 logger.error(f"Erreur lors de la création des paiements en lot: {e}")
@@ -2806,6 +2807,7 @@ def get_tranches_for_student(request):
         return JsonResponse({'error': 'Erreur lors de la récupération des tranches'}, status=500)
 
 @login_required
+@reporting_view
 def export_financial_report(request):
     """
     Vue pour exporter le rapport financier en PDF
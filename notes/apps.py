@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class NotesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'notes'
+
+    def ready(self):
+        """Invalidation du cache des statistiques de notes (notes/statistics.py)"""
+        import notes.signals
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from notes.models import Trimester
+from notes.services import ProgressSeriesService
+
+
+class Command(BaseCommand):
+    """
+    Commande de (re)construction des séries de progression à partir des bulletins existants
+    """
+    help = "Remplit les séries de progression des élèves à partir des bulletins déjà générés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=str, help="Année scolaire à traiter (ex: 2024-2025), toutes par défaut")
+
+    def handle(self, *args, **options):
+        trimesters = Trimester.objects.filter(bulletins__isnull=False).distinct().select_related('year')
+        if options['year']:
+            trimesters = trimesters.filter(year__annee=options['year'])
+
+        total = 0
+        for trimester in trimesters.order_by('year__annee', 'trimester'):
+            count = ProgressSeriesService.record_trimester(trimester)
+            total += count
+            self.stdout.write(f'📈 {trimester} : {count} élève(s)')
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} point(s) de progression enregistré(s)'))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_schoolclass_name_en_schoolclass_name_fr'),
+        ('notes', '0001_initial'),
+        ('school', '0004_add_matricule_sequence'),
+        ('students', '0003_alter_student_matricule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveIntegerField(help_text='Ordre chronologique : année de début * 10 + numéro du trimestre (ex: 20241)', verbose_name='Période')),
+                ('general_average', models.DecimalField(decimal_places=2, max_digits=4, verbose_name='Moyenne générale')),
+                ('rank', models.PositiveIntegerField(blank=True, null=True, verbose_name='Rang')),
+                ('class_size', models.PositiveIntegerField(blank=True, null=True, verbose_name='Effectif')),
+                ('subject_averages', models.JSONField(blank=True, default=dict, help_text='Moyenne par matière : {id de la matière: moyenne}')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('school_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='progress_points', to='classes.schoolclass')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_points', to='students.student')),
+                ('trimester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_points', to='notes.trimester')),
+                ('year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_points', to='school.schoolyear')),
+            ],
+            options={
+                'verbose_name': 'Point de progression',
+                'verbose_name_plural': 'Points de progression',
+                'ordering': ['period'],
+                'indexes': [models.Index(fields=['student', 'period'], name='notes_stude_student_f72a6b_idx'), models.Index(fields=['school_class', 'period'], name='notes_stude_school__0d7a2a_idx')],
+                'unique_together': {('student', 'trimester')},
+            },
+        ),
+    ]
@@ -87,17 +87,25 @@ class Evaluation(models.Model):
 
     @property
     def grades_count(self):
-        """Nombre de notes saisies"""
+        """
+        Nombre de notes saisies
+
+        Repris de la matrice de complétude (GradeCompletionService) quand elle
+        a été calculée pour cette évaluation, sans nouvelle requête.
+        """
+        completion = getattr(self, 'completion', None)
+        if completion is not None:
+            return completion['grades_count']
         return self.grades.count()
 
     @property
     def average_score(self):
         """Moyenne des notes pour cette évaluation"""
-        grades = self.grades.all()
-        if grades.exists():
-            total = sum(grade.score for grade in grades)
-            return round(total / grades.count(), 2)
-        return 0
+        completion = getattr(self, 'completion', None)
+        if completion is not None:
+            return completion['average']
+        average = self.grades.aggregate(avg=models.Avg('score'))['avg']
+        return round(average, 2) if average is not None else 0
 
     def close_evaluation(self):
         """Clôture l'évaluation"""
@@ -231,6 +239,46 @@ class BulletinLine(models.Model):
         """Matière réussie (≥ 10/20)"""
         return self.average >= 10
 
+# ==================== SÉRIES DE PROGRESSION ====================
+
+class StudentProgress(models.Model):
+    """
+    Point de la série de progression d'un élève : moyennes d'un trimestre
+
+    Rempli à la génération des bulletins (ProgressSeriesService.record_trimester),
+    conservé d'une année sur l'autre pour suivre la trajectoire de l'élève.
+    """
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE, related_name='progress_points')
+    trimester = models.ForeignKey(Trimester, on_delete=models.CASCADE, related_name='progress_points')
+    year = models.ForeignKey(SchoolYear, on_delete=models.CASCADE, related_name='progress_points')
+    school_class = models.ForeignKey(
+        'classes.SchoolClass', on_delete=models.SET_NULL, null=True, blank=True, related_name='progress_points'
+    )
+    period = models.PositiveIntegerField(
+        help_text="Ordre chronologique : année de début * 10 + numéro du trimestre (ex: 20241)",
+        verbose_name="Période"
+    )
+    general_average = models.DecimalField(max_digits=4, decimal_places=2, verbose_name="Moyenne générale")
+    rank = models.PositiveIntegerField(null=True, blank=True, verbose_name="Rang")
+    class_size = models.PositiveIntegerField(null=True, blank=True, verbose_name="Effectif")
+    subject_averages = models.JSONField(
+        default=dict, blank=True, help_text="Moyenne par matière : {id de la matière: moyenne}"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'trimester')
+        ordering = ['period']
+        indexes = [
+            models.Index(fields=['student', 'period']),
+            models.Index(fields=['school_class', 'period']),
+        ]
+        verbose_name = "Point de progression"
+        verbose_name_plural = "Points de progression"
+
+    def __str__(self):
+        return f"{self.student} - {self.trimester} : {self.general_average}/20"
+
 # ==================== UTILITAIRES ====================
 
 class BulletinUtils:
@@ -407,6 +455,10 @@ class BulletinUtils:
                     'subject_averages': data['subject_averages']
                 }
                 bulletins_created.append(bulletin_data)
+
+            # Séries de progression (suivi des moyennes d'un trimestre à l'autre)
+            from .services import ProgressSeriesService
+            ProgressSeriesService.record_trimester(trimester)
         
         # Envoyer les notifications automatiques aux parents (en arrière-plan)
         try:
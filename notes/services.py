@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-Service de notification pour les bulletins
+Services des notes : notification des bulletins, complétude des évaluations
+et séries de progression des élèves
 """
 
 import logging
@@ -233,3 +234,350 @@ class BulletinNotificationService:
 
 # Instance globale du service de notification de bulletin
 bulletin_notification_service = BulletinNotificationService()
+
+
+class GradeCompletionService:
+    """
+    Matrice de complétude des évaluations
+
+    Pour un ensemble d'évaluations, calcule en une requête groupée le nombre de
+    notes saisies, la moyenne, les extrêmes et le nombre de réussites par
+    évaluation, rapportés à l'effectif (élèves actifs) de la classe évaluée.
+    Sert la liste des évaluations, leur détail et la vérification préalable à
+    la génération des bulletins.
+    """
+
+    PASS_SCORE = 10
+
+    @staticmethod
+    def get_matrix(school_class=None, trimester=None, evaluations=None, include_missing=False):
+        """
+        Matrice de complétude
+
+        Args:
+            school_class (SchoolClass, optional): Classe évaluée
+            trimester (Trimester, optional): Trimestre
+            evaluations (QuerySet, optional): Évaluations à utiliser (sinon
+                celles de la classe et/ou du trimestre)
+            include_missing (bool): Si True, liste les élèves sans note
+
+        Returns:
+            dict: {
+                'rows': [ligne par évaluation],
+                'by_evaluation': {evaluation_id: ligne},
+                'total_evaluations', 'completed_evaluations', 'total_grades',
+                'ready': toutes les évaluations (au moins une) sont complètes,
+            }
+            Chaque ligne contient evaluation, total_students, grades_count,
+            missing_count, missing_students (si include_missing), completion
+            (en %), is_complete, average, highest, lowest, success_count et
+            success_rate.
+        """
+        from django.db.models import Avg, Count, F, Max, Min, Q
+        from students.models import Student
+        from .models import Evaluation, StudentGrade
+
+        if evaluations is None:
+            evaluations = Evaluation.objects.all()
+            if school_class is not None:
+                evaluations = evaluations.filter(school_class=school_class)
+            if trimester is not None:
+                evaluations = evaluations.filter(trimester=trimester)
+        evaluations = list(evaluations.select_related('trimester', 'subject', 'school_class'))
+        evaluation_ids = [evaluation.pk for evaluation in evaluations]
+        class_ids = {evaluation.school_class_id for evaluation in evaluations}
+
+        roster = Student.objects.filter(current_class_id__in=class_ids, is_active=True)
+        if include_missing:
+            students_by_class = {}
+            for student in roster.order_by('last_name', 'first_name'):
+                students_by_class.setdefault(student.current_class_id, []).append(student)
+            class_sizes = {class_id: len(students) for class_id, students in students_by_class.items()}
+        else:
+            class_sizes = dict(
+                roster.values('current_class_id').annotate(total=Count('id')).values_list('current_class_id', 'total')
+            )
+
+        # Seules comptent les notes des élèves actuellement dans la classe évaluée
+        grades = StudentGrade.objects.filter(
+            evaluation_id__in=evaluation_ids,
+            student__is_active=True,
+            student__current_class_id=F('evaluation__school_class_id'),
+        )
+        stats = {
+            row['evaluation_id']: row
+            for row in grades.values('evaluation_id').annotate(
+                grades_count=Count('id'),
+                average=Avg('score'),
+                highest=Max('score'),
+                lowest=Min('score'),
+                success_count=Count('id', filter=Q(score__gte=GradeCompletionService.PASS_SCORE)),
+            ).order_by()
+        }
+        graded = {}
+        if include_missing:
+            for evaluation_id, student_id in grades.values_list('evaluation_id', 'student_id'):
+                graded.setdefault(evaluation_id, set()).add(student_id)
+
+        rows = []
+        for evaluation in evaluations:
+            stat = stats.get(evaluation.pk, {})
+            total_students = class_sizes.get(evaluation.school_class_id, 0)
+            grades_count = stat.get('grades_count', 0)
+            row = {
+                'evaluation': evaluation,
+                'total_students': total_students,
+                'grades_count': grades_count,
+                'missing_count': total_students - grades_count,
+                'completion': round(grades_count * 100 / total_students, 1) if total_students else 0,
+                'is_complete': grades_count >= total_students,
+                'average': round(stat['average'], 2) if stat.get('average') is not None else 0,
+                'highest': stat.get('highest') or 0,
+                'lowest': stat.get('lowest') or 0,
+                'success_count': stat.get('success_count', 0),
+                'success_rate': round(stat.get('success_count', 0) * 100 / grades_count, 1) if grades_count else 0,
+            }
+            if include_missing:
+                graded_ids = graded.get(evaluation.pk, set())
+                row['missing_students'] = [
+                    student for student in students_by_class.get(evaluation.school_class_id, [])
+                    if student.pk not in graded_ids
+                ]
+            evaluation.completion = row
+            rows.append(row)
+
+        completed = sum(1 for row in rows if row['is_complete'])
+        return {
+            'rows': rows,
+            'by_evaluation': {row['evaluation'].pk: row for row in rows},
+            'total_evaluations': len(rows),
+            'completed_evaluations': completed,
+            'total_grades': sum(row['grades_count'] for row in rows),
+            'ready': bool(rows) and completed == len(rows),
+        }
+
+    @staticmethod
+    def get_ready_trimester(matrix):
+        """
+        Premier trimestre dont toutes les évaluations de la matrice sont complètes
+
+        Returns:
+            Trimester | None
+        """
+        by_trimester = {}
+        for row in matrix['rows']:
+            by_trimester.setdefault(row['evaluation'].trimester, []).append(row['is_complete'])
+        for trimester in sorted(by_trimester, key=lambda t: t.trimester):
+            if all(by_trimester[trimester]):
+                return trimester
+        return None
+
+    @staticmethod
+    def get_trimester_readiness(trimester):
+        """
+        État de préparation des bulletins d'un trimestre, par classe
+
+        Returns:
+            list: [{'school_class', 'ready', 'incomplete_evaluations', 'missing_grades'}]
+        """
+        matrix = GradeCompletionService.get_matrix(trimester=trimester)
+        by_class = {}
+        for row in matrix['rows']:
+            school_class = row['evaluation'].school_class
+            entry = by_class.setdefault(school_class.pk, {
+                'school_class': school_class,
+                'incomplete_evaluations': 0,
+                'missing_grades': 0,
+            })
+            if not row['is_complete']:
+                entry['incomplete_evaluations'] += 1
+                entry['missing_grades'] += row['missing_count']
+        readiness = sorted(by_class.values(), key=lambda entry: entry['school_class'].name)
+        for entry in readiness:
+            entry['ready'] = entry['incomplete_evaluations'] == 0
+        return readiness
+
+
+class ProgressSeriesService:
+    """
+    Séries de progression des élèves (notes.models.StudentProgress)
+
+    Un point par élève et par trimestre : moyenne générale, rang et moyenne par
+    matière, enregistrés à la génération des bulletins et conservés d'une année
+    sur l'autre. Les requêtes de groupe (ex: élèves dont la moyenne a baissé de
+    plus de 2 points) chargent les séries en une requête dans une matrice
+    élèves × périodes (notes/statistics.py).
+    """
+
+    DROP_THRESHOLD = 2
+
+    @staticmethod
+    def get_period(trimester):
+        """Période d'un trimestre, ex: 2e trimestre de 2024-2025 -> 20242"""
+        from .models import Trimester
+
+        codes = [code for code, _label in Trimester.TRIMESTER_CHOICES]
+        return int(str(trimester.year.annee)[:4]) * 10 + codes.index(trimester.trimester) + 1
+
+    @staticmethod
+    def record_trimester(trimester):
+        """
+        Enregistre (ou met à jour) les points de progression à partir des
+        bulletins du trimestre
+
+        Returns:
+            int: Nombre de points enregistrés
+        """
+        from .models import Bulletin, BulletinLine, StudentProgress
+
+        period = ProgressSeriesService.get_period(trimester)
+        subject_averages = {}
+        for bulletin_id, subject_id, average in BulletinLine.objects.filter(
+            bulletin__trimester=trimester
+        ).values_list('bulletin_id', 'subject_id', 'average'):
+            subject_averages.setdefault(bulletin_id, {})[str(subject_id)] = float(average)
+
+        points = [
+            StudentProgress(
+                student_id=bulletin.student_id,
+                trimester=trimester,
+                year_id=trimester.year_id,
+                school_class_id=bulletin.student.current_class_id,
+                period=period,
+                general_average=bulletin.student_average,
+                rank=bulletin.student_rank,
+                class_size=bulletin.class_size,
+                subject_averages=subject_averages.get(bulletin.pk, {}),
+            )
+            for bulletin in Bulletin.objects.filter(trimester=trimester).select_related('student')
+        ]
+        StudentProgress.objects.bulk_create(
+            points,
+            update_conflicts=True,
+            unique_fields=['student', 'trimester'],
+            update_fields=['school_class', 'period', 'general_average', 'rank', 'class_size',
+                           'subject_averages', 'updated_at'],
+        )
+        logger.info(f"{len(points)} points de progression enregistrés pour {trimester}")
+        return len(points)
+
+    @staticmethod
+    def get_series(student):
+        """
+        Série chronologique d'un élève
+
+        Returns:
+            list: [{'period', 'label', 'trimester', 'year', 'school_class',
+            'general_average', 'rank', 'class_size', 'delta', 'subjects':
+            [{'subject', 'average', 'delta'}]}]
+        """
+        from subjects.models import Subject
+        from .models import StudentProgress
+
+        points = list(
+            StudentProgress.objects.filter(student=student).select_related('trimester', 'year', 'school_class')
+        )
+        subject_ids = {int(pk) for point in points for pk in point.subject_averages}
+        subjects = Subject.objects.in_bulk(subject_ids)
+
+        series = []
+        previous = None
+        for point in points:
+            before = previous.subject_averages if previous else {}
+            series.append({
+                'period': point.period,
+                'label': f"{point.trimester.get_trimester_display()} {point.year.annee}",
+                'trimester': point.trimester,
+                'year': point.year,
+                'school_class': point.school_class,
+                'general_average': float(point.general_average),
+                'rank': point.rank,
+                'class_size': point.class_size,
+                'delta': round(float(point.general_average - previous.general_average), 2) if previous else None,
+                'subjects': [
+                    {
+                        'subject': subjects.get(int(pk)),
+                        'average': average,
+                        'delta': round(average - before[pk], 2) if pk in before else None,
+                    }
+                    for pk, average in sorted(point.subject_averages.items(), key=lambda item: int(item[0]))
+                ],
+            })
+            previous = point
+        return series
+
+    @staticmethod
+    def get_matrix(points=None, subject=None):
+        """
+        Séries d'un ensemble d'élèves en une requête
+
+        Args:
+            points (QuerySet, optional): Points à charger (tous par défaut)
+            subject (Subject, optional): Moyennes de cette matière au lieu
+                de la moyenne générale
+
+        Returns:
+            tuple: (ids des élèves, périodes, matrice élèves × périodes)
+        """
+        from .models import StudentProgress
+        from .statistics import series_matrix
+
+        if points is None:
+            points = StudentProgress.objects.all()
+        if subject is None:
+            rows = list(points.values_list('student_id', 'period', 'general_average').order_by())
+        else:
+            key = str(subject.pk)
+            rows = [
+                (student_id, period, averages.get(key, float('nan')))
+                for student_id, period, averages in points.values_list(
+                    'student_id', 'period', 'subject_averages'
+                ).order_by()
+            ]
+        if not rows:
+            return series_matrix([], [], [])
+        student_ids, periods, values = zip(*rows)
+        return series_matrix(student_ids, periods, values)
+
+    @staticmethod
+    def find_drops(threshold=None, school_class=None, students=None, subject=None):
+        """
+        Élèves dont la moyenne a baissé de plus de `threshold` points entre
+        leurs deux dernières périodes
+
+        Args:
+            threshold (float, optional): Baisse minimale (DROP_THRESHOLD par défaut)
+            school_class (SchoolClass, optional): Élèves actuellement dans la classe
+            students (QuerySet, optional): Élèves à examiner
+            subject (Subject, optional): Moyenne de la matière au lieu de la moyenne générale
+
+        Returns:
+            list: [{'student_id', 'period', 'previous', 'current', 'delta'}],
+            des plus fortes baisses aux plus faibles
+        """
+        import numpy as np
+        from .models import StudentProgress
+        from .statistics import last_changes
+
+        if threshold is None:
+            threshold = ProgressSeriesService.DROP_THRESHOLD
+        points = StudentProgress.objects.all()
+        if school_class is not None:
+            points = points.filter(student__current_class=school_class, student__is_active=True)
+        if students is not None:
+            points = points.filter(student__in=students)
+
+        student_ids, periods, matrix = ProgressSeriesService.get_matrix(points, subject)
+        last, current, previous, delta = last_changes(matrix)
+        dropped = np.flatnonzero(delta < -threshold)
+        dropped = dropped[np.argsort(delta[dropped], kind='stable')]
+        return [
+            {
+                'student_id': int(student_ids[i]),
+                'period': int(periods[last[i]]),
+                'previous': round(float(previous[i]), 2),
+                'current': round(float(current[i]), 2),
+                'delta': round(float(delta[i]), 2),
+            }
+            for i in dropped
+        ]
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from scolaris.fragments import bump_version
+from .models import Evaluation, StudentGrade
+
+
+def invalidate_evaluation_stats(evaluation):
+    """Invalide les statistiques de l'évaluation, de sa matière et de sa classe"""
+    bump_version('grades_evaluation', evaluation.pk)
+    bump_version('grades_subject', evaluation.subject_id)
+    bump_version('grades_class', evaluation.school_class_id)
+    # Évaluations ouvertes et notes à saisir des enseignants, toutes années (teachers/services.py)
+    bump_version('workload')
+
+
+@receiver(post_init, sender=Evaluation)
+def remember_evaluation_owners(sender, instance, **kwargs):
+    # Matière et classe au chargement : une évaluation déplacée invalide aussi les anciennes
+    instance._stats_owners = (instance.__dict__.get('subject_id'), instance.__dict__.get('school_class_id'))
+
+
+@receiver([post_save, post_delete], sender=Evaluation)
+def evaluation_changed(sender, instance, **kwargs):
+    invalidate_evaluation_stats(instance)
+    subject_id, class_id = getattr(instance, '_stats_owners', (None, None))
+    if subject_id != instance.subject_id:
+        bump_version('grades_subject', subject_id)
+    if class_id != instance.school_class_id:
+        bump_version('grades_class', class_id)
+    instance._stats_owners = (instance.subject_id, instance.school_class_id)
+
+
+@receiver([post_save, post_delete], sender=StudentGrade)
+def grade_changed(sender, instance, **kwargs):
+    invalidate_evaluation_stats(instance.evaluation)
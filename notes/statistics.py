@@ -0,0 +1,236 @@
+"""
+Statistiques des notes (évaluation, matière ou classe)
+
+Les notes sont chargées en une requête dans des tableaux NumPy, ramenées sur
+20, puis décrites de façon vectorisée : moyenne, médiane, écart-type,
+quartiles, histogramme, taux de réussite et écarts réduits (z-scores) par
+élève. Les résultats sont mis en cache et indexés par la version des notes
+concernées, incrémentée par notes/signals.py à chaque saisie. Dans une vue de
+rapport qui lit la base `reporting` (scolaris/routers.py), la clé porte aussi
+l'alias et la date des données lues : un instantané rafraîchi n'est pas masqué
+par un résultat calculé sur le précédent.
+
+series_matrix / last_changes servent les séries de progression
+(ProgressSeriesService) : une matrice élèves × périodes par requête de groupe.
+"""
+from django.conf import settings
+from django.core.cache import cache
+import numpy as np
+
+from scolaris.fragments import get_versions
+from scolaris.routers import get_read_alias, get_reporting_as_of
+from .models import StudentGrade
+from .services import GradeCompletionService
+
+# Classes de l'histogramme : [0, 2[, [2, 4[, ... [18, 20]
+HISTOGRAM_BINS = np.arange(0, 22, 2)
+
+
+def load_scores(**filters):
+    """
+    Notes sur 20 correspondant aux filtres (une requête)
+
+    Args:
+        **filters: Filtres sur StudentGrade (ex: evaluation=..., evaluation__subject=...)
+
+    Returns:
+        dict: Tableaux alignés 'student', 'evaluation', 'subject' et 'score'
+    """
+    rows = StudentGrade.objects.filter(**filters).values_list(
+        'student_id', 'evaluation_id', 'evaluation__subject_id', 'score', 'evaluation__max_score'
+    ).order_by()
+    data = np.array(rows, dtype=float).reshape(-1, 5)
+    max_scores = data[:, 4]
+    scores = np.divide(data[:, 3] * 20, max_scores, out=np.zeros(len(data)), where=max_scores > 0)
+    return {
+        'student': data[:, 0].astype(int),
+        'evaluation': data[:, 1].astype(int),
+        'subject': data[:, 2].astype(int),
+        'score': scores,
+    }
+
+
+def describe(scores):
+    """
+    Statistiques descriptives d'un tableau de notes sur 20
+
+    Returns:
+        dict: count, mean, median, std, min, max, q1, q3, success_count,
+        success_rate (en %) et histogram [{'start', 'end', 'count', 'percent'}]
+    """
+    count = int(scores.size)
+    counts, edges = np.histogram(scores, bins=HISTOGRAM_BINS)
+    histogram = [
+        {
+            'start': int(edges[i]),
+            'end': int(edges[i + 1]),
+            'count': int(counts[i]),
+            'percent': round(float(counts[i]) * 100 / count, 1) if count else 0,
+        }
+        for i in range(len(counts))
+    ]
+    if not count:
+        return {
+            'count': 0, 'mean': 0, 'median': 0, 'std': 0, 'min': 0, 'max': 0, 'q1': 0, 'q3': 0,
+            'success_count': 0, 'success_rate': 0, 'histogram': histogram,
+        }
+
+    q1, median, q3 = np.percentile(scores, [25, 50, 75])
+    success_count = int(np.count_nonzero(scores >= GradeCompletionService.PASS_SCORE))
+    return {
+        'count': count,
+        'mean': round(float(scores.mean()), 2),
+        'median': round(float(median), 2),
+        'std': round(float(scores.std()), 2),
+        'min': round(float(scores.min()), 2),
+        'max': round(float(scores.max()), 2),
+        'q1': round(float(q1), 2),
+        'q3': round(float(q3), 2),
+        'success_count': success_count,
+        'success_rate': round(success_count * 100 / count, 1),
+        'histogram': histogram,
+    }
+
+
+def group_means(keys, scores):
+    """
+    Moyenne des notes par clé (élève, matière, ...)
+
+    Returns:
+        tuple: (clés distinctes, moyennes, nombre de notes)
+    """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=scores, minlength=len(unique))
+    counts = np.bincount(inverse, minlength=len(unique))
+    return unique, totals / np.maximum(counts, 1), counts
+
+
+def student_zscores(students, scores):
+    """
+    Moyenne et écart réduit de chaque élève par rapport au groupe
+
+    Returns:
+        list: [{'student_id', 'average', 'z', 'count'}], du meilleur au plus faible
+    """
+    if not scores.size:
+        return []
+    unique, averages, counts = group_means(students, scores)
+    std = averages.std()
+    zscores = (averages - averages.mean()) / std if std > 0 else np.zeros(len(averages))
+    order = np.argsort(-averages, kind='stable')
+    return [
+        {
+            'student_id': int(unique[i]),
+            'average': round(float(averages[i]), 2),
+            'z': round(float(zscores[i]), 2),
+            'count': int(counts[i]),
+        }
+        for i in order
+    ]
+
+
+def series_matrix(student_ids, periods, values):
+    """
+    Matrice élèves × périodes d'une série longitudinale
+
+    Returns:
+        tuple: (élèves, périodes triées, matrice de valeurs, NaN si absente)
+    """
+    students, rows = np.unique(np.asarray(student_ids, dtype=int), return_inverse=True)
+    columns, cols = np.unique(np.asarray(periods, dtype=int), return_inverse=True)
+    matrix = np.full((len(students), len(columns)), np.nan)
+    matrix[rows, cols] = np.asarray(values, dtype=float)
+    return students, columns, matrix
+
+
+def last_changes(matrix):
+    """
+    Évolution entre les deux dernières valeurs connues de chaque ligne
+
+    Returns:
+        tuple: (colonne de la dernière valeur, -1 si aucune ; dernière valeur ;
+        valeur précédente ; écart), NaN quand la valeur n'existe pas
+    """
+    size = matrix.shape[0]
+    if not matrix.size:
+        empty = np.full(size, np.nan)
+        return np.full(size, -1), empty, empty, empty
+
+    rows = np.arange(size)
+    positions = np.where(np.isnan(matrix), -1, np.arange(matrix.shape[1]))
+    last = positions.max(axis=1)
+    positions[rows, np.maximum(last, 0)] = -1
+    previous = positions.max(axis=1)
+
+    current = np.where(last >= 0, matrix[rows, np.maximum(last, 0)], np.nan)
+    before = np.where(previous >= 0, matrix[rows, np.maximum(previous, 0)], np.nan)
+    return last, current, before, current - before
+
+
+def _cached(name, dependencies, compute):
+    versions = get_versions(dependencies)
+    key = f"notes:stats:{name}:" + ':'.join(versions)
+    alias = get_read_alias()
+    if alias is not None:
+        as_of = get_reporting_as_of(alias)
+        if as_of is None:
+            # Réplique sans date mesurable : résultat non mis en cache
+            return compute()
+        key += f":{alias}@{as_of.isoformat()}"
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, getattr(settings, 'GRADE_STATS_CACHE_TIMEOUT', 3600))
+    return result
+
+
+def get_evaluation_stats(evaluation):
+    """Statistiques d'une évaluation (mises en cache par version de l'évaluation)"""
+    def compute():
+        data = load_scores(evaluation=evaluation)
+        return {
+            **describe(data['score']),
+            'students': student_zscores(data['student'], data['score']),
+        }
+    return _cached(f'evaluation:{evaluation.pk}', [('grades_evaluation', evaluation.pk)], compute)
+
+
+def get_subject_stats(subject, year=None):
+    """
+    Statistiques d'une matière : toutes notes confondues et par évaluation
+    """
+    def compute():
+        filters = {'evaluation__subject': subject}
+        if year is not None:
+            filters['evaluation__trimester__year'] = year
+        data = load_scores(**filters)
+        evaluations = []
+        for evaluation_id in np.unique(data['evaluation']):
+            mask = data['evaluation'] == evaluation_id
+            evaluations.append({'evaluation_id': int(evaluation_id), **describe(data['score'][mask])})
+        return {**describe(data['score']), 'evaluations': evaluations}
+    year_key = year.pk if year is not None else 'all'
+    return _cached(f'subject:{subject.pk}:{year_key}', [('grades_subject', subject.pk)], compute)
+
+
+def get_class_stats(school_class, trimester=None):
+    """
+    Statistiques d'une classe : toutes notes confondues, par matière, et
+    moyenne / écart réduit de chaque élève
+    """
+    def compute():
+        filters = {'evaluation__school_class': school_class}
+        if trimester is not None:
+            filters['evaluation__trimester'] = trimester
+        data = load_scores(**filters)
+        subjects = []
+        for subject_id in np.unique(data['subject']):
+            mask = data['subject'] == subject_id
+            subjects.append({'subject_id': int(subject_id), **describe(data['score'][mask])})
+        return {
+            **describe(data['score']),
+            'subjects': subjects,
+            'students': student_zscores(data['student'], data['score']),
+        }
+    trimester_key = trimester.pk if trimester is not None else 'all'
+    return _cached(f'class:{school_class.pk}:{trimester_key}', [('grades_class', school_class.pk)], compute)
@@ -0,0 +1,171 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from classes.models import SchoolClass
+from school.models import EducationSystem, School, SchoolLevel, SchoolType, SchoolYear
+from students.models import Student
+from subjects.models import Subject
+
+from .models import Bulletin, BulletinLine, Evaluation, StudentGrade, StudentProgress, Trimester
+from .services import GradeCompletionService, ProgressSeriesService
+from . import statistics
+
+
+class NotesTestCase(TestCase):
+    """Une classe de trois élèves, deux évaluations, quatre notes"""
+
+    def setUp(self):
+        year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        school = School.objects.create(
+            name="École Test", code="ET01", address="Douala",
+            type=SchoolType.objects.create(name="Public", code="PUB"), education_system=system,
+        )
+        level = SchoolLevel.objects.create(name="Sixième", system=system, order=1)
+        self.school_class = SchoolClass.objects.create(name="6e M1", level=level, year=year, school=school)
+        self.students = [
+            Student.objects.create(
+                matricule=f"STU{i}", first_name=f"Élève{i}", last_name="Test", birth_date=date(2012, 1, 1),
+                birth_place="Douala", gender='F', year=year, school=school, current_class=self.school_class,
+            )
+            for i in range(3)
+        ]
+        self.trimester = Trimester.objects.create(
+            trimester='1ER', year=year, school=school, start_date=date(2024, 9, 2), end_date=date(2024, 12, 20),
+        )
+        subject = Subject.objects.create(name="Mathématiques", code="MATH")
+        self.eval1, self.eval2 = [
+            Evaluation.objects.create(
+                eval_type=eval_type, trimester=self.trimester, subject=subject,
+                school_class=self.school_class, eval_date=date(2024, 10, 1),
+            )
+            for eval_type in ('EVAL1', 'EVAL2')
+        ]
+        for student, score in zip(self.students, (8, 12, 16)):
+            StudentGrade.objects.create(student=student, evaluation=self.eval1, score=score)
+        StudentGrade.objects.create(student=self.students[0], evaluation=self.eval2, score=14)
+
+
+class GradeCompletionServiceTestCase(NotesTestCase):
+    """Tests de la matrice de complétude des évaluations"""
+
+    def test_matrix_counts_and_missing_students(self):
+        with self.assertNumQueries(3):
+            matrix = GradeCompletionService.get_matrix(self.school_class, self.trimester)
+
+        first = matrix['by_evaluation'][self.eval1.pk]
+        self.assertTrue(first['is_complete'])
+        self.assertEqual(first['average'], 12)
+        self.assertEqual(first['success_count'], 2)
+        self.assertEqual(matrix['by_evaluation'][self.eval2.pk]['missing_count'], 2)
+        self.assertEqual(matrix['total_grades'], 4)
+        self.assertFalse(matrix['ready'])
+        self.assertIsNone(GradeCompletionService.get_ready_trimester(matrix))
+
+        matrix = GradeCompletionService.get_matrix(
+            evaluations=Evaluation.objects.filter(pk=self.eval2.pk), include_missing=True
+        )
+        self.assertEqual(matrix['rows'][0]['missing_students'], self.students[1:])
+
+        for student in self.students[1:]:
+            StudentGrade.objects.create(student=student, evaluation=self.eval2, score=10)
+        matrix = GradeCompletionService.get_matrix(self.school_class, self.trimester)
+        self.assertTrue(matrix['ready'])
+        self.assertEqual(GradeCompletionService.get_ready_trimester(matrix), self.trimester)
+        self.assertEqual(GradeCompletionService.get_trimester_readiness(self.trimester)[0]['ready'], True)
+
+
+# Requêtes comptées hors cache (table de cache en base par défaut)
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class GradeStatisticsTestCase(NotesTestCase):
+    """Tests des statistiques vectorisées et de leur cache"""
+
+    def test_evaluation_stats_cached_until_grade_changes(self):
+        with self.assertNumQueries(1):
+            stats = statistics.get_evaluation_stats(self.eval1)
+        self.assertEqual((stats['count'], stats['mean'], stats['median']), (3, 12, 12))
+        self.assertEqual((stats['q1'], stats['q3'], stats['success_count']), (10, 14, 2))
+        self.assertEqual(sum(item['count'] for item in stats['histogram']), 3)
+        self.assertEqual([item['student_id'] for item in stats['students']], [s.pk for s in reversed(self.students)])
+        self.assertAlmostEqual(stats['students'][0]['z'], 1.22, places=2)
+
+        with self.assertNumQueries(0):
+            statistics.get_evaluation_stats(self.eval1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentGrade.objects.filter(evaluation=self.eval1, student=self.students[0]).get().delete()
+        self.assertEqual(statistics.get_evaluation_stats(self.eval1)['count'], 2)
+
+    def test_class_stats_normalise_scores(self):
+        self.eval2.max_score = 40
+        self.eval2.save()
+        stats = statistics.get_class_stats(self.school_class, self.trimester)
+        self.assertEqual(stats['count'], 4)
+        self.assertEqual(stats['subjects'][0]['mean'], 10.75)
+        # Élève 0 : (8 + 14 * 20 / 40) / 2
+        averages = {item['student_id']: item['average'] for item in stats['students']}
+        self.assertEqual(averages[self.students[0].pk], 7.5)
+
+    def test_moved_evaluation_and_snapshot_reads(self):
+        subject = self.eval1.subject
+        self.assertEqual(statistics.get_subject_stats(subject)['count'], 4)
+        # Évaluation déplacée vers une autre matière : l'ancienne est invalidée
+        with self.captureOnCommitCallbacks(execute=True):
+            self.eval1.subject = Subject.objects.create(name="Physique", code="PHY")
+            self.eval1.save()
+        self.assertEqual(statistics.get_subject_stats(subject)['count'], 1)
+
+        # Lectures sur l'instantané : une par date d'instantané
+        as_of = timezone.now()
+        with mock.patch('notes.statistics.get_read_alias', return_value='reporting'), \
+                mock.patch('notes.statistics.get_reporting_as_of', side_effect=lambda alias: as_of):
+            statistics.get_subject_stats(subject)
+            with self.assertNumQueries(0):
+                statistics.get_subject_stats(subject)
+            as_of += timedelta(hours=1)
+            with self.assertNumQueries(1):
+                statistics.get_subject_stats(subject)
+
+
+class ProgressSeriesTestCase(NotesTestCase):
+    """Tests des séries de progression"""
+
+    def create_bulletins(self, trimester, averages):
+        for rank, (student, average) in enumerate(zip(self.students, averages), start=1):
+            bulletin = Bulletin.objects.create(
+                student=student, trimester=trimester, class_size=3, student_rank=rank, class_average=10,
+                student_average=average, total_points=average, total_coefficients=1, success_rate=0,
+            )
+            BulletinLine.objects.create(
+                bulletin=bulletin, subject=self.eval1.subject, coefficient=1, average=average,
+                total_points=average, max_coefficient_rank=0, class_average_percent=0,
+            )
+        ProgressSeriesService.record_trimester(trimester)
+
+    def test_series_and_drops(self):
+        second = Trimester.objects.create(
+            trimester='2EME', year=self.trimester.year, school=self.trimester.school,
+            start_date=date(2025, 1, 6), end_date=date(2025, 3, 28),
+        )
+        self.create_bulletins(self.trimester, (12, 14, 9))
+        self.create_bulletins(second, (9.5, 13, 15))
+        # Nouvelle génération : mise à jour des points existants
+        Bulletin.objects.filter(trimester=second, student=self.students[1]).update(student_average=11)
+        ProgressSeriesService.record_trimester(second)
+        self.assertEqual(StudentProgress.objects.count(), 6)
+
+        series = ProgressSeriesService.get_series(self.students[0])
+        self.assertEqual([point['period'] for point in series], [20241, 20242])
+        self.assertEqual(series[1]['delta'], -2.5)
+        self.assertEqual(series[1]['subjects'][0]['delta'], -2.5)
+
+        with self.assertNumQueries(1):
+            drops = ProgressSeriesService.find_drops(school_class=self.school_class)
+        self.assertEqual([item['student_id'] for item in drops], [self.students[1].pk, self.students[0].pk])
+        self.assertEqual(drops[0]['delta'], -3)
+        # Ligne de matière inchangée pour l'élève 1 (14 -> 13)
+        drops = ProgressSeriesService.find_drops(subject=self.eval1.subject)
+        self.assertEqual([item['student_id'] for item in drops], [self.students[0].pk])
@@ -2,7 +2,6 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.db import models
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
@@ -17,11 +16,13 @@ import json
 from .models import (
     Trimester, Evaluation, StudentGrade, Bulletin, BulletinLine, BulletinUtils
 )
+from .services import GradeCompletionService, ProgressSeriesService
 from students.models import Student
 from classes.models import SchoolClass
 from subjects.models import Subject
 from school.models import SchoolYear, School
 from teachers.models import TeachingAssignment
+from scolaris.routers import reporting_view
 
 # ==================== VÉRIFICATIONS DROITS ====================
 
@@ -239,43 +240,29 @@ def evaluation_list(request):
     classes_with_evaluations = SchoolClass.objects.filter(
         year=year,
         evaluations__trimester__year=year
-    ).distinct().prefetch_related('students', 'evaluations', 'evaluations__grades')
+    ).distinct()
     
     # Filtres
     class_filter = request.GET.get('class')
     if class_filter:
         classes_with_evaluations = classes_with_evaluations.filter(id=class_filter)
     
-    # Calculer les statistiques pour chaque classe
+    # Calculer les statistiques pour chaque classe (matrice de complétude)
     classes_data = []
     for school_class in classes_with_evaluations:
-        evaluations = school_class.evaluations.filter(trimester__year=year)
-        total_students = school_class.students.count()
-        total_evaluations = evaluations.count()
-        total_grades = sum(evaluation.grades.count() for evaluation in evaluations)
-        completed_evaluations = sum(1 for evaluation in evaluations if evaluation.grades.count() >= total_students)
-        open_evaluations = evaluations.filter(is_open=True).count()
-        
-        # Vérifier si on peut générer des bulletins
-        can_generate_bulletins = False
-        ready_trimester = None
-        for trimester in Trimester.objects.filter(year=year):
-            trimester_evaluations = evaluations.filter(trimester=trimester)
-            if trimester_evaluations.exists():
-                trimester_completed = sum(1 for e in trimester_evaluations if e.grades.count() >= total_students)
-                if trimester_completed == trimester_evaluations.count():
-                    can_generate_bulletins = True
-                    ready_trimester = trimester
-                    break
+        matrix = GradeCompletionService.get_matrix(
+            evaluations=school_class.evaluations.filter(trimester__year=year)
+        )
+        ready_trimester = GradeCompletionService.get_ready_trimester(matrix)
         
         classes_data.append({
             'class': school_class,
-            'total_students': total_students,
-            'total_evaluations': total_evaluations,
-            'total_grades': total_grades,
-            'completed_evaluations': completed_evaluations,
-            'open_evaluations': open_evaluations,
-            'can_generate_bulletins': can_generate_bulletins,
+            'total_students': school_class.students.filter(is_active=True).count(),
+            'total_evaluations': matrix['total_evaluations'],
+            'total_grades': matrix['total_grades'],
+            'completed_evaluations': matrix['completed_evaluations'],
+            'open_evaluations': sum(1 for row in matrix['rows'] if row['evaluation'].is_open),
+            'can_generate_bulletins': ready_trimester is not None,
             'ready_trimester': ready_trimester,
         })
     
@@ -431,19 +418,24 @@ def evaluation_detail(request, pk):
     evaluation = get_object_or_404(Evaluation, pk=pk)
     grades = StudentGrade.objects.filter(evaluation=evaluation).select_related('student')
     
-    # Statistiques
+    # Statistiques et élèves sans note (matrice de complétude)
+    completion = GradeCompletionService.get_matrix(
+        evaluations=Evaluation.objects.filter(pk=evaluation.pk), include_missing=True
+    )['rows'][0]
     stats = {
-        'total_students': grades.count(),
-        'average_score': grades.aggregate(avg=Avg('score'))['avg'] or 0,
-        'success_rate': grades.filter(score__gte=10).count() / grades.count() * 100 if grades.count() > 0 else 0,
-        'highest_score': grades.aggregate(max=models.Max('score'))['max'] or 0,
-        'lowest_score': grades.aggregate(min=models.Min('score'))['min'] or 0,
+        'total_students': completion['total_students'],
+        'grades_count': completion['grades_count'],
+        'average_score': completion['average'],
+        'success_rate': completion['success_rate'],
+        'highest_score': completion['highest'],
+        'lowest_score': completion['lowest'],
     }
     
     context = {
         'evaluation': evaluation,
         'grades': grades,
         'stats': stats,
+        'completion': completion,
     }
     return render(request, 'notes/evaluation_detail.html', context)
 
@@ -618,8 +610,12 @@ def generate_bulletins(request, trimester_id):
         except Exception as e:
             messages.error(request, f"Erreur lors de la génération des bulletins: {str(e)}")
     
+    # Classes dont des notes manquent encore pour ce trimestre
+    readiness = GradeCompletionService.get_trimester_readiness(trimester)
     context = {
         'trimester': trimester,
+        'readiness': readiness,
+        'incomplete_classes': [entry for entry in readiness if not entry['ready']],
     }
     return render(request, 'notes/generate_bulletins_confirm.html', context)
 
@@ -1430,33 +1426,31 @@ def save_grade_ajax(request):
 
 @login_required
 def get_evaluation_stats(request, evaluation_id):
-    """Récupérer les statistiques d'une évaluation"""
+    """Récupérer les statistiques d'une évaluation (notes ramenées sur 20)"""
+    from .statistics import get_evaluation_stats as compute_evaluation_stats
+
     evaluation = get_object_or_404(Evaluation, pk=evaluation_id)
-    grades = StudentGrade.objects.filter(evaluation=evaluation)
-    
-    if grades.exists():
-        stats = {
-            'total_students': grades.count(),
-            'average_score': round(grades.aggregate(avg=Avg('score'))['avg'], 2),
-            'success_rate': round(grades.filter(score__gte=10).count() / grades.count() * 100, 1),
-            'highest_score': grades.aggregate(max=models.Max('score'))['score__max'],
-            'lowest_score': grades.aggregate(min=models.Min('score'))['score__min'],
-        }
-    else:
-        stats = {
-            'total_students': 0,
-            'average_score': 0,
-            'success_rate': 0,
-            'highest_score': 0,
-            'lowest_score': 0,
-        }
-    
-    return JsonResponse(stats)
+    stats = compute_evaluation_stats(evaluation)
+
+    return JsonResponse({
+        'total_students': stats['count'],
+        'average_score': stats['mean'],
+        'median_score': stats['median'],
+        'std_deviation': stats['std'],
+        'first_quartile': stats['q1'],
+        'third_quartile': stats['q3'],
+        'success_rate': stats['success_rate'],
+        'highest_score': stats['max'],
+        'lowest_score': stats['min'],
+        'distribution': stats['histogram'],
+        'z_scores': {item['student_id']: item['z'] for item in stats['students']},
+    })
 
 # ==================== RAPPORTS ET STATISTIQUES ====================
 
 @login_required
 @user_passes_test(is_admin_or_direction)
+@reporting_view
 def reports_dashboard(request):
     """Dashboard des rapports"""
     year = SchoolYear.objects.filter(statut='EN_COURS').first()
@@ -1481,34 +1475,80 @@ def reports_dashboard(request):
 
 @login_required
 @user_passes_test(is_admin_or_direction)
+@reporting_view
 def class_performance_report(request, class_id):
     """Rapport de performance d'une classe"""
+    from .statistics import get_class_stats
+
     school_class = get_object_or_404(SchoolClass, pk=class_id)
-    
+    trimesters = Trimester.objects.filter(year=school_class.year).order_by('start_date')
+    trimester = None
+    if request.GET.get('trimester'):
+        trimester = get_object_or_404(trimesters, pk=request.GET['trimester'])
+
+    stats = get_class_stats(school_class, trimester)
+    subjects = Subject.objects.in_bulk([item['subject_id'] for item in stats['subjects']])
+    subject_stats = [{**item, 'subject': subjects.get(item['subject_id'])} for item in stats['subjects']]
+    students = Student.objects.in_bulk([item['student_id'] for item in stats['students']])
+    student_stats = [{**item, 'student': students.get(item['student_id'])} for item in stats['students']]
+    drops = ProgressSeriesService.find_drops(school_class=school_class)
+    drop_students = Student.objects.in_bulk([item['student_id'] for item in drops])
+    drops = [{**item, 'student': drop_students.get(item['student_id'])} for item in drops]
+
     context = {
         'school_class': school_class,
+        'trimesters': trimesters,
+        'trimester': trimester,
+        'stats': stats,
+        'subject_stats': subject_stats,
+        'student_stats': student_stats,
+        'drops': drops,
     }
     return render(request, 'notes/class_performance_report.html', context)
 
 @login_required
 @user_passes_test(is_admin_or_direction)
+@reporting_view
 def student_progress_report(request, student_id):
     """Rapport de progression d'un étudiant"""
     student = get_object_or_404(Student, pk=student_id)
-    
+    series = ProgressSeriesService.get_series(student)
+
     context = {
         'student': student,
+        'series': series,
+        'chart_data': {
+            'labels': [point['label'] for point in series],
+            'averages': [point['general_average'] for point in series],
+        },
     }
     return render(request, 'notes/student_progress_report.html', context)
 
 @login_required
 @user_passes_test(is_admin_or_direction)
+@reporting_view
 def subject_analysis_report(request, subject_id):
     """Rapport d'analyse d'une matière"""
+    from .statistics import get_subject_stats
+
     subject = get_object_or_404(Subject, pk=subject_id)
-    
+    year = SchoolYear.objects.filter(statut='EN_COURS').first()
+
+    stats = get_subject_stats(subject, year)
+    evaluations = Evaluation.objects.select_related('school_class', 'trimester').in_bulk(
+        [item['evaluation_id'] for item in stats['evaluations']]
+    )
+    evaluation_stats = [
+        {**item, 'evaluation': evaluations[item['evaluation_id']]}
+        for item in stats['evaluations'] if item['evaluation_id'] in evaluations
+    ]
+    evaluation_stats.sort(key=lambda item: (item['evaluation'].eval_date, item['evaluation'].pk))
+
     context = {
         'subject': subject,
+        'year': year,
+        'stats': stats,
+        'evaluation_stats': evaluation_stats,
     }
     return render(request, 'notes/subject_analysis_report.html', context)
 
@@ -1551,7 +1591,7 @@ def class_evaluations_list(request, class_id):
     evaluations = Evaluation.objects.filter(
         school_class=school_class,
         trimester__year=year
-    ).select_related('trimester', 'subject').prefetch_related('grades').order_by('-created_at')
+    ).select_related('trimester', 'subject').order_by('-created_at')
     
     # Filtres
     trimester_filter = request.GET.get('trimester')
@@ -1567,28 +1607,27 @@ def class_evaluations_list(request, class_id):
     elif status_filter == 'closed':
         evaluations = evaluations.filter(is_open=False)
     
-    # Statistiques de la classe
-    total_students = school_class.students.count()
-    total_evaluations = evaluations.count()
-    total_grades = sum(evaluation.grades.count() for evaluation in evaluations)
-    completed_evaluations = sum(1 for evaluation in evaluations if evaluation.grades.count() >= total_students)
-    
-    # Vérifier si on peut générer des bulletins
-    can_generate_bulletins = False
-    ready_trimester = None
-    for trimester in Trimester.objects.filter(year=year):
-        trimester_evaluations = evaluations.filter(trimester=trimester)
-        if trimester_evaluations.exists():
-            trimester_completed = sum(1 for e in trimester_evaluations if e.grades.count() >= total_students)
-            if trimester_completed == trimester_evaluations.count():
-                can_generate_bulletins = True
-                ready_trimester = trimester
-                break
+    # Matrice de complétude de toutes les évaluations de l'année : la
+    # possibilité de générer les bulletins ne dépend pas des filtres
+    matrix = GradeCompletionService.get_matrix(
+        evaluations=Evaluation.objects.filter(school_class=school_class, trimester__year=year)
+    )
+    ready_trimester = GradeCompletionService.get_ready_trimester(matrix)
+    can_generate_bulletins = ready_trimester is not None
+    
+    # Statistiques de la classe (évaluations filtrées)
+    rows = [matrix['by_evaluation'][pk] for pk in evaluations.values_list('pk', flat=True)]
+    total_students = school_class.students.filter(is_active=True).count()
+    total_evaluations = len(rows)
+    total_grades = sum(row['grades_count'] for row in rows)
+    completed_evaluations = sum(1 for row in rows if row['is_complete'])
     
     # Pagination
     paginator = Paginator(evaluations, 12)  # 12 évaluations par page
     page_number = request.GET.get('page')
     evaluations_page = paginator.get_page(page_number)
+    for evaluation in evaluations_page:
+        evaluation.completion = matrix['by_evaluation'][evaluation.pk]
     
     context = {
         'school_class': school_class,
@@ -4,7 +4,8 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import (
     ParentUser, ParentStudentRelation, ParentPaymentMethod,
-    ParentPayment, ParentNotification, ParentLoginSession
+    ParentPayment, ParentNotification, ParentLoginSession, ParentAccountRequest,
+    ParentCredentialEmail, PaymentWebhookEvent
 )
 
 @admin.register(ParentUser)
@@ -137,7 +138,7 @@ class ParentPaymentAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Informations de paiement', {
-            'fields': ('transaction_id', 'parent_user', 'student', 'tranche')
+            'fields': ('transaction_id', 'parent_user', 'student', 'payment_type', 'tranche', 'fee_structure', 'extra_fee')
         }),
         ('Détails', {
             'fields': ('amount', 'payment_method', 'status')
@@ -225,3 +226,59 @@ class ParentLoginSessionAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """Permettre la suppression des anciennes sessions"""
         return True
+
+@admin.register(ParentAccountRequest)
+class ParentAccountRequestAdmin(admin.ModelAdmin):
+    """Administration des demandes de comptes parents différées"""
+    list_display = [
+        'guardian', 'status', 'source', 'attempts', 'created_at', 'processed_at'
+    ]
+    list_filter = ['status', 'source', 'created_at']
+    search_fields = ['guardian__name', 'guardian__email', 'guardian__student__matricule']
+    readonly_fields = ['guardian', 'attempts', 'last_error', 'created_at', 'processed_at']
+    ordering = ['-created_at']
+    actions = ['retry_requests']
+    
+    def retry_requests(self, request, queryset):
+        """Remet en attente les demandes sélectionnées"""
+        updated = queryset.exclude(status='DONE').update(status='PENDING')
+        self.message_user(request, f"{updated} demande(s) remise(s) en attente.")
+    retry_requests.short_description = "Remettre en attente"
+
+@admin.register(ParentCredentialEmail)
+class ParentCredentialEmailAdmin(admin.ModelAdmin):
+    """Administration de la file d'envoi des identifiants"""
+    list_display = ['parent_user', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['parent_user__username', 'parent_user__email']
+    readonly_fields = ['parent_user', 'attempts', 'last_error', 'created_at', 'sent_at']
+    ordering = ['-created_at']
+    
+    def has_add_permission(self, request):
+        """Les emails sont déposés par la génération des comptes"""
+        return False
+
+@admin.register(PaymentWebhookEvent)
+class PaymentWebhookEventAdmin(admin.ModelAdmin):
+    """Administration de la boîte de réception des webhooks de paiement"""
+    list_display = [
+        'event_id', 'provider', 'transaction_id', 'event_status', 'status', 'attempts', 'received_at', 'processed_at'
+    ]
+    list_filter = ['status', 'provider', 'event_status', 'received_at']
+    search_fields = ['event_id', 'transaction_id', 'payment__payment_id']
+    readonly_fields = [
+        'provider', 'event_id', 'transaction_id', 'event_status', 'payload', 'payment',
+        'attempts', 'last_error', 'received_at', 'processed_at'
+    ]
+    ordering = ['-received_at']
+    actions = ['retry_events']
+    
+    def has_add_permission(self, request):
+        """Les événements sont déposés par le webhook"""
+        return False
+    
+    def retry_events(self, request, queryset):
+        """Remet en attente les événements en échec"""
+        updated = queryset.filter(status='FAILED').update(status='PENDING')
+        self.message_user(request, f"{updated} événement(s) remis en attente.")
+    retry_events.short_description = "Remettre en attente"
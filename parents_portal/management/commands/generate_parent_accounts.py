@@ -7,7 +7,7 @@ import logging
 
 from students.models import Guardian
 from parents_portal.models import ParentUser, ParentStudentRelation
-from parents_portal.services import ParentPortalService
+from parents_portal.services import ParentPortalService, ParentAccountBatchService
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +38,27 @@ class Command(BaseCommand):
             type=int,
             help='Génère le compte pour un guardian spécifique (ID)',
         )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Mode lot : bulk_create, emails en file d\'attente et hachage parallèle à l\'envoi (reprise possible)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Nombre de processus de hachage à l\'envoi des identifiants en mode lot (défaut: nombre de cœurs)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Nombre de comptes créés par transaction en mode lot',
+        )
+        parser.add_argument(
+            '--queue-only',
+            action='store_true',
+            help='En mode lot, laisse les emails en file d\'attente sans les envoyer',
+        )
         parser.add_argument(
             '--resend-credentials',
             action='store_true',
@@ -53,6 +74,9 @@ class Command(BaseCommand):
             if options['guardian_id']:
                 # Générer le compte pour un guardian spécifique
                 self._generate_single_guardian_account(options['guardian_id'], options)
+            elif options['batch']:
+                # Générer les comptes en lot
+                self._generate_accounts_in_batch(options)
             elif options['resend_credentials']:
                 # Renvoyer les identifiants aux parents existants
                 self._resend_credentials_to_existing_parents(options)
@@ -175,6 +199,44 @@ class Command(BaseCommand):
             accounts_failed, emails_sent, emails_failed, options
         )
 
+    def _generate_accounts_in_batch(self, options):
+        """Génère les comptes de tous les guardians sans compte, en lot"""
+        if options['force']:
+            raise CommandError("--force n'est pas disponible en mode lot")
+
+        guardians = Guardian.objects.filter(
+            email__isnull=False, parent_user__isnull=True
+        ).exclude(email='')
+        total = guardians.count()
+        self.stdout.write(f'👥 {total} guardians sans compte parent')
+
+        def report_progress(created, to_create):
+            self.stdout.write(f'   … {created}/{to_create} comptes créés')
+
+        stats = ParentAccountBatchService.create_accounts(
+            guardians,
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            progress=report_progress,
+        )
+
+        emails_sent = emails_failed = 0
+        if not options['dry_run'] and not options['queue_only']:
+            email_stats = ParentPortalService.send_queued_credentials(workers=options['workers'])
+            emails_sent, emails_failed = email_stats['sent'], email_stats['failed']
+
+        self._display_statistics(
+            total, stats['created'], stats['linked'], len(stats['errors']), emails_sent, emails_failed, options
+        )
+        if stats['elapsed']:
+            self.stdout.write(
+                f"⏱️  {stats['elapsed']:.1f}s, {stats['rate']:.1f} comptes/s"
+            )
+        if options['queue_only']:
+            self.stdout.write(
+                "📬 Emails en file d'attente : exécutez process_parent_account_requests pour les envoyer"
+            )
+
     def _resend_credentials_to_existing_parents(self, options):
         """Renvoie les identifiants aux parents existants"""
         self.stdout.write('📧 Renvoi des identifiants aux parents existants...')
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from parents_portal.models import ParentAccountRequest
+from parents_portal.services import ParentPortalService
+
+
+class Command(BaseCommand):
+    """
+    Commande pour traiter les demandes de comptes parents déposées par les imports
+    (à exécuter via une tâche cron)
+    """
+    help = 'Crée les comptes parents en attente et envoie les emails d\'identifiants en file d\'attente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Nombre maximum de demandes à traiter',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Nombre de processus pour le hachage des mots de passe (défaut: nombre de cœurs)',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Remet en attente les demandes échouées avant le traitement',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retried = ParentAccountRequest.objects.filter(status='FAILED').update(status='PENDING')
+            self.stdout.write(f'🔁 {retried} demande(s) échouée(s) remise(s) en attente')
+
+        pending = ParentAccountRequest.objects.filter(status='PENDING').count()
+        if pending:
+            self.stdout.write(f'📋 {pending} demande(s) en attente')
+            stats = ParentPortalService.process_account_requests(limit=options['limit'])
+
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {stats['created']} compte(s) créé(s), {stats['linked']} rattachement(s) à un compte existant"
+            ))
+            if stats['skipped']:
+                self.stdout.write(self.style.WARNING(f"⚠️  {stats['skipped']} demande(s) ignorée(s) (sans email)"))
+            if stats['failed']:
+                self.stdout.write(self.style.ERROR(f"❌ {stats['failed']} demande(s) en échec"))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Aucune demande en attente'))
+
+        email_stats = ParentPortalService.send_queued_credentials(workers=options['workers'])
+        if email_stats['sent'] or email_stats['failed']:
+            self.stdout.write(
+                f"📧 {email_stats['sent']} email(s) d'identifiants envoyé(s), {email_stats['failed']} échec(s)"
+            )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from parents_portal.models import PaymentWebhookEvent
+from parents_portal.services import PaymentWebhookService
+
+
+class Command(BaseCommand):
+    """
+    Commande pour appliquer les événements de paiement reçus par le webhook
+    (à exécuter via une tâche cron ou en boucle par un worker)
+    """
+    help = 'Applique les événements de paiement en attente dans la boîte de réception des webhooks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help="Nombre maximum d'événements à traiter",
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Remet en attente les événements en échec avant le traitement',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retried = PaymentWebhookEvent.objects.filter(status='FAILED').update(status='PENDING', attempts=0)
+            self.stdout.write(f'🔁 {retried} événement(s) en échec remis en attente')
+
+        pending = PaymentWebhookEvent.objects.filter(status='PENDING').count()
+        if not pending:
+            self.stdout.write(self.style.SUCCESS('✅ Aucun événement en attente'))
+            return
+
+        self.stdout.write(f'📋 {pending} événement(s) en attente')
+        stats = PaymentWebhookService.process_pending(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['processed']} événement(s) appliqué(s), {stats['ignored']} ignoré(s) (répétés ou hors séquence)"
+        ))
+        if stats['retry']:
+            self.stdout.write(self.style.WARNING(f"⏳ {stats['retry']} événement(s) sans paiement connu, remis en attente"))
+        if stats['failed']:
+            self.stdout.write(self.style.ERROR(f"❌ {stats['failed']} événement(s) en échec"))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from parents_portal.reconciliation import PaymentReconciliationService
+
+
+class Command(BaseCommand):
+    """
+    Commande pour rapprocher un relevé de fournisseur de paiement (CSV) avec les
+    paiements du portail et les paiements financiers
+    """
+    help = 'Rapproche un relevé Orange Money / MTN MoMo (CSV) avec les paiements enregistrés'
+
+    LABELS = [
+        ('MATCHED', '✅ Rapprochées'),
+        ('MATCHED_BY_AMOUNT_PHONE', '🔎 Rapprochées par montant et téléphone (à confirmer)'),
+        ('DUPLICATE', '♻️  Doublons'),
+        ('AMOUNT_MISMATCH', '💰 Montants divergents'),
+        ('STATUS_MISMATCH', '🚦 Statuts divergents'),
+        ('FINANCE_MISMATCH', '📒 Paiements financiers absents ou divergents'),
+        ('UNMATCHED', '❓ Transactions inconnues'),
+        ('INVALID', '⚠️  Lignes illisibles'),
+        ('MISSING_FROM_STATEMENT', '📭 Paiements complétés absents du relevé'),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='Chemin du relevé CSV')
+        parser.add_argument(
+            '--method',
+            action='append',
+            choices=['OM', 'MOMO', 'CARD', 'BANK'],
+            help='Méthode de paiement du relevé (répétable, toutes par défaut)',
+        )
+        parser.add_argument('--report', help='Chemin du rapport CSV des anomalies')
+
+    def handle(self, *args, **options):
+        report = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else None
+        start = time.monotonic()
+        try:
+            with open(options['statement'], newline='', encoding='utf-8-sig') as statement:
+                stats = PaymentReconciliationService.reconcile(statement, options['method'], report=report)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        finally:
+            if report:
+                report.close()
+        elapsed = time.monotonic() - start
+
+        self.stdout.write(f"📋 {stats.get('lines', 0)} ligne(s) lue(s) en {elapsed:.2f}s")
+        for result, label in self.LABELS:
+            if stats.get(result):
+                self.stdout.write(f"{label} : {stats[result]}")
+        if options['report']:
+            self.stdout.write(self.style.SUCCESS(f"📄 Rapport des anomalies : {options['report']}"))
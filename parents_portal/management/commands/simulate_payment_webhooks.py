@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import random
+import time
+import urllib.request
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from parents_portal.models import ParentPayment
+from parents_portal.services import PaymentWebhookService
+
+
+class Command(BaseCommand):
+    """
+    Fournisseur de paiement simulé, pour les tests de charge du webhook
+
+    Pour chaque paiement en attente, émet la séquence d'événements d'un vrai
+    fournisseur (PROCESSING puis succès ou échec), avec des renvois à l'identique
+    et un ordre d'arrivée mélangé. Les événements sont postés sur --url, ou
+    déposés directement dans la boîte de réception sans serveur HTTP.
+    """
+    help = 'Simule les webhooks d\'un fournisseur de paiement pour les paiements en attente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=100, help='Nombre de paiements en attente à solder')
+        parser.add_argument('--provider', default='simulator', help='Nom du fournisseur simulé')
+        parser.add_argument('--failure-rate', type=float, default=0.05, help='Part des paiements échoués (0-1)')
+        parser.add_argument('--duplicates', type=float, default=0.3, help='Part des événements renvoyés une seconde fois (0-1)')
+        parser.add_argument('--url', help='URL du webhook (sinon dépôt direct dans la boîte de réception)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requêtes simultanées avec --url')
+        parser.add_argument('--process', action='store_true', help='Applique ensuite les événements reçus')
+        parser.add_argument('--seed', type=int, help='Graine du générateur aléatoire')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        payments = list(ParentPayment.objects.filter(status='PENDING').order_by('pk')[:options['payments']])
+        if not payments:
+            raise CommandError('Aucun paiement en attente à simuler')
+
+        events = []
+        for payment in payments:
+            if not payment.transaction_id:
+                payment.transaction_id = f"SIM-{uuid.uuid4().hex[:16].upper()}"
+                payment.save(update_fields=['transaction_id'])
+            final = 'failed' if rng.random() < options['failure_rate'] else 'success'
+            for status in ('pending', final):
+                events.append({
+                    'event_id': uuid.uuid4().hex,
+                    'transaction_id': payment.transaction_id,
+                    'status': status,
+                    'amount': str(payment.amount),
+                })
+        events += [event for event in list(events) if rng.random() < options['duplicates']]
+        rng.shuffle(events)
+        bodies = [json.dumps(event).encode() for event in events]
+
+        self.stdout.write(f'📨 {len(bodies)} événement(s) pour {len(payments)} paiement(s)')
+        start = time.monotonic()
+        if options['url']:
+            url = f"{options['url']}?provider={options['provider']}"
+            with ThreadPoolExecutor(max_workers=max(options['concurrency'], 1)) as executor:
+                results = list(executor.map(lambda body: self._post(url, body), bodies))
+        else:
+            results = [
+                'accepted' if PaymentWebhookService.receive(body, provider=options['provider'])[1] else 'duplicate'
+                for body in bodies
+            ]
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {results.count('accepted')} accepté(s), {results.count('duplicate')} doublon(s), "
+            f"{len(results) - results.count('accepted') - results.count('duplicate')} erreur(s) "
+            f"en {elapsed:.2f}s ({len(results) / max(elapsed, 1e-6):.0f} événements/s)"
+        ))
+
+        if options['process']:
+            start = time.monotonic()
+            stats = PaymentWebhookService.process_pending()
+            elapsed = time.monotonic() - start
+            self.stdout.write(self.style.SUCCESS(
+                f"⚙️  {stats['processed']} appliqué(s), {stats['ignored']} ignoré(s), {stats['failed']} en échec "
+                f"en {elapsed:.2f}s"
+            ))
+
+    @staticmethod
+    def _post(url, body):
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return json.loads(response.read()).get('status', 'error')
+        except Exception:
+            return 'error'
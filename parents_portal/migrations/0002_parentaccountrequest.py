@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parents_portal', '0001_initial'),
+        ('students', '0003_alter_student_matricule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParentAccountRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('DONE', 'Traitée'), ('FAILED', 'Échouée'), ('SKIPPED', 'Ignorée')], db_index=True, default='PENDING', max_length=20)),
+                ('source', models.CharField(blank=True, max_length=50, verbose_name='Origine de la demande')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('guardian', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='parent_account_request', to='students.guardian')),
+            ],
+            options={
+                'verbose_name': 'Demande de compte parent',
+                'verbose_name_plural': 'Demandes de comptes parents',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
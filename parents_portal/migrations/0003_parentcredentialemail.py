@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parents_portal', '0002_parentaccountrequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParentCredentialEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('temporary_password', models.CharField(blank=True, max_length=128)),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('SENT', 'Envoyé'), ('FAILED', 'Échoué')], db_index=True, default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('parent_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credential_emails', to='parents_portal.parentuser')),
+            ],
+            options={
+                'verbose_name': "Email d'identifiants",
+                'verbose_name_plural': "Emails d'identifiants",
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0002_extrafeetype_alter_extrafee_options_and_more'),
+        ('parents_portal', '0003_parentcredentialemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parentpayment',
+            name='extra_fee',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parent_payments', to='finances.extrafee'),
+        ),
+        migrations.AddField(
+            model_name='parentpayment',
+            name='fee_structure',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parent_payments', to='finances.feestructure'),
+        ),
+        migrations.AddField(
+            model_name='parentpayment',
+            name='payment_type',
+            field=models.CharField(choices=[('TRANCHE', 'Tranche de scolarité'), ('INSCRIPTION', "Frais d'inscription"), ('EXTRA_FEE', 'Frais annexe')], default='TRANCHE', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='parentpayment',
+            name='tranche',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parent_payments', to='finances.feetranche'),
+        ),
+        migrations.AlterField(
+            model_name='parentpayment',
+            name='transaction_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='PaymentWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20, verbose_name='Fournisseur')),
+                ('event_id', models.CharField(max_length=100, verbose_name="Identifiant de l'événement")),
+                ('transaction_id', models.CharField(db_index=True, max_length=100, verbose_name='Transaction')),
+                ('event_status', models.CharField(max_length=30, verbose_name='Statut annoncé')),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('PROCESSED', 'Appliqué'), ('IGNORED', 'Ignoré'), ('FAILED', 'Échoué')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='webhook_events', to='parents_portal.parentpayment')),
+            ],
+            options={
+                'verbose_name': 'Événement de paiement',
+                'verbose_name_plural': 'Événements de paiement',
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'id'], name='payment_webhook_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'event_id'), name='unique_payment_webhook_event')],
+            },
+        ),
+    ]
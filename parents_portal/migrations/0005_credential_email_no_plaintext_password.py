@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parents_portal', '0004_payment_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='parentcredentialemail',
+            name='temporary_password',
+        ),
+    ]
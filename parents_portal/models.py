@@ -9,7 +9,7 @@ import string
 
 # Import des modèles nécessaires
 from students.models import Student, Guardian
-from finances.models import FeeTranche, TranchePayment
+from finances.models import ExtraFee, FeeStructure, FeeTranche, TranchePayment
 from notes.models import Bulletin
 
 class ParentUser(models.Model):
@@ -69,6 +69,10 @@ class ParentUser(models.Model):
         """Définit le mot de passe hashé"""
         self.password_hash = make_password(password)
     
+    def set_unusable_password(self):
+        """Aucun mot de passe ne permet la connexion (en attente des identifiants)"""
+        self.password_hash = make_password(None)
+    
     def check_password(self, password):
         """Vérifie si le mot de passe est correct"""
         return check_password(password, self.password_hash)
@@ -103,14 +107,13 @@ class ParentUser(models.Model):
             students.append(guardian.student)
         return students
     
-    def send_credentials_email(self, password):
-        """Envoie les identifiants par email"""
-        try:
-            from django.core.mail import send_mail
-            from django.conf import settings
-            
-            subject = "Vos identifiants de connexion - Portail Parents Scolaris"
-            message = f"""
+    def get_credentials_email(self, password):
+        """Construit l'email contenant les identifiants de connexion"""
+        from django.core.mail import EmailMessage
+        from django.conf import settings
+        
+        subject = "Vos identifiants de connexion - Portail Parents Scolaris"
+        message = f"""
             Bonjour {self.get_full_name()},
             
             Votre compte a été créé avec succès sur le portail parents de Scolaris.
@@ -126,14 +129,17 @@ class ParentUser(models.Model):
             Cordialement,
             L'équipe Scolaris
             """
-            
-            return send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[self.email],
-                fail_silently=False,
-            )
+        return EmailMessage(
+            subject=subject,
+            body=message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[self.email],
+        )
+    
+    def send_credentials_email(self, password):
+        """Envoie les identifiants par email"""
+        try:
+            return self.get_credentials_email(password).send(fail_silently=False)
         except Exception as e:
             print(f"Erreur envoi email: {e}")
             return False
@@ -217,12 +223,35 @@ class ParentPayment(models.Model):
         ('FAILED', 'Échoué'),
         ('CANCELLED', 'Annulé'),
     ]
+    PAYMENT_TYPE_CHOICES = [
+        ('TRANCHE', 'Tranche de scolarité'),
+        ('INSCRIPTION', "Frais d'inscription"),
+        ('EXTRA_FEE', 'Frais annexe'),
+    ]
+    # Statuts atteignables depuis chaque statut : COMPLETED et CANCELLED sont définitifs,
+    # un paiement échoué peut encore être confirmé par le fournisseur
+    STATUS_TRANSITIONS = {
+        'PENDING': {'PROCESSING', 'COMPLETED', 'FAILED', 'CANCELLED'},
+        'PROCESSING': {'COMPLETED', 'FAILED', 'CANCELLED'},
+        'FAILED': {'COMPLETED'},
+        'COMPLETED': set(),
+        'CANCELLED': set(),
+    }
     
     # Informations de base
     payment_id = models.CharField(max_length=50, unique=True, blank=True)
     parent_user = models.ForeignKey(ParentUser, on_delete=models.CASCADE, related_name='payments')
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='parent_payments')
-    tranche = models.ForeignKey(FeeTranche, on_delete=models.CASCADE, related_name='parent_payments')
+    payment_type = models.CharField(max_length=20, choices=PAYMENT_TYPE_CHOICES, default='TRANCHE')
+    tranche = models.ForeignKey(
+        FeeTranche, on_delete=models.CASCADE, related_name='parent_payments', null=True, blank=True
+    )
+    fee_structure = models.ForeignKey(
+        FeeStructure, on_delete=models.CASCADE, related_name='parent_payments', null=True, blank=True
+    )
+    extra_fee = models.ForeignKey(
+        ExtraFee, on_delete=models.CASCADE, related_name='parent_payments', null=True, blank=True
+    )
     
     # Montants
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -235,7 +264,7 @@ class ParentPayment(models.Model):
     
     # Statut et suivi
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='PENDING')
-    transaction_id = models.CharField(max_length=100, blank=True)  # ID de transaction externe
+    transaction_id = models.CharField(max_length=100, blank=True, db_index=True)  # ID de transaction externe
     receipt_url = models.URLField(blank=True)
     
     # Métadonnées
@@ -258,6 +287,10 @@ class ParentPayment(models.Model):
             self.total_amount = self.amount + self.fees
         super().save(*args, **kwargs)
     
+    def can_transition_to(self, status):
+        """Indique si le paiement peut passer au statut donné"""
+        return status in self.STATUS_TRANSITIONS.get(self.status, set())
+    
     def generate_payment_id(self):
         """Génère un ID unique pour le paiement"""
         while True:
@@ -294,18 +327,24 @@ class ParentPayment(models.Model):
             return False
     
     def create_financial_payment(self):
-        """Crée le paiement correspondant dans le système financier"""
-        try:
-            TranchePayment.objects.create(
-                student=self.student,
-                tranche=self.tranche,
-                amount=self.amount,
-                mode=self.method_type.lower(),
-                receipt=self.payment_id,
-                created_by=None  # Paiement parent
-            )
-        except Exception as e:
-            print(f"Erreur création paiement financier: {e}")
+        """
+        Crée le paiement correspondant dans le système financier (tranche, inscription
+        ou frais annexe), avec le numéro du paiement parent comme reçu
+        """
+        from finances.models import ExtraFeePayment, InscriptionPayment
+
+        # Paiement parent : created_by vide
+        values = {
+            'student': self.student,
+            'amount': self.amount,
+            'mode': 'mobile' if self.method_type in ('OM', 'MOMO') else 'virement',
+            'receipt': self.payment_id,
+        }
+        if self.payment_type == 'INSCRIPTION':
+            return InscriptionPayment.objects.create(fee_structure=self.fee_structure, **values)
+        if self.payment_type == 'EXTRA_FEE':
+            return ExtraFeePayment.objects.create(extra_fee=self.extra_fee, **values)
+        return TranchePayment.objects.create(tranche=self.tranche, **values)
 
 class ParentNotification(models.Model):
     """
@@ -368,3 +407,117 @@ class ParentLoginSession(models.Model):
     
     def __str__(self):
         return f"{self.parent_user} - {self.ip_address} ({self.created_at})"
+
+class ParentAccountRequest(models.Model):
+    """
+    Demande de création de compte parent différée.
+
+    Les imports d'élèves en masse n'envoient aucun email ni ne hachent de mot de
+    passe : ils déposent une demande par responsable, traitée ensuite par la
+    commande `process_parent_account_requests` (tâche cron).
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('DONE', 'Traitée'),
+        ('FAILED', 'Échouée'),
+        ('SKIPPED', 'Ignorée'),
+    ]
+
+    guardian = models.OneToOneField(Guardian, on_delete=models.CASCADE, related_name='parent_account_request')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    source = models.CharField(max_length=50, blank=True, verbose_name="Origine de la demande")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+
+    # Métadonnées
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Demande de compte parent"
+        verbose_name_plural = "Demandes de comptes parents"
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Compte parent pour {self.guardian.name} ({self.get_status_display()})"
+
+class ParentCredentialEmail(models.Model):
+    """
+    Email d'identifiants en attente d'envoi.
+
+    La génération des comptes en lot n'envoie pas les emails elle-même : elle les
+    dépose ici et ils sont envoyés par paquets sur une seule connexion SMTP. Le mot
+    de passe temporaire n'est pas stocké : il est généré et défini sur le compte au
+    moment de l'envoi (un nouveau à chaque tentative). Un email en échec reste en
+    attente jusqu'à MAX_ATTEMPTS tentatives, puis passe en échec.
+    """
+    MAX_ATTEMPTS = 3
+
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('SENT', 'Envoyé'),
+        ('FAILED', 'Échoué'),
+    ]
+
+    parent_user = models.ForeignKey(ParentUser, on_delete=models.CASCADE, related_name='credential_emails')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+
+    # Métadonnées
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Email d'identifiants"
+        verbose_name_plural = "Emails d'identifiants"
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Identifiants pour {self.parent_user.email} ({self.get_status_display()})"
+
+class PaymentWebhookEvent(models.Model):
+    """
+    Événement reçu d'un fournisseur de paiement (boîte de réception des webhooks).
+
+    Le webhook enregistre l'événement brut et répond aussitôt ; les événements sont
+    appliqués ensuite par la commande `process_payment_webhooks`. L'identifiant
+    d'événement du fournisseur est unique : un événement renvoyé par le fournisseur
+    n'est enregistré qu'une fois.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('PROCESSED', 'Appliqué'),
+        ('IGNORED', 'Ignoré'),
+        ('FAILED', 'Échoué'),
+    ]
+
+    provider = models.CharField(max_length=20, verbose_name="Fournisseur")
+    event_id = models.CharField(max_length=100, verbose_name="Identifiant de l'événement")
+    transaction_id = models.CharField(max_length=100, db_index=True, verbose_name="Transaction")
+    event_status = models.CharField(max_length=30, verbose_name="Statut annoncé")
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    payment = models.ForeignKey(
+        ParentPayment, on_delete=models.SET_NULL, null=True, blank=True, related_name='webhook_events'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+
+    # Métadonnées
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Événement de paiement"
+        verbose_name_plural = "Événements de paiement"
+        ordering = ['received_at']
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='unique_payment_webhook_event'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='payment_webhook_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_id} - {self.transaction_id} ({self.get_status_display()})"
@@ -0,0 +1,263 @@
+"""
+Rapprochement des relevés des fournisseurs de paiement (Orange Money, MTN MoMo)
+
+Le relevé (CSV) est lu ligne à ligne, sans être chargé en mémoire. Avant la
+lecture, les paiements du portail et les paiements financiers enregistrés à
+partir d'eux (reçu = numéro du paiement parent) sont chargés en quelques
+requêtes dans des tables de hachage :
+- par identifiant de transaction (ou numéro de paiement parent) ;
+- par (montant, téléphone), pour les lignes dont la référence est inconnue.
+
+Chaque ligne est rapprochée par simple recherche dans ces tables, puis classée :
+rapprochée, doublon dans le relevé, divergente (montant, statut, paiement
+financier absent ou différent) ou inconnue. Les paiements complétés de la
+période du relevé qui n'y figurent pas sont signalés à la fin.
+"""
+from collections import defaultdict
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import io
+import itertools
+import re
+
+from django.db.models import Sum
+from django.utils.text import slugify
+
+# Nom de colonne normalisé -> champ interne
+COLUMN_ALIASES = {
+    'transaction_id': 'transaction_id',
+    'id_transaction': 'transaction_id',
+    'transaction': 'transaction_id',
+    'txn_id': 'transaction_id',
+    'reference': 'transaction_id',
+    'ref': 'transaction_id',
+    'amount': 'amount',
+    'montant': 'amount',
+    'phone': 'phone',
+    'telephone': 'phone',
+    'msisdn': 'phone',
+    'numero': 'phone',
+    'status': 'status',
+    'statut': 'status',
+    'etat': 'status',
+    'date': 'date',
+    'date_transaction': 'date',
+}
+DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y']
+
+MATCHED = 'MATCHED'
+MATCHED_BY_AMOUNT_PHONE = 'MATCHED_BY_AMOUNT_PHONE'
+DUPLICATE = 'DUPLICATE'
+AMOUNT_MISMATCH = 'AMOUNT_MISMATCH'
+STATUS_MISMATCH = 'STATUS_MISMATCH'
+FINANCE_MISMATCH = 'FINANCE_MISMATCH'
+UNMATCHED = 'UNMATCHED'
+INVALID = 'INVALID'
+MISSING_FROM_STATEMENT = 'MISSING_FROM_STATEMENT'
+
+REPORT_COLUMNS = ['line', 'result', 'transaction_id', 'amount', 'phone', 'payment_id', 'detail']
+
+
+def normalize_phone(value):
+    """9 derniers chiffres du numéro (sans indicatif pays ni séparateurs)"""
+    return re.sub(r'\D', '', str(value or ''))[-9:]
+
+
+def to_cents(value):
+    """Montant en centimes (entier), ou None si illisible"""
+    if isinstance(value, Decimal):
+        return int(value * 100)
+    text = re.sub(r'[\s ]', '', str(value or ''))
+    if ',' in text and '.' not in text:
+        text = text.replace(',', '.')
+    try:
+        return int(Decimal(text) * 100)
+    except InvalidOperation:
+        return None
+
+
+def parse_date(value):
+    value = str(value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def read_statement(stream):
+    """
+    Lignes d'un relevé CSV, lues à la demande
+
+    Args:
+        stream: Fichier texte ou binaire (UTF-8), séparateur détecté parmi , ; et tabulation
+
+    Yields:
+        tuple: (numéro de ligne, {champ interne: valeur})
+
+    Raises:
+        ValueError: Fichier vide ou colonnes obligatoires (transaction, montant) absentes
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    sample = stream.read(2048)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    # Échantillon consommé par la détection du séparateur, complété jusqu'à la fin de sa ligne, puis suite du fichier
+    reader = csv.reader(itertools.chain(io.StringIO(sample + stream.readline()), stream), dialect)
+
+    header = next(reader, None)
+    if not header:
+        raise ValueError("Le relevé est vide.")
+    columns = [COLUMN_ALIASES.get(slugify(title).replace('-', '_')) for title in header]
+    missing = [field for field in ('transaction_id', 'amount') if field not in columns]
+    if missing:
+        raise ValueError(f"Colonnes obligatoires manquantes: {', '.join(missing)}")
+
+    for line_number, values in enumerate(reader, start=2):
+        if any(values):
+            yield line_number, {column: value.strip() for column, value in zip(columns, values) if column}
+
+
+class PaymentIndex:
+    """Paiements parents et paiements financiers indexés pour le rapprochement"""
+
+    def __init__(self, method_types=None):
+        from finances.models import ExtraFeePayment, InscriptionPayment, TranchePayment
+        from .models import ParentPayment
+
+        payments = ParentPayment.objects.all()
+        if method_types:
+            payments = payments.filter(method_type__in=method_types)
+        rows = payments.values_list(
+            'pk', 'payment_id', 'transaction_id', 'amount', 'status', 'completed_at',
+            'payment_method__account_number', 'parent_user__phone',
+        ).order_by()
+
+        self.payments = {}                         # pk -> (payment_id, cents, statut, date, téléphone)
+        self.by_reference = {}                     # transaction_id ou payment_id -> pk
+        self.by_amount_phone = defaultdict(list)   # (cents, téléphone) -> [pk]
+        for pk, payment_id, transaction_id, amount, status, completed_at, account, phone in rows:
+            phone = normalize_phone(account or phone)
+            cents = to_cents(amount)
+            self.payments[pk] = (payment_id, cents, status, completed_at.date() if completed_at else None, phone)
+            self.by_reference[payment_id] = pk
+            if transaction_id:
+                self.by_reference[transaction_id] = pk
+            self.by_amount_phone[(cents, phone)].append(pk)
+
+        # Paiements financiers créés depuis le portail : reçu = numéro du paiement parent
+        self.finance = defaultdict(int)
+        for model in (TranchePayment, InscriptionPayment, ExtraFeePayment):
+            receipts = model.objects.filter(receipt__startswith='PP').values('receipt').annotate(
+                total=Sum('amount')
+            ).values_list('receipt', 'total').order_by()
+            for receipt, total in receipts:
+                self.finance[receipt] += to_cents(total)
+
+
+class PaymentReconciliationService:
+    """
+    Rapprochement d'un relevé de fournisseur avec les paiements enregistrés
+
+    Les lignes autres que MATCHED (y compris les rapprochements par montant et
+    téléphone, à confirmer) sont écrites au fil de l'eau dans le rapport CSV, si
+    fourni : seuls les compteurs et les références déjà vues restent en mémoire.
+    """
+
+    @staticmethod
+    def reconcile(stream, method_types=None, report=None):
+        """
+        Rapproche un relevé CSV
+
+        Args:
+            stream: Relevé (fichier texte ou binaire)
+            method_types (list): Méthodes de paiement concernées (ex: ['OM']), toutes par défaut
+            report: Fichier texte où écrire les anomalies (CSV), optionnel
+
+        Returns:
+            dict: Nombre de lignes et nombre par résultat (MATCHED, DUPLICATE, ...)
+        """
+        from .services import PaymentWebhookService
+
+        index = PaymentIndex(method_types)
+        writer = csv.writer(report) if report is not None else None
+        if writer:
+            writer.writerow(REPORT_COLUMNS)
+
+        stats = defaultdict(int)
+        seen = set()
+        matched = set()
+        first_date = last_date = None
+
+        def record(line, result, entry, payment_id='', detail=''):
+            stats[result] += 1
+            if writer and result != MATCHED:
+                writer.writerow([
+                    line, result, entry.get('transaction_id', ''), entry.get('amount', ''),
+                    entry.get('phone', ''), payment_id, detail,
+                ])
+
+        for line, entry in read_statement(stream):
+            stats['lines'] += 1
+            reference = entry.get('transaction_id', '')
+            cents = to_cents(entry.get('amount'))
+            if not reference or cents is None:
+                record(line, INVALID, entry, detail="Transaction ou montant illisible")
+                continue
+            if reference in seen:
+                record(line, DUPLICATE, entry, detail="Transaction déjà présente dans le relevé")
+                continue
+            seen.add(reference)
+
+            statement_date = parse_date(entry.get('date'))
+            if statement_date:
+                first_date = min(first_date or statement_date, statement_date)
+                last_date = max(last_date or statement_date, statement_date)
+
+            pk = index.by_reference.get(reference)
+            result = MATCHED
+            if pk is None:
+                # Référence inconnue : paiement unique non encore rapproché de même montant et téléphone
+                candidates = [
+                    candidate for candidate in index.by_amount_phone.get((cents, normalize_phone(entry.get('phone'))), ())
+                    if candidate not in matched
+                ]
+                if len(candidates) != 1:
+                    detail = "Aucun paiement correspondant" if not candidates else \
+                        f"{len(candidates)} paiements de même montant et téléphone"
+                    record(line, UNMATCHED, entry, detail=detail)
+                    continue
+                pk = candidates[0]
+                result = MATCHED_BY_AMOUNT_PHONE
+            if pk in matched:
+                record(line, DUPLICATE, entry, index.payments[pk][0], "Paiement déjà rapproché par une autre ligne")
+                continue
+            matched.add(pk)
+
+            payment_id, expected, status, _, _ = index.payments[pk]
+            statement_status = PaymentWebhookService.STATUS_MAP.get(entry.get('status', 'success').lower() or 'success')
+            if cents != expected:
+                record(line, AMOUNT_MISMATCH, entry, payment_id, f"Montant enregistré : {expected / 100:.2f}")
+            elif statement_status and statement_status != status and 'COMPLETED' in (statement_status, status):
+                record(line, STATUS_MISMATCH, entry, payment_id, f"Statut enregistré : {status}")
+            elif status == 'COMPLETED' and index.finance.get(payment_id, 0) != expected:
+                recorded = index.finance.get(payment_id, 0)
+                detail = "Paiement financier absent" if not recorded else \
+                    f"Paiement financier de {recorded / 100:.2f}"
+                record(line, FINANCE_MISMATCH, entry, payment_id, detail)
+            else:
+                record(line, result, entry, payment_id)
+
+        # Paiements complétés sur la période du relevé qui n'y figurent pas
+        if first_date:
+            for pk, (payment_id, cents, status, completed_on, phone) in index.payments.items():
+                if status == 'COMPLETED' and pk not in matched and completed_on \
+                        and first_date <= completed_on <= last_date:
+                    record('', MISSING_FROM_STATEMENT, {'amount': f"{cents / 100:.2f}", 'phone': phone}, payment_id,
+                           "Paiement complété absent du relevé")
+        return dict(stats)
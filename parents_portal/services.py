@@ -2,13 +2,17 @@ from django.contrib.auth import authenticate
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Sum, Count, Avg
+from django.db.models import F, Q, Sum, Count, Avg
+from django.db.models.functions import Lower
+from django.db import transaction
 from datetime import datetime, timedelta
 import logging
+import time
 
 from .models import (
     ParentUser, ParentStudentRelation, ParentPaymentMethod,
-    ParentPayment, ParentNotification, ParentLoginSession
+    ParentPayment, ParentNotification, ParentLoginSession, ParentAccountRequest,
+    ParentCredentialEmail
 )
 from students.models import Student, Guardian
 from finances.models import (
@@ -18,6 +22,8 @@ from finances.models import (
 from notes.models import Bulletin, Evaluation
 from classes.models import SchoolClass
 from school.models import SchoolYear
+from .hashers import hash_passwords
+from .sync import touch
 
 logger = logging.getLogger(__name__)
 
@@ -71,8 +77,7 @@ class ParentPortalService:
     @staticmethod
     def _generate_unique_username(guardian):
         """Génère un nom d'utilisateur unique basé sur le nom du guardian"""
-        base_username = guardian.name.lower().replace(' ', '').replace('-', '').replace("'", '')
-        username = base_username[:15]  # Limiter à 15 caractères
+        username = ParentPortalService._get_base_username(guardian.name)
 
         counter = 1
         original_username = username
@@ -86,6 +91,12 @@ class ParentPortalService:
 
         return username
 
+    @staticmethod
+    def _get_base_username(name):
+        """Nom d'utilisateur de base dérivé du nom du guardian"""
+        base_username = name.lower().replace(' ', '').replace('-', '').replace("'", '')
+        return base_username[:15]  # Limiter à 15 caractères
+
     @staticmethod
     def _create_student_relations(parent_user, guardian):
         """Crée les relations entre le parent et ses étudiants"""
@@ -94,7 +105,7 @@ class ParentPortalService:
             ParentStudentRelation.objects.create(
                 parent_user=parent_user,
                 student=guardian.student,
-                relation_type=guardian.relation,
+                relation_type=ParentPortalService.get_relation_type(guardian.relation),
                 is_active=True,
                 can_view_academic=True,
                 can_view_financial=True,
@@ -106,6 +117,142 @@ class ParentPortalService:
             logger.error(f"Erreur création relation: {str(e)}")
             raise e
 
+    @staticmethod
+    def get_relation_type(guardian_relation):
+        """Convertit la relation libre du guardian (Père, Mère...) en type de relation"""
+        relation = (guardian_relation or '').strip().lower()
+        if relation in ('père', 'pere', 'father'):
+            return 'FATHER'
+        if relation in ('mère', 'mere', 'mother'):
+            return 'MOTHER'
+        if relation in ('tuteur', 'tutrice', 'tutor'):
+            return 'TUTOR'
+        return 'GUARDIAN'
+
+    @staticmethod
+    def queue_account_requests(guardians, source=''):
+        """
+        Dépose une demande de création de compte pour chaque guardian avec email,
+        sans hachage de mot de passe ni envoi d'email (traitement différé)
+        """
+        requests = [
+            ParentAccountRequest(guardian=guardian, source=source)
+            for guardian in guardians
+            if guardian.email and not guardian.parent_user_id
+        ]
+        ParentAccountRequest.objects.bulk_create(requests, ignore_conflicts=True)
+        return len(requests)
+
+    @staticmethod
+    def process_account_requests(limit=None):
+        """
+        Traite les demandes de création de comptes parents en attente
+
+        Les comptes sont créés en lot (voir ParentAccountBatchService) : un
+        responsable dont l'email correspond déjà à un compte (fratrie) est simplement
+        rattaché à ce compte, et les emails d'identifiants sont mis en file d'attente.
+
+        Returns:
+            dict: Nombre de comptes créés, rattachés, demandes échouées et ignorées
+        """
+        pending = ParentAccountRequest.objects.filter(
+            status='PENDING'
+        ).select_related('guardian', 'guardian__student')
+        if limit:
+            pending = pending[:limit]
+        requests = list(pending)
+
+        skipped = [request for request in requests if not request.guardian.email]
+        to_process = [request for request in requests if request.guardian.email]
+        stats = {'created': 0, 'linked': 0, 'failed': 0, 'skipped': len(skipped)}
+
+        now = timezone.now()
+        for account_request in skipped:
+            account_request.status = 'SKIPPED'
+        try:
+            result = ParentAccountBatchService.create_accounts([request.guardian for request in to_process])
+            stats['created'] = result['created']
+            stats['linked'] = result['linked']
+            for account_request in to_process:
+                error = result['errors'].get(account_request.guardian.email.strip().lower())
+                account_request.status = 'FAILED' if error else 'DONE'
+                account_request.last_error = error or ''
+                stats['failed'] += bool(error)
+        except Exception as e:
+            logger.error(f"Erreur création des comptes parents en lot: {str(e)}")
+            stats['failed'] = len(to_process)
+            for account_request in to_process:
+                account_request.status = 'FAILED'
+                account_request.last_error = str(e)
+
+        for account_request in requests:
+            account_request.attempts += 1
+            account_request.processed_at = now
+        ParentAccountRequest.objects.bulk_update(
+            requests, ['status', 'attempts', 'last_error', 'processed_at'], batch_size=500
+        )
+        return stats
+
+    @staticmethod
+    def send_queued_credentials(limit=None, workers=None, batch_size=200):
+        """
+        Envoie les emails d'identifiants en attente sur une seule connexion SMTP
+
+        Le mot de passe temporaire de chaque compte est généré et haché (en
+        parallèle, par paquets de `batch_size`) juste avant l'envoi : il n'est
+        jamais stocké en clair. Un échec n'affecte que l'email concerné.
+
+        Args:
+            limit (int, optional): Nombre maximum d'emails à envoyer
+            workers (int, optional): Nombre de processus de hachage (défaut: nombre de cœurs)
+
+        Returns:
+            dict: Nombre d'emails envoyés et en échec
+        """
+        from django.core.mail import get_connection
+
+        queued = ParentCredentialEmail.objects.filter(status='PENDING').select_related('parent_user')
+        if limit:
+            queued = queued[:limit]
+        queued = list(queued)
+
+        stats = {'sent': 0, 'failed': 0}
+        connection = get_connection(fail_silently=False)
+        try:
+            for start in range(0, len(queued), batch_size):
+                batch = queued[start:start + batch_size]
+                passwords = [credential_email.parent_user.generate_temporary_password() for credential_email in batch]
+                password_hashes = hash_passwords(passwords, workers=workers)
+
+                for credential_email, password, password_hash in zip(batch, passwords, password_hashes):
+                    parent_user = credential_email.parent_user
+                    credential_email.attempts += 1
+                    try:
+                        ParentUser.objects.filter(pk=parent_user.pk).update(password_hash=password_hash)
+                        # Connexion rouverte si le serveur l'a fermée après une erreur
+                        connection.open()
+                        message = parent_user.get_credentials_email(password)
+                        message.connection = connection
+                        message.send(fail_silently=False)
+                        credential_email.status = 'SENT'
+                        credential_email.sent_at = timezone.now()
+                        credential_email.last_error = ''
+                        stats['sent'] += 1
+                    except Exception as e:
+                        logger.error(f"Erreur envoi des identifiants à {parent_user.email}: {str(e)}")
+                        if credential_email.attempts >= ParentCredentialEmail.MAX_ATTEMPTS:
+                            credential_email.status = 'FAILED'
+                        credential_email.last_error = str(e)
+                        stats['failed'] += 1
+                        connection.close()
+                    credential_email.save(update_fields=['status', 'attempts', 'last_error', 'sent_at'])
+        finally:
+            connection.close()
+
+        if stats['sent']:
+            logger.info(f"{stats['sent']} email(s) d'identifiants envoyé(s)")
+        return stats
+
     @staticmethod
     def get_parent_statistics(parent_user):
         """Récupère les statistiques du parent"""
@@ -641,7 +788,8 @@ class PaymentService:
             payment = ParentPayment.objects.create(
                 parent_user=parent_user,
                 student=student,
-                tranche=None,  # Pas de tranche pour l'inscription
+                payment_type='INSCRIPTION',
+                fee_structure=fee_structure,
                 payment_method=payment_method,
                 amount=amount,
                 method_type=payment_method.method_type,
@@ -671,7 +819,8 @@ class PaymentService:
             payment = ParentPayment.objects.create(
                 parent_user=parent_user,
                 student=student,
-                tranche=None,  # Pas de tranche pour les frais annexes
+                payment_type='EXTRA_FEE',
+                extra_fee=extra_fee,
                 payment_method=payment_method,
                 amount=amount,
                 method_type=payment_method.method_type,
@@ -765,25 +914,332 @@ class PaymentService:
         # Simulation avec 90% de succès
         return random.random() > 0.10
 
+
+class PaymentWebhookService:
+    """
+    Webhooks des fournisseurs de paiement
+
+    La réception (`receive`) se limite à enregistrer l'événement brut dans
+    PaymentWebhookEvent, dédoublonné par (fournisseur, identifiant d'événement),
+    pour répondre aussitôt au fournisseur. Les événements sont appliqués ensuite,
+    dans l'ordre de réception, par `process_pending` (commande
+    `process_payment_webhooks`) : chaque événement est traité dans sa propre
+    transaction, paiement verrouillé, et n'est appliqué que si la transition de
+    statut est permise (ParentPayment.STATUS_TRANSITIONS). Un événement répété ou
+    arrivé après un statut définitif est ignoré : le paiement financier
+    correspondant n'est créé qu'une fois.
+    """
+
+    # Statuts annoncés par les fournisseurs -> statut du paiement
+    STATUS_MAP = {
+        'success': 'COMPLETED', 'successful': 'COMPLETED', 'completed': 'COMPLETED', 'paid': 'COMPLETED',
+        'pending': 'PROCESSING', 'processing': 'PROCESSING',
+        'failed': 'FAILED', 'failure': 'FAILED', 'expired': 'FAILED',
+        'cancelled': 'CANCELLED', 'canceled': 'CANCELLED',
+    }
+    BATCH_SIZE = 200
+
     @staticmethod
-    def process_payment_webhook(data):
-        """Traite un webhook de paiement"""
-        try:
-            # Traiter les données du webhook selon le fournisseur
-            payment_id = data.get('payment_id')
-            status = data.get('status')
-
-            if payment_id and status:
-                # Mettre à jour le statut du paiement
-                payment = ParentPayment.objects.get(transaction_id=payment_id)
-                payment.status = 'COMPLETED' if status == 'success' else 'FAILED'
-                payment.completed_at = timezone.now()
-                payment.save()
+    def get_max_attempts():
+        """Tentatives avant l'abandon d'un événement dont le paiement est introuvable"""
+        return getattr(settings, 'PAYMENT_WEBHOOK_MAX_ATTEMPTS', 5)
 
-                logger.info(f"Webhook traité: {payment_id} -> {status}")
-                return status
+    @staticmethod
+    def receive(body, provider=None, event_id=None):
+        """
+        Enregistre un événement reçu
+
+        Args:
+            body (bytes): Corps JSON de la requête
+            provider (str): Fournisseur (sinon champ `provider` du corps)
+            event_id (str): Identifiant d'événement (sinon champ `event_id` du corps,
+                à défaut empreinte du corps : un renvoi à l'identique est reconnu)
 
-            return 'unknown'
+        Returns:
+            tuple: (PaymentWebhookEvent, créé ou non)
+
+        Raises:
+            ValueError: Corps invalide, transaction ou statut absent
+        """
+        import hashlib
+        import json
+        from .models import PaymentWebhookEvent
+
+        data = json.loads(body)
+        if not isinstance(data, dict):
+            raise ValueError("Le corps doit être un objet JSON")
+        transaction_id = str(data.get('transaction_id') or data.get('payment_id') or '')
+        event_status = str(data.get('status') or '')
+        if not transaction_id or not event_status:
+            raise ValueError("Transaction ou statut manquant")
+
+        provider = (provider or data.get('provider') or 'default')[:20]
+        event_id = str(event_id or data.get('event_id') or hashlib.sha256(body).hexdigest())[:100]
+        return PaymentWebhookEvent.objects.get_or_create(
+            provider=provider, event_id=event_id,
+            defaults={
+                'transaction_id': transaction_id[:100],
+                'event_status': event_status[:30],
+                'payload': data,
+            },
+        )
+
+    @staticmethod
+    def process_pending(limit=None):
+        """
+        Applique les événements en attente, par ordre de réception
+
+        Returns:
+            dict: Nombre d'événements appliqués, ignorés, en échec et remis en attente
+        """
+        from .models import PaymentWebhookEvent
+
+        stats = {'processed': 0, 'ignored': 0, 'failed': 0, 'retry': 0}
+        last_id = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = PaymentWebhookService.BATCH_SIZE if remaining is None else min(remaining, PaymentWebhookService.BATCH_SIZE)
+            # Curseur sur pk : les événements remis en attente attendent le passage suivant
+            event_ids = list(PaymentWebhookEvent.objects.filter(status='PENDING', pk__gt=last_id).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:size])
+            if not event_ids:
+                break
+            for event_id in event_ids:
+                result = PaymentWebhookService.apply_event(event_id)
+                if result:
+                    stats[result] += 1
+            last_id = max(event_ids)
+            if remaining is not None:
+                remaining -= len(event_ids)
+
+        if stats['processed'] or stats['failed']:
+            logger.info(
+                f"Webhooks de paiement : {stats['processed']} appliqué(s), {stats['ignored']} ignoré(s), "
+                f"{stats['failed']} en échec, {stats['retry']} remis en attente"
+            )
+        return stats
+
+    @staticmethod
+    def apply_event(event_id):
+        """
+        Applique un événement : transition de statut du paiement et, s'il est
+        complété, création du paiement financier, dans une même transaction
+
+        Returns:
+            str: 'processed', 'ignored', 'failed', 'retry' ou None si l'événement
+            n'est plus en attente (traité par un autre processus)
+        """
+        from .models import PaymentWebhookEvent
+
+        try:
+            with transaction.atomic():
+                event = PaymentWebhookEvent.objects.select_for_update().filter(pk=event_id, status='PENDING').first()
+                if event is None:
+                    return None
+                event.attempts += 1
+                event.last_error = ''
+                result = PaymentWebhookService._apply(event)
+                if result == 'retry':
+                    # Le webhook peut précéder l'enregistrement de la transaction : nouvel essai au passage suivant
+                    event.last_error = f"Paiement introuvable pour la transaction {event.transaction_id}"
+                    if event.attempts >= PaymentWebhookService.get_max_attempts():
+                        result = 'failed'
+                if result != 'retry':
+                    event.status = result.upper()
+                event.processed_at = timezone.now()
+                event.save(update_fields=['status', 'payment', 'attempts', 'last_error', 'processed_at'])
+                return result
         except Exception as e:
-            logger.error(f"Erreur traitement webhook: {str(e)}")
-            return 'error'
+            # Transaction annulée : l'événement est marqué en échec hors transaction
+            logger.error(f"Erreur application webhook {event_id}: {str(e)}")
+            PaymentWebhookEvent.objects.filter(pk=event_id, status='PENDING').update(
+                status='FAILED', attempts=F('attempts') + 1, last_error=str(e), processed_at=timezone.now()
+            )
+            return 'failed'
+
+    @staticmethod
+    def _apply(event):
+        status = PaymentWebhookService.STATUS_MAP.get(event.event_status.lower())
+        if status is None:
+            event.last_error = f"Statut inconnu : {event.event_status}"
+            return 'ignored'
+
+        payment = ParentPayment.objects.select_for_update().filter(
+            Q(transaction_id=event.transaction_id) | Q(payment_id=event.transaction_id)
+        ).select_related('student').first()
+        if payment is None:
+            return 'retry'
+        event.payment = payment
+        if not payment.can_transition_to(status):
+            # Événement répété, ou arrivé après un statut définitif
+            return 'ignored'
+
+        payment.status = status
+        fields = ['status', 'updated_at']
+        if not payment.transaction_id:
+            payment.transaction_id = event.transaction_id
+            fields.append('transaction_id')
+        if status == 'COMPLETED':
+            payment.completed_at = timezone.now()
+            fields.append('completed_at')
+            payment.create_financial_payment()
+        payment.save(update_fields=fields)
+        return 'processed'
+
+
+class ParentAccountBatchService:
+    """
+    Création des comptes parents en lot
+
+    Contrairement à ParentPortalService.create_parent_account, qui sonde la base
+    pour chaque nom d'utilisateur, hache le mot de passe et envoie l'email en
+    série, ce service calcule les noms d'utilisateur en mémoire, insère comptes et
+    relations par bulk_create et dépose les emails dans ParentCredentialEmail.
+    Les comptes sont créés sans mot de passe utilisable : le mot de passe
+    temporaire est généré, haché (dans un pool de processus) puis envoyé par
+    ParentPortalService.send_queued_credentials, sans jamais être stocké en clair.
+
+    Chaque paquet est validé dans sa propre transaction : une exécution interrompue
+    peut être relancée, les comptes déjà créés étant simplement rattachés.
+    """
+
+    @staticmethod
+    def create_accounts(guardians, chunk_size=200, dry_run=False, progress=None):
+        """
+        Crée les comptes parents manquants pour une liste de guardians
+
+        Args:
+            guardians (iterable): Guardians à traiter (ceux sans email sont ignorés)
+            chunk_size (int): Nombre de comptes créés par transaction
+            dry_run (bool): Calcule le plan sans rien écrire
+            progress (callable, optional): Appelée avec (comptes créés, total) après chaque paquet
+
+        Returns:
+            dict: Statistiques (created, linked, skipped, elapsed, rate) et `errors`,
+            erreur par email des comptes qui n'ont pas pu être créés
+        """
+        started = time.monotonic()
+        guardians = [guardian for guardian in guardians]
+        with_email = [guardian for guardian in guardians if guardian.email]
+
+        # Regrouper par email : un seul compte pour les responsables de plusieurs enfants
+        guardians_by_email = {}
+        for guardian in with_email:
+            guardians_by_email.setdefault(guardian.email.strip().lower(), []).append(guardian)
+
+        # Comparaison insensible à la casse : un compte « Paul.Mbarga@… » est rattaché, pas dupliqué
+        existing = {}
+        for parent in ParentUser.objects.annotate(email_lower=Lower('email')).filter(
+            email_lower__in=list(guardians_by_email)
+        ).order_by('pk'):
+            existing.setdefault(parent.email_lower, parent)
+        new_emails = [email for email in guardians_by_email if email not in existing]
+
+        stats = {
+            'guardians': len(guardians),
+            'skipped': len(guardians) - len(with_email),
+            'linked': sum(len(guardians_by_email[email]) for email in existing),
+            'created': 0,
+            'elapsed': 0,
+            'rate': 0,
+            'errors': {},
+        }
+        if dry_run:
+            stats['created'] = len(new_emails)
+            return stats
+
+        # Responsables dont le compte existe déjà (exécution précédente ou fratrie)
+        ParentAccountBatchService._link_guardians(
+            [(existing[email], guardians_by_email[email]) for email in existing]
+        )
+
+        taken_usernames = set(ParentUser.objects.values_list('username', flat=True))
+        for start in range(0, len(new_emails), chunk_size):
+            chunk = new_emails[start:start + chunk_size]
+            accounts = []
+            for email in chunk:
+                guardian = guardians_by_email[email][0]
+                name_parts = guardian.name.split() if guardian.name else []
+                account = ParentUser(
+                    username=ParentAccountBatchService._allocate_username(guardian.name or email, taken_usernames),
+                    email=email,
+                    first_name=name_parts[0] if name_parts else '',
+                    last_name=' '.join(name_parts[1:]),
+                    phone=guardian.phone,
+                    role='PARENT' if guardian.relation in ['Père', 'Mère'] else 'GUARDIAN',
+                )
+                # Mot de passe défini à l'envoi des identifiants
+                account.set_unusable_password()
+                accounts.append(account)
+
+            try:
+                stats['created'] += ParentAccountBatchService._create_chunk(accounts, guardians_by_email)
+            except Exception as e:
+                # Paquet refusé (ex: compte créé entre-temps) : comptes repris un par un,
+                # seuls ceux en erreur échouent
+                logger.warning(f"Paquet de {len(accounts)} compte(s) parent refusé, reprise compte par compte: {str(e)}")
+                for account in accounts:
+                    account.pk = None
+                    account._state.adding = True
+                    try:
+                        stats['created'] += ParentAccountBatchService._create_chunk([account], guardians_by_email)
+                    except Exception as e:
+                        logger.error(f"Erreur création du compte parent {account.email}: {str(e)}")
+                        stats['errors'][account.email] = str(e)
+
+            if progress:
+                progress(stats['created'], len(new_emails))
+
+        stats['elapsed'] = time.monotonic() - started
+        if stats['elapsed'] > 0:
+            stats['rate'] = stats['created'] / stats['elapsed']
+        logger.info(
+            f"{stats['created']} compte(s) parent créé(s) en {stats['elapsed']:.1f}s "
+            f"({stats['rate']:.1f} comptes/s), {stats['linked']} rattachement(s)"
+        )
+        return stats
+
+    @staticmethod
+    def _create_chunk(accounts, guardians_by_email):
+        """Insère un paquet de comptes, leurs rattachements et leurs emails en une transaction"""
+        with transaction.atomic():
+            accounts = ParentUser.objects.bulk_create(accounts)
+            ParentAccountBatchService._link_guardians(
+                [(account, guardians_by_email[account.email]) for account in accounts]
+            )
+            ParentCredentialEmail.objects.bulk_create([
+                ParentCredentialEmail(parent_user=account) for account in accounts
+            ])
+        return len(accounts)
+
+    @staticmethod
+    def _allocate_username(name, taken_usernames):
+        """Nom d'utilisateur unique calculé contre l'ensemble des noms déjà pris"""
+        original_username = ParentPortalService._get_base_username(name)
+        username = original_username
+        counter = 1
+        while username in taken_usernames:
+            username = f"{original_username}{counter}"
+            counter += 1
+        taken_usernames.add(username)
+        return username
+
+    @staticmethod
+    def _link_guardians(pairs):
+        """Rattache les guardians à leur compte et crée les relations parent-élève"""
+        guardians = []
+        relations = []
+        for parent_user, parent_guardians in pairs:
+            for guardian in parent_guardians:
+                guardian.parent_user = parent_user
+                guardians.append(guardian)
+                relations.append(ParentStudentRelation(
+                    parent_user=parent_user,
+                    student_id=guardian.student_id,
+                    relation_type=ParentPortalService.get_relation_type(guardian.relation),
+                ))
+        Guardian.objects.bulk_update(guardians, ['parent_user'], batch_size=500)
+        ParentStudentRelation.objects.bulk_create(relations, batch_size=500, ignore_conflicts=True)
+        # bulk_create ne déclenche pas les signaux : nouvelle version des enfants des parents
+        touch('children', *{relation.parent_user_id for relation in relations})
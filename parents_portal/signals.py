@@ -6,8 +6,10 @@ from django.utils import timezone
 
 from .models import ParentUser, ParentStudentRelation, ParentPayment, ParentNotification
 from students.models import Guardian, Student
-from notes.models import Bulletin
-from finances.models import TranchePayment
+from notes.models import Bulletin, StudentGrade
+from finances.models import FeeDiscount, FeeTranche, TranchePayment
+from school.models import SchoolYear
+from .sync import touch
 
 @receiver(post_save, sender=Guardian)
 def create_parent_account_on_guardian_creation(sender, instance, created, **kwargs):
@@ -168,7 +170,7 @@ def handle_payment_status_change(sender, instance, **kwargs):
         if instance.status == 'COMPLETED':
             # Créer une notification de succès
             ParentNotification.objects.create(
-                parent=instance.parent,
+                parent_user=instance.parent_user,
                 notification_type='PAYMENT',
                 title='Paiement confirmé',
                 message=f'Votre paiement de {instance.amount} FCFA pour {instance.student.first_name} {instance.student.last_name} a été confirmé avec succès.',
@@ -179,7 +181,7 @@ def handle_payment_status_change(sender, instance, **kwargs):
         elif instance.status == 'FAILED':
             # Créer une notification d'échec
             ParentNotification.objects.create(
-                parent=instance.parent,
+                parent_user=instance.parent_user,
                 notification_type='PAYMENT',
                 title='Paiement échoué',
                 message=f'Votre paiement de {instance.amount} FCFA pour {instance.student.first_name} {instance.student.last_name} a échoué. Veuillez réessayer.',
@@ -249,3 +251,50 @@ def send_payment_reminders():
                             
     except Exception as e:
         print(f"Erreur envoi rappels: {e}")
+
+
+# -- Versions de l'API du portail parents (parents_portal/sync.py) -------------
+
+@receiver([post_save, post_delete], sender=Student)
+def touch_child(sender, instance, **kwargs):
+    # La classe de l'élève détermine aussi ses tranches de frais
+    touch('child', instance.pk)
+    touch('balance', instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ParentStudentRelation)
+def touch_children(sender, instance, **kwargs):
+    touch('children', instance.parent_user_id)
+
+
+@receiver([post_save, post_delete], sender=StudentGrade)
+def touch_grades(sender, instance, **kwargs):
+    touch('grades', instance.student_id)
+
+
+@receiver([post_save, post_delete], sender=Bulletin)
+def touch_bulletins(sender, instance, **kwargs):
+    touch('bulletins', instance.student_id)
+
+
+@receiver([post_save, post_delete], sender=TranchePayment)
+@receiver([post_save, post_delete], sender=FeeDiscount)
+def touch_balance(sender, instance, **kwargs):
+    touch('balance', instance.student_id)
+
+
+@receiver([post_save, post_delete], sender=FeeTranche)
+def touch_all_balances(sender, instance, **kwargs):
+    touch('balance')
+
+
+@receiver(post_save, sender=SchoolYear)
+def touch_active_year(sender, instance, **kwargs):
+    # Notes et soldes exposés sont ceux de l'année en cours
+    touch('grades')
+    touch('balance')
+
+
+@receiver([post_save, post_delete], sender=ParentNotification)
+def touch_notifications(sender, instance, **kwargs):
+    touch('notifications', instance.parent_user_id)
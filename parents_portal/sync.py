@@ -0,0 +1,314 @@
+"""
+API de lecture du portail parents : versions, requêtes conditionnelles et synchronisation
+
+Chaque donnée exposée aux parents porte un horodatage de version en cache
+(ex: ('grades', 12) pour les notes de l'élève 12, ('notifications', 3) pour
+les notifications du parent 3), mis à jour par parents_portal/signals.py à
+la validation de chaque écriture. Une version sans pk (ex: ('balance', None))
+vaut pour tous les objets du type, pour les changements qui concernent toute
+une classe (tranches de frais) ou les traitements en masse.
+
+Les horodatages sont tenus dans le cache partagé par tous les processus
+(CACHES, voir scolaris/db.py). Sans cache partagé, un processus ne verrait pas
+les écritures validées par les autres : toute version vaut alors l'instant
+présent (aucune réponse 304, synchronisation complète). Un horodatage évincé
+du cache est recréé à l'instant présent : les clients rechargent la donnée.
+
+Les réponses portent un ETag et un Last-Modified tirés de ces versions : un
+client qui renvoie If-None-Match ou If-Modified-Since reçoit 304 sans
+qu'aucune donnée ne soit relue. L'endpoint de synchronisation reçoit un
+curseur (`since`) et ne renvoie que ce qui a changé depuis.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from scolaris.db import is_shared_cache
+
+API_VERSION = 'v1'
+NOTIFICATIONS_LIMIT = 50
+
+
+# -- Versions ------------------------------------------------------------------
+
+def _stamp_key(kind, pk=None):
+    return f"parents_api:stamp:{kind}:{'*' if pk is None else pk}"
+
+
+def touch(kind, *pks):
+    """
+    Nouvelle version des objets `pks` du type `kind` (de tous les objets du
+    type si aucun pk n'est donné), à la validation de la transaction en cours
+    """
+    keys = [_stamp_key(kind, pk) for pk in pks if pk is not None] if pks else [_stamp_key(kind)]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: time.time() for key in keys}, None))
+
+
+def get_stamps(dependencies):
+    """
+    Horodatages de version d'une liste de dépendances [(kind, pk), ...]
+
+    La version d'un objet est la plus récente entre la sienne et celle de son
+    type. Une version absente du cache est créée à l'instant présent : les
+    clients rechargent alors une fois la donnée.
+    """
+    if not is_shared_cache():
+        now = time.time()
+        return {dependency: now for dependency in dependencies}
+    keys = set()
+    for kind, pk in dependencies:
+        keys.update((_stamp_key(kind), _stamp_key(kind, pk)))
+    stamps = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in stamps}
+    if missing:
+        cache.set_many(missing, None)
+        stamps.update(missing)
+    return {
+        (kind, pk): max(stamps[_stamp_key(kind)], stamps[_stamp_key(kind, pk)])
+        for kind, pk in dependencies
+    }
+
+
+def conditional_json(request, dependencies, build):
+    """
+    Réponse JSON conditionnelle
+
+    Args:
+        dependencies (list): Dépendances [(kind, pk), ...] de la réponse
+        build (callable): Construit le contenu, appelé seulement si le client n'est pas à jour
+
+    Returns:
+        JsonResponse, ou 304 si l'ETag (ou la date) envoyé par le client est à jour
+    """
+    stamps = get_stamps(dependencies)
+    signature = ':'.join([API_VERSION] + [f"{kind}={pk}@{stamps[(kind, pk)]!r}" for kind, pk in dependencies])
+    etag = quote_etag(hashlib.sha1(signature.encode()).hexdigest())
+    last_modified = int(max(stamps.values()))
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(build())
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# -- Curseurs ------------------------------------------------------------------
+
+def make_cursor(moment=None):
+    """Curseur de synchronisation : instant en microsecondes"""
+    return str(int((moment or timezone.now()).timestamp() * 1_000_000))
+
+
+def parse_cursor(cursor):
+    """
+    Instant correspondant à un curseur, avancé de PARENTS_API_SYNC_OVERLAP
+    secondes (5 par défaut) pour couvrir les écarts d'horloge entre serveurs
+
+    Raises:
+        ValueError: Curseur invalide
+    """
+    moment = datetime.fromtimestamp(int(cursor) / 1_000_000, tz=dt_timezone.utc)
+    return moment - timedelta(seconds=getattr(settings, 'PARENTS_API_SYNC_OVERLAP', 5))
+
+
+# -- Données -------------------------------------------------------------------
+
+def get_children(parent_user):
+    """Relations actives du parent avec des élèves actifs"""
+    from .models import ParentStudentRelation
+
+    return list(ParentStudentRelation.objects.filter(
+        parent_user=parent_user, is_active=True, student__is_active=True
+    ).select_related('student__current_class').order_by('student__last_name', 'student__first_name'))
+
+
+def child_data(relation):
+    student = relation.student
+    return {
+        'id': student.pk,
+        'matricule': student.matricule,
+        'first_name': student.first_name,
+        'last_name': student.last_name,
+        'class': student.current_class.name if student.current_class else None,
+        'relation': relation.relation_type,
+        'can_view_academic': relation.can_view_academic,
+        'can_view_financial': relation.can_view_financial,
+        'updated_at': student.updated_at,
+    }
+
+
+def grades_data(student_ids, since=None):
+    """Notes de l'année en cours par élève, modifiées après `since` si donné"""
+    from notes.models import StudentGrade
+    from school.models import SchoolYear
+
+    grades = StudentGrade.objects.filter(
+        student_id__in=student_ids, evaluation__trimester__year=SchoolYear.get_active_year()
+    ).select_related('evaluation__subject', 'evaluation__trimester').order_by('evaluation__eval_date', 'pk')
+    if since is not None:
+        grades = grades.filter(updated_at__gt=since)
+    data = {student_id: [] for student_id in student_ids}
+    for grade in grades:
+        evaluation = grade.evaluation
+        data[grade.student_id].append({
+            'id': grade.pk,
+            'evaluation': evaluation.get_eval_type_display(),
+            'trimester': evaluation.trimester.get_trimester_display(),
+            'subject': evaluation.subject.name,
+            'date': evaluation.eval_date,
+            'score': grade.score,
+            'max_score': evaluation.max_score,
+            'coefficient': evaluation.coefficient,
+            'remarks': grade.remarks,
+            'updated_at': grade.updated_at,
+        })
+    return data
+
+
+def grade_ids(student_ids):
+    """Identifiants des notes existantes par élève (les notes supprimées en sont absentes)"""
+    from notes.models import StudentGrade
+    from school.models import SchoolYear
+
+    ids = {student_id: [] for student_id in student_ids}
+    for pk, student_id in StudentGrade.objects.filter(
+        student_id__in=student_ids, evaluation__trimester__year=SchoolYear.get_active_year()
+    ).values_list('pk', 'student_id').order_by('pk'):
+        ids[student_id].append(pk)
+    return ids
+
+
+def bulletins_data(student_ids):
+    from notes.models import Bulletin
+
+    data = {student_id: [] for student_id in student_ids}
+    bulletins = Bulletin.objects.filter(student_id__in=student_ids).select_related('trimester__year').order_by(
+        'trimester__start_date'
+    )
+    for bulletin in bulletins:
+        data[bulletin.student_id].append({
+            'id': bulletin.pk,
+            'trimester': bulletin.trimester.get_trimester_display(),
+            'year': bulletin.trimester.year.annee,
+            'student_average': bulletin.student_average,
+            'class_average': bulletin.class_average,
+            'rank': bulletin.student_rank,
+            'class_size': bulletin.class_size,
+            'appreciation': bulletin.appreciation,
+            'is_approved': bulletin.is_approved,
+            'generated_at': bulletin.generated_at,
+        })
+    return data
+
+
+def balance_data(student):
+    """Solde des frais de scolarité de l'année en cours"""
+    from school.models import SchoolYear
+
+    year = SchoolYear.get_active_year()
+    tranches = student.get_tranche_status(year) if year else []
+    return {
+        'year': year.annee if year else None,
+        'total_due': sum(tranche['montant'] for tranche in tranches),
+        'total_paid': sum(tranche['payé'] for tranche in tranches),
+        'total_discount': sum(tranche['remise'] for tranche in tranches),
+        'remaining': sum(tranche['reste'] for tranche in tranches),
+        'tranches': [
+            {
+                'id': tranche['tranche'].pk,
+                'number': tranche['tranche'].number,
+                'due_date': tranche['échéance'],
+                'amount': tranche['montant'],
+                'paid': tranche['payé'],
+                'discount': tranche['remise'],
+                'remaining': tranche['reste'],
+                'status': tranche['statut'],
+            }
+            for tranche in tranches
+        ],
+    }
+
+
+def notifications_data(parent_user, since=None):
+    """Dernières notifications du parent, créées ou lues après `since` si donné"""
+    from django.db.models import Q
+    from .models import ParentNotification
+
+    notifications = ParentNotification.objects.filter(parent_user=parent_user)
+    if since is not None:
+        notifications = notifications.filter(Q(created_at__gt=since) | Q(read_at__gt=since))
+    return [
+        {
+            'id': notification.pk,
+            'type': notification.notification_type,
+            'title': notification.title,
+            'message': notification.message,
+            'student': notification.related_student_id,
+            'is_read': notification.is_read,
+            'created_at': notification.created_at,
+        }
+        for notification in notifications.order_by('-created_at')[:NOTIFICATIONS_LIMIT]
+    ]
+
+
+def build_sync(parent_user, since=None):
+    """
+    Synchronisation du portail d'un parent
+
+    Sans `since`, renvoie toutes les données. Avec `since` (instant issu d'un
+    curseur), ne renvoie que les enfants, notes, bulletins, soldes et
+    notifications modifiés depuis ; pour chaque élève dont les notes ont
+    changé, `grade_ids` liste les notes existantes (les autres ont été
+    supprimées). `children_ids` liste toujours les enfants accessibles.
+
+    Returns:
+        dict: cursor, children_ids, children, grades, grade_ids, bulletins, balances, notifications
+    """
+    relations = get_children(parent_user)
+    student_ids = [relation.student_id for relation in relations]
+    dependencies = [('children', parent_user.pk), ('notifications', parent_user.pk)] + [
+        (kind, student_id) for student_id in student_ids for kind in ('child', 'grades', 'bulletins', 'balance')
+    ]
+    stamps = get_stamps(dependencies)
+    # Curseur pris après la lecture des versions (y compris celles créées à l'instant)
+    # et avant celle des données : une écriture ultérieure aura une version plus récente
+    cursor = make_cursor()
+    since_stamp = since.timestamp() if since is not None else None
+
+    def changed(kind, pk):
+        return since_stamp is None or stamps[(kind, pk)] > since_stamp
+
+    relations_changed = changed('children', parent_user.pk)
+    academic = [r.student_id for r in relations if r.can_view_academic]
+    financial = [r for r in relations if r.can_view_financial]
+    changed_grades = [pk for pk in academic if relations_changed or changed('grades', pk)]
+    changed_bulletins = [pk for pk in academic if relations_changed or changed('bulletins', pk)]
+
+    return {
+        'cursor': cursor,
+        'children_ids': student_ids,
+        'children': [
+            child_data(relation) for relation in relations
+            if relations_changed or changed('child', relation.student_id)
+        ],
+        'grades': grades_data(changed_grades, since=None if relations_changed else since) if changed_grades else {},
+        'grade_ids': grade_ids(changed_grades) if since is not None and changed_grades else {},
+        'bulletins': bulletins_data(changed_bulletins) if changed_bulletins else {},
+        'balances': {
+            relation.student_id: balance_data(relation.student) for relation in financial
+            if relations_changed or changed('balance', relation.student_id)
+        },
+        'notifications': notifications_data(parent_user, since=since)
+        if changed('notifications', parent_user.pk) else [],
+    }
@@ -1,3 +1,298 @@
-from django.test import TestCase
+from datetime import date
+import csv
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from classes.models import SchoolClass
+from finances.models import FeeStructure, FeeTranche, TranchePayment
+from notes.models import Evaluation, StudentGrade, Trimester
+from school.models import SchoolYear, School, SchoolLevel, SchoolType, EducationSystem
+from students.models import Student, Guardian
+from subjects.models import Subject
+from .models import (
+    ParentUser, ParentStudentRelation, ParentCredentialEmail, ParentPayment, PaymentWebhookEvent
+)
+from . import views
+from .reconciliation import PaymentReconciliationService
+from .services import ParentAccountBatchService, ParentPortalService, PaymentWebhookService
+
+
+class ParentAccountBatchServiceTestCase(TestCase):
+    """Tests de la génération des comptes parents en lot"""
+
+    def setUp(self):
+        year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        school = School.objects.create(
+            name="École Test",
+            code="ET01",
+            type=SchoolType.objects.create(name="Public", code="PUB"),
+            education_system=EducationSystem.objects.create(name="Francophone", code="FR"),
+            address="Douala",
+        )
+        guardians = []
+        for index, (name, email) in enumerate([
+            ("Paul Mbarga", "paul@example.com"),
+            ("Paul Mbarga", "PAUL@example.com"),  # même parent, deuxième enfant
+            ("Paul Mbarga", "autre.paul@example.com"),
+            ("Marie Essomba", ""),
+        ]):
+            student = Student.objects.create(
+                matricule=f"STU{index}", first_name="Enfant", last_name=str(index), birth_date=date(2012, 1, 1),
+                birth_place="Douala", gender='M', year=year, school=school,
+            )
+            guardians.append(Guardian(student=student, name=name, relation="Père", phone="699000000", email=email))
+        # bulk_create : pas de création de compte par le signal post_save
+        Guardian.objects.bulk_create(guardians)
+
+    def test_create_accounts(self):
+        stats = ParentAccountBatchService.create_accounts(Guardian.objects.all())
+
+        self.assertEqual(stats['created'], 2)
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(
+            sorted(ParentUser.objects.values_list('username', flat=True)),
+            ['paulmbarga', 'paulmbarga1']
+        )
+        parent = ParentUser.objects.get(email='paul@example.com')
+        self.assertEqual(ParentStudentRelation.objects.filter(parent_user=parent).count(), 2)
+        self.assertEqual(Guardian.objects.filter(parent_user=parent).count(), 2)
+        self.assertEqual(ParentCredentialEmail.objects.filter(status='PENDING').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Aucun mot de passe utilisable avant l'envoi des identifiants
+        self.assertFalse(parent.check_password(''))
+        self.assertFalse(parent.password_hash.startswith('pbkdf2'))
+
+        ParentPortalService.send_queued_credentials(workers=1)
+        self.assertEqual(len(mail.outbox), 2)
+        message = next(message for message in mail.outbox if message.to == ['paul@example.com'])
+        password = message.body.split('Mot de passe temporaire : ')[1].split()[0]
+        parent.refresh_from_db()
+        self.assertTrue(parent.check_password(password))
+
+    def test_failed_send_only_affects_its_email(self):
+        ParentAccountBatchService.create_accounts(Guardian.objects.all())
+        original = ParentUser.get_credentials_email
+
+        def get_credentials_email(parent_user, password):
+            if parent_user.email == 'paul@example.com':
+                raise ConnectionError("Destinataire refusé")
+            return original(parent_user, password)
+
+        with mock.patch.object(ParentUser, 'get_credentials_email', get_credentials_email):
+            for attempt in range(ParentCredentialEmail.MAX_ATTEMPTS):
+                stats = ParentPortalService.send_queued_credentials(workers=1)
+                self.assertEqual(stats['failed'], 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        failed = ParentCredentialEmail.objects.get(status='FAILED')
+        self.assertEqual(failed.parent_user.email, 'paul@example.com')
+        self.assertEqual(failed.attempts, ParentCredentialEmail.MAX_ATTEMPTS)
+        self.assertEqual(ParentCredentialEmail.objects.filter(status='SENT').count(), 1)
+
+    def test_rerun_only_links_existing_accounts(self):
+        ParentAccountBatchService.create_accounts(Guardian.objects.all())
+        stats = ParentAccountBatchService.create_accounts(Guardian.objects.all())
+
+        self.assertEqual(stats['created'], 0)
+        self.assertEqual(stats['linked'], 3)
+        self.assertEqual(ParentUser.objects.count(), 2)
+
+    def test_existing_account_matched_case_insensitively(self):
+        parent = ParentUser.objects.create(
+            username="paulmbarga", email="Paul@Example.com", first_name="Paul", last_name="Mbarga",
+        )
+        stats = ParentAccountBatchService.create_accounts(Guardian.objects.all())
+
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(ParentUser.objects.filter(email__iexact='paul@example.com').count(), 1)
+        self.assertEqual(ParentStudentRelation.objects.filter(parent_user=parent).count(), 2)
+
+    def test_linking_renews_children_version(self):
+        from .sync import get_stamps
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ParentAccountBatchService.create_accounts(Guardian.objects.all())
+        parent = ParentUser.objects.get(email='paul@example.com')
+        key = ('children', parent.pk)
+        before = get_stamps([key])[key]
+
+        # Nouveau lien vers un compte existant (bulk_create, sans signal)
+        Guardian.objects.filter(email='paul@example.com').update(parent_user=None)
+        ParentStudentRelation.objects.filter(parent_user=parent).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            ParentAccountBatchService.create_accounts(Guardian.objects.filter(email__iexact='paul@example.com'))
+        self.assertGreater(get_stamps([key])[key], before)
+
+
+class ParentPortalTestCase(TestCase):
+    """Élève inscrit en 6e M1 et son parent connecté au portail"""
+
+    def setUp(self):
+        cache.clear()
+        self.year = year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        school = School.objects.create(
+            name="École Test", code="ET01", address="Douala",
+            type=SchoolType.objects.create(name="Public", code="PUB"), education_system=system,
+        )
+        self.school = school
+        self.school_class = school_class = SchoolClass.objects.create(
+            name="6e M1", level=SchoolLevel.objects.create(name="Sixième", system=system, order=1),
+            year=year, school=school,
+        )
+        self.student = Student.objects.create(
+            matricule="STU1", first_name="Enfant", last_name="Test", birth_date=date(2012, 1, 1),
+            birth_place="Douala", gender='F', year=year, school=school, current_class=school_class,
+        )
+        self.parent = ParentUser.objects.create(
+            username="parent", email="parent@example.com", first_name="Paul", last_name="Test", phone="699000000",
+        )
+        ParentStudentRelation.objects.create(parent_user=self.parent, student=self.student, relation_type='FATHER')
+
+
+@override_settings(PARENTS_API_SYNC_OVERLAP=0)
+class ParentApiTestCase(ParentPortalTestCase):
+    """Tests de l'API de lecture du portail parents"""
+
+    def setUp(self):
+        super().setUp()
+        trimester = Trimester.objects.create(
+            trimester='1ER', year=self.year, school=self.school,
+            start_date=date(2024, 9, 2), end_date=date(2024, 12, 20),
+        )
+        subject = Subject.objects.create(name="Mathématiques", code="MATH")
+        self.evaluations = [
+            Evaluation.objects.create(
+                eval_type=eval_type, trimester=trimester, subject=subject, school_class=self.school_class,
+                eval_date=date(2024, 10, 1),
+            )
+            for eval_type in ('EVAL1', 'EVAL2')
+        ]
+        self.grade = StudentGrade.objects.create(student=self.student, evaluation=self.evaluations[0], score=12)
+
+    def get(self, view, *args, parent=True, **headers):
+        request = RequestFactory().get('/', headers=headers)
+        request.session = {'parent_user_id': self.parent.pk} if parent else {}
+        return view(request, *args)
+
+    def sync(self, cursor):
+        request = RequestFactory().get('/', {'since': cursor})
+        request.session = {'parent_user_id': self.parent.pk}
+        return json.loads(views.api_sync(request).content)
+
+    def test_not_modified_until_a_grade_changes(self):
+        response = self.get(views.api_child_grades, self.student.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([grade['id'] for grade in json.loads(response.content)['grades']], [self.grade.pk])
+
+        response = self.get(views.api_child_grades, self.student.pk, if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grade.score = 15
+            self.grade.save()
+        response = self.get(views.api_child_grades, self.student.pk, if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(float(json.loads(response.content)['grades'][0]['score']), 15)
+
+    def test_sync_returns_only_changes_since_cursor(self):
+        snapshot = json.loads(self.get(views.api_sync).content)
+        self.assertEqual(snapshot['children_ids'], [self.student.pk])
+        self.assertEqual(len(snapshot['grades'][str(self.student.pk)]), 1)
+
+        delta = self.sync(snapshot['cursor'])
+        self.assertEqual((delta['children'], delta['grades'], delta['balances']), ([], {}, {}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_grade = StudentGrade.objects.create(student=self.student, evaluation=self.evaluations[1], score=9)
+        delta = self.sync(delta['cursor'])
+        self.assertEqual([grade['id'] for grade in delta['grades'][str(self.student.pk)]], [new_grade.pk])
+        self.assertEqual(delta['grade_ids'][str(self.student.pk)], [self.grade.pk, new_grade.pk])
+
+        self.assertEqual(self.get(views.api_sync, parent=False).status_code, 401)
+
+
+class ParentPaymentTestCase(ParentPortalTestCase):
+    """Paiement Orange Money en attente pour la première tranche"""
+
+    def setUp(self):
+        super().setUp()
+        structure = FeeStructure.objects.create(
+            school_class=self.school_class, year=self.year, inscription_fee=10000, tuition_total=60000,
+        )
+        self.tranche = FeeTranche.objects.create(
+            fee_structure=structure, number=1, amount=20000, due_date=date(2024, 10, 1)
+        )
+        self.payment = ParentPayment.objects.create(
+            parent_user=self.parent, student=self.student, tranche=self.tranche, amount=20000, total_amount=20000,
+            method_type='OM', transaction_id='OM-123',
+        )
+
+
+class PaymentWebhookTestCase(ParentPaymentTestCase):
+    """Tests de la boîte de réception des webhooks de paiement"""
+
+    def receive(self, event_id, status, transaction_id='OM-123'):
+        body = json.dumps({'event_id': event_id, 'transaction_id': transaction_id, 'status': status}).encode()
+        return PaymentWebhookService.receive(body, provider='om')[1]
+
+    def test_events_applied_once_in_valid_order(self):
+        self.assertTrue(self.receive('evt-1', 'success'))
+        self.assertFalse(self.receive('evt-1', 'success'))  # renvoi du fournisseur
+        self.receive('evt-2', 'pending')  # arrivé après le succès
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 2)
+
+        stats = PaymentWebhookService.process_pending()
+        self.assertEqual((stats['processed'], stats['ignored']), (1, 1))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'COMPLETED')
+        self.assertEqual(TranchePayment.objects.get().receipt, self.payment.payment_id)
+
+        self.receive('evt-3', 'success')
+        self.assertEqual(PaymentWebhookService.process_pending()['ignored'], 1)
+        self.assertEqual(TranchePayment.objects.count(), 1)
+
+    @override_settings(PAYMENT_WEBHOOK_MAX_ATTEMPTS=2)
+    def test_unknown_transaction_retried_then_failed(self):
+        self.receive('evt-1', 'success', transaction_id='OM-999')
+        self.assertEqual(PaymentWebhookService.process_pending()['retry'], 1)
+        self.assertEqual(PaymentWebhookService.process_pending()['failed'], 1)
+        self.assertEqual(PaymentWebhookEvent.objects.get().status, 'FAILED')
+
+
+class PaymentReconciliationTestCase(ParentPaymentTestCase):
+    """Tests du rapprochement des relevés de paiement"""
+
+    def test_reconcile_statement(self):
+        self.payment.status = 'COMPLETED'
+        self.payment.save()
+        self.payment.create_financial_payment()
+        pending = ParentPayment.objects.create(
+            parent_user=self.parent, student=self.student, tranche=self.tranche, amount=5000, total_amount=5000,
+            method_type='OM',
+        )
+        statement = io.StringIO("\n".join([
+            "Date;Reference;Montant;MSISDN;Statut",
+            "2024-10-02 10:00:00;OM-123;20 000;237699000000;SUCCESS",
+            "2024-10-02 10:00:00;OM-123;20 000;237699000000;SUCCESS",
+            "2024-10-02 11:00:00;OM-777;5000;+237 699 00 00 00;SUCCESS",
+            "2024-10-02 12:00:00;OM-888;7500;699111111;SUCCESS",
+            "2024-10-02 13:00:00;;abc;;SUCCESS",
+        ]))
+        report = io.StringIO()
+
+        with self.assertNumQueries(4):
+            stats = PaymentReconciliationService.reconcile(statement, ['OM'], report=report)
+
+        self.assertEqual(stats, {
+            'lines': 5, 'MATCHED': 1, 'DUPLICATE': 1, 'STATUS_MISMATCH': 1, 'UNMATCHED': 1, 'INVALID': 1,
+        })
+        rows = list(csv.reader(io.StringIO(report.getvalue())))
+        self.assertEqual([row[1] for row in rows[1:]], ['DUPLICATE', 'STATUS_MISMATCH', 'UNMATCHED', 'INVALID'])
+        self.assertEqual(rows[2][5], pending.payment_id)
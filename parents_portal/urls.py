@@ -40,6 +40,7 @@ urlpatterns = [
     # Historique et rapports
     path('finances/history/', views.payment_history, name='payment_history'),
     path('finances/reports/', views.financial_reports, name='financial_reports'),
+    path('history/', views.archive_history, name='archive_history'),
     
     # ==================== PROFIL ====================
     path('profile/', views.parent_profile, name='profile'),
@@ -51,4 +52,10 @@ urlpatterns = [
     
     # ==================== API & WEBHOOKS ====================
     path('api/payment-webhook/', views.payment_webhook, name='payment_webhook'),
+    path('api/v1/children/', views.api_children, name='api_children'),
+    path('api/v1/children/<int:student_id>/grades/', views.api_child_grades, name='api_child_grades'),
+    path('api/v1/children/<int:student_id>/bulletins/', views.api_child_bulletins, name='api_child_bulletins'),
+    path('api/v1/children/<int:student_id>/balance/', views.api_child_balance, name='api_child_balance'),
+    path('api/v1/notifications/', views.api_notifications, name='api_notifications'),
+    path('api/v1/sync/', views.api_sync, name='api_sync'),
 ]
@@ -5,11 +5,11 @@ from django.http import JsonResponse, HttpResponse
 from django.core.paginator import Paginator
 from django.db.models import Q, Sum, Count, Avg
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.translation import gettext as _
 from datetime import datetime, timedelta
-import json
 import logging
 
 from .models import (
@@ -21,7 +21,9 @@ from .forms import (
     ParentPaymentMethodForm, PaymentForm, StudentSearchForm,
     NotificationFilterForm, FinancialFilterForm
 )
-from .services import ParentPortalService, PaymentService
+from .services import ParentPortalService, PaymentService, PaymentWebhookService
+from . import sync
+from .sync import touch
 from students.models import Student, Guardian, Attendance
 from finances.models import (
     FeeTranche, TranchePayment, FeeStructure, InscriptionPayment,
@@ -152,6 +154,16 @@ def parent_required(view_func):
         return view_func(request, *args, **kwargs)
     return wrapper
 
+def parent_api_required(view_func):
+    """Décorateur des vues de l'API : parent connecté (401 sinon), disponible dans request.parent_user"""
+    @require_http_methods(["GET", "HEAD"])
+    def wrapper(request, *args, **kwargs):
+        request.parent_user = get_parent_user(request)
+        if not request.parent_user:
+            return JsonResponse({'error': 'Authentification requise'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
 @parent_required
 def parent_dashboard(request):
     """Tableau de bord principal des parents"""
@@ -264,8 +276,15 @@ def get_student_grades(request, student_id):
     
     # Récupérer les notes
     grades = ParentPortalService.get_student_grades(student)
-    
-    return JsonResponse({'grades': grades})
+
+    # Série des moyennes générales (graphique de progression)
+    from notes.services import ProgressSeriesService
+    progress = [
+        {'label': point['label'], 'average': point['general_average'], 'delta': point['delta']}
+        for point in ProgressSeriesService.get_series(student)
+    ]
+
+    return JsonResponse({'grades': grades, 'progress': progress})
 
 @parent_required
 def bulletin_view(request, bulletin_id):
@@ -286,11 +305,14 @@ def bulletin_view(request, bulletin_id):
         return redirect('parents_portal:dashboard')
     
     # Marquer la notification comme lue
-    ParentNotification.objects.filter(
+    read = ParentNotification.objects.filter(
         parent_user=parent_user,
         notification_type='BULLETIN',
-        related_id=bulletin_id
-    ).update(is_read=True)
+        related_student=bulletin.student,
+        is_read=False
+    ).update(is_read=True, read_at=timezone.now())
+    if read:
+        touch('notifications', parent_user.pk)
     
     context = {
         'parent_user': parent_user,
@@ -720,24 +742,136 @@ def notifications(request):
     
     return render(request, 'parents_portal/notifications.html', context)
 
+@parent_required
+def archive_history(request):
+    """Bulletins, paiements et notifications des années archivées (lecture seule)"""
+    from archives.models import ArchivedRecord
+    from archives.services import ArchiveService
+
+    parent_user = get_parent_user(request)
+    kind = request.GET.get('kind')
+    if kind not in dict(ArchivedRecord.KIND_CHOICES):
+        kind = None
+
+    records = ArchiveService.get_parent_history(parent_user, kind=kind)
+    paginator = Paginator(records, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    context = {
+        'parent_user': parent_user,
+        'page_obj': page_obj,
+        'kind': kind,
+    }
+    return render(request, 'parents_portal/archive_history.html', context)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def payment_webhook(request):
-    """Webhook pour les notifications de paiement"""
+    """
+    Webhook pour les notifications de paiement : l'événement est enregistré puis
+    appliqué par la commande process_payment_webhooks
+    """
     try:
-        data = json.loads(request.body)
-        
-        # Traiter la notification de paiement
-        payment_status = PaymentService.process_payment_webhook(data)
-        
-        return JsonResponse({'status': 'success', 'payment_status': payment_status})
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        event, created = PaymentWebhookService.receive(
+            request.body,
+            provider=request.GET.get('provider'),
+            event_id=request.headers.get('X-Event-Id'),
+        )
+        return JsonResponse({'status': 'accepted' if created else 'duplicate', 'event': event.pk})
+    except ValueError as e:
+        # JSONDecodeError hérite de ValueError
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         logger.error(f"Erreur webhook paiement: {str(e)}")
         return JsonResponse({'error': 'Internal server error'}, status=500)
 
 
+# ==================== API DE LECTURE (parents_portal/sync.py) ====================
+
+def _api_relation(request, student_id, permission):
+    """Relation du parent avec l'élève, ou réponse d'erreur JSON"""
+    relation = next((r for r in sync.get_children(request.parent_user) if r.student_id == student_id), None)
+    if relation is None:
+        return None, JsonResponse({'error': 'Élève non trouvé'}, status=404)
+    if not getattr(relation, permission):
+        return None, JsonResponse({'error': 'Accès non autorisé'}, status=403)
+    return relation, None
+
+
+@parent_api_required
+def api_children(request):
+    """Enfants du parent connecté"""
+    parent_user = request.parent_user
+    relations = sync.get_children(parent_user)
+    dependencies = [('children', parent_user.pk)] + [('child', r.student_id) for r in relations]
+    return sync.conditional_json(
+        request, dependencies, lambda: {'children': [sync.child_data(r) for r in relations]}
+    )
+
+
+@parent_api_required
+def api_child_grades(request, student_id):
+    """Notes de l'année en cours d'un enfant"""
+    relation, error = _api_relation(request, student_id, 'can_view_academic')
+    if error:
+        return error
+    return sync.conditional_json(
+        request, [('children', request.parent_user.pk), ('grades', student_id)],
+        lambda: {'student': student_id, 'grades': sync.grades_data([student_id])[student_id]}
+    )
+
+
+@parent_api_required
+def api_child_bulletins(request, student_id):
+    """Bulletins d'un enfant"""
+    relation, error = _api_relation(request, student_id, 'can_view_academic')
+    if error:
+        return error
+    return sync.conditional_json(
+        request, [('children', request.parent_user.pk), ('bulletins', student_id)],
+        lambda: {'student': student_id, 'bulletins': sync.bulletins_data([student_id])[student_id]}
+    )
+
+
+@parent_api_required
+def api_child_balance(request, student_id):
+    """Solde des frais de scolarité d'un enfant"""
+    relation, error = _api_relation(request, student_id, 'can_view_financial')
+    if error:
+        return error
+    return sync.conditional_json(
+        request, [('children', request.parent_user.pk), ('balance', student_id)],
+        lambda: {'student': student_id, 'balance': sync.balance_data(relation.student)}
+    )
+
+
+@parent_api_required
+def api_notifications(request):
+    """Dernières notifications du parent connecté"""
+    parent_user = request.parent_user
+    return sync.conditional_json(
+        request, [('notifications', parent_user.pk)],
+        lambda: {'notifications': sync.notifications_data(parent_user)}
+    )
+
+
+@parent_api_required
+def api_sync(request):
+    """
+    Synchronisation : tout sans paramètre, sinon seulement ce qui a changé depuis
+    le curseur `since` renvoyé par l'appel précédent
+    """
+    since = request.GET.get('since')
+    if since:
+        try:
+            since = sync.parse_cursor(since)
+        except (ValueError, OverflowError, OSError):
+            return JsonResponse({'error': 'Curseur invalide'}, status=400)
+    response = JsonResponse(sync.build_sync(request.parent_user, since=since or None))
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
 @parent_required
 def payment_success(request, payment_id):
     """Page de succès après un paiement"""
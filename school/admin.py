@@ -1,5 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import School, SchoolYear, YearClosure, EducationSystem, SchoolLevel, SchoolType, Ministry, RegionalDelegation, DocumentHeader, MatriculeSequence
+from .services import MatriculeService
 
 @admin.register(EducationSystem)
 class EducationSystemAdmin(admin.ModelAdmin):
@@ -80,7 +81,7 @@ class MatriculeSequenceAdmin(admin.ModelAdmin):
     list_filter = ('sequence_type', 'current_year', 'is_active')
     search_fields = ('prefix', 'format_pattern')
     readonly_fields = ('created_at', 'updated_at')
-    actions = ['reset_sequence', 'generate_test_matricule']
+    actions = ['reset_sequence', 'generate_test_matricule', 'audit_sequences']
     
     fieldsets = (
         ('Informations générales', {
@@ -107,8 +108,21 @@ class MatriculeSequenceAdmin(admin.ModelAdmin):
         """Action pour générer un matricule de test"""
         if queryset.count() == 1:
             sequence = queryset.first()
-            test_matricule = sequence.generate_matricule()
-            self.message_user(request, f"Matricule de test généré: {test_matricule}")
+            test_matricule = sequence.preview_matricule()
+            self.message_user(request, f"Prochain matricule: {test_matricule}")
         else:
             self.message_user(request, "Veuillez sélectionner une seule séquence pour générer un matricule de test.")
     generate_test_matricule.short_description = "Générer un matricule de test"
+    
+    def audit_sequences(self, request, queryset):
+        """Action pour détecter les trous, doublons et collisions des séquences"""
+        for sequence in queryset:
+            report = MatriculeService.audit_sequence(sequence.sequence_type)
+            level = messages.SUCCESS if report['is_consistent'] else messages.WARNING
+            self.message_user(
+                request,
+                f"{sequence}: {report['used_count']} utilisé(s), {len(report['gaps'])} trou(s), "
+                f"{len(report['duplicates'])} doublon(s), {len(report['ahead'])} en avance sur la séquence",
+                level=level
+            )
+    audit_sequences.short_description = "Auditer les séquences sélectionnées"
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from school.models import MatriculeSequence
+from school.services import MatriculeService
+
+
+class Command(BaseCommand):
+    """
+    Commande pour contrôler la cohérence des séquences de matricules
+    """
+    help = 'Détecte les trous, doublons et collisions entre les séquences et les matricules existants'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            choices=[choice for choice, _ in MatriculeSequence.SEQUENCE_TYPES],
+            help='Audite uniquement ce type de séquence',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Avance les séquences au-delà des numéros déjà attribués',
+        )
+        parser.add_argument(
+            '--show-gaps',
+            action='store_true',
+            help='Affiche le détail des numéros non utilisés',
+        )
+
+    def handle(self, *args, **options):
+        sequences = MatriculeSequence.objects.all()
+        if options['type']:
+            sequences = sequences.filter(sequence_type=options['type'])
+        if not sequences.exists():
+            raise CommandError('Aucune séquence de matricule configurée')
+
+        for sequence in sequences:
+            report = MatriculeService.audit_sequence(sequence.sequence_type)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{sequence}'))
+            self.stdout.write(f"  Dernier numéro réservé : {report['last_number']}")
+            self.stdout.write(f"  Numéros utilisés       : {report['used_count']}")
+            self.stdout.write(f"  Matricules hors format : {report['foreign_count']}")
+            self.stdout.write(f"  Trous                  : {len(report['gaps'])}")
+            if options['show_gaps'] and report['gaps']:
+                self.stdout.write(f"    {', '.join(str(number) for number in report['gaps'])}")
+
+            for number, matricules in report['duplicates'].items():
+                self.stdout.write(self.style.ERROR(f"  Doublon n°{number} : {', '.join(matricules)}"))
+
+            if report['ahead']:
+                self.stdout.write(self.style.WARNING(
+                    f"  {len(report['ahead'])} numéro(s) au-delà de la séquence (max {report['max_used']})"
+                ))
+                if options['fix']:
+                    last_number = MatriculeService.resync_sequence(sequence.sequence_type)
+                    self.stdout.write(self.style.SUCCESS(f'  Séquence avancée à {last_number}'))
+
+            if report['is_consistent']:
+                self.stdout.write(self.style.SUCCESS('  Séquence cohérente'))
@@ -0,0 +1,106 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from school.models import SchoolYear
+
+
+class Command(BaseCommand):
+    """
+    Commande pour clôturer une année scolaire et basculer vers la suivante
+    """
+    help = "Clôture l'année en cours, promeut les élèves et recopie la configuration dans la nouvelle année"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'nouvelle_annee',
+            help='Libellé de la nouvelle année scolaire (ex: 2025-2026)',
+        )
+        parser.add_argument(
+            '--year',
+            help="Année à clôturer (par défaut l'année en cours)",
+        )
+        parser.add_argument(
+            '--pass-average',
+            help="Moyenne annuelle d'admission (par défaut ROLLOVER_PASS_AVERAGE ou 10)",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche le rapport de passage sans rien modifier',
+        )
+
+    def handle(self, *args, **options):
+        if options['year']:
+            year = SchoolYear.objects.filter(annee=options['year']).first()
+        else:
+            year = SchoolYear.get_active_year()
+        if not year:
+            raise CommandError('Année scolaire introuvable')
+
+        pass_average = None
+        if options['pass_average']:
+            try:
+                pass_average = Decimal(options['pass_average'])
+            except InvalidOperation:
+                raise CommandError(f"Moyenne d'admission invalide : {options['pass_average']}")
+
+        try:
+            report = year.close(
+                options['nouvelle_annee'],
+                rollover=True,
+                dry_run=options['dry_run'],
+                pass_average=pass_average,
+            )
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+
+        self._print_report(report, options['dry_run'])
+
+    def _print_report(self, report, dry_run):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n📅 Passage {report['year']} → {report['nouvelle_annee']} (admission à {report['pass_average']}/20)"
+        ))
+        for row in report['classes']:
+            target = row['target'].name if row['target'] else '-'
+            line = (
+                f"  {row['class'].name:<15} → {target:<15} "
+                f"admis {row['PROMOTED']:>3}  redoublants {row['REPEATING']:>3}  sortants {row['GRADUATED']:>3}"
+            )
+            if row['without_average']:
+                line += f"  sans moyenne {row['without_average']}"
+            self.stdout.write(line)
+            if row['without_average_students']:
+                self.stdout.write(self.style.WARNING(
+                    f"    ⚠️  Sans moyenne (décision de la classe appliquée) : "
+                    f"{', '.join(row['without_average_students'])}"
+                ))
+            if row['UNPLACED']:
+                self.stdout.write(self.style.WARNING(
+                    f"    ⚠️  {row['UNPLACED']} élève(s) admis sans classe supérieure dans l'établissement"
+                ))
+
+        totals = report['totals']
+        self.stdout.write(
+            f"\n👥 Admis : {totals['PROMOTED']}  Redoublants : {totals['REPEATING']}  "
+            f"Sortants : {totals['GRADUATED']}  Non placés : {totals['UNPLACED']}"
+        )
+        to_copy = report['to_copy']
+        self.stdout.write(
+            f"📋 À recopier : {to_copy['classes']} classe(s), {to_copy['fee_structures']} structure(s) de frais, "
+            f"{to_copy['fee_tranches']} tranche(s), {to_copy['extra_fees']} frais annexe(s), "
+            f"{to_copy['teaching_assignments']} affectation(s)"
+        )
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('\n🔍 Simulation : aucune modification effectuée'))
+            return
+
+        copied = report['copied']
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ {report['students']['moved']} élève(s) basculé(s), {report['students']['graduated']} sortant(s), "
+            f"{copied['fee_structures']} structure(s) de frais, {copied['fee_tranches']} tranche(s), "
+            f"{copied['extra_fees']} frais annexe(s), {copied['teaching_assignments']} affectation(s), "
+            f"{copied['timetable_slots']} créneau(x) recopiés en {report['elapsed']}s"
+        ))
@@ -1,5 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+import re
+import string
 
 # --------------------
 # Système éducatif
@@ -223,13 +227,35 @@ class SchoolYear(models.Model):
     def get_active_year(cls):
         return cls.objects.filter(statut='EN_COURS').first()
 
-    def close(self, nouvelle_annee: str):
-        """Méthode utilitaire pour clôturer cette année."""
+    def close(self, nouvelle_annee: str, rollover: bool = False, dry_run: bool = False, pass_average=None):
+        """
+        Méthode utilitaire pour clôturer cette année.
+
+        Avec `rollover=True`, les élèves et la configuration (classes, frais,
+        affectations, emplois du temps) sont basculés vers `nouvelle_annee` dans
+        la même transaction. Avec `dry_run=True`, seul le rapport de passage est
+        calculé et l'année n'est pas clôturée.
+
+        Returns:
+            dict | None: Le rapport de passage si `rollover` ou `dry_run`
+        """
+        from school.services import YearRolloverService
+
         if self.statut == 'CLOTUREE':
             raise ValidationError(f"L'année {self.annee} est déjà clôturée.")
-        self.statut = 'CLOTUREE'
-        self.save()
-        YearClosure.objects.create(annee=self, nouvelle_annee=nouvelle_annee)
+        if nouvelle_annee == self.annee:
+            raise ValidationError("La nouvelle année doit être différente de l'année clôturée.")
+        if dry_run:
+            return YearRolloverService.rollover(self, nouvelle_annee, dry_run=True, pass_average=pass_average)
+
+        report = None
+        with transaction.atomic():
+            self.statut = 'CLOTUREE'
+            self.save()
+            YearClosure.objects.create(annee=self, nouvelle_annee=nouvelle_annee)
+            if rollover:
+                report = YearRolloverService.rollover(self, nouvelle_annee, pass_average=pass_average)
+        return report
 
 # --------------------
 # Clôture d'une année
@@ -296,17 +322,69 @@ class MatriculeSequence(models.Model):
     def __str__(self):
         return f"{self.get_sequence_type_display()} - {self.current_year} ({self.prefix})"
     
+    def format_number(self, number):
+        """Formate un numéro de séquence selon le format défini"""
+        return self.format_pattern.format(
+            prefix=self.prefix,
+            year=self.current_year,
+            number=number
+        )
+
+    def reserve_block(self, count=1):
+        """
+        Réserve un bloc contigu de `count` numéros en une seule requête UPDATE.
+
+        L'incrément est fait en base via F() : deux inscriptions simultanées ne
+        peuvent jamais recevoir le même numéro, et un import de masse ne coûte
+        qu'une écriture sur la ligne de séquence quel que soit le nombre d'élèves.
+
+        Returns:
+            tuple: (premier numéro, dernier numéro) du bloc réservé
+        """
+        if count < 1:
+            raise ValidationError("Le nombre de matricules à réserver doit être positif.")
+        with transaction.atomic():
+            MatriculeSequence.objects.filter(pk=self.pk).update(
+                last_number=F('last_number') + count,
+                updated_at=timezone.now()
+            )
+            # La ligne reste verrouillée par l'UPDATE jusqu'au commit :
+            # la valeur relue est bien celle que nous venons d'écrire.
+            self.last_number = MatriculeSequence.objects.filter(pk=self.pk).values_list('last_number', flat=True).get()
+        return self.last_number - count + 1, self.last_number
+
     def get_next_number(self):
         """Retourne le prochain numéro de la séquence"""
-        self.last_number += 1
-        self.save()
-        return self.last_number
-    
+        first, _ = self.reserve_block(1)
+        return first
+
     def generate_matricule(self):
         """Génère le prochain matricule selon le format défini"""
-        next_number = self.get_next_number()
-        return self.format_pattern.format(
-            prefix=self.prefix,
-            year=self.current_year,
-            number=next_number
-        )
\ No newline at end of file
+        return self.format_number(self.get_next_number())
+
+    def generate_matricules(self, count):
+        """Génère un bloc de `count` matricules consécutifs"""
+        first, last = self.reserve_block(count)
+        return [self.format_number(number) for number in range(first, last + 1)]
+
+    def preview_matricule(self):
+        """Retourne le prochain matricule sans consommer de numéro"""
+        return self.format_number(self.last_number + 1)
+
+    def get_number_regex(self):
+        """
+        Construit une expression régulière qui reconnaît les matricules produits
+        par cette séquence et capture leur partie numérique.
+        """
+        parts = []
+        for literal, field_name, _spec, _conversion in string.Formatter().parse(self.format_pattern):
+            parts.append(re.escape(literal))
+            if field_name == 'prefix':
+                parts.append(re.escape(self.prefix))
+            elif field_name == 'year':
+                parts.append(re.escape(str(self.current_year)))
+            elif field_name == 'number':
+                parts.append(r'(?P<number>\d+)')
+            elif field_name is not None:
+                parts.append(r'.*?')
+        return re.compile('^' + ''.join(parts) + '$')
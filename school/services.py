@@ -1,8 +1,13 @@
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Avg, F, Value
+from django.db.models.functions import Greatest
 from django.core.exceptions import ValidationError
-from .models import MatriculeSequence, SchoolYear
+from .models import CurrentSchoolYear, MatriculeSequence, SchoolYear
 from datetime import datetime
+from decimal import Decimal
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -56,22 +61,55 @@ class MatriculeService:
         Returns:
             str: Le matricule généré ou None si la génération automatique est désactivée
         """
+        matricules = MatriculeService.reserve_matricules(sequence_type, 1)
+        return matricules[0] if matricules else None
+    
+    @staticmethod
+    def reserve_matricules(sequence_type, count):
+        """
+        Réserve un bloc contigu de matricules en une seule écriture (imports de masse)
+        
+        Args:
+            sequence_type (str): Type de séquence (STUDENT, TEACHER)
+            count (int): Nombre de matricules à réserver
+            
+        Returns:
+            list: Les matricules réservés, ou None si la génération automatique est désactivée
+        """
         try:
             sequence = MatriculeSequence.objects.get(sequence_type=sequence_type)
-            if not sequence.auto_generation:
-                return None
-                
-            with transaction.atomic():
-                matricule = sequence.generate_matricule()
-                logger.info(f"Matricule généré: {matricule} pour {sequence_type}")
-                return matricule
         except MatriculeSequence.DoesNotExist:
             # Créer la séquence par défaut
-            with transaction.atomic():
-                sequence = MatriculeService.get_or_create_sequence(sequence_type)
-                matricule = sequence.generate_matricule()
-                logger.info(f"Matricule généré: {matricule} pour {sequence_type}")
-                return matricule
+            sequence = MatriculeService.get_or_create_sequence(sequence_type)
+        
+        if not sequence.auto_generation:
+            return None
+        
+        matricules = sequence.generate_matricules(count)
+        if count == 1:
+            logger.info(f"Matricule généré: {matricules[0]} pour {sequence_type}")
+        else:
+            logger.info(f"{count} matricules réservés pour {sequence_type}: {matricules[0]} → {matricules[-1]}")
+        return matricules
+    
+    @staticmethod
+    def preview_matricule(sequence_type):
+        """
+        Retourne le prochain matricule sans le réserver (affichage dans les formulaires)
+        
+        Args:
+            sequence_type (str): Type de séquence (STUDENT, TEACHER)
+            
+        Returns:
+            str: Le prochain matricule ou None si la génération automatique est désactivée
+        """
+        try:
+            sequence = MatriculeSequence.objects.get(sequence_type=sequence_type)
+        except MatriculeSequence.DoesNotExist:
+            sequence = MatriculeService.get_or_create_sequence(sequence_type)
+        if not sequence.auto_generation:
+            return None
+        return sequence.preview_matricule()
     
     @staticmethod
     def validate_matricule_uniqueness(matricule, model_class, exclude_id=None):
@@ -162,7 +200,480 @@ class MatriculeService:
                 'last_number': sequence.last_number,
                 'format_pattern': sequence.format_pattern,
                 'is_active': sequence.is_active,
-                'next_matricule': sequence.generate_matricule()
+                'next_matricule': sequence.preview_matricule()
             }
         except MatriculeSequence.DoesNotExist:
             return None
+    
+    @staticmethod
+    def _get_model_class(sequence_type):
+        """Retourne le modèle dont les matricules sont issus de la séquence"""
+        if sequence_type == 'STUDENT':
+            from students.models import Student
+            return Student
+        if sequence_type == 'TEACHER':
+            from teachers.models import Teacher
+            return Teacher
+        raise ValidationError(f"Type de séquence inconnu: {sequence_type}")
+    
+    @staticmethod
+    def audit_sequence(sequence_type):
+        """
+        Compare une séquence aux matricules réellement attribués
+        
+        Détecte les trous (numéros réservés mais jamais utilisés), les doublons
+        (même numéro présent sous plusieurs écritures, ex: STU20240007 et STU2024007)
+        et les numéros en avance sur la séquence, qui provoqueraient une collision
+        lors des prochaines générations.
+        
+        Args:
+            sequence_type (str): Type de séquence (STUDENT, TEACHER)
+            
+        Returns:
+            dict: Rapport d'audit de la séquence
+        """
+        sequence = MatriculeSequence.objects.get(sequence_type=sequence_type)
+        model_class = MatriculeService._get_model_class(sequence_type)
+        pattern = sequence.get_number_regex()
+        
+        numbers = {}
+        foreign = 0
+        for matricule in model_class.objects.exclude(matricule='').values_list('matricule', flat=True).iterator():
+            match = pattern.match(matricule)
+            if not match:
+                # Matricule saisi manuellement ou issu d'un autre format
+                foreign += 1
+                continue
+            numbers.setdefault(int(match.group('number')), []).append(matricule)
+        
+        used = set(numbers)
+        gaps = sorted(set(range(1, sequence.last_number + 1)) - used)
+        duplicates = {number: matricules for number, matricules in sorted(numbers.items()) if len(matricules) > 1}
+        ahead = sorted(number for number in used if number > sequence.last_number)
+        
+        return {
+            'sequence': sequence,
+            'last_number': sequence.last_number,
+            'used_count': len(used),
+            'foreign_count': foreign,
+            'gaps': gaps,
+            'duplicates': duplicates,
+            'ahead': ahead,
+            'max_used': max(used) if used else 0,
+            'is_consistent': not duplicates and not ahead,
+        }
+    
+    @staticmethod
+    def resync_sequence(sequence_type):
+        """
+        Avance la séquence au-delà du plus grand numéro déjà attribué afin
+        d'éviter toute collision avec des matricules existants
+        
+        Args:
+            sequence_type (str): Type de séquence (STUDENT, TEACHER)
+            
+        Returns:
+            int: Le dernier numéro de la séquence après synchronisation
+        """
+        report = MatriculeService.audit_sequence(sequence_type)
+        sequence = report['sequence']
+        if report['max_used'] > sequence.last_number:
+            MatriculeSequence.objects.filter(pk=sequence.pk).update(
+                last_number=Greatest(F('last_number'), Value(report['max_used']))
+            )
+            sequence.refresh_from_db(fields=['last_number'])
+            logger.warning(
+                f"Séquence {sequence_type} avancée à {sequence.last_number} "
+                f"({len(report['ahead'])} numéro(s) en avance détecté(s))"
+            )
+        return sequence.last_number
+
+
+class YearRolloverService:
+    """
+    Passage d'une année scolaire à la suivante
+
+    Le passage est ensembliste : les classes, structures de frais, tranches,
+    frais annexes, affectations et créneaux d'emploi du temps sont recopiés par
+    bulk_create, et les élèves sont déplacés par un UPDATE par classe cible.
+    Tout se fait dans une seule transaction.
+
+    La classe supérieure d'une classe est la classe du niveau suivant
+    (SchoolLevel.order dans le même système éducatif) portant la même
+    spécialité (ex: "6e M1" -> "5e M1"), à défaut la première classe de ce niveau.
+    Les élèves du dernier niveau sont sortants et désactivés. Un élève sans
+    bulletin (sans moyenne) suit la décision de sa classe, comme un admis ; il
+    est listé « sans moyenne » dans le plan et le rapport pour vérification.
+    """
+
+    @staticmethod
+    def get_pass_average():
+        """Moyenne annuelle minimale pour être admis en classe supérieure"""
+        return Decimal(str(getattr(settings, 'ROLLOVER_PASS_AVERAGE', 10)))
+
+    @staticmethod
+    def compute_final_averages(year):
+        """
+        Moyennes annuelles de l'année (moyenne des bulletins des trimestres)
+
+        Returns:
+            dict: {student_id: moyenne}
+        """
+        from notes.models import Bulletin
+
+        rows = (
+            Bulletin.objects.filter(trimester__year=year)
+            .values('student_id')
+            .annotate(average=Avg('student_average'))
+        )
+        return {row['student_id']: row['average'] for row in rows}
+
+    @staticmethod
+    def plan(year, pass_average=None):
+        """
+        Calcule les décisions de passage sans rien écrire
+
+        Args:
+            year (SchoolYear): Année à clôturer
+            pass_average (Decimal, optional): Moyenne d'admission
+
+        Returns:
+            dict: Plan de passage (classes, cibles et décisions par élève)
+        """
+        from classes.models import SchoolClass
+        from students.models import Student
+
+        if pass_average is None:
+            pass_average = YearRolloverService.get_pass_average()
+
+        classes = list(
+            SchoolClass.objects.filter(year=year, is_active=True)
+            .select_related('level')
+            .order_by('school_id', 'level__order', 'name')
+        )
+        next_levels = YearRolloverService._get_next_levels({c.level.system_id for c in classes})
+
+        by_level = {}
+        for school_class in classes:
+            by_level.setdefault((school_class.school_id, school_class.level_id), []).append(school_class)
+
+        # Classe (de l'année clôturée) dont le clone accueillera les admis
+        targets = {}
+        for school_class in classes:
+            next_level = next_levels.get(school_class.level_id)
+            if next_level is None:
+                targets[school_class.id] = None
+                continue
+            candidates = by_level.get((school_class.school_id, next_level), [])
+            suffix = YearRolloverService._get_class_suffix(school_class.name)
+            target = next(
+                (c for c in candidates if YearRolloverService._get_class_suffix(c.name) == suffix),
+                candidates[0] if candidates else False
+            )
+            targets[school_class.id] = target
+
+        averages = YearRolloverService.compute_final_averages(year)
+        decisions = {}
+        without_average = []
+        students = Student.objects.filter(
+            year=year, is_active=True, current_class__in=classes
+        ).values_list('id', 'current_class_id')
+        for student_id, class_id in students.iterator():
+            average = averages.get(student_id)
+            target = targets[class_id]
+            if average is not None and average < pass_average:
+                decision = 'REPEATING'
+            elif target is None:
+                decision = 'GRADUATED'
+            elif target is False:
+                decision = 'UNPLACED'
+            else:
+                decision = 'PROMOTED'
+            decisions[student_id] = (class_id, decision, average)
+            if average is None:
+                without_average.append(student_id)
+
+        return {
+            'year': year,
+            'pass_average': pass_average,
+            'classes': classes,
+            'targets': targets,
+            'decisions': decisions,
+            'without_average': without_average,
+        }
+
+    @staticmethod
+    def rollover(year, nouvelle_annee, dry_run=False, pass_average=None):
+        """
+        Bascule les élèves et la configuration de `year` vers `nouvelle_annee`
+
+        Ne modifie pas le statut de `year` : utiliser SchoolYear.close(rollover=True)
+        pour clôturer et basculer en une seule opération.
+
+        Args:
+            year (SchoolYear): Année à clôturer
+            nouvelle_annee (str): Libellé de la nouvelle année (ex: "2025-2026")
+            dry_run (bool): Si True, retourne le rapport sans rien écrire
+            pass_average (Decimal, optional): Moyenne d'admission
+
+        Returns:
+            dict: Rapport de passage
+        """
+        plan = YearRolloverService.plan(year, pass_average)
+        report = YearRolloverService._build_report(plan, nouvelle_annee)
+        if dry_run:
+            return report
+
+        start = time.monotonic()
+        with transaction.atomic():
+            new_year, _ = SchoolYear.objects.get_or_create(annee=nouvelle_annee)
+            class_map = YearRolloverService._clone_classes(plan['classes'], new_year)
+            report['students'] = YearRolloverService._move_students(plan, class_map, new_year)
+            report['copied'] = YearRolloverService._copy_configuration(year, new_year, class_map)
+            CurrentSchoolYear.objects.update(year=new_year)
+
+        # Mises à jour en masse, sans signaux : onglets des fiches à recalculer
+        from scolaris.fragments import bump_version
+        for kind in ('student', 'class', 'teacher'):
+            bump_version(kind)
+        # API du portail parents : fiches, notes et soldes de tous les élèves (parents_portal/sync.py)
+        from parents_portal.sync import touch
+        for kind in ('child', 'grades', 'balance'):
+            touch(kind)
+
+        report['elapsed'] = round(time.monotonic() - start, 2)
+        logger.info(f"Passage {year.annee} -> {nouvelle_annee} effectué : {report['totals']} en {report['elapsed']}s")
+        return report
+
+    @staticmethod
+    def _build_report(plan, nouvelle_annee):
+        """Rapport de passage par classe, calculé à partir du plan"""
+        from finances.models import ExtraFee, FeeStructure, FeeTranche
+        from students.models import Student
+        from teachers.models import TeachingAssignment
+
+        year = plan['year']
+        rows = {
+            school_class.id: {
+                'class': school_class,
+                'target': plan['targets'][school_class.id] or None,
+                'PROMOTED': 0, 'REPEATING': 0, 'GRADUATED': 0, 'UNPLACED': 0,
+                'without_average': 0,
+                'without_average_students': [],
+            }
+            for school_class in plan['classes']
+        }
+        for class_id, decision, average in plan['decisions'].values():
+            rows[class_id][decision] += 1
+            if average is None:
+                rows[class_id]['without_average'] += 1
+        for student in Student.objects.filter(pk__in=plan['without_average']).order_by('last_name', 'first_name'):
+            rows[student.current_class_id]['without_average_students'].append(
+                f"{student.last_name.upper()} {student.first_name} ({student.matricule})"
+            )
+
+        totals = {key: sum(row[key] for row in rows.values())
+                  for key in ('PROMOTED', 'REPEATING', 'GRADUATED', 'UNPLACED', 'without_average')}
+        return {
+            'year': year.annee,
+            'nouvelle_annee': nouvelle_annee,
+            'pass_average': plan['pass_average'],
+            'classes': list(rows.values()),
+            'totals': totals,
+            'to_copy': {
+                'classes': len(plan['classes']),
+                'fee_structures': FeeStructure.objects.filter(year=year).count(),
+                'fee_tranches': FeeTranche.objects.filter(fee_structure__year=year).count(),
+                'extra_fees': ExtraFee.objects.filter(year=year).count(),
+                'teaching_assignments': TeachingAssignment.objects.filter(year=year).count(),
+            },
+        }
+
+    @staticmethod
+    def _get_next_levels(system_ids):
+        """Niveau suivant de chaque niveau, dans l'ordre de son système éducatif"""
+        from school.models import SchoolLevel
+
+        next_levels = {}
+        previous = {}
+        for level in SchoolLevel.objects.filter(system_id__in=system_ids).order_by('system_id', 'order', 'name'):
+            if level.system_id in previous:
+                next_levels[previous[level.system_id]] = level.id
+            previous[level.system_id] = level.id
+        return next_levels
+
+    @staticmethod
+    def _get_class_suffix(name):
+        """Spécialité d'une classe : son nom sans le premier mot ("6e M1" -> "M1")"""
+        parts = name.split(maxsplit=1)
+        return parts[1].strip().lower() if len(parts) > 1 else ''
+
+    @staticmethod
+    def _shift_date(value, years):
+        if value is None:
+            return None
+        try:
+            return value.replace(year=value.year + years)
+        except ValueError:
+            # 29 février
+            return value.replace(year=value.year + years, day=28)
+
+    @staticmethod
+    def _year_offset(year, new_year):
+        try:
+            return int(new_year.annee.split('-')[0]) - int(year.annee.split('-')[0])
+        except ValueError:
+            return 1
+
+    @staticmethod
+    def _clone_classes(classes, new_year):
+        """
+        Recrée les classes dans la nouvelle année (les classes déjà créées sont conservées)
+
+        Returns:
+            dict: {id de l'ancienne classe: id de la nouvelle classe}
+        """
+        from classes.models import SchoolClass
+
+        SchoolClass.objects.bulk_create([
+            SchoolClass(
+                name=c.name, level_id=c.level_id, year=new_year, school_id=c.school_id,
+                capacity=c.capacity, main_teacher_id=c.main_teacher_id,
+                subject_teached=c.subject_teached,
+            )
+            for c in classes
+        ], ignore_conflicts=True)
+
+        new_ids = {
+            (name, level_id, school_id): pk
+            for pk, name, level_id, school_id in SchoolClass.objects.filter(year=new_year)
+            .values_list('id', 'name', 'level_id', 'school_id')
+        }
+        return {c.id: new_ids[(c.name, c.level_id, c.school_id)] for c in classes}
+
+    @staticmethod
+    def _move_students(plan, class_map, new_year):
+        """Déplace les élèves par lots (un UPDATE par classe cible) et historise"""
+        from students.models import Student, StudentClassHistory
+
+        groups = {}
+        graduated = []
+        for student_id, (class_id, decision, _) in plan['decisions'].items():
+            if decision == 'PROMOTED':
+                groups.setdefault((class_map[plan['targets'][class_id].id], False), []).append(student_id)
+            elif decision == 'REPEATING':
+                groups.setdefault((class_map[class_id], True), []).append(student_id)
+            elif decision == 'GRADUATED':
+                graduated.append(student_id)
+
+        history = []
+        for (new_class_id, is_repeating), student_ids in groups.items():
+            Student.objects.filter(pk__in=student_ids).update(
+                current_class_id=new_class_id, year=new_year, is_repeating=is_repeating
+            )
+            history.extend(
+                StudentClassHistory(student_id=student_id, school_class_id=new_class_id,
+                                    year=new_year, is_repeating=is_repeating)
+                for student_id in student_ids
+            )
+        StudentClassHistory.objects.bulk_create(history, batch_size=500, ignore_conflicts=True)
+
+        if graduated:
+            Student.objects.filter(pk__in=graduated).update(is_active=False)
+
+        return {
+            'moved': len(history),
+            'graduated': len(graduated),
+        }
+
+    @staticmethod
+    def _copy_configuration(year, new_year, class_map):
+        """Recopie frais, tranches, frais annexes, affectations et emplois du temps"""
+        from classes import occupancy
+        from classes.models import TimetableSlot
+        from finances.models import ExtraFee, FeeStructure, FeeTranche
+        from teachers.models import TeachingAssignment
+
+        offset = YearRolloverService._year_offset(year, new_year)
+        shift = YearRolloverService._shift_date
+
+        # Structures de frais : une par classe, sauf si déjà saisie pour la nouvelle année
+        existing = set(FeeStructure.objects.filter(year=new_year).values_list('school_class_id', flat=True))
+        structures = [
+            fs for fs in FeeStructure.objects.filter(year=year, school_class_id__in=class_map)
+            if class_map[fs.school_class_id] not in existing
+        ]
+        new_structures = FeeStructure.objects.bulk_create([
+            FeeStructure(
+                school_class_id=class_map[fs.school_class_id], year=new_year,
+                inscription_fee=fs.inscription_fee, tuition_total=fs.tuition_total,
+                tranche_count=fs.tranche_count, created_by_id=fs.created_by_id,
+            )
+            for fs in structures
+        ])
+        structure_map = {old.id: new.id for old, new in zip(structures, new_structures)}
+        tranches = FeeTranche.objects.bulk_create([
+            FeeTranche(
+                fee_structure_id=structure_map[t.fee_structure_id], number=t.number,
+                amount=t.amount, due_date=shift(t.due_date, offset),
+            )
+            for t in FeeTranche.objects.filter(fee_structure_id__in=structure_map)
+        ], batch_size=500)
+
+        # Frais annexes : les montants par classe sont indexés par id de classe
+        existing = set(ExtraFee.objects.filter(year=new_year).values_list('name', flat=True))
+        extra_fees = list(
+            ExtraFee.objects.filter(year=year).exclude(name__in=existing).prefetch_related('classes')
+        )
+        new_extra_fees = ExtraFee.objects.bulk_create([
+            ExtraFee(
+                name=fee.name, fee_type_id=fee.fee_type_id, is_exam_fee=fee.is_exam_fee,
+                exam_types=fee.exam_types, apply_to_all_classes=fee.apply_to_all_classes,
+                amount=fee.amount, year=new_year, due_date=shift(fee.due_date, offset),
+                is_optional=fee.is_optional, is_active=fee.is_active,
+                description=fee.description, created_by_id=fee.created_by_id,
+                amounts_by_class={
+                    str(class_map[int(class_id)]): amount
+                    for class_id, amount in fee.amounts_by_class.items()
+                    if int(class_id) in class_map
+                },
+            )
+            for fee in extra_fees
+        ])
+        ExtraFee.classes.through.objects.bulk_create([
+            ExtraFee.classes.through(extrafee_id=new.id, schoolclass_id=class_map[c.id])
+            for old, new in zip(extra_fees, new_extra_fees)
+            for c in old.classes.all() if c.id in class_map
+        ], batch_size=500, ignore_conflicts=True)
+
+        TeachingAssignment.objects.bulk_create([
+            TeachingAssignment(
+                teacher_id=a.teacher_id, subject_id=a.subject_id,
+                school_class_id=class_map[a.school_class_id], year=new_year,
+                coefficient=a.coefficient, hours_per_week=a.hours_per_week,
+            )
+            for a in TeachingAssignment.objects.filter(year=year, school_class_id__in=class_map)
+        ], batch_size=500, ignore_conflicts=True)
+
+        TimetableSlot.objects.bulk_create([
+            TimetableSlot(
+                class_obj_id=class_map[s.class_obj_id], year=new_year, day=s.day,
+                period=s.period, subject_id=s.subject_id, teacher_id=s.teacher_id,
+                duration=s.duration,
+            )
+            for s in TimetableSlot.objects.filter(year=year, class_obj_id__in=class_map)
+        ], batch_size=500, ignore_conflicts=True)
+        # bulk_create ne déclenche pas les signaux de l'index d'occupation
+        occupancy.invalidate(new_year.pk)
+
+        # ignore_conflicts : les lignes ignorées ne sont pas comptées par len(), on compte en base
+        new_class_ids = list(class_map.values())
+        return {
+            'fee_structures': len(new_structures),
+            'fee_tranches': len(tranches),
+            'extra_fees': len(new_extra_fees),
+            'teaching_assignments': TeachingAssignment.objects.filter(
+                year=new_year, school_class_id__in=new_class_ids
+            ).count(),
+            'timetable_slots': TimetableSlot.objects.filter(year=new_year, class_obj_id__in=new_class_ids).count(),
+        }
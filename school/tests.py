@@ -1,3 +1,162 @@
+from datetime import date
+
 from django.test import TestCase
 
-# Create your tests here.
+from .models import MatriculeSequence, SchoolYear, School, SchoolType, EducationSystem, SchoolLevel, YearClosure
+from .services import MatriculeService
+
+
+class MatriculeSequenceTestCase(TestCase):
+    """Tests de l'allocation des matricules"""
+
+    def setUp(self):
+        self.year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        self.sequence = MatriculeSequence.objects.create(
+            sequence_type='STUDENT',
+            prefix='STU',
+            current_year=2024,
+            format_pattern='{prefix}{year}{number:04d}',
+        )
+
+    def test_reserve_block_is_contiguous(self):
+        self.assertEqual(self.sequence.reserve_block(3), (1, 3))
+        self.assertEqual(self.sequence.reserve_block(2), (4, 5))
+        self.sequence.refresh_from_db()
+        self.assertEqual(self.sequence.last_number, 5)
+
+    def test_stale_instance_does_not_reuse_numbers(self):
+        stale = MatriculeSequence.objects.get(pk=self.sequence.pk)
+        self.sequence.generate_matricule()
+        self.assertEqual(stale.generate_matricule(), 'STU20240002')
+
+    def test_preview_does_not_consume(self):
+        self.assertEqual(MatriculeService.preview_matricule('STUDENT'), 'STU20240001')
+        self.assertEqual(MatriculeService.reserve_matricules('STUDENT', 2), ['STU20240001', 'STU20240002'])
+
+    def test_audit_detects_gaps_and_collisions(self):
+        from students.models import Student
+        school = School.objects.create(
+            name="École Test",
+            code="ET01",
+            type=SchoolType.objects.create(name="Public", code="PUB"),
+            education_system=EducationSystem.objects.create(name="Francophone", code="FR"),
+            address="Douala",
+        )
+        self.sequence.reserve_block(3)
+        for matricule in ('STU20240001', 'STU20240003', 'STU20240007', 'MANUEL-1'):
+            Student.objects.create(
+                matricule=matricule, first_name="A", last_name="B", birth_date=date(2010, 1, 1),
+                birth_place="Douala", gender='M', year=self.year, school=school,
+            )
+
+        report = MatriculeService.audit_sequence('STUDENT')
+        self.assertEqual(report['gaps'], [2])
+        self.assertEqual(report['ahead'], [7])
+        self.assertEqual(report['foreign_count'], 1)
+        self.assertFalse(report['is_consistent'])
+
+        self.assertEqual(MatriculeService.resync_sequence('STUDENT'), 7)
+
+
+class YearRolloverTestCase(TestCase):
+    """Tests du passage d'une année scolaire à la suivante"""
+
+    def setUp(self):
+        from classes.models import SchoolClass
+        from finances.models import FeeStructure, FeeTranche
+        from notes.models import Bulletin, Trimester
+        from students.models import Student
+
+        self.year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        school = School.objects.create(
+            name="École Test", code="ET01", address="Douala",
+            type=SchoolType.objects.create(name="Public", code="PUB"), education_system=system,
+        )
+        sixieme = SchoolLevel.objects.create(name="Sixième", system=system, order=1)
+        cinquieme = SchoolLevel.objects.create(name="Cinquième", system=system, order=2)
+        self.class_6 = SchoolClass.objects.create(name="6e M1", level=sixieme, year=self.year, school=school)
+        self.class_5 = SchoolClass.objects.create(name="5e M1", level=cinquieme, year=self.year, school=school)
+
+        structure = FeeStructure.objects.create(
+            school_class=self.class_6, year=self.year, inscription_fee=10000, tuition_total=60000,
+        )
+        FeeTranche.objects.create(fee_structure=structure, number=1, amount=30000, due_date=date(2024, 10, 15))
+
+        trimester = Trimester.objects.create(
+            trimester='1ER', year=self.year, school=school,
+            start_date=date(2024, 9, 1), end_date=date(2024, 12, 15),
+        )
+        self.students = {}
+        for name, school_class, average in (
+            ("Admis", self.class_6, 12), ("Redoublant", self.class_6, 8), ("Sortant", self.class_5, 14),
+        ):
+            student = Student.objects.create(
+                matricule=name, first_name=name, last_name="Test", birth_date=date(2012, 1, 1),
+                birth_place="Douala", gender='M', year=self.year, school=school, current_class=school_class,
+            )
+            Bulletin.objects.create(
+                student=student, trimester=trimester, class_size=2, student_rank=1, class_average=10,
+                student_average=average, total_points=0, total_coefficients=1, success_rate=0,
+            )
+            self.students[name] = student
+
+    def test_dry_run_does_not_write(self):
+        report = self.year.close("2025-2026", dry_run=True)
+        self.assertEqual(report['totals']['PROMOTED'], 1)
+        self.assertEqual(report['totals']['REPEATING'], 1)
+        self.assertEqual(report['totals']['GRADUATED'], 1)
+        self.assertEqual(report['to_copy']['fee_tranches'], 1)
+        self.assertFalse(SchoolYear.objects.filter(annee="2025-2026").exists())
+        self.year.refresh_from_db()
+        self.assertEqual(self.year.statut, 'EN_COURS')
+
+    def test_students_without_average_are_listed(self):
+        from classes.models import TimetableSlot
+        from students.models import Student
+        from subjects.models import Subject
+        from teachers.models import Teacher
+
+        Student.objects.create(
+            matricule="SansNote", first_name="Sans", last_name="Note", birth_date=date(2012, 1, 1),
+            birth_place="Douala", gender='F', year=self.year, school=self.class_6.school, current_class=self.class_6,
+        )
+        report = self.year.close("2025-2026", dry_run=True)
+        row = next(row for row in report['classes'] if row['class'] == self.class_6)
+        self.assertEqual(row['without_average_students'], ["NOTE Sans (SansNote)"])
+        self.assertEqual(row['PROMOTED'], 2)
+
+        # Créneaux recopiés : nombre de lignes présentes en base après l'insertion
+        teacher = Teacher.objects.create(
+            matricule="ENS1", first_name="Paul", last_name="Prof", birth_date=date(1980, 1, 1),
+            birth_place="Douala", gender='M', school=self.class_6.school, year=self.year,
+        )
+        subject = Subject.objects.create(name="Mathématiques", code="MATH")
+        TimetableSlot.objects.create(
+            class_obj=self.class_6, year=self.year, day=1, period=1, subject=subject, teacher=teacher,
+        )
+        report = self.year.close("2025-2026", rollover=True)
+        new_year = SchoolYear.objects.get(annee="2025-2026")
+        self.assertEqual(report['copied']['timetable_slots'], TimetableSlot.objects.filter(year=new_year).count())
+
+    def test_rollover_promotes_and_copies(self):
+        from finances.models import FeeTranche
+        from students.models import StudentClassHistory
+
+        report = self.year.close("2025-2026", rollover=True)
+        new_year = SchoolYear.objects.get(annee="2025-2026")
+        self.assertTrue(YearClosure.objects.filter(annee=self.year).exists())
+        self.assertEqual(report['students'], {'moved': 2, 'graduated': 1})
+
+        for student in self.students.values():
+            student.refresh_from_db()
+        self.assertEqual(self.students["Admis"].current_class.name, "5e M1")
+        self.assertEqual(self.students["Admis"].year, new_year)
+        self.assertEqual(self.students["Redoublant"].current_class.name, "6e M1")
+        self.assertTrue(self.students["Redoublant"].is_repeating)
+        self.assertFalse(self.students["Sortant"].is_active)
+        self.assertEqual(StudentClassHistory.objects.filter(year=new_year, is_repeating=True).count(), 1)
+
+        tranche = FeeTranche.objects.get(fee_structure__year=new_year)
+        self.assertEqual(tranche.due_date, date(2025, 10, 15))
+        self.assertEqual(tranche.fee_structure.school_class.year, new_year)
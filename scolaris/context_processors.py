@@ -24,3 +24,20 @@ def global_stats(request):
             'teachers_count': 0,
             'classes_count': 0,
         }
+
+
+def reporting_status(request):
+    """
+    Fraîcheur des données des rapports (vues décorées par @reporting_view)
+    """
+    as_of = getattr(request, 'reporting_as_of', None)
+    if as_of is None:
+        return {}
+    from django.conf import settings
+    from django.utils import timezone
+
+    stale_after = getattr(settings, 'REPORTING_STALE_AFTER', 6 * 3600)
+    return {
+        'reporting_as_of': as_of,
+        'reporting_stale': (timezone.now() - as_of).total_seconds() > stale_after,
+    }
@@ -0,0 +1,177 @@
+"""
+Profils de base de données
+
+- Sans DATABASE_URL : SQLite (db.sqlite3), réglé pour les accès concurrents
+  (caisse et saisie des notes en parallèle) : journal WAL, attente sur verrou,
+  synchronous=NORMAL, mmap et transactions IMMEDIATE.
+- Avec DATABASE_URL : PostgreSQL (ou tout moteur reconnu par dj_database_url),
+  avec connexions persistantes, contrôle de santé et pooler optionnel.
+
+Le cache (voir get_default_cache) est partagé entre les processus : Redis si
+CACHE_URL est défini, sinon une table de la base.
+"""
+from decouple import config
+import dj_database_url
+
+
+def sqlite_profile(name):
+    """
+    Configuration SQLite pour un usage multi-utilisateurs
+
+    - journal_mode=WAL : les lecteurs ne bloquent plus l'écrivain (et inversement)
+    - timeout : attente (en secondes) d'un verrou avant « database is locked »
+    - transaction_mode=IMMEDIATE : le verrou d'écriture est pris dès le début de
+      la transaction ; sans cela, deux transactions qui passent de la lecture à
+      l'écriture échouent immédiatement, sans tenir compte du timeout
+    - synchronous=NORMAL : sûr en mode WAL, évite un fsync par transaction
+    """
+    mmap_size = config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)
+    cache_size = config('SQLITE_CACHE_SIZE_KB', default=64 * 1024, cast=int)
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA mmap_size={mmap_size}',
+        f'PRAGMA cache_size=-{cache_size}',
+        'PRAGMA temp_store=MEMORY',
+    ]
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'OPTIONS': {
+            'timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=int),
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': '; '.join(pragmas),
+        },
+    }
+
+
+def postgresql_profile(url):
+    """
+    Configuration PostgreSQL à partir de DATABASE_URL
+
+    DB_POOL permet d'ajouter un pooler :
+    - "pgbouncer" : PgBouncer local en mode transaction (curseurs serveur désactivés)
+    - "psycopg" : pool intégré de Django 5.1+ (nécessite psycopg[pool] 3)
+    """
+    pool = config('DB_POOL', default='').lower()
+    conn_max_age = config('DB_CONN_MAX_AGE', default=600, cast=int)
+
+    database = dj_database_url.parse(
+        url,
+        # Le pool psycopg gère lui-même la réutilisation des connexions
+        conn_max_age=0 if pool == 'psycopg' else conn_max_age,
+        conn_health_checks=True,
+        disable_server_side_cursors=pool == 'pgbouncer',
+    )
+    options = database.setdefault('OPTIONS', {})
+    options.setdefault('connect_timeout', config('DB_CONNECT_TIMEOUT', default=10, cast=int))
+    if pool == 'psycopg':
+        options['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+    return database
+
+
+def get_default_database(base_dir):
+    """Base par défaut selon l'environnement (DATABASE_URL ou SQLite local)"""
+    url = config('DATABASE_URL', default='')
+    if url:
+        return postgresql_profile(url)
+    return sqlite_profile(config('SQLITE_PATH', default=str(base_dir / 'db.sqlite3')))
+
+
+def reporting_snapshot_profile(path):
+    """Instantané SQLite des rapports, ouvert en lecture seule"""
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{path}?mode=ro',
+        'OPTIONS': {
+            'timeout': 5,
+            'init_command': 'PRAGMA query_only=ON; PRAGMA temp_store=MEMORY; '
+                            f"PRAGMA mmap_size={config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)}",
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+
+
+def get_reporting_database(base_dir):
+    """
+    Base de lecture des rapports (alias `reporting`, voir scolaris/routers.py)
+
+    - REPORTING_DATABASE_URL : réplique en lecture (PostgreSQL)
+    - sinon, en SQLite : instantané rafraîchi par refresh_reporting_snapshot
+      (désactivable avec REPORTING_SNAPSHOT=False)
+
+    Returns:
+        dict | None: La configuration, ou None si les rapports lisent `default`
+    """
+    url = config('REPORTING_DATABASE_URL', default='')
+    if url:
+        database = dj_database_url.parse(
+            url,
+            conn_max_age=config('DB_CONN_MAX_AGE', default=600, cast=int),
+            conn_health_checks=True,
+        )
+        database['TEST'] = {'MIRROR': 'default'}
+        return database
+    if config('DATABASE_URL', default='') or not config('REPORTING_SNAPSHOT', default=True, cast=bool):
+        return None
+    return reporting_snapshot_profile(get_reporting_snapshot_path(base_dir))
+
+
+def get_reporting_snapshot_path(base_dir):
+    return config('REPORTING_SNAPSHOT_PATH', default=str(base_dir / 'reporting.sqlite3'))
+
+
+def register_sqlite_database(alias, name):
+    """
+    Déclare à chaud une base SQLite supplémentaire (utilisée comme source par
+    la commande migrate_sqlite_to_postgresql)
+    """
+    from django.db import connections
+
+    connections.settings[alias] = sqlite_profile(name)
+    connections.configure_settings(connections.settings)
+    return connections[alias]
+
+
+CACHE_TABLE = 'scolaris_cache'
+
+
+def get_default_cache():
+    """
+    Cache partagé par tous les processus du serveur
+
+    Les versions des onglets mis en cache, les versions de l'API parents et
+    l'index d'occupation des créneaux y sont stockés : un cache propre à chaque
+    processus (LocMemCache, le défaut de Django) laisserait les autres
+    processus servir des données périmées.
+
+    - CACHE_URL (redis://...) : Redis (nécessite le paquet redis)
+    - sinon : table `scolaris_cache` de la base (python manage.py createcachetable)
+    """
+    url = config('CACHE_URL', default='')
+    if url:
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+            'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='scolaris'),
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': CACHE_TABLE,
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=20000, cast=int)},
+    }
+
+
+def is_shared_cache(alias='default'):
+    """Vrai si le cache `alias` est commun à tous les processus (ni mémoire locale, ni factice)"""
+    from django.conf import settings
+
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+    return backend not in (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.dummy.DummyCache',
+    )
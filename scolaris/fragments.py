@@ -0,0 +1,82 @@
+"""
+Cache des onglets des fiches détaillées (élève, classe, enseignant)
+
+La page d'une fiche ne calcule que l'onglet visible ; les autres onglets sont
+chargés par HTMX à l'ouverture, depuis le cache quand c'est possible.
+
+Chaque fragment est indexé par les versions des objets dont il dépend
+(ex: ('student', 12), ('class', 3)). Les signaux de chaque application
+incrémentent ces versions quand un modèle lié est enregistré ou supprimé :
+les anciens fragments ne sont plus jamais lus et expirent d'eux-mêmes.
+Une version sans pk (ex: ('student', None)) invalide tous les objets du type,
+pour les traitements en masse qui ne déclenchent pas de signaux.
+
+Les versions sont stockées dans le cache partagé (voir CACHES) et ne changent
+qu'à la validation de la transaction : un rendu concurrent ne peut pas mettre
+en cache des données non validées sous la nouvelle version.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.translation import get_language
+
+
+def _version_key(kind, pk=None):
+    return f"fragment:version:{kind}:{'*' if pk is None else pk}"
+
+
+def get_versions(dependencies):
+    """
+    Versions courantes d'une liste de dépendances [(kind, pk), ...]
+
+    La version globale de chaque type est ajoutée automatiquement.
+    """
+    keys = []
+    for kind, pk in dependencies:
+        for key in (_version_key(kind), _version_key(kind, pk)):
+            if key not in keys:
+                keys.append(key)
+
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_version(kind, *pks):
+    """
+    Invalide les fragments des objets `pks` du type `kind` (de tous les objets
+    du type si aucun pk n'est donné), à la validation de la transaction en cours
+    """
+    keys = [_version_key(kind, pk) for pk in pks if pk is not None] if pks else [_version_key(kind)]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, None))
+
+
+def render_fragment(request, name, dependencies, template_name, get_context):
+    """
+    Rend un onglet depuis le cache, ou le calcule et le met en cache
+
+    Args:
+        request (HttpRequest): La requête HTMX
+        name (str): Nom du fragment (ex: 'student:financial')
+        dependencies (list): Dépendances [(kind, pk), ...] du fragment
+        template_name (str): Gabarit de l'onglet
+        get_context (callable): Construit le contexte, appelé seulement si absent du cache
+
+    Le contenu ne doit pas dépendre de l'utilisateur (ni jeton CSRF, ni droits).
+    """
+    versions = get_versions(dependencies)
+    key = f"fragment:{name}:{get_language()}:{':'.join(f'{kind}={pk}' for kind, pk in dependencies)}:" + \
+        ':'.join(versions)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(template_name, get_context(), request=request)
+        cache.set(key, html, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+    return HttpResponse(html)
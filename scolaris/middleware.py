@@ -77,9 +77,24 @@ class PermissionDeniedMiddleware:
         return []
 
 
+def get_activity_write_interval():
+    """
+    Intervalle minimal (en secondes) entre deux écritures de session dues au seul
+    suivi d'activité. Avec le backend de sessions en base, chaque écriture est un
+    UPDATE de la table des sessions : on en fait au plus une par intervalle.
+    """
+    return getattr(settings, 'SESSION_ACTIVITY_WRITE_INTERVAL', 60)
+
+
 class AutoLogoutMiddleware:
     """
     Middleware pour la déconnexion automatique basée sur l'inactivité
+
+    La dernière activité n'est réécrite en session (et nulle part ailleurs)
+    que lorsque la valeur stockée a plus de SESSION_ACTIVITY_WRITE_INTERVAL
+    secondes : la valeur lue peut donc avoir jusqu'à un intervalle de retard,
+    et la déconnexion intervient après AUTO_LOGOUT_DELAY à AUTO_LOGOUT_DELAY +
+    SESSION_ACTIVITY_WRITE_INTERVAL secondes d'inactivité, jamais avant.
     """
     def __init__(self, get_response):
         self.get_response = get_response
@@ -88,20 +103,15 @@ class AutoLogoutMiddleware:
         try:
             # Vérifier si l'utilisateur est connecté
             if request.user.is_authenticated:
-                # Récupérer le timestamp de la dernière activité
-                last_activity = request.session.get('last_activity')
+                now = timezone.now()
+                last_activity = self._parse_timestamp(request.session.get('last_activity'))
                 
                 if last_activity:
-                    # Convertir en datetime si c'est un string
-                    if isinstance(last_activity, str):
-                        try:
-                            last_activity = datetime.datetime.fromisoformat(last_activity)
-                        except ValueError:
-                            last_activity = timezone.now()
-                    
-                    # Calculer le temps d'inactivité
-                    inactive_duration = timezone.now() - last_activity
-                    max_inactive_time = datetime.timedelta(seconds=getattr(settings, 'SESSION_COOKIE_AGE', 3600))
+                    # Calculer le temps d'inactivité (valeur stockée en retard d'un intervalle au plus)
+                    inactive_duration = now - last_activity
+                    max_inactive_time = datetime.timedelta(
+                        seconds=self._get_logout_delay() + get_activity_write_interval()
+                    )
                     
                     # Si l'utilisateur est inactif depuis trop longtemps
                     if inactive_duration > max_inactive_time:
@@ -115,8 +125,7 @@ class AutoLogoutMiddleware:
                 
                 # Mettre à jour le timestamp de la dernière activité pour les requêtes non-AJAX
                 if not request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    request.session['last_activity'] = timezone.now().isoformat()
-                    request.session.modified = True
+                    self._record_activity(request, now, last_activity)
         except Exception:
             # Ignorer les erreurs de session/auth (ex: tables non créées, utilisateur non authentifié)
             pass
@@ -124,6 +133,26 @@ class AutoLogoutMiddleware:
         response = self.get_response(request)
         return response
     
+    def _get_logout_delay(self):
+        """Délai d'inactivité avant déconnexion, en secondes"""
+        return getattr(settings, 'AUTO_LOGOUT_DELAY', getattr(settings, 'SESSION_COOKIE_AGE', 3600))
+    
+    def _parse_timestamp(self, value):
+        """Convertit un timestamp ISO stocké en session en datetime"""
+        if not value:
+            return None
+        if isinstance(value, str):
+            try:
+                return datetime.datetime.fromisoformat(value)
+            except ValueError:
+                return timezone.now()
+        return value
+    
+    def _record_activity(self, request, now, stored_activity):
+        """Enregistre l'activité en session, au plus une fois par intervalle"""
+        if stored_activity is None or (now - stored_activity).total_seconds() >= get_activity_write_interval():
+            request.session['last_activity'] = now.isoformat()
+    
     def _is_public_url(self, path):
         """
         Vérifie si l'URL est publique (accessible sans authentification)
@@ -146,6 +175,10 @@ class AutoLogoutMiddleware:
 class LastVisitedMiddleware:
     """
     Middleware pour traquer la dernière page visitée par l'utilisateur
+
+    L'URL n'est écrite en session que si la session est déjà réécrite pour cette
+    requête ou si la valeur stockée a plus de SESSION_ACTIVITY_WRITE_INTERVAL
+    secondes.
     """
     def __init__(self, get_response):
         self.get_response = get_response
@@ -181,9 +214,15 @@ class LastVisitedMiddleware:
                 # Éviter de sauvegarder la même URL de façon répétitive
                 last_visited = request.session.get('last_visited_url')
                 if last_visited != current_url:
-                    request.session['last_visited_url'] = current_url
-                    request.session['last_visited_time'] = timezone.now().isoformat()
-                    request.session.modified = True
+                    now = timezone.now()
+                    last_visited_time = request.session.get('last_visited_time')
+                    stale = (
+                        not last_visited_time or
+                        (now - datetime.datetime.fromisoformat(last_visited_time)).total_seconds() >= get_activity_write_interval()
+                    )
+                    if request.session.modified or stale:
+                        request.session['last_visited_url'] = current_url
+                        request.session['last_visited_time'] = now.isoformat()
         except Exception:
             # Ignorer les erreurs de session (ex: tables non créées)
             pass
@@ -0,0 +1,114 @@
+"""
+Routage des lectures des rapports vers la base `reporting`
+
+Les vues de rapports et d'exports décorées par @reporting_view lisent dans
+l'alias `reporting` (réplique PostgreSQL ou instantané SQLite rafraîchi
+périodiquement) ; toutes les écritures restent sur `default`. Sans alias
+`reporting` disponible, tout continue de passer par `default`.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+from pathlib import Path
+import logging
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+REPORTING_ALIAS = 'reporting'
+
+_read_alias = ContextVar('reporting_read_alias', default=None)
+
+
+class ReportingRouter:
+    """Envoie les lectures vers `reporting` pendant l'exécution d'une vue de rapport"""
+
+    def db_for_read(self, model, **hints):
+        # Le cache en base (versions, fragments) est toujours lu sur `default`
+        if model._meta.app_label == 'django_cache':
+            return None
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # `reporting` est une copie de `default` : mêmes objets
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPORTING_ALIAS:
+            return False
+        return None
+
+
+def get_read_alias():
+    """Alias de lecture en cours : `reporting` dans une vue de rapport, sinon None (`default`)"""
+    return _read_alias.get()
+
+
+def get_reporting_alias():
+    """Alias de lecture des rapports s'il est configuré et disponible, sinon None"""
+    if REPORTING_ALIAS not in settings.DATABASES:
+        return None
+    snapshot = get_snapshot_path()
+    if snapshot is not None and not snapshot.exists():
+        return None
+    return REPORTING_ALIAS
+
+
+def get_snapshot_path():
+    """Fichier de l'instantané SQLite, ou None si `reporting` est une réplique"""
+    database = settings.DATABASES.get(REPORTING_ALIAS)
+    if not database or 'sqlite' not in database['ENGINE']:
+        return None
+    return Path(getattr(settings, 'REPORTING_SNAPSHOT_PATH', settings.BASE_DIR / 'reporting.sqlite3'))
+
+
+def get_reporting_as_of(alias):
+    """
+    Date des données lues dans `alias`
+
+    Returns:
+        datetime | None: None si les données sont à jour (base principale ou
+        réplique sans retard mesurable)
+    """
+    if alias is None:
+        return None
+    snapshot = get_snapshot_path()
+    if snapshot is not None:
+        return datetime.fromtimestamp(snapshot.stat().st_mtime, tz=dt_timezone.utc)
+
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            # NULL hors réplication ; sinon date de la dernière transaction rejouée
+            cursor.execute('SELECT pg_last_xact_replay_timestamp()')
+            return cursor.fetchone()[0]
+    except Exception as e:
+        logger.warning(f"Impossible de mesurer le retard de la réplique {alias}: {e}")
+        return None
+
+
+def reporting_view(view_func):
+    """
+    Décorateur des vues de rapports et d'exports en lecture seule
+
+    Les requêtes de lecture de la vue sont envoyées à la base `reporting` ;
+    `request.reporting_as_of` indique la date des données affichées (None si
+    elles sont à jour), affichée par le bandeau du gabarit de base.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        alias = get_reporting_alias()
+        request.reporting_as_of = get_reporting_as_of(alias)
+        token = _read_alias.set(alias)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
@@ -15,7 +15,7 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 from decouple import config
-import dj_database_url
+from scolaris.db import get_default_cache, get_default_database, get_reporting_database, get_reporting_snapshot_path
 
 SECRET_KEY = os.getenv('SECRET_KEY')
 
@@ -60,6 +60,7 @@ INSTALLED_APPS = [
     'notifications',
     'parents_portal',
     'settings',
+    'archives',
 ]
 
 MIDDLEWARE = [
@@ -92,6 +93,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'scolaris.context_processors.global_stats',
+                'scolaris.context_processors.reporting_status',
                 'authentication.context_processors.user_permissions',
             ],
         },
@@ -103,15 +105,23 @@ WSGI_APPLICATION = 'scolaris.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# SQLite (WAL) par défaut, PostgreSQL si DATABASE_URL est défini : voir scolaris/db.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': get_default_database(BASE_DIR),
+}
+
+# Lectures des rapports sur une réplique ou un instantané : voir scolaris/routers.py
+REPORTING_SNAPSHOT_PATH = Path(get_reporting_snapshot_path(BASE_DIR))
+REPORTING_DATABASE = get_reporting_database(BASE_DIR)
+if REPORTING_DATABASE:
+    DATABASES['reporting'] = REPORTING_DATABASE
+DATABASE_ROUTERS = ['scolaris.routers.ReportingRouter']
+REPORTING_STALE_AFTER = 6 * 3600  # Au-delà (en secondes), le bandeau des rapports signale des données anciennes
+
+# Cache partagé entre les processus (Redis si CACHE_URL, sinon table en base) : voir scolaris/db.py
+CACHES = {
+    'default': get_default_cache(),
 }
-#DATABASES = {
-#    'default': dj_database_url.parse(config('DATABASE_URL'))
-#}
 
 
 
@@ -165,13 +175,21 @@ LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/login/'
 
 # Configuration des sessions
-SESSION_COOKIE_AGE = 300  # 5 minutes en secondes
+AUTO_LOGOUT_DELAY = 300  # 5 minutes d'inactivité avant déconnexion (AutoLogoutMiddleware)
+SESSION_ACTIVITY_WRITE_INTERVAL = 60  # Au plus une écriture de session par minute pour le suivi d'activité
+# Le middleware déconnecte après le délai d'inactivité augmenté d'un intervalle d'écriture
+# (activité stockée en retard d'un intervalle au plus) ; la session en base doit lui
+# survivre : c'est le middleware, et non l'expiration de la session, qui décide.
+SESSION_COOKIE_AGE = AUTO_LOGOUT_DELAY + 2 * SESSION_ACTIVITY_WRITE_INTERVAL
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_SAVE_EVERY_REQUEST = False  # Changé de True à False pour éviter les problèmes de cache
 SESSION_COOKIE_SECURE = False  # Mettre True en production avec HTTPS
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
 
+# Onglets des fiches élève, classe et enseignant chargés à la demande : voir scolaris/fragments.py
+FRAGMENT_CACHE_TIMEOUT = 3600  # Les fragments sont invalidés par version ; l'expiration libère la mémoire
+
 # Configuration de l'authentification
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
@@ -323,3 +341,9 @@ SMS_SENDER_ID = os.getenv('SMS_SENDER_ID')
 NOTIFICATIONS_ENABLED = True
 SMS_ENABLED = True
 EMAIL_ENABLED = True
+
+# Sauvegardes de la base (commande backup_database, à planifier chaque nuit)
+BACKUP_DIR = Path(os.getenv('BACKUP_DIR', BASE_DIR / 'backup_sqlite'))
+BACKUP_RETENTION = {'daily': 7, 'weekly': 4, 'monthly': 6}  # Nombre de jours / semaines / mois conservés
+BACKUP_PAGES_PER_STEP = 256  # Pages SQLite copiées avant de relâcher le verrou
+BACKUP_STEP_SLEEP = 0.01  # Pause (s) entre deux paquets de pages
@@ -1,3 +1,87 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.views.decorators.http import require_POST
 
-# Register your models here.
+from .models import DatabaseBackup
+from .services import BackupService
+
+
+@admin.register(DatabaseBackup)
+class DatabaseBackupAdmin(admin.ModelAdmin):
+    """Sauvegardes de la base : lancement, vérification et téléchargement"""
+    change_list_template = 'admin/settings/databasebackup/change_list.html'
+    list_display = ['started_at', 'engine', 'status', 'size_display', 'duration_display', 'is_verified', 'download_link']
+    list_filter = ['status', 'is_verified', 'engine']
+    readonly_fields = [
+        'file_name', 'engine', 'status', 'size', 'checksum', 'is_verified', 'verification_message',
+        'error', 'started_at', 'finished_at', 'verified_at', 'created_by',
+    ]
+    actions = ['verify_backups', 'apply_retention']
+
+    def get_urls(self):
+        urls = [
+            path('run/', self.admin_site.admin_view(require_POST(self.run_backup)), name='settings_databasebackup_run'),
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_backup), name='settings_databasebackup_download'),
+        ]
+        return urls + super().get_urls()
+
+    def has_add_permission(self, request):
+        """Les sauvegardes sont créées par le bouton « Lancer une sauvegarde » ou la commande backup_database"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        if obj.file_name:
+            BackupService.get_backup_path(obj).unlink(missing_ok=True)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for backup in queryset:
+            self.delete_model(request, backup)
+
+    def run_backup(self, request):
+        backup = BackupService.create_backup(user=request.user)
+        if backup.status == 'FAILED':
+            self.message_user(request, f"Échec de la sauvegarde : {backup.error}", messages.ERROR)
+        elif backup.is_verified:
+            self.message_user(request, f"Sauvegarde {backup.file_name} créée et vérifiée : {backup.verification_message}", messages.SUCCESS)
+        else:
+            self.message_user(request, f"Sauvegarde {backup.file_name} créée mais non vérifiée : {backup.verification_message}", messages.WARNING)
+        return redirect('admin:settings_databasebackup_changelist')
+
+    def download_backup(self, request, pk):
+        backup = get_object_or_404(DatabaseBackup, pk=pk, status='SUCCESS')
+        path = BackupService.get_backup_path(backup)
+        if not path.exists():
+            raise Http404("Fichier de sauvegarde introuvable")
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=backup.file_name)
+
+    def size_display(self, obj):
+        return f"{obj.size / 1024 / 1024:.1f} Mo" if obj.size else '-'
+    size_display.short_description = 'Taille'
+
+    def duration_display(self, obj):
+        return f"{obj.duration:.1f} s" if obj.duration is not None else '-'
+    duration_display.short_description = 'Durée'
+
+    def download_link(self, obj):
+        if obj.status != 'SUCCESS':
+            return '-'
+        return format_html('<a href="{}">Télécharger</a>', reverse('admin:settings_databasebackup_download', args=[obj.pk]))
+    download_link.short_description = 'Fichier'
+
+    def verify_backups(self, request, queryset):
+        """Restaure et contrôle les sauvegardes sélectionnées"""
+        verified = sum(1 for backup in queryset.filter(status='SUCCESS') if BackupService.verify_backup(backup))
+        self.message_user(request, f"{verified} sauvegarde(s) vérifiée(s) sur {queryset.count()}")
+    verify_backups.short_description = "Vérifier les sauvegardes sélectionnées"
+
+    def apply_retention(self, request, queryset):
+        expired = BackupService.apply_retention()
+        self.message_user(request, f"{len(expired)} sauvegarde(s) supprimée(s) par la rétention")
+    apply_retention.short_description = "Appliquer la rétention"
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from settings.models import DatabaseBackup
+from settings.services import BackupService
+
+
+class Command(BaseCommand):
+    """
+    Commande de sauvegarde de la base de données (à planifier chaque nuit)
+    """
+    help = 'Sauvegarde la base sans bloquer les écritures, vérifie la sauvegarde et applique la rétention'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-verify',
+            action='store_true',
+            help='Ne pas restaurer la sauvegarde pour contrôle',
+        )
+        parser.add_argument(
+            '--no-prune',
+            action='store_true',
+            help="Ne pas supprimer les sauvegardes hors rétention",
+        )
+        parser.add_argument(
+            '--verify',
+            type=int,
+            metavar='ID',
+            help="Vérifie uniquement la sauvegarde indiquée",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            backup = DatabaseBackup.objects.filter(pk=options['verify']).first()
+            if not backup:
+                raise CommandError(f"Sauvegarde {options['verify']} introuvable")
+            self._report_verification(backup, BackupService.verify_backup(backup))
+            return
+
+        self.stdout.write('💾 Sauvegarde de la base en cours...')
+        backup = BackupService.create_backup(
+            verify=not options['no_verify'],
+            progress=self._progress if options['verbosity'] > 1 else None,
+        )
+        if backup.status == 'FAILED':
+            raise CommandError(f'Échec de la sauvegarde : {backup.error}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {backup.file_name} ({backup.size / 1024 / 1024:.1f} Mo en {backup.duration:.1f}s)'
+        ))
+        if not options['no_verify']:
+            self._report_verification(backup, backup.is_verified)
+
+        if not options['no_prune']:
+            expired = BackupService.apply_retention()
+            if expired:
+                self.stdout.write(f'🗑️  {len(expired)} ancienne(s) sauvegarde(s) supprimée(s)')
+
+        if backup.is_verified is False:
+            raise CommandError('La sauvegarde a été créée mais sa vérification a échoué')
+
+    def _report_verification(self, backup, is_verified):
+        if is_verified:
+            self.stdout.write(self.style.SUCCESS(f'🔍 {backup.verification_message}'))
+        else:
+            self.stdout.write(self.style.ERROR(f'❌ Vérification échouée : {backup.verification_message}'))
+
+    def _progress(self, remaining, total):
+        self.stdout.write(f'  {total - remaining}/{total} pages copiées')
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from settings.services import SqliteToPostgresqlService
+
+
+class Command(BaseCommand):
+    """
+    Commande de transfert des données SQLite vers PostgreSQL
+    """
+    help = (
+        "Copie toutes les données d'un fichier SQLite dans la base PostgreSQL configurée "
+        "(DATABASE_URL). Lancer 'manage.py migrate' sur PostgreSQL au préalable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            default=str(settings.BASE_DIR / 'db.sqlite3'),
+            help='Fichier SQLite source (défaut: db.sqlite3)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Nombre de lignes par insertion (défaut: 2000)',
+        )
+        parser.add_argument(
+            '--noinput',
+            action='store_true',
+            help='Ne pas demander de confirmation',
+        )
+
+    def handle(self, *args, **options):
+        if not options['noinput']:
+            answer = input('⚠️  Les tables de la base PostgreSQL vont être vidées puis remplies. Continuer ? [o/N] ')
+            if answer.lower() not in ('o', 'oui', 'y', 'yes'):
+                self.stdout.write('Transfert annulé')
+                return
+
+        self.stdout.write(f"🚚 Transfert depuis {options['source']}...")
+        try:
+            result = SqliteToPostgresqlService.copy_database(
+                options['source'],
+                batch_size=options['batch_size'],
+                progress=self._progress if options['verbosity'] > 1 else None,
+            )
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+
+        for label, count in result['counts'].items():
+            if count:
+                self.stdout.write(f'  {label:<45} {count:>8}')
+        for label in result['missing']:
+            self.stdout.write(self.style.WARNING(f'  ⚠️  {label} : table absente de la source'))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(result['counts'].values())} ligne(s) transférée(s) dans {len(result['counts'])} table(s)"
+        ))
+
+    def _progress(self, label, count):
+        self.stdout.write(f'    {label} : {count}')
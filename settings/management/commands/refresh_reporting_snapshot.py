@@ -0,0 +1,21 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from settings.services import ReportingSnapshotService
+
+
+class Command(BaseCommand):
+    """
+    Commande de rafraîchissement de l'instantané des rapports (à planifier, ex: toutes les heures)
+    """
+    help = "Copie la base SQLite dans l'instantané lu par les rapports et exports"
+
+    def handle(self, *args, **options):
+        start = timezone.now()
+        try:
+            path = ReportingSnapshotService.refresh()
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+        elapsed = (timezone.now() - start).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f'✅ Instantané {path.name} rafraîchi en {elapsed:.1f}s'))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatabaseBackup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='Fichier')),
+                ('engine', models.CharField(max_length=20, verbose_name='Moteur')),
+                ('status', models.CharField(choices=[('RUNNING', 'En cours'), ('SUCCESS', 'Réussie'), ('FAILED', 'Échouée')], db_index=True, default='RUNNING', max_length=10)),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Taille (octets)')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='SHA-256')),
+                ('is_verified', models.BooleanField(null=True, verbose_name='Vérifiée')),
+                ('verification_message', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sauvegarde de la base',
+                'verbose_name_plural': 'Sauvegardes de la base',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
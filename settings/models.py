@@ -1,3 +1,45 @@
 from django.db import models
 
-# Create your models here.
+from authentication.models import User
+
+
+class DatabaseBackup(models.Model):
+    """
+    Sauvegarde de la base de données
+
+    Les sauvegardes SQLite sont prises avec l'API de sauvegarde en ligne (copie
+    page par page) puis compressées ; les sauvegardes PostgreSQL avec pg_dump.
+    Chaque sauvegarde est ensuite restaurée à part pour vérifier son intégrité.
+    """
+    STATUS_CHOICES = [
+        ('RUNNING', 'En cours'),
+        ('SUCCESS', 'Réussie'),
+        ('FAILED', 'Échouée'),
+    ]
+
+    file_name = models.CharField(max_length=255, blank=True, verbose_name="Fichier")
+    engine = models.CharField(max_length=20, verbose_name="Moteur")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='RUNNING', db_index=True)
+    size = models.PositiveBigIntegerField(default=0, verbose_name="Taille (octets)")
+    checksum = models.CharField(max_length=64, blank=True, verbose_name="SHA-256")
+    is_verified = models.BooleanField(null=True, verbose_name="Vérifiée")
+    verification_message = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        verbose_name = "Sauvegarde de la base"
+        verbose_name_plural = "Sauvegardes de la base"
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.file_name or 'Sauvegarde'} ({self.get_status_display()})"
+
+    @property
+    def duration(self):
+        if self.finished_at:
+            return (self.finished_at - self.started_at).total_seconds()
+        return None
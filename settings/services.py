@@ -0,0 +1,446 @@
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections, models, transaction
+from django.utils import timezone
+from contextlib import contextmanager
+from pathlib import Path
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+
+from .models import DatabaseBackup
+
+logger = logging.getLogger(__name__)
+
+
+class BackupService:
+    """
+    Service de sauvegarde de la base de données
+
+    SQLite : l'API de sauvegarde en ligne copie la base par paquets de pages en
+    relâchant le verrou entre deux paquets, les écritures (saisie des notes,
+    encaissements) ne sont donc pas bloquées pendant la sauvegarde.
+    PostgreSQL : pg_dump travaille sur un instantané MVCC, sans verrou bloquant.
+    """
+
+    DEFAULT_RETENTION = {'daily': 7, 'weekly': 4, 'monthly': 6}
+
+    @staticmethod
+    def get_backup_dir():
+        """Dossier des sauvegardes (BACKUP_DIR, par défaut backup_sqlite/)"""
+        backup_dir = Path(getattr(settings, 'BACKUP_DIR', settings.BASE_DIR / 'backup_sqlite'))
+        backup_dir.mkdir(parents=True, exist_ok=True)
+        return backup_dir
+
+    @staticmethod
+    def get_backup_path(backup):
+        return BackupService.get_backup_dir() / backup.file_name
+
+    @staticmethod
+    def create_backup(user=None, verify=True, progress=None, using='default'):
+        """
+        Sauvegarde la base, puis vérifie la sauvegarde
+
+        Args:
+            user (User, optional): Utilisateur à l'origine de la sauvegarde
+            verify (bool): Restaurer et contrôler la sauvegarde
+            progress (callable, optional): Appelé avec (pages restantes, pages totales) pour SQLite
+            using (str): Alias de la base à sauvegarder
+
+        Returns:
+            DatabaseBackup: La sauvegarde (statut SUCCESS ou FAILED)
+        """
+        connection = connections[using]
+        backup = DatabaseBackup.objects.create(engine=connection.vendor, created_by=user)
+        timestamp = timezone.localtime().strftime('%Y%m%d_%H%M%S')
+        backup_dir = BackupService.get_backup_dir()
+
+        try:
+            if connection.vendor == 'sqlite':
+                path = BackupService._backup_sqlite(
+                    connection.settings_dict['NAME'], backup_dir / f'db_backup_{timestamp}.sqlite3.gz', progress
+                )
+            elif connection.vendor == 'postgresql':
+                path = BackupService._backup_postgresql(
+                    connection.settings_dict, backup_dir / f'db_backup_{timestamp}.dump'
+                )
+            else:
+                raise ValidationError(f"Sauvegarde non prise en charge pour le moteur {connection.vendor}")
+        except Exception as e:
+            logger.exception("Échec de la sauvegarde de la base")
+            backup.status = 'FAILED'
+            backup.error = BackupService._error_message(e)
+            backup.finished_at = timezone.now()
+            backup.save(update_fields=['status', 'error', 'finished_at'])
+            return backup
+
+        backup.file_name = path.name
+        backup.size = path.stat().st_size
+        backup.checksum = BackupService._checksum(path)
+        backup.status = 'SUCCESS'
+        backup.finished_at = timezone.now()
+        backup.save(update_fields=['file_name', 'size', 'checksum', 'status', 'finished_at'])
+        logger.info(f"Sauvegarde {backup.file_name} créée ({backup.size} octets en {backup.duration:.1f}s)")
+
+        if verify:
+            BackupService.verify_backup(backup)
+        return backup
+
+    @staticmethod
+    def verify_backup(backup):
+        """
+        Restaure la sauvegarde dans un emplacement temporaire et contrôle son intégrité
+
+        Returns:
+            bool: True si la sauvegarde est exploitable
+        """
+        path = BackupService.get_backup_path(backup)
+        try:
+            if not path.exists():
+                raise ValidationError(f"Fichier introuvable : {path.name}")
+            if backup.checksum and BackupService._checksum(path) != backup.checksum:
+                raise ValidationError("Le fichier a été modifié depuis la sauvegarde (SHA-256 différent)")
+            if backup.engine == 'sqlite':
+                message = BackupService._verify_sqlite(path)
+            elif backup.engine == 'postgresql':
+                message = BackupService._verify_postgresql(path)
+            else:
+                raise ValidationError(f"Vérification non prise en charge pour le moteur {backup.engine}")
+            backup.is_verified = True
+        except Exception as e:
+            message = BackupService._error_message(e)
+            logger.error(f"Vérification de la sauvegarde {backup.file_name} échouée : {message}")
+            backup.is_verified = False
+
+        backup.verification_message = message
+        backup.verified_at = timezone.now()
+        backup.save(update_fields=['is_verified', 'verification_message', 'verified_at'])
+        return backup.is_verified
+
+    @staticmethod
+    def apply_retention(dry_run=False):
+        """
+        Supprime les sauvegardes hors du calendrier de rétention
+
+        On conserve la sauvegarde la plus récente de chacun des derniers jours,
+        semaines et mois (BACKUP_RETENTION, par défaut 7 jours, 4 semaines et
+        6 mois). Seules les sauvegardes vérifiées comptent dans le calendrier.
+
+        Returns:
+            list: Les sauvegardes supprimées (ou à supprimer si dry_run)
+        """
+        retention = {**BackupService.DEFAULT_RETENTION, **getattr(settings, 'BACKUP_RETENTION', {})}
+        backups = list(DatabaseBackup.objects.exclude(status='RUNNING').order_by('-started_at'))
+        usable = [b for b in backups if b.status == 'SUCCESS' and b.is_verified is not False]
+
+        periods = {
+            'daily': lambda moment: moment.date(),
+            'weekly': lambda moment: moment.isocalendar()[:2],
+            'monthly': lambda moment: (moment.year, moment.month),
+        }
+        keep = set()
+        for name, period_of in periods.items():
+            seen = set()
+            for backup in usable:
+                period = period_of(timezone.localtime(backup.started_at))
+                if period in seen:
+                    continue
+                if len(seen) >= retention[name]:
+                    break
+                seen.add(period)
+                keep.add(backup.pk)
+
+        expired = [b for b in backups if b.pk not in keep]
+        if dry_run:
+            return expired
+
+        for backup in expired:
+            if backup.file_name:
+                BackupService.get_backup_path(backup).unlink(missing_ok=True)
+            backup.delete()
+        if expired:
+            logger.info(f"{len(expired)} sauvegarde(s) supprimée(s) par la rétention")
+        return expired
+
+    # ---------------------------------------------------------------------
+    # SQLite
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def _connect_sqlite(name):
+        name = str(name)
+        return sqlite3.connect(name, uri=name.startswith('file:'))
+
+    @staticmethod
+    def copy_sqlite(db_name, target_path, progress=None):
+        """
+        Copie une base SQLite en ligne, par paquets de BACKUP_PAGES_PER_STEP pages
+
+        Le fichier obtenu est en journal DELETE : il peut être ouvert en lecture
+        seule sans fichiers -wal/-shm.
+        """
+        pages = getattr(settings, 'BACKUP_PAGES_PER_STEP', 256)
+        sleep = getattr(settings, 'BACKUP_STEP_SLEEP', 0.01)
+
+        source = BackupService._connect_sqlite(db_name)
+        target = sqlite3.connect(target_path)
+        try:
+            callback = (lambda status, remaining, total: progress(remaining, total)) if progress else None
+            source.backup(target, pages=pages, progress=callback, sleep=sleep)
+            target.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            target.close()
+            source.close()
+        return target_path
+
+    @staticmethod
+    def _backup_sqlite(db_name, path, progress=None):
+        raw_path = path.with_name(f'.{path.stem}.tmp')
+        BackupService.copy_sqlite(db_name, raw_path, progress)
+
+        try:
+            with open(raw_path, 'rb') as raw, gzip.open(path, 'wb', compresslevel=6) as compressed:
+                shutil.copyfileobj(raw, compressed, 1024 * 1024)
+        finally:
+            raw_path.unlink(missing_ok=True)
+        return path
+
+    @staticmethod
+    def _verify_sqlite(path):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            restored = Path(tmp_dir) / 'restored.sqlite3'
+            with gzip.open(path, 'rb') as compressed, open(restored, 'wb') as raw:
+                shutil.copyfileobj(compressed, raw, 1024 * 1024)
+
+            connection = sqlite3.connect(restored)
+            try:
+                result = [row[0] for row in connection.execute('PRAGMA integrity_check')]
+                tables = connection.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+            finally:
+                connection.close()
+
+        if result != ['ok']:
+            raise ValidationError(f"Contrôle d'intégrité en échec : {'; '.join(result[:5])}")
+        if not tables:
+            raise ValidationError("La sauvegarde restaurée ne contient aucune table")
+        return f"Restauration et contrôle d'intégrité OK ({tables} tables)"
+
+    # ---------------------------------------------------------------------
+    # PostgreSQL
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def _pg_env(settings_dict):
+        env = os.environ.copy()
+        if settings_dict.get('PASSWORD'):
+            env['PGPASSWORD'] = settings_dict['PASSWORD']
+        return env
+
+    @staticmethod
+    def _pg_args(settings_dict):
+        args = []
+        for option, key in (('--host', 'HOST'), ('--port', 'PORT'), ('--username', 'USER')):
+            if settings_dict.get(key):
+                args += [option, str(settings_dict[key])]
+        return args
+
+    @staticmethod
+    def _backup_postgresql(settings_dict, path):
+        # Format custom : compressé, et restaurable table par table
+        subprocess.run(
+            ['pg_dump', '--format=custom', '--compress=6', '--file', str(path),
+             *BackupService._pg_args(settings_dict), settings_dict['NAME']],
+            env=BackupService._pg_env(settings_dict), check=True, capture_output=True, text=True,
+        )
+        return path
+
+    @staticmethod
+    def _verify_postgresql(path):
+        """
+        Lit le sommaire de l'archive ; si BACKUP_VERIFY_DATABASE est défini, la
+        restaure entièrement dans cette base de contrôle
+        """
+        listing = subprocess.run(
+            ['pg_restore', '--list', str(path)], check=True, capture_output=True, text=True,
+        )
+        entries = sum(1 for line in listing.stdout.splitlines() if line and not line.startswith(';'))
+
+        verify_database = getattr(settings, 'BACKUP_VERIFY_DATABASE', None)
+        if not verify_database:
+            return f"Archive lisible ({entries} objets)"
+
+        settings_dict = {**connections['default'].settings_dict, 'NAME': verify_database}
+        subprocess.run(
+            ['pg_restore', '--clean', '--if-exists', '--no-owner', '--exit-on-error',
+             *BackupService._pg_args(settings_dict), '--dbname', verify_database, str(path)],
+            env=BackupService._pg_env(settings_dict), check=True, capture_output=True, text=True,
+        )
+        return f"Restauration dans {verify_database} OK ({entries} objets)"
+
+    @staticmethod
+    def _error_message(error):
+        if isinstance(error, ValidationError):
+            return ' '.join(error.messages)
+        # subprocess.CalledProcessError : le détail est sur la sortie d'erreur
+        return getattr(error, 'stderr', None) or str(error)
+
+    @staticmethod
+    def _checksum(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+class ReportingSnapshotService:
+    """
+    Instantané SQLite servant de base `reporting` (voir scolaris/routers.py)
+
+    L'instantané est copié à côté du fichier courant puis substitué par un
+    renommage atomique : les rapports en cours finissent sur l'ancien fichier.
+    """
+
+    @staticmethod
+    def refresh(progress=None, using='default'):
+        """
+        Rafraîchit l'instantané des rapports
+
+        Returns:
+            Path: Le fichier de l'instantané
+        """
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            raise ValidationError("L'instantané des rapports n'est utilisé qu'avec SQLite (utiliser une réplique sinon)")
+
+        path = Path(settings.REPORTING_SNAPSHOT_PATH)
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        tmp_path.unlink(missing_ok=True)
+        try:
+            BackupService.copy_sqlite(connection.settings_dict['NAME'], tmp_path, progress)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        logger.info(f"Instantané des rapports rafraîchi : {path}")
+        return path
+
+
+class SqliteToPostgresqlService:
+    """
+    Transfert des données de db.sqlite3 vers la base PostgreSQL configurée
+
+    La base cible doit avoir été migrée (manage.py migrate) ; ses tables sont
+    vidées puis remplies table par table par bulk_create, en conservant les
+    clés primaires, dans une seule transaction. Les clés étrangères Django
+    étant DEFERRABLE INITIALLY DEFERRED sous PostgreSQL, l'ordre des tables
+    n'a pas besoin de respecter les dépendances circulaires.
+    """
+
+    SOURCE_ALIAS = 'sqlite_source'
+
+    @staticmethod
+    def get_models():
+        """Modèles à transférer, tables M2M auto-créées comprises"""
+        app_list = [(app_config, None) for app_config in apps.get_app_configs()]
+        concrete = [
+            model for model in serializers.sort_dependencies(app_list, allow_cycles=True)
+            if model._meta.managed and not model._meta.proxy
+        ]
+        through = [
+            field.remote_field.through
+            for model in concrete
+            for field in model._meta.local_many_to_many
+            if field.remote_field.through._meta.auto_created
+        ]
+        return concrete + through
+
+    @staticmethod
+    @contextmanager
+    def _preserve_timestamps(model_list):
+        """Désactive auto_now/auto_now_add : bulk_create écraserait les dates d'origine"""
+        fields = [
+            (field, field.auto_now, field.auto_now_add)
+            for model in model_list
+            for field in model._meta.local_fields
+            if isinstance(field, models.DateField) and (field.auto_now or field.auto_now_add)
+        ]
+        for field, _, _ in fields:
+            field.auto_now = field.auto_now_add = False
+        try:
+            yield
+        finally:
+            for field, auto_now, auto_now_add in fields:
+                field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+    @staticmethod
+    def copy_database(source_path, using='default', batch_size=2000, progress=None):
+        """
+        Copie toutes les tables de `source_path` (SQLite) vers la base `using`
+
+        Args:
+            source_path (str): Chemin du fichier SQLite source
+            using (str): Alias de la base PostgreSQL cible
+            batch_size (int): Nombre de lignes par INSERT
+            progress (callable, optional): Appelé avec (modèle, lignes copiées)
+
+        Returns:
+            dict: {"app_label.Model": nombre de lignes} et la liste des tables absentes de la source
+        """
+        from scolaris.db import register_sqlite_database
+
+        target = connections[using]
+        if target.vendor != 'postgresql':
+            raise ValidationError(f"La base cible doit être PostgreSQL (moteur actuel : {target.vendor})")
+        if not Path(source_path).exists():
+            raise ValidationError(f"Fichier SQLite introuvable : {source_path}")
+
+        source = register_sqlite_database(SqliteToPostgresqlService.SOURCE_ALIAS, str(source_path))
+        source_tables = set(source.introspection.table_names())
+        model_list = SqliteToPostgresqlService.get_models()
+
+        counts = {}
+        missing = []
+        with transaction.atomic(using=using), SqliteToPostgresqlService._preserve_timestamps(model_list):
+            with target.cursor() as cursor:
+                # Les tables remplies par migrate (contenttypes, permissions) sont
+                # remplacées par celles de la source pour garder les mêmes ids
+                tables = [model._meta.db_table for model in model_list]
+                for sql in target.ops.sql_flush(no_style(), tables, allow_cascade=True):
+                    cursor.execute(sql)
+                cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+            for model in model_list:
+                label = model._meta.label
+                if model._meta.db_table not in source_tables:
+                    missing.append(label)
+                    continue
+
+                queryset = model._base_manager.using(SqliteToPostgresqlService.SOURCE_ALIAS).order_by('pk')
+                copied = 0
+                last_pk = None
+                while True:
+                    batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                    rows = list(batch[:batch_size])
+                    if not rows:
+                        break
+                    model._base_manager.using(using).bulk_create(rows, batch_size=batch_size)
+                    last_pk = rows[-1].pk
+                    copied += len(rows)
+                    if progress:
+                        progress(label, copied)
+                counts[label] = copied
+
+            with target.cursor() as cursor:
+                for sql in target.ops.sequence_reset_sql(no_style(), model_list):
+                    cursor.execute(sql)
+
+        logger.info(f"{sum(counts.values())} ligne(s) transférée(s) depuis {source_path}")
+        return {'counts': counts, 'missing': missing}
@@ -1,3 +1,70 @@
-from django.test import TestCase
+import sqlite3
+import tempfile
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from scolaris.routers import ReportingRouter, reporting_view
+from .models import DatabaseBackup
+from .services import BackupService, ReportingSnapshotService
+
+
+class BackupServiceTestCase(TransactionTestCase):
+    """Tests des sauvegardes de la base"""
+
+    def setUp(self):
+        self.backup_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(BACKUP_DIR=self.backup_dir.name)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        self.backup_dir.cleanup()
+
+    def test_backup_is_compressed_and_verified(self):
+        backup = BackupService.create_backup()
+        self.assertEqual(backup.status, 'SUCCESS', backup.error)
+        self.assertTrue(backup.file_name.endswith('.sqlite3.gz'))
+        self.assertTrue(backup.is_verified, backup.verification_message)
+
+        # Un fichier altéré est détecté
+        with open(BackupService.get_backup_path(backup), 'ab') as f:
+            f.write(b'corrompu')
+        self.assertFalse(BackupService.verify_backup(backup))
+
+    def test_retention_keeps_one_backup_per_period(self):
+        now = timezone.now()
+        for days in range(0, 20):
+            for hours in (0, 1):
+                backup = DatabaseBackup.objects.create(engine='sqlite', status='SUCCESS', is_verified=True)
+                DatabaseBackup.objects.filter(pk=backup.pk).update(started_at=now - timedelta(days=days, hours=hours))
+
+        with override_settings(BACKUP_RETENTION={'daily': 3, 'weekly': 0, 'monthly': 0}):
+            BackupService.apply_retention()
+        self.assertEqual(DatabaseBackup.objects.count(), 3)
+
+
+class ReportingSnapshotTestCase(TransactionTestCase):
+    """Tests de l'instantané des rapports"""
+
+    def test_refresh_and_reporting_view(self):
+        DatabaseBackup.objects.create(engine='sqlite', status='SUCCESS')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'reporting.sqlite3'
+            with override_settings(REPORTING_SNAPSHOT_PATH=path):
+                ReportingSnapshotService.refresh()
+                with sqlite3.connect(path) as snapshot:
+                    self.assertEqual(snapshot.execute('SELECT COUNT(*) FROM settings_databasebackup').fetchone()[0], 1)
+
+                @reporting_view
+                def view(request):
+                    return HttpResponse(ReportingRouter().db_for_read(DatabaseBackup))
+
+                request = RequestFactory().get('/')
+                response = view(request)
+                self.assertEqual(response.content, b'reporting')
+                self.assertIsNotNone(request.reporting_as_of)
+                self.assertIsNone(ReportingRouter().db_for_read(DatabaseBackup))
@@ -131,10 +131,10 @@ def reset_sequence(request, sequence_id):
 
 @login_required
 def generate_test_matricule(request, sequence_id):
-    """Générer un matricule de test pour une séquence"""
+    """Générer un matricule de test pour une séquence (sans consommer de numéro)"""
     try:
         sequence = get_object_or_404(MatriculeSequence, id=sequence_id)
-        test_matricule = sequence.generate_matricule()
+        test_matricule = sequence.preview_matricule()
         
         return JsonResponse({
             'success': True,
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
+
+    def ready(self):
+        """Invalidation du cache des onglets des fiches (scolaris/fragments.py)"""
+        import students.signals
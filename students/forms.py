@@ -1,5 +1,6 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from .models import Student, Guardian
 from school.services import MatriculeService
 from classes.models import SchoolClass
@@ -43,7 +44,8 @@ class StudentForm(forms.ModelForm):
         
         # Si c'est un nouveau student, pré-remplir le matricule si génération automatique
         if not self.instance.pk:
-            auto_matricule = MatriculeService.generate_matricule('STUDENT')
+            # Simple aperçu : le numéro n'est réservé qu'à l'enregistrement
+            auto_matricule = MatriculeService.preview_matricule('STUDENT')
             if auto_matricule:
                 self.fields['matricule'].initial = auto_matricule
                 self.fields['matricule'].widget.attrs['readonly'] = True
@@ -51,11 +53,14 @@ class StudentForm(forms.ModelForm):
 
     def clean_matricule(self):
         matricule = self.cleaned_data.get('matricule')
-        if not matricule:
-            # Générer automatiquement si vide
-            matricule = MatriculeService.generate_matricule('STUDENT')
-            if not matricule:
+        self.generate_matricule = False
+        if not matricule or self.fields['matricule'].widget.attrs.get('readonly'):
+            # Génération automatique si vide ou si l'aperçu a été affiché : le numéro
+            # n'est réservé qu'à l'enregistrement (save), pas à chaque validation
+            if not MatriculeService.preview_matricule('STUDENT'):
                 raise ValidationError("Le matricule est obligatoire quand la génération automatique est désactivée.")
+            self.generate_matricule = True
+            return ''
         
         # Vérifier l'unicité
         if matricule:
@@ -77,9 +82,20 @@ class StudentForm(forms.ModelForm):
                 student.year = current_year
         
         if commit:
-            student.save()
+            with transaction.atomic():
+                self._reserve_matricule(student)
+                student.save()
+        else:
+            self._reserve_matricule(student)
         return student
 
+    def _reserve_matricule(self, student):
+        """Réserve le matricule généré, dans la transaction de l'insertion si commit=True"""
+        if getattr(self, 'generate_matricule', False) and not student.matricule:
+            student.matricule = MatriculeService.generate_matricule('STUDENT')
+            if not student.matricule:
+                raise ValidationError("Le matricule est obligatoire quand la génération automatique est désactivée.")
+
 
 class GuardianForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,34 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from school.models import SchoolYear
+from students.services import RiskScoringService
+
+
+class Command(BaseCommand):
+    """
+    Commande de calcul des scores de risque des élèves (à planifier chaque nuit)
+    """
+    help = "Calcule les scores de risque de décrochage des élèves actifs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=str, help="Année scolaire (ex: 2024-2025), l'année en cours par défaut")
+        parser.add_argument('--full', action='store_true', help="Recalcule tous les élèves, pas seulement ceux dont les données ont changé")
+
+    def handle(self, *args, **options):
+        year = None
+        if options['year']:
+            year = SchoolYear.objects.filter(annee=options['year']).first()
+            if year is None:
+                raise CommandError(f"Année scolaire {options['year']} introuvable")
+
+        start = timezone.now()
+        try:
+            result = RiskScoringService.compute(year=year, full=options['full'])
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+        elapsed = (timezone.now() - start).total_seconds()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['computed']} score(s) recalculé(s), {result['removed']} supprimé(s) en {elapsed:.1f}s"
+        ))
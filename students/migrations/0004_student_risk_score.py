@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_schoolclass_name_en_schoolclass_name_fr'),
+        ('students', '0003_alter_student_matricule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(default=0, verbose_name='Score de risque')),
+                ('level', models.CharField(choices=[('LOW', 'Faible'), ('MEDIUM', 'Modéré'), ('HIGH', 'Élevé')], default='LOW', max_length=6, verbose_name='Niveau')),
+                ('grades_risk', models.PositiveSmallIntegerField(default=0, verbose_name='Notes')),
+                ('attendance_risk', models.PositiveSmallIntegerField(default=0, verbose_name='Absences')),
+                ('discipline_risk', models.PositiveSmallIntegerField(default=0, verbose_name='Discipline')),
+                ('lessons_risk', models.PositiveSmallIntegerField(default=0, verbose_name='Suivi des leçons')),
+                ('payments_risk', models.PositiveSmallIntegerField(default=0, verbose_name='Paiements')),
+                ('grade_average', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='Moyenne des notes')),
+                ('absences', models.PositiveIntegerField(default=0, verbose_name='Absences')),
+                ('sanctions', models.PositiveIntegerField(default=0, verbose_name='Sanctions')),
+                ('overdue_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Montant en retard')),
+                ('computed_at', models.DateTimeField(verbose_name='À jour au')),
+                ('school_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='risk_scores', to='classes.schoolclass')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk_score', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Score de risque',
+                'verbose_name_plural': 'Scores de risque',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['school_class', '-score'], name='students_st_school__150b3a_idx')],
+            },
+        ),
+    ]
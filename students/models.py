@@ -248,4 +248,47 @@ class Sanction(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.sanction_type} - {self.student}"
\ No newline at end of file
+        return f"{self.sanction_type} - {self.student}"
+# -------------------- DÉTECTION DU DÉCROCHAGE --------------------
+
+class StudentRiskScore(models.Model):
+    """
+    Score de risque (0 à 100) d'un élève actif, calculé chaque nuit par
+    compute_risk_scores (students.services.RiskScoringService)
+
+    Chaque composante (0 à 100) correspond à une source : notes, absences,
+    sanctions, suivi des leçons et retards de paiement.
+    """
+    LEVEL_CHOICES = [
+        ('LOW', 'Faible'),
+        ('MEDIUM', 'Modéré'),
+        ('HIGH', 'Élevé'),
+    ]
+
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='risk_score')
+    school_class = models.ForeignKey(
+        'classes.SchoolClass', on_delete=models.SET_NULL, null=True, blank=True, related_name='risk_scores'
+    )
+    score = models.PositiveSmallIntegerField(default=0, verbose_name="Score de risque")
+    level = models.CharField(max_length=6, choices=LEVEL_CHOICES, default='LOW', verbose_name="Niveau")
+    grades_risk = models.PositiveSmallIntegerField(default=0, verbose_name="Notes")
+    attendance_risk = models.PositiveSmallIntegerField(default=0, verbose_name="Absences")
+    discipline_risk = models.PositiveSmallIntegerField(default=0, verbose_name="Discipline")
+    lessons_risk = models.PositiveSmallIntegerField(default=0, verbose_name="Suivi des leçons")
+    payments_risk = models.PositiveSmallIntegerField(default=0, verbose_name="Paiements")
+    grade_average = models.DecimalField(
+        max_digits=4, decimal_places=2, null=True, blank=True, verbose_name="Moyenne des notes"
+    )
+    absences = models.PositiveIntegerField(default=0, verbose_name="Absences")
+    sanctions = models.PositiveIntegerField(default=0, verbose_name="Sanctions")
+    overdue_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Montant en retard")
+    computed_at = models.DateTimeField(verbose_name="À jour au")
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [models.Index(fields=['school_class', '-score'])]
+        verbose_name = "Score de risque"
+        verbose_name_plural = "Scores de risque"
+
+    def __str__(self):
+        return f"{self.student} - {self.score}/100 ({self.get_level_display()})"
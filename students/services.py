@@ -0,0 +1,741 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.text import slugify
+from datetime import date, datetime
+import csv
+import io
+import logging
+import zipfile
+
+from school.models import SchoolYear, School, MatriculeSequence
+from school.services import MatriculeService
+from classes.models import SchoolClass
+from .models import Student, StudentClassHistory, Guardian
+
+logger = logging.getLogger(__name__)
+
+
+class StudentImportService:
+    """
+    Service d'inscription des élèves en masse à partir d'un fichier CSV ou XLSX
+
+    Le fichier est entièrement validé avant toute écriture. Les matricules manquants
+    sont réservés en un seul bloc et les élèves, historiques de classe, responsables
+    et relations parents sont insérés par `bulk_create`. La création des comptes
+    parents (hachage du mot de passe, email) est différée via des
+    `ParentAccountRequest` traitées par la commande `process_parent_account_requests`.
+    """
+
+    # Nom de colonne normalisé -> champ interne
+    COLUMN_ALIASES = {
+        'matricule': 'matricule',
+        'nom': 'last_name',
+        'last_name': 'last_name',
+        'prenom': 'first_name',
+        'prenoms': 'first_name',
+        'first_name': 'first_name',
+        'date_naissance': 'birth_date',
+        'date_de_naissance': 'birth_date',
+        'birth_date': 'birth_date',
+        'lieu_naissance': 'birth_place',
+        'lieu_de_naissance': 'birth_place',
+        'birth_place': 'birth_place',
+        'sexe': 'gender',
+        'genre': 'gender',
+        'gender': 'gender',
+        'nationalite': 'nationality',
+        'nationality': 'nationality',
+        'adresse': 'address',
+        'address': 'address',
+        'telephone': 'phone',
+        'phone': 'phone',
+        'classe': 'class_name',
+        'class': 'class_name',
+        'redoublant': 'is_repeating',
+        'tuteur_nom': 'guardian_name',
+        'parent_nom': 'guardian_name',
+        'tuteur_relation': 'guardian_relation',
+        'parent_relation': 'guardian_relation',
+        'tuteur_telephone': 'guardian_phone',
+        'parent_telephone': 'guardian_phone',
+        'tuteur_email': 'guardian_email',
+        'parent_email': 'guardian_email',
+        'tuteur_profession': 'guardian_profession',
+        'parent_profession': 'guardian_profession',
+    }
+    REQUIRED_FIELDS = ['last_name', 'first_name', 'birth_date', 'birth_place', 'gender']
+    DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y']
+    TRUE_VALUES = {'1', 'oui', 'o', 'yes', 'true', 'vrai', 'x'}
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def read_file(uploaded_file):
+        """
+        Lit un fichier CSV ou XLSX et retourne une liste de dictionnaires
+        (une entrée par ligne, clés normalisées selon COLUMN_ALIASES)
+        """
+        name = (getattr(uploaded_file, 'name', '') or '').lower()
+        if name.endswith('.xlsx'):
+            reader, file_type = StudentImportService._read_xlsx, 'XLSX'
+        elif name.endswith('.csv'):
+            reader, file_type = StudentImportService._read_csv, 'CSV'
+        else:
+            raise ValidationError("Format de fichier non supporté (CSV ou XLSX attendu).")
+
+        from openpyxl.utils.exceptions import InvalidFileException
+        try:
+            raw_rows = reader(uploaded_file)
+            header = next(raw_rows, None)
+            if not header:
+                raise ValidationError("Le fichier est vide.")
+
+            columns = [
+                StudentImportService.COLUMN_ALIASES.get(slugify(str(title or '')).replace('-', '_'))
+                for title in header
+            ]
+            missing = [field for field in StudentImportService.REQUIRED_FIELDS if field not in columns]
+            if missing:
+                raise ValidationError(f"Colonnes obligatoires manquantes: {', '.join(missing)}")
+
+            rows = []
+            for values in raw_rows:
+                if not any(value not in (None, '') for value in values):
+                    continue
+                rows.append({
+                    column: value
+                    for column, value in zip(columns, values)
+                    if column
+                })
+        except (csv.Error, zipfile.BadZipFile, InvalidFileException, KeyError, ValueError, OSError) as e:
+            # Fichier corrompu ou mal enregistré (archive XLSX invalide, CSV mal formé...)
+            logger.warning("Lecture du fichier d'import %s impossible: %s", name, e)
+            raise ValidationError(
+                f"Le fichier {file_type} est illisible ou corrompu. "
+                f"Enregistrez-le à nouveau depuis votre tableur puis réessayez."
+            )
+        return rows
+
+    @staticmethod
+    def _read_csv(uploaded_file):
+        content = uploaded_file.read()
+        if isinstance(content, bytes):
+            try:
+                content = content.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                # Export CSV par défaut d'Excel en français
+                content = content.decode('cp1252', errors='replace')
+        try:
+            dialect = csv.Sniffer().sniff(content[:2048], delimiters=',;\t')
+        except csv.Error:
+            raise ValidationError("Séparateur du fichier CSV non reconnu (virgule, point-virgule ou tabulation attendu).")
+        return iter(csv.reader(io.StringIO(content), dialect))
+
+    @staticmethod
+    def _read_xlsx(uploaded_file):
+        import openpyxl
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        return workbook.active.iter_rows(values_only=True)
+
+    @staticmethod
+    def _clean_text(value):
+        if value is None:
+            return ''
+        return str(value).strip()
+
+    @staticmethod
+    def _parse_date(value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        value = StudentImportService._clean_text(value)
+        for date_format in StudentImportService.DATE_FORMATS:
+            try:
+                return datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        raise ValidationError(f"Date invalide: '{value}'")
+
+    @staticmethod
+    def _parse_gender(value):
+        value = StudentImportService._clean_text(value).upper()
+        if value in ('M', 'MASCULIN', 'G', 'GARÇON', 'GARCON'):
+            return 'M'
+        if value in ('F', 'FÉMININ', 'FEMININ', 'FILLE'):
+            return 'F'
+        raise ValidationError(f"Sexe invalide: '{value}' (M ou F attendu)")
+
+    @staticmethod
+    def validate_rows(rows, year):
+        """
+        Valide toutes les lignes du fichier sans rien écrire en base
+
+        Args:
+            rows (list): Lignes retournées par read_file
+            year (SchoolYear): Année d'inscription
+
+        Returns:
+            tuple: (lignes nettoyées, liste d'erreurs (numéro de ligne, message))
+        """
+        classes = {
+            school_class.name.strip().lower(): school_class
+            for school_class in SchoolClass.objects.filter(year=year, is_active=True)
+        }
+        file_matricules = [
+            StudentImportService._clean_text(row.get('matricule'))
+            for row in rows
+            if StudentImportService._clean_text(row.get('matricule'))
+        ]
+        existing_matricules = set(
+            Student.objects.filter(matricule__in=file_matricules).values_list('matricule', flat=True)
+        )
+
+        cleaned_rows = []
+        errors = []
+        seen_matricules = set()
+        for line_number, row in enumerate(rows, start=2):
+            try:
+                cleaned = StudentImportService._validate_row(row, classes)
+            except ValidationError as e:
+                errors.append((line_number, '; '.join(e.messages)))
+                continue
+
+            matricule = cleaned['matricule']
+            if matricule:
+                if matricule in existing_matricules:
+                    errors.append((line_number, f"Le matricule '{matricule}' existe déjà"))
+                    continue
+                if matricule in seen_matricules:
+                    errors.append((line_number, f"Le matricule '{matricule}' apparaît plusieurs fois dans le fichier"))
+                    continue
+                seen_matricules.add(matricule)
+            cleaned['line'] = line_number
+            cleaned_rows.append(cleaned)
+
+        if any(not row['matricule'] for row in cleaned_rows):
+            sequence = MatriculeSequence.objects.filter(sequence_type='STUDENT').first()
+            if sequence and not sequence.auto_generation:
+                errors.append((0, "Des matricules sont manquants alors que la génération automatique est désactivée"))
+
+        return cleaned_rows, errors
+
+    @staticmethod
+    def _validate_row(row, classes):
+        """Valide et convertit une ligne du fichier"""
+        messages = []
+        for field in StudentImportService.REQUIRED_FIELDS:
+            if not StudentImportService._clean_text(row.get(field)):
+                messages.append(f"Champ obligatoire manquant: {field}")
+        if messages:
+            raise ValidationError(messages)
+
+        cleaned = {
+            'matricule': StudentImportService._clean_text(row.get('matricule')),
+            'last_name': StudentImportService._clean_text(row.get('last_name')),
+            'first_name': StudentImportService._clean_text(row.get('first_name')),
+            'birth_place': StudentImportService._clean_text(row.get('birth_place')),
+            'nationality': StudentImportService._clean_text(row.get('nationality')) or 'Camerounaise',
+            'address': StudentImportService._clean_text(row.get('address')),
+            'phone': StudentImportService._clean_text(row.get('phone')),
+            'is_repeating': StudentImportService._clean_text(row.get('is_repeating')).lower() in StudentImportService.TRUE_VALUES,
+            'school_class': None,
+            'guardian': None,
+        }
+        try:
+            cleaned['birth_date'] = StudentImportService._parse_date(row.get('birth_date'))
+        except ValidationError as e:
+            messages.extend(e.messages)
+        try:
+            cleaned['gender'] = StudentImportService._parse_gender(row.get('gender'))
+        except ValidationError as e:
+            messages.extend(e.messages)
+
+        class_name = StudentImportService._clean_text(row.get('class_name'))
+        if class_name:
+            cleaned['school_class'] = classes.get(class_name.lower())
+            if not cleaned['school_class']:
+                messages.append(f"Classe inconnue pour l'année: '{class_name}'")
+
+        guardian_name = StudentImportService._clean_text(row.get('guardian_name'))
+        if guardian_name:
+            guardian_phone = StudentImportService._clean_text(row.get('guardian_phone'))
+            if not guardian_phone:
+                messages.append("Le téléphone du responsable est obligatoire")
+            cleaned['guardian'] = {
+                'name': guardian_name,
+                'relation': StudentImportService._clean_text(row.get('guardian_relation')) or 'Tuteur',
+                'phone': guardian_phone,
+                'email': StudentImportService._clean_text(row.get('guardian_email')).lower() or None,
+                'profession': StudentImportService._clean_text(row.get('guardian_profession')),
+            }
+
+        messages.extend(StudentImportService._check_fields(Student, cleaned, (
+            'matricule', 'last_name', 'first_name', 'birth_place', 'nationality', 'address', 'phone',
+        )))
+        if cleaned['guardian']:
+            messages.extend(StudentImportService._check_fields(Guardian, cleaned['guardian'], (
+                'name', 'relation', 'phone', 'email', 'profession',
+            ), prefix='guardian_'))
+
+        if messages:
+            raise ValidationError(messages)
+        return cleaned
+
+    @staticmethod
+    def _check_fields(model, values, field_names, prefix=''):
+        """
+        Contrôle des valeurs par les champs du modèle (longueur, format des emails)
+
+        Sans ce contrôle, SQLite accepte une valeur trop longue et PostgreSQL fait
+        échouer tout l'import (DataError) : l'erreur est rattachée à la ligne.
+        """
+        messages = []
+        for name in field_names:
+            value = values.get(name)
+            if not value:
+                continue
+            try:
+                model._meta.get_field(name).clean(value, None)
+            except ValidationError as e:
+                messages.extend(f"{prefix}{name}: {message}" for message in e.messages)
+        return messages
+
+    @staticmethod
+    def _reserve_free_matricules(count, taken):
+        """
+        Réserve `count` matricules générés absents du fichier et de la base
+
+        Un numéro déjà utilisé (saisi dans le fichier ou à la main) est sauté :
+        l'insertion groupée ne peut pas échouer sur l'unicité du matricule.
+        """
+        free = []
+        while len(free) < count:
+            matricules = MatriculeService.reserve_matricules('STUDENT', count - len(free))
+            if matricules is None:
+                raise ValidationError("La génération automatique des matricules est désactivée.")
+            used = set(taken) | set(
+                Student.objects.filter(matricule__in=matricules).values_list('matricule', flat=True)
+            )
+            free.extend(matricule for matricule in matricules if matricule not in used)
+        return free
+
+    @staticmethod
+    def import_rows(cleaned_rows, year, school, user=None):
+        """
+        Inscrit les élèves validés en une seule transaction
+
+        Args:
+            cleaned_rows (list): Lignes retournées par validate_rows
+            year (SchoolYear): Année d'inscription
+            school (School): Établissement
+            user (User, optional): Utilisateur à l'origine de l'import
+
+        Returns:
+            dict: Statistiques de l'import
+        """
+        from parents_portal.models import ParentUser, ParentStudentRelation
+        from parents_portal.services import ParentPortalService
+        from parents_portal.sync import touch
+        from scolaris.fragments import bump_version
+
+        batch_size = StudentImportService.BATCH_SIZE
+        with transaction.atomic():
+            missing = [row for row in cleaned_rows if not row['matricule']]
+            if missing:
+                matricules = StudentImportService._reserve_free_matricules(
+                    len(missing), {row['matricule'] for row in cleaned_rows if row['matricule']}
+                )
+                for row, matricule in zip(missing, matricules):
+                    row['matricule'] = matricule
+
+            students = Student.objects.bulk_create([
+                Student(
+                    matricule=row['matricule'],
+                    first_name=row['first_name'],
+                    last_name=row['last_name'],
+                    birth_date=row['birth_date'],
+                    birth_place=row['birth_place'],
+                    gender=row['gender'],
+                    nationality=row['nationality'],
+                    address=row['address'],
+                    phone=row['phone'],
+                    current_class=row['school_class'],
+                    is_repeating=row['is_repeating'],
+                    year=year,
+                    school=school,
+                    created_by=user,
+                    updated_by=user,
+                )
+                for row in cleaned_rows
+            ], batch_size=batch_size)
+
+            StudentClassHistory.objects.bulk_create([
+                StudentClassHistory(
+                    student=student,
+                    school_class=row['school_class'],
+                    year=year,
+                    is_repeating=row['is_repeating'],
+                )
+                for student, row in zip(students, cleaned_rows)
+                if row['school_class']
+            ], batch_size=batch_size)
+
+            guardian_emails = {row['guardian']['email'] for row in cleaned_rows if row['guardian'] and row['guardian']['email']}
+            # Emails du fichier en minuscules : comparaison insensible à la casse avec les comptes
+            parents_by_email = {}
+            for parent in ParentUser.objects.annotate(email_lower=Lower('email')).filter(
+                email_lower__in=guardian_emails
+            ).order_by('pk'):
+                parents_by_email.setdefault(parent.email_lower, parent)
+            guardians = Guardian.objects.bulk_create([
+                Guardian(
+                    student=student,
+                    parent_user=parents_by_email.get(row['guardian']['email']),
+                    **row['guardian']
+                )
+                for student, row in zip(students, cleaned_rows)
+                if row['guardian']
+            ], batch_size=batch_size)
+
+            # Responsables déjà titulaires d'un compte : simple rattachement
+            ParentStudentRelation.objects.bulk_create([
+                ParentStudentRelation(
+                    parent_user=guardian.parent_user,
+                    student=guardian.student,
+                    relation_type=ParentPortalService.get_relation_type(guardian.relation),
+                )
+                for guardian in guardians
+                if guardian.parent_user
+            ], batch_size=batch_size, ignore_conflicts=True)
+            # Insertion sans signaux : listes d'enfants de l'API du portail parents, onglets des
+            # classes concernées et charges des enseignants à recharger
+            touch('children')
+            bump_version('class', *{row['school_class'].pk for row in cleaned_rows if row['school_class']})
+            bump_version('workload', year.pk)
+
+            # Nouveaux responsables : création des comptes différée
+            queued = ParentPortalService.queue_account_requests(guardians, source='IMPORT')
+
+        logger.info(
+            f"Import de {len(students)} élève(s), {len(guardians)} responsable(s), "
+            f"{queued} compte(s) parent en attente"
+        )
+        return {
+            'students': len(students),
+            'guardians': len(guardians),
+            'linked_parents': sum(1 for guardian in guardians if guardian.parent_user),
+            'queued_accounts': queued,
+            'generated_matricules': len(missing),
+        }
+
+    @staticmethod
+    def import_file(uploaded_file, year=None, school=None, user=None, dry_run=False):
+        """
+        Valide puis importe un fichier d'élèves
+
+        Returns:
+            dict: Rapport contenant les erreurs de validation et, si l'import a eu lieu,
+            ses statistiques
+        """
+        year = year or SchoolYear.get_active_year()
+        if not year:
+            raise ValidationError("Aucune année scolaire active trouvée")
+        school = school or School.objects.filter(is_active=True).first()
+        if not school:
+            raise ValidationError("Aucune école n'est configurée dans le système.")
+
+        rows = StudentImportService.read_file(uploaded_file)
+        cleaned_rows, errors = StudentImportService.validate_rows(rows, year)
+        report = {
+            'total_rows': len(rows),
+            'valid_rows': len(cleaned_rows),
+            'errors': errors,
+            'imported': False,
+            'stats': None,
+        }
+        if errors or dry_run or not cleaned_rows:
+            return report
+
+        report['stats'] = StudentImportService.import_rows(cleaned_rows, year, school, user=user)
+        report['imported'] = True
+        return report
+
+
+class RiskScoringService:
+    """
+    Détection précoce des élèves en difficulté
+
+    Le score (0 à 100) combine cinq composantes, chacune ramenée entre 0 et 1 :
+    - notes : écart de la moyenne (sur 20) à la moyenne de passage
+    - absences : taux d'absence, plafonné à ABSENCE_RATE_MAX
+    - discipline : nombre de sanctions de l'année, plafonné à SANCTIONS_MAX
+    - leçons : part des suivis de leçon nécessitant une attention
+      (LessonProgress.needs_attention)
+    - paiements : part des tranches échues restant impayée
+
+    Chaque source est lue en une requête groupée par élève ; les composantes
+    sont ensuite calculées sur des tableaux NumPy alignés sur les élèves.
+    Hors recalcul complet, seuls les élèves dont une donnée a changé depuis le
+    dernier passage (ou dont une échéance est tombée entre-temps) sont recalculés.
+    """
+
+    WEIGHTS = {'grades': 35, 'attendance': 20, 'discipline': 15, 'lessons': 15, 'payments': 15}
+    PASS_AVERAGE = 10
+    ABSENCE_RATE_MAX = 0.2
+    SANCTIONS_MAX = 3
+    MEDIUM_THRESHOLD = 35
+    HIGH_THRESHOLD = 60
+
+    @staticmethod
+    def get_weights():
+        """Pondération des composantes (settings.RISK_WEIGHTS pour la modifier)"""
+        return {**RiskScoringService.WEIGHTS, **getattr(settings, 'RISK_WEIGHTS', {})}
+
+    @staticmethod
+    def get_changed_student_ids(year, since):
+        """
+        Élèves dont une donnée du score a changé depuis `since`
+
+        Les suppressions ne laissent pas de trace : elles sont prises en compte
+        au prochain recalcul complet (compute_risk_scores --full).
+        """
+        from finances.models import FeeDiscount, FeeTranche, Moratorium, TranchePayment
+        from notes.models import StudentGrade
+        from subjects.models import LessonProgress
+        from .models import Attendance, Sanction
+
+        today = timezone.localdate()
+        sources = [
+            StudentGrade.objects.filter(updated_at__gt=since),
+            Attendance.objects.filter(updated_at__gt=since),
+            Sanction.objects.filter(updated_at__gt=since),
+            LessonProgress.objects.filter(updated_at__gt=since),
+            TranchePayment.objects.filter(created_at__gt=since),
+            FeeDiscount.objects.filter(granted_at__gte=since.date()),
+            Moratorium.objects.filter(Q(approved_at__gt=since) | Q(new_due_date__gte=since.date(), new_due_date__lt=today)),
+        ]
+        changed = set(Student.objects.filter(year=year, updated_at__gt=since).values_list('pk', flat=True))
+        for queryset in sources:
+            changed.update(queryset.values_list('student_id', flat=True).distinct().order_by())
+
+        # Tranches arrivées à échéance depuis le dernier passage
+        class_ids = FeeTranche.objects.filter(
+            fee_structure__year=year, due_date__gte=since.date(), due_date__lt=today
+        ).values('fee_structure__school_class_id')
+        changed.update(Student.objects.filter(current_class_id__in=class_ids).values_list('pk', flat=True))
+        return changed
+
+    @staticmethod
+    def _align(student_ids, rows, default=0.0):
+        """Valeurs [(student_id, valeur), ...] rangées dans l'ordre de `student_ids` (trié)"""
+        import numpy as np
+
+        values = np.full(len(student_ids), default, dtype=float)
+        if rows:
+            keys, data = zip(*rows)
+            positions = np.searchsorted(student_ids, keys)
+            values[positions] = np.array(data, dtype=float)
+        return values
+
+    @staticmethod
+    def compute_components(students, year):
+        """
+        Composantes du risque d'un ensemble d'élèves
+
+        Args:
+            students (QuerySet): Élèves à évaluer
+            year (SchoolYear): Année scolaire
+
+        Returns:
+            dict: Tableaux alignés sur 'student_ids' (triés) : 'class_ids',
+            'grade_average' (NaN sans note), 'absences', 'sanctions',
+            'overdue_amount' et les composantes 'grades', 'attendance',
+            'discipline', 'lessons', 'payments' (entre 0 et 1)
+        """
+        import numpy as np
+        from django.db.models import Avg, Count, ExpressionWrapper, F, FloatField, Sum
+        from finances.models import FeeDiscount, FeeTranche, Moratorium, TranchePayment
+        from notes.models import StudentGrade
+        from subjects.models import LessonProgress
+        from .models import Attendance, Sanction
+
+        align = RiskScoringService._align
+        today = timezone.localdate()
+        rows = sorted(students.values_list('pk', 'current_class_id').order_by())
+        student_ids = np.array([pk for pk, _class_id in rows], dtype=int)
+        class_ids = np.array([class_id or 0 for _pk, class_id in rows], dtype=int)
+
+        # Notes (ramenées sur 20)
+        on_twenty = ExpressionWrapper(F('score') * 20 / F('evaluation__max_score'), output_field=FloatField())
+        grade_average = align(student_ids, list(
+            StudentGrade.objects.filter(student__in=students, evaluation__trimester__year=year)
+            .values('student_id').annotate(average=Avg(on_twenty)).values_list('student_id', 'average').order_by()
+        ), default=np.nan)
+
+        # Absences
+        attendance = list(
+            Attendance.objects.filter(student__in=students, year=year).values('student_id')
+            .annotate(total=Count('id'), absent=Count('id', filter=Q(present=False)))
+            .values_list('student_id', 'total', 'absent').order_by()
+        )
+        recorded = align(student_ids, [(pk, total) for pk, total, _absent in attendance])
+        absences = align(student_ids, [(pk, absent) for pk, _total, absent in attendance])
+
+        sanctions = align(student_ids, list(
+            Sanction.objects.filter(student__in=students, year=year).values('student_id')
+            .annotate(total=Count('id')).values_list('student_id', 'total').order_by()
+        ))
+
+        # Suivi des leçons (mêmes critères que LessonProgress.needs_attention)
+        needs_attention = Q(understanding_level__lte=2) | Q(participation__lte=2) | Q(homework_completed=False)
+        lessons = list(
+            LessonProgress.objects.filter(
+                student__in=students, lesson__learning_unit__subject_program__school_year=year
+            ).values('student_id')
+            .annotate(total=Count('id'), attention=Count('id', filter=needs_attention))
+            .values_list('student_id', 'total', 'attention').order_by()
+        )
+        followed = align(student_ids, [(pk, total) for pk, total, _attention in lessons])
+        attention = align(student_ids, [(pk, count) for pk, _total, count in lessons])
+
+        # Tranches échues de la classe de l'élève, moins paiements, remises et moratoires en cours
+        due_by_class = dict(
+            FeeTranche.objects.filter(fee_structure__year=year, due_date__lt=today)
+            .values('fee_structure__school_class_id').annotate(total=Sum('amount'))
+            .values_list('fee_structure__school_class_id', 'total').order_by()
+        )
+        due = np.array([float(due_by_class.get(class_id, 0)) for class_id in class_ids.tolist()], dtype=float)
+        overdue_tranches = {
+            'student__in': students,
+            'tranche__fee_structure__year': year,
+            'tranche__due_date__lt': today,
+        }
+        settled = sum(
+            align(student_ids, list(
+                queryset.values('student_id').annotate(total=Sum('amount'))
+                .values_list('student_id', 'total').order_by()
+            ))
+            for queryset in (
+                TranchePayment.objects.filter(**overdue_tranches),
+                FeeDiscount.objects.filter(**overdue_tranches),
+                Moratorium.objects.filter(is_approved=True, new_due_date__gte=today, **overdue_tranches),
+            )
+        )
+        overdue_amount = np.maximum(due - settled, 0)
+
+        def ratio(numerator, denominator):
+            return np.divide(numerator, denominator, out=np.zeros(len(student_ids)), where=denominator > 0)
+
+        pass_average = RiskScoringService.PASS_AVERAGE
+        return {
+            'student_ids': student_ids,
+            'class_ids': class_ids,
+            'grade_average': grade_average,
+            'absences': absences,
+            'sanctions': sanctions,
+            'overdue_amount': overdue_amount,
+            'grades': np.clip(np.nan_to_num((pass_average - grade_average) / pass_average), 0, 1),
+            'attendance': np.clip(ratio(absences, recorded) / RiskScoringService.ABSENCE_RATE_MAX, 0, 1),
+            'discipline': np.clip(sanctions / RiskScoringService.SANCTIONS_MAX, 0, 1),
+            'lessons': ratio(attention, followed),
+            'payments': np.clip(ratio(overdue_amount, due), 0, 1),
+        }
+
+    @staticmethod
+    def compute(year=None, full=False):
+        """
+        Calcule et enregistre les scores de risque des élèves actifs
+
+        Args:
+            year (SchoolYear, optional): Année scolaire (l'année en cours par défaut)
+            full (bool): Recalcule tous les élèves, sinon seulement ceux dont
+                une donnée a changé depuis le dernier passage
+
+        Returns:
+            dict: {'computed': nombre d'élèves recalculés, 'removed': scores supprimés}
+        """
+        import numpy as np
+        from django.db.models import Max
+        from .models import StudentRiskScore
+
+        year = year or SchoolYear.objects.filter(statut='EN_COURS').first()
+        if year is None:
+            raise ValidationError("Aucune année scolaire en cours.")
+
+        started_at = timezone.now()
+        # Scores de l'année calculée seulement : ceux des autres années sont laissés intacts
+        year_scores = StudentRiskScore.objects.filter(student__year=year)
+        removed, _details = year_scores.filter(student__is_active=False).delete()
+
+        students = Student.objects.filter(is_active=True, year=year)
+        last_run = year_scores.aggregate(last=Max('computed_at'))['last']
+        if not full and last_run is not None:
+            changed = RiskScoringService.get_changed_student_ids(year, last_run)
+            students = students.filter(Q(pk__in=changed) | Q(risk_score__isnull=True))
+
+        data = RiskScoringService.compute_components(students, year)
+        weights = RiskScoringService.get_weights()
+        total_weight = sum(weights.values()) or 1
+        components = {name: np.rint(data[name] * 100).astype(int) for name in weights}
+        scores = np.rint(sum(data[name] * weight for name, weight in weights.items()) * 100 / total_weight).astype(int)
+        levels = np.select(
+            [scores >= RiskScoringService.HIGH_THRESHOLD, scores >= RiskScoringService.MEDIUM_THRESHOLD],
+            ['HIGH', 'MEDIUM'], default='LOW',
+        )
+
+        scores_to_save = [
+            StudentRiskScore(
+                student_id=int(student_id),
+                school_class_id=int(data['class_ids'][i]) or None,
+                score=int(scores[i]),
+                level=str(levels[i]),
+                grades_risk=int(components['grades'][i]),
+                attendance_risk=int(components['attendance'][i]),
+                discipline_risk=int(components['discipline'][i]),
+                lessons_risk=int(components['lessons'][i]),
+                payments_risk=int(components['payments'][i]),
+                grade_average=None if np.isnan(data['grade_average'][i]) else round(float(data['grade_average'][i]), 2),
+                absences=int(data['absences'][i]),
+                sanctions=int(data['sanctions'][i]),
+                overdue_amount=round(float(data['overdue_amount'][i]), 2),
+                computed_at=started_at,
+            )
+            for i, student_id in enumerate(data['student_ids'])
+        ]
+        update_fields = [
+            field.name for field in StudentRiskScore._meta.concrete_fields if field.name not in ('id', 'student')
+        ]
+        with transaction.atomic():
+            StudentRiskScore.objects.bulk_create(
+                scores_to_save, batch_size=500,
+                update_conflicts=True, unique_fields=['student'], update_fields=update_fields,
+            )
+            # Marque le passage même pour les élèves inchangés : base du prochain calcul incrémental
+            year_scores.filter(computed_at__lt=started_at).update(computed_at=started_at)
+
+        logger.info(f"Scores de risque : {len(scores_to_save)} élève(s) recalculé(s), {removed} supprimé(s)")
+        return {'computed': len(scores_to_save), 'removed': removed}
+
+    @staticmethod
+    def get_class_ranking(school_class, level=None):
+        """
+        Élèves d'une classe classés du plus au moins à risque
+
+        Args:
+            school_class (SchoolClass): La classe
+            level (str, optional): Niveau minimal ('MEDIUM' ou 'HIGH')
+        """
+        from .models import StudentRiskScore
+
+        ranking = StudentRiskScore.objects.filter(
+            school_class=school_class, student__is_active=True
+        ).select_related('student').order_by('-score', 'student__last_name', 'student__first_name')
+        if level == 'HIGH':
+            ranking = ranking.filter(level='HIGH')
+        elif level == 'MEDIUM':
+            ranking = ranking.filter(level__in=['MEDIUM', 'HIGH'])
+        return ranking
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from scolaris.fragments import bump_version
+from .models import Student, StudentClassHistory, Guardian, Scholarship, Evaluation, Attendance, Sanction
+from finances.models import TranchePayment
+from documents.models import StudentDocument, DocumentCategory
+
+
+@receiver([post_save, post_delete], sender=Student)
+def invalidate_student_fragments(sender, instance, **kwargs):
+    """Invalide les onglets de la fiche élève"""
+    bump_version('student', instance.pk)
+    # Effectifs des classes dans la charge des enseignants (teachers/services.py)
+    bump_version('workload', instance.year_id)
+
+
+def invalidate_related_student_fragments(sender, instance, **kwargs):
+    """Invalide les onglets de la fiche de l'élève lié à l'objet modifié"""
+    bump_version('student', instance.student_id)
+
+
+for model in (StudentClassHistory, Guardian, Scholarship, Evaluation, Attendance, Sanction, TranchePayment, StudentDocument):
+    post_save.connect(invalidate_related_student_fragments, sender=model)
+    post_delete.connect(invalidate_related_student_fragments, sender=model)
+
+
+@receiver([post_save, post_delete], sender=DocumentCategory)
+def invalidate_all_student_fragments(sender, instance, **kwargs):
+    """Les catégories apparaissent dans les onglets de tous les élèves"""
+    bump_version('student')
@@ -1,3 +1,239 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase
+
+from school.models import SchoolYear, School, SchoolType, EducationSystem, SchoolLevel
+from school.services import MatriculeService
+from classes.models import SchoolClass
+from parents_portal.models import ParentUser, ParentAccountRequest, ParentStudentRelation
+from parents_portal.services import ParentPortalService
+from .models import Student, StudentClassHistory, Guardian, Attendance, Sanction, StudentRiskScore
+from scolaris.fragments import get_versions, render_fragment
+from .services import RiskScoringService, StudentImportService
+
+
+class StudentImportTestCase(TestCase):
+    """Tests de l'inscription des élèves en masse"""
+
+    def setUp(self):
+        self.year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        self.school = School.objects.create(
+            name="École Test",
+            code="ET01",
+            type=SchoolType.objects.create(name="Public", code="PUB"),
+            education_system=system,
+            address="Douala",
+        )
+        level = SchoolLevel.objects.create(name="Secondaire", system=system)
+        self.school_class = SchoolClass.objects.create(name="6ème A", level=level, year=self.year, school=self.school)
+        self.parent = ParentUser.objects.create(
+            username="mbarga", email="Mbarga@Example.com", first_name="Paul", last_name="Mbarga", phone="+237699000000"
+        )
+
+    def _file(self, lines):
+        header = "Nom;Prénom;Date de naissance;Lieu de naissance;Sexe;Classe;Tuteur nom;Tuteur relation;Tuteur téléphone;Tuteur email"
+        return SimpleUploadedFile("eleves.csv", "\n".join([header] + lines).encode("utf-8"))
+
+    def test_import_creates_students_guardians_and_defers_accounts(self):
+        class_versions = get_versions([('class', self.school_class.pk)])
+        with self.captureOnCommitCallbacks(execute=True):
+            report = StudentImportService.import_file(self._file([
+                "Mbarga;Alice;01/09/2012;Douala;F;6ème A;Paul Mbarga;Père;699000000;mbarga@example.com",
+                "Essomba;Jean;2012-03-15;Yaoundé;M;6ème A;Marie Essomba;Mère;677000000;marie@example.com",
+                "Nkou;Luc;15/03/2012;Yaoundé;M;;;;;",
+            ]), year=self.year, school=self.school)
+
+        self.assertTrue(report['imported'])
+        # Insertion en masse sans signaux : onglets de la classe invalidés
+        self.assertNotEqual(get_versions([('class', self.school_class.pk)]), class_versions)
+        self.assertEqual(Student.objects.count(), 3)
+        self.assertEqual(StudentClassHistory.objects.count(), 2)
+        self.assertEqual(Guardian.objects.count(), 2)
+        self.assertEqual(len(set(Student.objects.values_list('matricule', flat=True))), 3)
+        # Parent existant : rattaché immédiatement, nouveau parent : demande différée
+        self.assertTrue(ParentStudentRelation.objects.filter(parent_user=self.parent).exists())
+        self.assertEqual(
+            list(ParentAccountRequest.objects.values_list('guardian__email', flat=True)),
+            ['marie@example.com']
+        )
+
+        stats = ParentPortalService.process_account_requests()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(len(mail.outbox), 0)
+        ParentPortalService.send_queued_credentials()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIsNotNone(Guardian.objects.get(email='marie@example.com').parent_user)
+
+    def test_invalid_file_imports_nothing(self):
+        report = StudentImportService.import_file(self._file([
+            "Mbarga;Alice;01/09/2012;Douala;F;6ème A;;;;",
+            "Essomba;Jean;32/13/2012;Yaoundé;X;6ème Z;;;;",
+        ]), year=self.year, school=self.school)
+
+        self.assertFalse(report['imported'])
+        self.assertEqual(report['errors'][0][0], 3)
+        self.assertEqual(Student.objects.count(), 0)
+
+    def test_generated_matricules_skip_file_matricules(self):
+        next_matricule = MatriculeService.preview_matricule('STUDENT')
+        header = "Matricule;Nom;Prénom;Date de naissance;Lieu de naissance;Sexe"
+        uploaded = SimpleUploadedFile("eleves.csv", "\n".join([
+            header,
+            ";Mbarga;Alice;01/09/2012;Douala;F",
+            f"{next_matricule};Essomba;Jean;15/03/2012;Yaoundé;M",
+            ";Nkou;Luc;15/03/2012;Yaoundé;M",
+        ]).encode("utf-8"))
+
+        report = StudentImportService.import_file(uploaded, year=self.year, school=self.school)
+
+        self.assertTrue(report['imported'])
+        self.assertEqual(Student.objects.get(last_name="Essomba").matricule, next_matricule)
+        self.assertEqual(len(set(Student.objects.values_list('matricule', flat=True))), 3)
+
+    def test_field_lengths_and_emails_are_row_errors(self):
+        report = StudentImportService.import_file(self._file([
+            "Mbarga;Alice;01/09/2012;Douala;F;6ème A;Paul Mbarga;Père;" + "6" * 40 + ";mbarga@example.com",
+            "Essomba;Jean;15/03/2012;Yaoundé;M;6ème A;Marie Essomba;Mère;677000000;marie@",
+        ]), year=self.year, school=self.school)
+
+        self.assertFalse(report['imported'])
+        self.assertEqual([line for line, _ in report['errors']], [2, 3])
+        self.assertIn("guardian_phone", report['errors'][0][1])
+        self.assertIn("guardian_email", report['errors'][1][1])
+        self.assertEqual(Student.objects.count(), 0)
+
+    def test_form_reserves_matricule_on_save_only(self):
+        from .forms import StudentForm
+
+        preview = MatriculeService.preview_matricule('STUDENT')
+        data = {
+            'matricule': preview, 'first_name': "Alice", 'last_name': "Mbarga", 'birth_date': '2012-09-01',
+            'birth_place': "Douala", 'gender': 'F', 'nationality': "Camerounaise",
+        }
+        # Saisie refusée (date invalide) : aucun numéro consommé
+        self.assertFalse(StudentForm({**data, 'birth_date': 'x'}).is_valid())
+        self.assertEqual(MatriculeService.preview_matricule('STUDENT'), preview)
+
+        form = StudentForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        student = form.save(commit=False)
+        self.assertEqual(student.matricule, preview)
+        self.assertNotEqual(MatriculeService.preview_matricule('STUDENT'), preview)
+
+    def test_excel_csv_and_corrupt_files(self):
+        # Export CSV d'Excel en français : encodé en cp1252
+        content = self._file(["Mbarga;Élodie;01/09/2012;Ébolowa;F;6ème A;;;;"]).read().decode("utf-8")
+        rows = StudentImportService.read_file(SimpleUploadedFile("eleves.csv", content.encode("cp1252")))
+        self.assertEqual(rows[0]['first_name'], "Élodie")
+
+        for name, data in (("eleves.xlsx", b"PK\x03\x04 corrompu"), ("eleves.csv", b"Nom\x00;Pr\x00\n\"a")):
+            with self.assertRaises(ValidationError):
+                StudentImportService.read_file(SimpleUploadedFile(name, data))
+
+
+class StudentFragmentCacheTestCase(TestCase):
+    """Tests du cache des onglets de la fiche élève"""
+
+    def setUp(self):
+        year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        school = School.objects.create(
+            name="École Test", code="ET01", type=SchoolType.objects.create(name="Public", code="PUB"),
+            education_system=system, address="Douala",
+        )
+        level = SchoolLevel.objects.create(name="Secondaire", system=system)
+        self.school_class = SchoolClass.objects.create(name="6ème A", level=level, year=year, school=school)
+        self.student = Student.objects.create(
+            first_name="Alice", last_name="Mbarga", birth_date=date(2012, 9, 1), birth_place="Douala",
+            gender="F", current_class=self.school_class, year=year, school=school,
+        )
+
+    def test_related_save_invalidates_student_tabs(self):
+        student = self.student
+        calls = []
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        def render():
+            return render_fragment(
+                request, 'student:test', [('student', student.pk)],
+                'partials/lazy_tab.html', lambda: calls.append(1) or {'url': '/tab/'},
+            )
+
+        first = render()
+        self.assertEqual(render().content, first.content)
+        self.assertEqual(len(calls), 1)
+
+        class_versions = get_versions([('class', self.school_class.pk)])
+        with self.captureOnCommitCallbacks(execute=True):
+            Guardian.objects.create(student=student, name="Paul Mbarga", relation="Père", phone="699000000")
+        render()
+        self.assertEqual(len(calls), 2)
+        # La classe de l'élève n'est pas concernée par le tuteur
+        self.assertEqual(get_versions([('class', self.school_class.pk)]), class_versions)
+
+        # Changement de classe : l'ancienne classe est invalidée
+        student = Student.objects.get(pk=student.pk)
+        student.current_class = None
+        with self.captureOnCommitCallbacks(execute=True):
+            student.save()
+        self.assertNotEqual(get_versions([('class', self.school_class.pk)]), class_versions)
+
+
+class RiskScoringTestCase(TestCase):
+    """Tests du score de risque et de son recalcul incrémental"""
+
+    def setUp(self):
+        self.year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        self.school = School.objects.create(
+            name="École Test", code="ET01", type=SchoolType.objects.create(name="Public", code="PUB"),
+            education_system=system, address="Douala",
+        )
+        level = SchoolLevel.objects.create(name="Secondaire", system=system)
+        self.school_class = SchoolClass.objects.create(name="6ème A", level=level, year=self.year, school=self.school)
+        self.calm, self.absent = [
+            Student.objects.create(
+                matricule=f"RSK{name}", first_name=name, last_name="Test", birth_date=date(2012, 9, 1), birth_place="Douala",
+                gender="F", current_class=self.school_class, year=self.year, school=self.school,
+            )
+            for name in ("Alice", "Berthe")
+        ]
+        for day in range(1, 6):
+            for student, present in ((self.calm, True), (self.absent, day > 2)):
+                Attendance.objects.create(
+                    student=student, date=date(2024, 10, day), present=present, year=self.year, school=self.school,
+                )
+
+    def test_scores_ranking_and_incremental_run(self):
+        self.assertEqual(RiskScoringService.compute()['computed'], 2)
+        ranking = list(RiskScoringService.get_class_ranking(self.school_class))
+        self.assertEqual([risk.student for risk in ranking], [self.absent, self.calm])
+        # 2 absences sur 5 : taux de 40 %, au-delà du plafond de 20 %
+        self.assertEqual((ranking[0].attendance_risk, ranking[0].absences, ranking[0].score), (100, 2, 20))
+        self.assertEqual(ranking[1].score, 0)
+
+        self.assertEqual(RiskScoringService.compute()['computed'], 0)
+        for _ in range(3):
+            Sanction.objects.create(
+                student=self.calm, reason="Retards", sanction_type="Avertissement", issued_by="Direction",
+                year=self.year, school=self.school,
+            )
+        self.assertEqual(RiskScoringService.compute()['computed'], 1)
+        self.assertEqual(StudentRiskScore.objects.get(student=self.calm).discipline_risk, 100)
+
+        self.calm.is_active = False
+        self.calm.save()
+        self.assertEqual(RiskScoringService.compute()['removed'], 1)
+        self.assertEqual(list(RiskScoringService.get_class_ranking(self.school_class, 'MEDIUM')), [])
+
+    def test_other_year_keeps_current_scores(self):
+        RiskScoringService.compute()
+        past_year = SchoolYear.objects.create(annee="2023-2024", statut="CLOTUREE")
+        self.assertEqual(RiskScoringService.compute(year=past_year), {'computed': 0, 'removed': 0})
+        self.assertEqual(StudentRiskScore.objects.count(), 2)
@@ -3,8 +3,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from .views import (
-    StudentListView, StudentDetailView,
-    StudentCreateHtmxView, StudentUpdateHtmxView, StudentDeleteHtmxView,
+    StudentListView, StudentDetailView, StudentDetailTabView, StudentRiskListView,
+    StudentCreateHtmxView, StudentImportHtmxView, StudentUpdateHtmxView, StudentDeleteHtmxView,
     StudentHistoryCreateHtmxView, StudentHistoryUpdateHtmxView, StudentHistoryDeleteHtmxView,
     GuardianCreateHtmxView, GuardianUpdateHtmxView, GuardianDeleteHtmxView,
     DocumentCreateHtmxView, DocumentUpdateHtmxView, DocumentDeleteHtmxView,
@@ -21,7 +21,10 @@ app_name = 'students'
 urlpatterns = [
     path('', StudentListView.as_view(), name='student_list'),
     path('create/', StudentCreateHtmxView.as_view(), name='student_create_htmx'),
+    path('import/', StudentImportHtmxView.as_view(), name='student_import_htmx'),
+    path('risk/', StudentRiskListView.as_view(), name='student_risk_list'),
     path('<int:pk>/', StudentDetailView.as_view(), name='student_detail'),
+    path('<int:pk>/tab/<slug:tab>/', StudentDetailTabView.as_view(), name='student_detail_tab'),
     path('<int:pk>/update/', StudentUpdateHtmxView.as_view(), name='student_update_htmx'),
     path('<int:pk>/delete/', StudentDeleteHtmxView.as_view(), name='student_delete_htmx'),
     # Historique des classes (HTMX)
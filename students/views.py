@@ -1,24 +1,29 @@
 from django.shortcuts import render
 from django.views.generic import ListView, View
 from django.shortcuts import get_object_or_404, redirect
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 from django.template.loader import render_to_string
-from django.db import models
+from django.db import IntegrityError, models
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import PermissionDenied, ValidationError
 from authentication.permissions import TeacherPermissionManager, require_teacher_assignment
-from .models import Student, StudentClassHistory, Guardian, StudentDocument, Scholarship
+from .models import Student, StudentClassHistory, Guardian, Scholarship
 from .forms import StudentForm
+from .services import StudentImportService
+from scolaris.fragments import render_fragment
 from school.models import SchoolYear
 from classes.models import SchoolClass
 from teachers.models import Teacher
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from finances.models import TranchePayment, FeeDiscount, PaymentRefund, ExtraFee, FeeStructure
 from students.models import Evaluation, Attendance, Sanction
 from django.http import JsonResponse
 from .forms import GuardianForm
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Vue pour afficher la liste des élèves
 class StudentListView(LoginRequiredMixin, ListView):
@@ -172,6 +177,36 @@ class StudentCreateHtmxView(LoginRequiredMixin, View):
             html = render_to_string("students/partials/student_form.html", {"form": form}, request=request)
             return HttpResponse(html)
 
+class StudentImportHtmxView(LoginRequiredMixin, View):
+    """Inscription en masse des élèves à partir d'un fichier CSV/XLSX"""
+
+    def get(self, request, *args, **kwargs):
+        html = render_to_string("students/partials/student_import.html", {}, request=request)
+        return HttpResponse(html)
+
+    def post(self, request, *args, **kwargs):
+        uploaded_file = request.FILES.get('file')
+        context = {}
+        if not uploaded_file:
+            context['error'] = "Veuillez sélectionner un fichier."
+        else:
+            try:
+                context['report'] = StudentImportService.import_file(
+                    uploaded_file,
+                    user=request.user,
+                    dry_run=request.POST.get('dry_run') == 'on'
+                )
+            except ValidationError as e:
+                context['error'] = '; '.join(e.messages)
+            except IntegrityError as e:
+                logger.warning(f"Import d'élèves refusé par la base: {e}")
+                context['error'] = (
+                    "L'import a été annulé : une donnée entre en conflit avec un enregistrement existant "
+                    "(matricule en double par exemple). Aucun élève n'a été inscrit."
+                )
+        html = render_to_string("students/partials/student_import.html", context, request=request)
+        return HttpResponse(html)
+
 class StudentUpdateHtmxView(LoginRequiredMixin, View):
     def get(self, request, pk, *args, **kwargs):
         student = get_object_or_404(Student, pk=pk)
@@ -232,15 +267,53 @@ def filter_students(request):
     context = {"students": students, "classes": classes, "years": years}
     return render(request, "students/students_list.html", context)
 
+class StudentRiskListView(LoginRequiredMixin, View):
+    """
+    Élèves d'une classe classés par score de risque (compute_risk_scores)
+
+    Les professeurs ne voient que les classes dont ils sont titulaires.
+    """
+    template_name = "students/risk_list.html"
+
+    def get_classes(self):
+        user = self.request.user
+        year = SchoolYear.objects.filter(statut='EN_COURS').first()
+        classes = SchoolClass.objects.filter(year=year, is_active=True).order_by('name')
+        if user.role in ('ADMIN', 'DIRECTION', 'SURVEILLANCE'):
+            return classes
+        teacher = getattr(user, 'teacher_profile', None)
+        if user.role == 'PROFESSEUR' and teacher is not None:
+            return classes.filter(main_teacher=teacher)
+        return classes.none()
+
+    def get(self, request):
+        from .services import RiskScoringService
+
+        classes = list(self.get_classes())
+        if not classes:
+            raise PermissionDenied("Vous n'êtes titulaire d'aucune classe.")
+        school_class = next((c for c in classes if str(c.pk) == request.GET.get('class')), classes[0])
+        level = request.GET.get('level', '')
+        ranking = list(RiskScoringService.get_class_ranking(school_class, level))
+
+        context = {
+            'classes': classes,
+            'school_class': school_class,
+            'level': level,
+            'ranking': ranking,
+            'computed_at': max((score.computed_at for score in ranking), default=None),
+        }
+        return render(request, self.template_name, context)
+
+
 class StudentDetailView(LoginRequiredMixin, View):
+    """
+    Fiche élève : seul l'onglet « Vue d'ensemble » est calculé ici, les autres
+    onglets sont chargés à la demande par StudentDetailTabView
+    """
     def get(self, request, pk, *args, **kwargs):
         student = get_object_or_404(Student, pk=pk)
         
-        # Récupérer tous les éléments liés
-        history = StudentClassHistory.objects.filter(student=student).order_by('-year')
-        guardians = Guardian.objects.filter(student=student)
-        documents = StudentDocument.objects.filter(student=student)
-        scholarships = Scholarship.objects.filter(student=student)
         evaluations = Evaluation.objects.filter(student=student)
         attendances = Attendance.objects.filter(student=student)
         sanctions = Sanction.objects.filter(student=student)
@@ -331,29 +404,17 @@ class StudentDetailView(LoginRequiredMixin, View):
         recent_activities.sort(key=lambda x: x['date'], reverse=True)
         recent_activities = recent_activities[:10]
         
-        # Récupérer les documents de l'app documents
-        try:
-            from documents.models import StudentDocument as DocStudentDocument
-            student_documents = DocStudentDocument.objects.filter(student=student).select_related('category').order_by('-uploaded_at')
-        except:
-            student_documents = []
-        
         context = {
             'student': student,
-            'history': history,
-            'guardians': guardians,
-            'documents': documents,
-            'student_documents': student_documents,
-            'payments': payments,
-            'scholarships': scholarships,
-            'evaluations': evaluations,
-            'attendances': attendances,
-            'sanctions': sanctions,
             'total_paid': total_paid,
             'total_due': total_due,
             'payment_percentage': payment_percentage,
             'remaining_amount': remaining_amount,
             'recent_activities': recent_activities,
+            'tab_urls': {
+                tab: reverse('students:student_detail_tab', args=[student.pk, tab])
+                for tab in StudentDetailTabView.TABS
+            },
         }
         return render(request, "students/student_detail.html", context)
     
@@ -384,6 +445,59 @@ class StudentDetailView(LoginRequiredMixin, View):
             years = delta.days // 365
             return f"Il y a {years} an{'s' if years > 1 else ''}"
 
+class StudentDetailTabView(LoginRequiredMixin, View):
+    """
+    Onglet de la fiche élève chargé par HTMX, servi depuis le cache des
+    fragments (invalidé par students/signals.py)
+    """
+    TABS = ['academic', 'financial', 'family', 'documents', 'history']
+
+    def get(self, request, pk, tab, *args, **kwargs):
+        if tab not in self.TABS:
+            raise Http404("Onglet inconnu")
+        student = get_object_or_404(Student, pk=pk)
+        return render_fragment(
+            request,
+            f'student:{tab}',
+            [('student', student.pk)],
+            f'students/partials/tabs/{tab}.html',
+            lambda: {'student': student, **getattr(self, f'_get_{tab}_context')(student)},
+        )
+
+    def _get_academic_context(self, student):
+        return {
+            'evaluations': Evaluation.objects.filter(student=student).select_related('subject'),
+            'attendances': Attendance.objects.filter(student=student),
+            'sanctions': Sanction.objects.filter(student=student),
+        }
+
+    def _get_financial_context(self, student):
+        return {
+            'payments': TranchePayment.objects.filter(student=student).select_related(
+                'tranche', 'tranche__fee_structure', 'tranche__fee_structure__year'
+            ).order_by('-payment_date'),
+            'scholarships': Scholarship.objects.filter(student=student),
+        }
+
+    def _get_family_context(self, student):
+        return {'guardians': Guardian.objects.filter(student=student)}
+
+    def _get_documents_context(self, student):
+        try:
+            from documents.models import StudentDocument as DocStudentDocument
+            student_documents = DocStudentDocument.objects.filter(student=student).select_related('category').order_by('-uploaded_at')
+        except:
+            student_documents = []
+        return {'student_documents': student_documents}
+
+    def _get_history_context(self, student):
+        # Données des années archivées (notes, bulletins, paiements, présences)
+        from archives.services import ArchiveService
+        return {
+            'history': StudentClassHistory.objects.filter(student=student).order_by('-year'),
+            'archived_records': ArchiveService.get_student_history(student).exclude(kind='NOTIFICATION'),
+        }
+
 class StudentHistoryCreateHtmxView(LoginRequiredMixin, View):
     def get(self, request, student_id, *args, **kwargs):
         from .forms import StudentClassHistoryForm
@@ -82,6 +82,10 @@ class SubjectProgramAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Progression annotée en une requête pour la liste"""
+        return super().get_queryset(request).with_progress()
+    
     def get_completion_percentage(self, obj):
         """Affiche le pourcentage de completion du programme"""
         percentage = obj.get_completion_percentage()
@@ -133,6 +137,10 @@ class LearningUnitAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Progression annotée en une requête pour la liste"""
+        return super().get_queryset(request).with_progress()
+    
     def get_completion_percentage(self, obj):
         """Affiche le pourcentage de completion de l'unité"""
         percentage = obj.get_completion_percentage()
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SubjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'subjects'
+
+    def ready(self):
+        """Statistiques dénormalisées des leçons et avancement des programmes (subjects/services.py)"""
+        import subjects.signals
@@ -0,0 +1,33 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from school.models import SchoolYear
+from subjects.services import PacingService
+
+
+class Command(BaseCommand):
+    """
+    Commande de calcul de l'avancement prévu des programmes (à planifier chaque nuit)
+    """
+    help = "Calcule la date de fin prévue et la marge horaire des programmes pédagogiques actifs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=str, help="Année scolaire (ex: 2024-2025), l'année en cours par défaut")
+
+    def handle(self, *args, **options):
+        year = None
+        if options['year']:
+            year = SchoolYear.objects.filter(annee=options['year']).first()
+            if year is None:
+                raise CommandError(f"Année scolaire {options['year']} introuvable")
+
+        start = timezone.now()
+        try:
+            result = PacingService.compute(year=year)
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+        elapsed = (timezone.now() - start).total_seconds()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['computed']} programme(s) recalculé(s), {result['late']} en retard en {elapsed:.1f}s"
+        ))
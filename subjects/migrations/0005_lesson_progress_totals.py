@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:51
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_lesson_totals(apps, schema_editor):
+    """Calcule les statistiques des leçons à partir des suivis existants"""
+    Lesson = apps.get_model('subjects', 'Lesson')
+    LessonProgress = apps.get_model('subjects', 'LessonProgress')
+
+    needs_attention = Q(understanding_level__lte=2) | Q(participation__lte=2) | Q(homework_completed=False)
+    rows = LessonProgress.objects.values('lesson_id').annotate(
+        progress_count=Count('id'),
+        understanding_total=Sum('understanding_level'),
+        participation_total=Sum('participation'),
+        homework_completed_count=Count('id', filter=Q(homework_completed=True)),
+        attention_count=Count('id', filter=needs_attention),
+    ).order_by()
+    for row in rows:
+        lesson_id = row.pop('lesson_id')
+        Lesson.objects.filter(pk=lesson_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subjects', '0004_alter_lesson_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='attention_count',
+            field=models.PositiveIntegerField(default=0, help_text="Nombre d'élèves nécessitant une attention particulière", verbose_name='Élèves à suivre'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='homework_completed_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Devoirs réalisés'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='participation_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total des niveaux de participation'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='progress_count',
+            field=models.PositiveIntegerField(default=0, help_text='Nombre de suivis de progression enregistrés', verbose_name='Élèves suivis'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='understanding_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total des niveaux de compréhension'),
+        ),
+        migrations.RunPython(fill_lesson_totals, migrations.RunPython.noop),
+    ]
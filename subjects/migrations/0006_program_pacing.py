@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_student_progress'),
+        ('subjects', '0005_lesson_progress_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgramPacing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('ON_TRACK', 'Dans les temps'), ('LATE', 'En retard'), ('DONE', 'Terminé'), ('UNSCHEDULED', 'Sans horaire')], default='UNSCHEDULED', max_length=12, verbose_name='Statut')),
+                ('hours_per_week', models.FloatField(default=0, verbose_name='Heures par semaine')),
+                ('remaining_hours', models.FloatField(default=0, verbose_name='Heures restantes')),
+                ('available_hours', models.FloatField(default=0, help_text='Heures de cours restantes avant la fin du trimestre', verbose_name='Heures disponibles')),
+                ('slack_hours', models.FloatField(default=0, help_text='Heures disponibles moins heures restantes (négatif : retard)', verbose_name='Marge (heures)')),
+                ('projected_end_date', models.DateField(blank=True, null=True, verbose_name='Fin prévue')),
+                ('computed_at', models.DateTimeField(verbose_name='À jour au')),
+                ('program', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pacing', to='subjects.subjectprogram', verbose_name='Programme')),
+                ('trimester', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='program_pacings', to='notes.trimester', verbose_name='Trimestre')),
+            ],
+            options={
+                'verbose_name': 'Avancement de programme',
+                'verbose_name_plural': 'Avancements de programmes',
+                'db_table': 'subjects_program_pacing',
+                'ordering': ['slack_hours'],
+                'indexes': [models.Index(fields=['status', 'slack_hours'], name='subjects_pr_status_fc2f69_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, F, FloatField, Q, Value
+from django.db.models.functions import Cast, Greatest
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -69,7 +71,101 @@ class Subject(models.Model):
         return self.programs.filter(is_active=True).count()
 
 
-class SubjectProgram(models.Model):
+# Durée retenue pour une leçon terminée ou en cours dans le calcul des heures restantes
+LESSON_HOURS = 1.5
+
+
+def _progress_annotations(lessons=None):
+    """Comptes de leçons par statut, `lessons` étant le chemin vers les leçons (None sur Lesson)"""
+    status = f'{lessons}__status' if lessons else 'status'
+    lessons = lessons or 'id'
+    return {
+        'lessons_total': Count(lessons),
+        'lessons_completed': Count(lessons, filter=Q(**{status: 'COMPLETED'})),
+        'lessons_in_progress': Count(lessons, filter=Q(**{status: 'IN_PROGRESS'})),
+    }
+
+
+def _remaining_hours(hours_field):
+    """Heures prévues moins les leçons terminées ou en cours, jamais négatif"""
+    used = (F('lessons_completed') + F('lessons_in_progress')) * Value(LESSON_HOURS)
+    return Greatest(Cast(hours_field, FloatField()) - used, Value(0.0), output_field=FloatField())
+
+
+class SubjectProgramQuerySet(models.QuerySet):
+
+    def with_progress(self):
+        """
+        Annote chaque programme avec sa progression, en une requête groupée :
+        units_total, lessons_total, lessons_completed, lessons_in_progress, remaining_hours
+        """
+        return self.annotate(
+            units_total=Count('learning_units', distinct=True),
+            **_progress_annotations('learning_units__lessons'),
+        ).annotate(remaining_hours=_remaining_hours('total_hours'))
+
+
+class LearningUnitQuerySet(models.QuerySet):
+
+    def with_progress(self):
+        """
+        Annote chaque unité avec sa progression, en une requête groupée :
+        lessons_total, lessons_completed, lessons_in_progress, remaining_hours
+        """
+        return self.annotate(
+            **_progress_annotations('lessons'),
+        ).annotate(remaining_hours=_remaining_hours('estimated_hours'))
+
+
+class ProgressMixin:
+    """
+    Progression d'un programme ou d'une unité
+
+    Utilise les annotations de with_progress() si elles sont présentes ;
+    sinon les comptes sont calculés en une requête d'agrégation et conservés
+    sur l'instance.
+    """
+
+    def _lessons(self):
+        raise NotImplementedError
+
+    def _load_progress(self):
+        if not hasattr(self, 'lessons_total'):
+            counts = self._lessons().aggregate(**_progress_annotations())
+            for field, value in counts.items():
+                setattr(self, field, value)
+
+    def get_lessons_count(self):
+        """Retourne le nombre de leçons planifiées"""
+        self._load_progress()
+        return self.lessons_total
+
+    def get_completed_lessons_count(self):
+        """Retourne le nombre de leçons terminées"""
+        self._load_progress()
+        return self.lessons_completed
+
+    def get_completion_percentage(self):
+        """
+        Calcule le pourcentage de completion basé sur les leçons terminées.
+
+        Returns:
+            float: Pourcentage de completion (0-100)
+        """
+        self._load_progress()
+        if not self.lessons_total:
+            return 0.0
+        return round((self.lessons_completed / self.lessons_total) * 100, 1)
+
+    def _get_remaining_hours(self, planned_hours):
+        if getattr(self, 'remaining_hours', None) is not None:
+            return self.remaining_hours
+        self._load_progress()
+        used_hours = (self.lessons_completed + self.lessons_in_progress) * LESSON_HOURS
+        return max(0, planned_hours - used_hours)
+
+
+class SubjectProgram(ProgressMixin, models.Model):
     """
     Modèle représentant le programme pédagogique d'une matière pour une classe spécifique.
     
@@ -168,6 +264,8 @@ class SubjectProgram(models.Model):
         help_text=_("Enseignant ayant créé ce programme")
     )
     
+    objects = SubjectProgramQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Programme de matière")
         verbose_name_plural = _("Programmes de matières")
@@ -179,47 +277,26 @@ class SubjectProgram(models.Model):
         """Représentation textuelle du programme"""
         return f"Programme {self.subject.name} - {self.school_class.name} ({self.school_year})"
 
-    def get_completion_percentage(self):
-        """
-        Calcule le pourcentage de completion du programme basé sur les leçons terminées.
-        
-        Returns:
-            float: Pourcentage de completion (0-100)
-        """
-        total_lessons = sum(unit.lessons.count() for unit in self.learning_units.all())
-        completed_lessons = sum(
-            unit.lessons.filter(status='COMPLETED').count() 
-            for unit in self.learning_units.all()
-        )
-        
-        if total_lessons == 0:
-            return 0.0
-        
-        return round((completed_lessons / total_lessons) * 100, 1)
+    def _lessons(self):
+        return Lesson.objects.filter(learning_unit__subject_program=self)
 
     def get_remaining_hours(self):
         """
         Calcule le nombre d'heures restantes dans le programme.
         
         Returns:
-            int: Nombre d'heures restantes
+            float: Nombre d'heures restantes
         """
-        used_hours = sum(
-            unit.lessons.filter(status__in=['COMPLETED', 'IN_PROGRESS']).count() * 1.5
-            for unit in self.learning_units.all()
-        )
-        return max(0, self.total_hours - used_hours)
+        return self._get_remaining_hours(self.total_hours)
 
     def get_units_count(self):
         """Retourne le nombre d'unités d'apprentissage dans ce programme"""
+        if hasattr(self, 'units_total'):
+            return self.units_total
         return self.learning_units.count()
 
-    def get_lessons_count(self):
-        """Retourne le nombre total de leçons planifiées dans ce programme"""
-        return sum(unit.lessons.count() for unit in self.learning_units.all())
-
 
-class LearningUnit(models.Model):
+class LearningUnit(ProgressMixin, models.Model):
     """
     Modèle représentant une unité d'apprentissage dans un programme pédagogique.
     
@@ -304,6 +381,8 @@ class LearningUnit(models.Model):
         verbose_name=_("Date de modification")
     )
     
+    objects = LearningUnitQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Unité d'apprentissage")
         verbose_name_plural = _("Unités d'apprentissage")
@@ -314,27 +393,12 @@ class LearningUnit(models.Model):
         """Représentation textuelle de l'unité d'apprentissage"""
         return f"{self.title} ({self.subject_program.subject.name})"
 
-    def get_completion_percentage(self):
-        """
-        Calcule le pourcentage de completion de cette unité.
-        
-        Returns:
-            float: Pourcentage de completion (0-100)
-        """
-        total_lessons = self.lessons.count()
-        if total_lessons == 0:
-            return 0.0
-        
-        completed_lessons = self.lessons.filter(status='COMPLETED').count()
-        return round((completed_lessons / total_lessons) * 100, 1)
-
-    def get_lessons_count(self):
-        """Retourne le nombre de leçons dans cette unité"""
-        return self.lessons.count()
+    def _lessons(self):
+        return self.lessons.all()
 
-    def get_completed_lessons_count(self):
-        """Retourne le nombre de leçons terminées dans cette unité"""
-        return self.lessons.filter(status='COMPLETED').count()
+    def get_remaining_hours(self):
+        """Retourne le nombre d'heures estimées restantes pour cette unité"""
+        return self._get_remaining_hours(self.estimated_hours)
 
     def get_next_lesson(self):
         """
@@ -476,6 +540,31 @@ class Lesson(models.Model):
         help_text=_("Date effective de réalisation de la leçon")
     )
     
+    # Statistiques de suivi des élèves (dénormalisées, tenues à jour par
+    # subjects/signals.py et LessonProgressService)
+    progress_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Élèves suivis"),
+        help_text=_("Nombre de suivis de progression enregistrés")
+    )
+    understanding_total = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Total des niveaux de compréhension")
+    )
+    participation_total = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Total des niveaux de participation")
+    )
+    homework_completed_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Devoirs réalisés")
+    )
+    attention_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Élèves à suivre"),
+        help_text=_("Nombre d'élèves nécessitant une attention particulière")
+    )
+
     # Métadonnées système
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -516,7 +605,7 @@ class Lesson(models.Model):
 
     def get_progress_count(self):
         """Retourne le nombre d'élèves ayant un suivi de progression"""
-        return self.student_progress.count()
+        return self.progress_count
 
     def get_average_understanding(self):
         """
@@ -525,12 +614,9 @@ class Lesson(models.Model):
         Returns:
             float: Moyenne du niveau de compréhension (1-5) ou 0 si aucun suivi
         """
-        progress_list = self.student_progress.all()
-        if not progress_list:
+        if not self.progress_count:
             return 0.0
-        
-        total_understanding = sum(p.understanding_level for p in progress_list)
-        return round(total_understanding / len(progress_list), 1)
+        return round(self.understanding_total / self.progress_count, 1)
 
     def get_average_participation(self):
         """
@@ -539,12 +625,15 @@ class Lesson(models.Model):
         Returns:
             float: Moyenne du niveau de participation (1-5) ou 0 si aucun suivi
         """
-        progress_list = self.student_progress.all()
-        if not progress_list:
+        if not self.progress_count:
             return 0.0
-        
-        total_participation = sum(p.participation for p in progress_list)
-        return round(total_participation / len(progress_list), 1)
+        return round(self.participation_total / self.progress_count, 1)
+
+    def get_school_class(self):
+        """Classe de la leçon : celle du créneau, sinon celle du programme"""
+        if self.timetable_slot:
+            return self.timetable_slot.class_obj
+        return self.learning_unit.subject_program.school_class
 
     def can_be_started(self):
         """
@@ -739,3 +828,66 @@ class LessonProgress(models.Model):
             self.participation <= 2 or
             not self.homework_completed
         )
+
+    def get_lesson_totals(self):
+        """
+        Contribution de ce suivi aux statistiques dénormalisées de la leçon.
+        
+        Returns:
+            dict: Valeurs à ajouter aux champs de Lesson
+        """
+        return {
+            'progress_count': 1,
+            'understanding_total': self.understanding_level,
+            'participation_total': self.participation,
+            'homework_completed_count': int(bool(self.homework_completed)),
+            'attention_count': int(self.needs_attention()),
+        }
+
+
+class ProgramPacing(models.Model):
+    """
+    Prévision d'avancement d'un programme par rapport au calendrier
+
+    Calculée par PacingService (subjects/services.py) à partir des heures
+    restantes du programme, des heures hebdomadaires des affectations de la
+    classe et des jours de cours restants du trimestre. Recalculée quand une
+    leçon change de statut et chaque nuit par la commande compute_pacing.
+    """
+    STATUS_CHOICES = [
+        ('ON_TRACK', 'Dans les temps'),
+        ('LATE', 'En retard'),
+        ('DONE', 'Terminé'),
+        ('UNSCHEDULED', 'Sans horaire'),
+    ]
+
+    program = models.OneToOneField(
+        SubjectProgram, on_delete=models.CASCADE, related_name='pacing', verbose_name=_("Programme")
+    )
+    trimester = models.ForeignKey(
+        'notes.Trimester', on_delete=models.SET_NULL, null=True, blank=True, related_name='program_pacings',
+        verbose_name=_("Trimestre")
+    )
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='UNSCHEDULED', verbose_name=_("Statut"))
+    hours_per_week = models.FloatField(default=0, verbose_name=_("Heures par semaine"))
+    remaining_hours = models.FloatField(default=0, verbose_name=_("Heures restantes"))
+    available_hours = models.FloatField(
+        default=0, verbose_name=_("Heures disponibles"),
+        help_text=_("Heures de cours restantes avant la fin du trimestre")
+    )
+    slack_hours = models.FloatField(
+        default=0, verbose_name=_("Marge (heures)"),
+        help_text=_("Heures disponibles moins heures restantes (négatif : retard)")
+    )
+    projected_end_date = models.DateField(null=True, blank=True, verbose_name=_("Fin prévue"))
+    computed_at = models.DateTimeField(verbose_name=_("À jour au"))
+
+    class Meta:
+        verbose_name = _("Avancement de programme")
+        verbose_name_plural = _("Avancements de programmes")
+        ordering = ['slack_hours']
+        indexes = [models.Index(fields=['status', 'slack_hours'])]
+        db_table = 'subjects_program_pacing'
+
+    def __str__(self):
+        return f"{self.program} - {self.get_status_display()}"
@@ -0,0 +1,295 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+import logging
+
+from .models import LearningUnit, Lesson, LessonProgress, ProgramPacing, SubjectProgram
+
+logger = logging.getLogger(__name__)
+
+
+class LessonProgressService:
+    """
+    Suivi de progression des élèves par leçon
+
+    Les statistiques de chaque leçon (nombre de suivis, totaux de compréhension
+    et de participation, devoirs réalisés, élèves à suivre) sont conservées
+    dans des colonnes de Lesson : les listes de leçons et les tableaux de bord
+    n'agrègent plus LessonProgress. Un enregistrement isolé les met à jour par
+    différence (subjects/signals.py) ; une saisie groupée les recalcule en une
+    requête pour la leçon concernée.
+    """
+
+    TOTAL_FIELDS = (
+        'progress_count', 'understanding_total', 'participation_total',
+        'homework_completed_count', 'attention_count',
+    )
+    LEVELS = range(1, 6)
+
+    @staticmethod
+    def apply_totals(lesson_id, totals, sign=1):
+        """Ajoute (sign=1) ou retire (sign=-1) une contribution aux totaux d'une leçon"""
+        changes = {field: F(field) + sign * value for field, value in totals.items() if value}
+        if lesson_id and changes:
+            Lesson.objects.filter(pk=lesson_id).update(**changes)
+
+    @staticmethod
+    def refresh_totals(lesson_ids):
+        """Recalcule les totaux des leçons à partir de LessonProgress (une requête groupée)"""
+        lesson_ids = list(lesson_ids)
+        needs_attention = Q(understanding_level__lte=2) | Q(participation__lte=2) | Q(homework_completed=False)
+        rows = {
+            row['lesson_id']: row
+            for row in LessonProgress.objects.filter(lesson_id__in=lesson_ids).values('lesson_id').annotate(
+                progress_count=Count('id'),
+                understanding_total=Sum('understanding_level'),
+                participation_total=Sum('participation'),
+                homework_completed_count=Count('id', filter=Q(homework_completed=True)),
+                attention_count=Count('id', filter=needs_attention),
+            ).order_by()
+        }
+        lessons = list(Lesson.objects.filter(pk__in=lesson_ids).only('pk', *LessonProgressService.TOTAL_FIELDS))
+        for lesson in lessons:
+            row = rows.get(lesson.pk, {})
+            for field in LessonProgressService.TOTAL_FIELDS:
+                setattr(lesson, field, row.get(field) or 0)
+        Lesson.objects.bulk_update(lessons, LessonProgressService.TOTAL_FIELDS)
+        return len(lessons)
+
+    @staticmethod
+    def _level(value, label, required=True):
+        if value in (None, '') and not required:
+            return None
+        try:
+            level = int(value)
+        except (TypeError, ValueError):
+            level = None
+        if level not in LessonProgressService.LEVELS:
+            raise ValidationError(f"{label} : valeur entre 1 et 5 attendue.")
+        return level
+
+    @staticmethod
+    def record_class_progress(lesson, entries, evaluated_by=None):
+        """
+        Enregistre en une transaction le suivi de toute la classe pour une leçon
+
+        Args:
+            lesson (Lesson): La leçon
+            entries (list): [{'student_id', 'understanding_level', 'participation',
+                'homework_completed', 'homework_quality' (optionnel),
+                'teacher_feedback' (optionnel)}]
+            evaluated_by (Teacher, optional): Enseignant ayant fait la saisie
+
+        Returns:
+            dict: {'created': int, 'updated': int}
+
+        Raises:
+            ValidationError: Élève hors de la classe ou niveau invalide (rien n'est enregistré)
+        """
+        class_students = set(lesson.get_school_class().students.filter(is_active=True).values_list('pk', flat=True))
+        cleaned = {}
+        errors = []
+        for entry in entries:
+            try:
+                student_id = int(entry.get('student_id'))
+            except (TypeError, ValueError):
+                errors.append("Élève manquant ou invalide.")
+                continue
+            if student_id not in class_students:
+                errors.append(f"L'élève {student_id} n'appartient pas à la classe de la leçon.")
+                continue
+            try:
+                cleaned[student_id] = {
+                    'understanding_level': LessonProgressService._level(
+                        entry.get('understanding_level'), "Niveau de compréhension"),
+                    'participation': LessonProgressService._level(entry.get('participation'), "Participation"),
+                    'homework_completed': str(entry.get('homework_completed')).lower() in ('1', 'true', 'on', 'yes'),
+                    'homework_quality': LessonProgressService._level(
+                        entry.get('homework_quality'), "Qualité des devoirs", required=False),
+                }
+                if 'teacher_feedback' in entry:
+                    cleaned[student_id]['teacher_feedback'] = entry['teacher_feedback'] or ''
+            except ValidationError as e:
+                errors.append(f"Élève {student_id} : {' '.join(e.messages)}")
+        if errors:
+            raise ValidationError(errors)
+
+        with transaction.atomic():
+            existing = {
+                progress.student_id: progress
+                for progress in LessonProgress.objects.select_for_update().filter(
+                    lesson=lesson, student_id__in=cleaned
+                )
+            }
+            to_create, to_update = [], []
+            for student_id, values in cleaned.items():
+                progress = existing.get(student_id)
+                if progress is None:
+                    to_create.append(LessonProgress(
+                        lesson=lesson, student_id=student_id, evaluated_by=evaluated_by, **values
+                    ))
+                    continue
+                for field, value in values.items():
+                    setattr(progress, field, value)
+                progress.evaluated_by = evaluated_by or progress.evaluated_by
+                to_update.append(progress)
+
+            LessonProgress.objects.bulk_create(to_create)
+            # bulk_update ne met pas à jour les champs auto_now
+            for progress in to_update:
+                progress.updated_at = timezone.now()
+            LessonProgress.objects.bulk_update(
+                to_update, ['understanding_level', 'participation', 'homework_completed', 'homework_quality',
+                            'teacher_feedback', 'evaluated_by', 'updated_at']
+            )
+            LessonProgressService.refresh_totals([lesson.pk])
+
+        logger.info(f"Suivi de la leçon {lesson.pk} : {len(to_create)} créé(s), {len(to_update)} mis à jour")
+        return {'created': len(to_create), 'updated': len(to_update)}
+
+
+class PacingService:
+    """
+    Prévision d'avancement des programmes pédagogiques
+
+    Pour chaque programme : heures restantes (SubjectProgram.with_progress),
+    heures hebdomadaires de la matière dans la classe (TeachingAssignment) et
+    jours de cours restants jusqu'à la fin du trimestre en cours ou à venir
+    (Trimester de l'école de la classe). Les jours de cours sont ceux de
+    l'emploi du temps (settings.TIMETABLE_DAYS) ; les dates sont calculées
+    pour tous les programmes à la fois avec les fonctions jours ouvrés de NumPy.
+
+    Les résultats sont enregistrés dans ProgramPacing. Un changement de statut
+    de leçon recalcule son programme (subjects/signals.py) ; la commande
+    compute_pacing, à planifier chaque nuit, recalcule toute l'année (le
+    calendrier avance, les heures des affectations et les trimestres changent).
+    """
+
+    @staticmethod
+    def get_weekmask():
+        """Jours de cours de la semaine au format NumPy (lundi en premier)"""
+        from classes.scheduling import get_days
+
+        days = set(get_days())
+        return ''.join('1' if day in days else '0' for day in range(1, 8))
+
+    @staticmethod
+    def _trimesters(year_ids, school_ids, today):
+        """Trimestre en cours ou à venir (à défaut le dernier) par (école, année)"""
+        from notes.models import Trimester
+
+        chosen = {}
+        trimesters = Trimester.objects.filter(
+            year_id__in=year_ids, school_id__in=school_ids, is_active=True
+        ).values_list('pk', 'school_id', 'year_id', 'start_date', 'end_date').order_by('start_date')
+        for pk, school_id, year_id, start_date, end_date in trimesters:
+            current = chosen.get((school_id, year_id))
+            if current is None or current[2] < today:
+                chosen[(school_id, year_id)] = (pk, start_date, end_date)
+        return chosen
+
+    @staticmethod
+    def compute(year=None, program_ids=None, today=None):
+        """
+        Calcule et enregistre l'avancement prévu des programmes
+
+        Args:
+            year (SchoolYear, optional): Année scolaire (l'année en cours par défaut),
+                ignorée si program_ids est donné
+            program_ids (iterable, optional): Programmes à recalculer
+            today (date, optional): Date de référence
+
+        Returns:
+            dict: {'computed': programmes recalculés, 'late': programmes en retard}
+        """
+        import numpy as np
+        from school.models import SchoolYear
+        from teachers.models import TeachingAssignment
+
+        today = today or timezone.localdate()
+        programs = SubjectProgram.objects.all()
+        if program_ids is not None:
+            programs = programs.filter(pk__in=list(program_ids))
+        else:
+            year = year or SchoolYear.get_active_year()
+            if year is None:
+                raise ValidationError("Aucune année scolaire en cours.")
+            programs = programs.filter(school_year=year, is_active=True)
+        rows = list(programs.with_progress().values_list(
+            'pk', 'school_class_id', 'school_class__school_id', 'subject_id', 'school_year_id', 'remaining_hours'
+        ).order_by())
+        started_at = timezone.now()
+        if program_ids is None:
+            ProgramPacing.objects.filter(program__school_year=year).exclude(
+                program_id__in=[row[0] for row in rows]
+            ).delete()
+        if not rows:
+            return {'computed': 0, 'late': 0}
+
+        year_ids = {row[4] for row in rows}
+        class_ids = {row[1] for row in rows}
+        weekly = {
+            (row['school_class_id'], row['subject_id'], row['year_id']): row['hours']
+            for row in TeachingAssignment.objects.filter(
+                year_id__in=year_ids, school_class_id__in=class_ids
+            ).values('school_class_id', 'subject_id', 'year_id').annotate(hours=Sum('hours_per_week')).order_by()
+        }
+        trimesters = PacingService._trimesters(year_ids, {row[2] for row in rows}, today)
+
+        # Tableaux alignés sur les programmes
+        trimester = [trimesters.get((row[2], row[4])) for row in rows]
+        remaining = np.array([max(row[5] or 0, 0) for row in rows], dtype=float)
+        hours = np.array([weekly.get((row[1], row[3], row[4])) or 0 for row in rows], dtype=float)
+        has_trimester = np.array([t is not None for t in trimester])
+        begin = np.array([max(today, t[1]) if t else today for t in trimester], dtype='datetime64[D]')
+        end = np.array([t[2] if t else today for t in trimester], dtype='datetime64[D]')
+
+        weekmask = PacingService.get_weekmask()
+        days_per_week = max(weekmask.count('1'), 1)
+        days_left = np.maximum(np.busday_count(begin, end + 1, weekmask=weekmask), 0)
+        available = days_left / days_per_week * hours
+        slack = available - remaining
+
+        scheduled = has_trimester & (hours > 0)
+        days_needed = np.zeros(len(rows), dtype=int)
+        days_needed[scheduled] = np.ceil(remaining[scheduled] / hours[scheduled] * days_per_week)
+        # Dernier jour de cours nécessaire pour terminer le programme
+        projected = np.busday_offset(begin, np.maximum(days_needed - 1, 0), roll='forward', weekmask=weekmask)
+        status = np.select(
+            [remaining <= 0, ~scheduled, projected > end],
+            ['DONE', 'UNSCHEDULED', 'LATE'], default='ON_TRACK',
+        )
+
+        pacings = [
+            ProgramPacing(
+                program_id=row[0],
+                trimester_id=trimester[i][0] if trimester[i] else None,
+                status=str(status[i]),
+                hours_per_week=float(hours[i]),
+                remaining_hours=round(float(remaining[i]), 1),
+                available_hours=round(float(available[i]), 1),
+                slack_hours=round(float(slack[i]), 1),
+                projected_end_date=projected[i].astype(object) if status[i] in ('ON_TRACK', 'LATE') else None,
+                computed_at=started_at,
+            )
+            for i, row in enumerate(rows)
+        ]
+        update_fields = [
+            field.name for field in ProgramPacing._meta.concrete_fields if field.name not in ('id', 'program')
+        ]
+        ProgramPacing.objects.bulk_create(
+            pacings, batch_size=500, update_conflicts=True, unique_fields=['program'], update_fields=update_fields,
+        )
+        late = int(np.count_nonzero(status == 'LATE'))
+        logger.info(f"Avancement des programmes : {len(pacings)} recalculé(s), {late} en retard")
+        return {'computed': len(pacings), 'late': late}
+
+    @staticmethod
+    def refresh_units(unit_ids):
+        """Recalcule les programmes des unités données (après un changement de statut de leçon)"""
+        program_ids = set(
+            LearningUnit.objects.filter(pk__in=[pk for pk in unit_ids if pk]).values_list('subject_program_id', flat=True)
+        )
+        if program_ids:
+            PacingService.compute(program_ids=program_ids)
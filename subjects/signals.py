@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Lesson, LessonProgress
+from .services import LessonProgressService, PacingService
+
+# Statuts comptés dans les heures réalisées d'un programme
+DONE_STATUSES = ('COMPLETED', 'IN_PROGRESS')
+
+
+def _snapshot(instance):
+    """Contribution actuelle du suivi aux totaux de sa leçon, None si inconnue"""
+    if instance.pk is None or instance.get_deferred_fields():
+        return None
+    return instance.lesson_id, instance.get_lesson_totals()
+
+
+@receiver(post_init, sender=LessonProgress)
+def remember_lesson_totals(sender, instance, **kwargs):
+    instance._lesson_totals = _snapshot(instance)
+
+
+@receiver(post_save, sender=LessonProgress)
+def update_lesson_totals(sender, instance, created, **kwargs):
+    """Met à jour par différence les statistiques de la leçon"""
+    previous = None if created else instance._lesson_totals
+    if not created and previous is None:
+        # Suivi chargé partiellement : contribution précédente inconnue
+        LessonProgressService.refresh_totals([instance.lesson_id])
+    elif previous is not None and previous[0] == instance.lesson_id:
+        totals = instance.get_lesson_totals()
+        LessonProgressService.apply_totals(
+            instance.lesson_id, {field: value - previous[1][field] for field, value in totals.items()}
+        )
+    else:
+        if previous is not None:
+            LessonProgressService.apply_totals(previous[0], previous[1], sign=-1)
+        LessonProgressService.apply_totals(instance.lesson_id, instance.get_lesson_totals())
+    instance._lesson_totals = _snapshot(instance)
+
+
+@receiver(post_delete, sender=LessonProgress)
+def remove_lesson_totals(sender, instance, **kwargs):
+    previous = instance._lesson_totals
+    if previous is None:
+        LessonProgressService.refresh_totals([instance.lesson_id])
+    else:
+        LessonProgressService.apply_totals(previous[0], previous[1], sign=-1)
+
+
+# -- Avancement des programmes (PacingService) --------------------------------
+
+def _pacing_state(instance):
+    """(unité, leçon réalisée) de la leçon, None si inconnu"""
+    if instance.pk is None or {'learning_unit_id', 'status'} & instance.get_deferred_fields():
+        return None
+    return instance.learning_unit_id, instance.status in DONE_STATUSES
+
+
+def _refresh_pacing(*unit_ids):
+    transaction.on_commit(lambda: PacingService.refresh_units(unit_ids))
+
+
+@receiver(post_init, sender=Lesson)
+def remember_pacing_state(sender, instance, **kwargs):
+    instance._pacing_state = _pacing_state(instance)
+
+
+@receiver(post_save, sender=Lesson)
+def update_program_pacing(sender, instance, created, **kwargs):
+    """Recalcule l'avancement du programme quand les heures réalisées changent"""
+    previous = None if created else instance._pacing_state
+    current = _pacing_state(instance)
+    if created:
+        if current[1]:
+            _refresh_pacing(instance.learning_unit_id)
+    elif previous is None:
+        _refresh_pacing(instance.learning_unit_id)
+    elif previous != current and (previous[1] or current[1]):
+        _refresh_pacing(previous[0], current[0])
+    instance._pacing_state = current
+
+
+@receiver(post_delete, sender=Lesson)
+def remove_program_pacing(sender, instance, **kwargs):
+    previous = instance._pacing_state
+    if previous is None or previous[1]:
+        _refresh_pacing(instance.learning_unit_id)
@@ -1,3 +1,172 @@
+from datetime import date
+from unittest import mock
+
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-# Create your tests here.
+from classes.models import SchoolClass
+from school.models import EducationSystem, School, SchoolLevel, SchoolType, SchoolYear
+from students.models import Student
+from teachers.models import Teacher
+
+from notes.models import Trimester
+from teachers.models import TeachingAssignment
+
+from .models import LearningUnit, Lesson, LessonProgress, ProgramPacing, Subject, SubjectProgram
+from .services import LessonProgressService, PacingService
+
+
+class PedagogyTestCase(TestCase):
+    """Données communes : une classe de trois élèves, un programme, une unité et une leçon"""
+
+    def setUp(self):
+        year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        self.school = school = School.objects.create(
+            name="École Test", code="ET01", address="Douala",
+            type=SchoolType.objects.create(name="Public", code="PUB"), education_system=system,
+        )
+        level = SchoolLevel.objects.create(name="Sixième", system=system, order=1)
+        school_class = SchoolClass.objects.create(name="6e M1", level=level, year=year, school=school)
+        self.students = [
+            Student.objects.create(
+                matricule=f"STU{i}", first_name=f"Élève{i}", last_name="Test", birth_date=date(2012, 1, 1),
+                birth_place="Douala", gender='F', year=year, school=school, current_class=school_class,
+            )
+            for i in range(3)
+        ]
+        self.teacher = teacher = Teacher.objects.create(
+            matricule="ENS1", first_name="Paul", last_name="Prof", birth_date=date(1980, 1, 1),
+            birth_place="Douala", gender='M', school=school, year=year,
+        )
+        self.program = program = SubjectProgram.objects.create(
+            subject=Subject.objects.create(name="Mathématiques", code="MATH"), school_class=school_class,
+            school_year=year, title="Programme", description="-", objectives="-", total_hours=10,
+        )
+        self.unit = unit = LearningUnit.objects.create(
+            subject_program=program, title="Unité 1", description="-", estimated_hours=2, order=1,
+        )
+        self.lesson = Lesson.objects.create(
+            learning_unit=unit, teacher=teacher, title="Fractions", objectives="-", activities="-",
+            planned_date=date(2024, 10, 1),
+        )
+
+
+class LessonProgressTotalsTestCase(PedagogyTestCase):
+    """Tests de la saisie groupée du suivi et des statistiques dénormalisées des leçons"""
+
+    def test_batch_and_single_updates_keep_totals(self):
+        entries = [
+            {'student_id': student.pk, 'understanding_level': level, 'participation': 4, 'homework_completed': True}
+            for student, level in zip(self.students, (5, 4, 1))
+        ]
+        self.assertEqual(LessonProgressService.record_class_progress(self.lesson, entries)['created'], 3)
+        self.lesson.refresh_from_db()
+        self.assertEqual((self.lesson.progress_count, self.lesson.attention_count), (3, 1))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lesson.get_average_understanding(), 3.3)
+
+        # Modification et suppression isolées : mise à jour par différence
+        progress = LessonProgress.objects.get(lesson=self.lesson, student=self.students[2])
+        progress.understanding_level = 4
+        progress.save()
+        LessonProgress.objects.get(lesson=self.lesson, student=self.students[0]).delete()
+        self.lesson.refresh_from_db()
+        self.assertEqual(
+            (self.lesson.progress_count, self.lesson.understanding_total, self.lesson.attention_count), (2, 8, 0)
+        )
+
+        with self.assertRaises(ValidationError):
+            LessonProgressService.record_class_progress(
+                self.lesson, [{'student_id': self.students[0].pk, 'understanding_level': 9, 'participation': 3}]
+            )
+        self.assertEqual(LessonProgress.objects.filter(lesson=self.lesson).count(), 2)
+
+
+class ProgramProgressTestCase(PedagogyTestCase):
+    """Tests de la progression annotée des programmes et des unités"""
+
+    def setUp(self):
+        super().setUp()
+        self.lesson.status = 'COMPLETED'
+        self.lesson.save()
+        unit = LearningUnit.objects.create(
+            subject_program=self.program, title="Unité 2", description="-", estimated_hours=4, order=2,
+        )
+        for status in ('COMPLETED', 'IN_PROGRESS', 'PLANNED'):
+            Lesson.objects.create(
+                learning_unit=unit, teacher=self.teacher, title=status, objectives="-", activities="-",
+                planned_date=date(2024, 10, 2), status=status,
+            )
+        # Unité sans leçon
+        LearningUnit.objects.create(
+            subject_program=self.program, title="Unité 3", description="-", estimated_hours=3, order=3,
+        )
+
+    def test_annotations_match_fallback(self):
+        with self.assertNumQueries(1):
+            program = SubjectProgram.objects.with_progress().get(pk=self.program.pk)
+            self.assertEqual(program.get_units_count(), 3)
+            self.assertEqual(program.get_lessons_count(), 4)
+            self.assertEqual(program.get_completion_percentage(), 50.0)
+            self.assertEqual(program.get_remaining_hours(), 10 - 3 * 1.5)
+
+        program = SubjectProgram.objects.get(pk=self.program.pk)
+        self.assertEqual(program.get_completion_percentage(), 50.0)
+        self.assertEqual(program.get_remaining_hours(), 5.5)
+
+        units = list(LearningUnit.objects.filter(subject_program=self.program).with_progress())
+        self.assertEqual([unit.get_completion_percentage() for unit in units], [100.0, 33.3, 0.0])
+        self.assertEqual([unit.get_remaining_hours() for unit in units], [0.5, 1.0, 3.0])
+
+    def test_query_count_does_not_grow_with_programs(self):
+        SubjectProgram.objects.create(
+            subject=Subject.objects.create(name="Français", code="FR"), school_class=self.program.school_class,
+            school_year=self.program.school_year, title="Programme", description="-", objectives="-", total_hours=6,
+        )
+        programs = SubjectProgram.objects.select_related('subject').with_progress()
+        with self.assertNumQueries(1):
+            progress = [(program.get_completion_percentage(), program.get_remaining_hours()) for program in programs]
+        self.assertEqual(sorted(progress), [(0.0, 6.0), (50.0, 5.5)])
+
+
+class ProgramPacingTestCase(PedagogyTestCase):
+    """Tests de la prévision d'avancement des programmes"""
+
+    def setUp(self):
+        super().setUp()
+        Trimester.objects.create(
+            trimester='1ER', year=self.program.school_year, school=self.school,
+            start_date=date(2024, 9, 2), end_date=date(2024, 10, 18),
+        )
+        TeachingAssignment.objects.create(
+            teacher=self.teacher, subject=self.program.subject, school_class=self.program.school_class,
+            year=self.program.school_year, hours_per_week=2,
+        )
+
+    def test_projection_against_trimester(self):
+        # Lundi 7 octobre : 10 jours de cours, soit 4h avant la fin du trimestre
+        result = PacingService.compute(year=self.program.school_year, today=date(2024, 10, 7))
+        self.assertEqual(result, {'computed': 1, 'late': 1})
+        pacing = ProgramPacing.objects.get(program=self.program)
+        self.assertEqual((pacing.status, pacing.available_hours, pacing.slack_hours), ('LATE', 4.0, -6.0))
+
+        SubjectProgram.objects.filter(pk=self.program.pk).update(total_hours=3)
+        PacingService.compute(year=self.program.school_year, today=date(2024, 10, 7))
+        pacing.refresh_from_db()
+        # 3h à 2h par semaine : 8 jours de cours, du lundi 7 au mercredi 16
+        self.assertEqual((pacing.status, pacing.projected_end_date), ('ON_TRACK', date(2024, 10, 16)))
+        self.assertEqual(pacing.slack_hours, 1.0)
+
+    def test_recomputed_when_lesson_status_changes(self):
+        PacingService.compute(year=self.program.school_year)
+        with mock.patch.object(PacingService, 'refresh_units') as refresh_units, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.lesson.notes = "Préparation"
+            self.lesson.save()
+        refresh_units.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.status = 'COMPLETED'
+            self.lesson.save()
+        self.assertEqual(ProgramPacing.objects.get(program=self.program).remaining_hours, 8.5)
@@ -21,6 +21,7 @@ urlpatterns = [
     path('pedagogy/units/<int:pk>/', views.unit_detail, name='unit_detail'),
     path('pedagogy/lessons/<int:pk>/', views.lesson_detail, name='lesson_detail'),
     path('pedagogy/lessons/<int:pk>/change-status/', views.lesson_change_status, name='lesson_change_status'),
+    path('pedagogy/lessons/<int:pk>/progress/', views.lesson_record_progress, name='lesson_record_progress'),
     
     # URLs d'intégration avec les classes et élèves
     path('pedagogy/class/<int:class_id>/', views.class_pedagogy_overview, name='class_pedagogy_overview'),
@@ -4,13 +4,15 @@ from django.urls import reverse
 from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import PermissionDenied, ValidationError
 from authentication.mixins import admin_or_direction_required
-from django.db.models import Q, Count, Avg
+from django.db import transaction
+from django.db.models import Q, Count, Avg, Prefetch
 from django.utils import timezone
-from .models import Subject, SubjectProgram, LearningUnit, Lesson, LessonProgress
+from .models import Subject, SubjectProgram, LearningUnit, Lesson, LessonProgress, ProgramPacing
 from .forms import SubjectForm, TimetableSlotForm, TimetableBulkForm
 from teachers.models import Teacher
+from classes import occupancy
 from classes.models import SchoolClass, TimetableSlot
 from school.models import SchoolYear
 from students.models import Student
@@ -235,8 +237,8 @@ def pedagogy_dashboard(request):
     
     # Programmes actifs
     active_programs = SubjectProgram.objects.filter(is_active=True).select_related(
-        'subject', 'school_class', 'school_year'
-    ).prefetch_related('learning_units')
+        'subject', 'school_class', 'school_year', 'pacing'
+    ).with_progress()
     
     # Leçons récentes
     recent_lessons = Lesson.objects.select_related(
@@ -244,6 +246,16 @@ def pedagogy_dashboard(request):
         'teacher'
     ).order_by('-created_at')[:10]
     
+    # Leçons où le plus d'élèves nécessitent une attention (statistiques dénormalisées)
+    attention_lessons = Lesson.objects.filter(attention_count__gt=0).select_related(
+        'learning_unit__subject_program__subject'
+    ).order_by('-attention_count', '-planned_date')[:5]
+    
+    # Programmes qui ne seront pas terminés avant la fin du trimestre (PacingService)
+    late_programs = ProgramPacing.objects.filter(status='LATE', program__is_active=True).select_related(
+        'program__subject', 'program__school_class', 'trimester'
+    ).order_by('slack_hours')[:5]
+    
     # Statistiques de progression
     programs_completion = []
     for program in active_programs:
@@ -261,6 +273,8 @@ def pedagogy_dashboard(request):
         'total_lessons': total_lessons,
         'active_programs': active_programs,
         'recent_lessons': recent_lessons,
+        'attention_lessons': attention_lessons,
+        'late_programs': late_programs,
         'programs_completion': programs_completion,
     }
     
@@ -274,7 +288,7 @@ def program_list(request):
     """
     programs = SubjectProgram.objects.select_related(
         'subject', 'school_class', 'school_year', 'created_by'
-    ).prefetch_related('learning_units')
+    ).with_progress()
     
     # Filtres
     subject_filter = request.GET.get('subject')
@@ -326,15 +340,14 @@ def program_detail(request, pk):
     """
     program = get_object_or_404(SubjectProgram.objects.select_related(
         'subject', 'school_class', 'school_year', 'created_by'
-    ).prefetch_related('learning_units__lessons'), pk=pk)
+    ).with_progress().prefetch_related(
+        Prefetch('learning_units', queryset=LearningUnit.objects.with_progress())
+    ), pk=pk)
     
     # Statistiques du programme
-    total_units = program.learning_units.count()
-    total_lessons = sum(unit.lessons.count() for unit in program.learning_units.all())
-    completed_lessons = sum(
-        unit.lessons.filter(status='COMPLETED').count() 
-        for unit in program.learning_units.all()
-    )
+    total_units = program.get_units_count()
+    total_lessons = program.get_lessons_count()
+    completed_lessons = program.get_completed_lessons_count()
     
     # Progression par unité
     units_progress = []
@@ -342,8 +355,8 @@ def program_detail(request, pk):
         progress = {
             'unit': unit,
             'completion': unit.get_completion_percentage(),
-            'lessons_count': unit.lessons.count(),
-            'completed_lessons': unit.lessons.filter(status='COMPLETED').count(),
+            'lessons_count': unit.get_lessons_count(),
+            'completed_lessons': unit.get_completed_lessons_count(),
             'can_start': unit.can_be_started(),
         }
         units_progress.append(progress)
@@ -581,11 +594,12 @@ def generate_timetable_from_programs(request, class_id):
                     if day_slots == 0:
                         continue
                     
-                    # Trouver des créneaux disponibles pour ce jour
-                    available_periods = []
-                    for period in range(1, periods_per_day + 1):
-                        if period not in timetable_grid[day]:
-                            available_periods.append(period)
+                    # Trouver des créneaux disponibles pour ce jour (classe et enseignant libres)
+                    index = occupancy.get_index(current_year.pk)
+                    available_periods = [
+                        period for period in index.free_periods(school_class.pk, teacher.pk, day)
+                        if period <= periods_per_day and period not in timetable_grid[day]
+                    ]
                     
                     # Créer les créneaux pour ce jour
                     for i in range(min(day_slots, len(available_periods))):
@@ -656,6 +670,49 @@ def generate_timetable_from_programs(request, class_id):
     return redirect('classes:schoolclass_detail', pk=class_id)
 
 
+@login_required
+@require_POST
+def lesson_record_progress(request, pk):
+    """
+    Saisie groupée du suivi des élèves d'une leçon, en une transaction.
+
+    Corps JSON : {"entries": [{"student_id", "understanding_level", "participation",
+    "homework_completed", "homework_quality", "teacher_feedback"}, ...]}
+    """
+    from .services import LessonProgressService
+
+    lesson = get_object_or_404(Lesson.objects.select_related(
+        'timetable_slot__class_obj', 'learning_unit__subject_program__school_class'
+    ), pk=pk)
+    teacher = getattr(request.user, 'teacher_profile', None)
+    if request.user.role not in ('ADMIN', 'DIRECTION') and (teacher is None or teacher.pk != lesson.teacher_id):
+        return JsonResponse({'success': False, 'error': "Vous n'êtes pas l'enseignant de cette leçon."}, status=403)
+
+    try:
+        entries = json.loads(request.body or '{}').get('entries')
+    except (ValueError, AttributeError):
+        entries = None
+    if not isinstance(entries, list):
+        return JsonResponse({'success': False, 'error': "Liste 'entries' attendue."}, status=400)
+
+    try:
+        result = LessonProgressService.record_class_progress(lesson, entries, evaluated_by=teacher)
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'errors': e.messages}, status=400)
+
+    lesson.refresh_from_db(fields=LessonProgressService.TOTAL_FIELDS)
+    return JsonResponse({
+        'success': True,
+        **result,
+        'lesson': {
+            'progress_count': lesson.progress_count,
+            'average_understanding': lesson.get_average_understanding(),
+            'average_participation': lesson.get_average_participation(),
+            'homework_completed_count': lesson.homework_completed_count,
+            'attention_count': lesson.attention_count,
+        },
+    })
+
 @login_required
 def class_pedagogy_overview(request, class_id):
     """
@@ -665,18 +722,15 @@ def class_pedagogy_overview(request, class_id):
     school_class = get_object_or_404(SchoolClass, pk=class_id)
     
     # Programmes pédagogiques de la classe
-    programs = SubjectProgram.objects.filter(
+    programs = list(SubjectProgram.objects.filter(
         school_class=school_class,
         is_active=True
-    ).select_related('subject', 'school_year').prefetch_related('learning_units')
+    ).select_related('subject', 'school_year').with_progress())
     
     # Statistiques globales de la classe
-    total_subjects = programs.count()
-    total_units = sum(program.learning_units.count() for program in programs)
-    total_lessons = sum(
-        sum(unit.lessons.count() for unit in program.learning_units.all())
-        for program in programs
-    )
+    total_subjects = len(programs)
+    total_units = sum(program.get_units_count() for program in programs)
+    total_lessons = sum(program.get_lessons_count() for program in programs)
     
     # Progression par matière
     subjects_progress = []
@@ -685,8 +739,8 @@ def class_pedagogy_overview(request, class_id):
         subjects_progress.append({
             'subject': program.subject,
             'completion': completion,
-            'units_count': program.learning_units.count(),
-            'lessons_count': sum(unit.lessons.count() for unit in program.learning_units.all()),
+            'units_count': program.get_units_count(),
+            'lessons_count': program.get_lessons_count(),
         })
     
     # Leçons récentes de la classe
@@ -822,9 +876,18 @@ def timetable_management(request, class_id):
                 slot = form.save(commit=False)
                 slot.class_obj = school_class
                 slot.year = school_class.year
-                slot.save()
-                messages.success(request, f"Créneau créé : {slot.subject.name} le {slot.get_day_display()}")
-                return redirect('subjects:timetable_management', class_id=class_id)
+                with transaction.atomic():
+                    try:
+                        occupancy.validate_slot(
+                            slot.year_id, school_class.pk, slot.teacher_id, slot.day, slot.period, slot.duration
+                        )
+                    except ValidationError as e:
+                        for error in e.messages:
+                            form.add_error(None, error)
+                    else:
+                        slot.save()
+                    messages.success(request, f"Créneau créé : {slot.subject.name} le {slot.get_day_display()}")
+                    return redirect('subjects:timetable_management', class_id=class_id)
         elif 'bulk_assign' in request.POST:
             bulk_form = TimetableBulkForm(request.POST, school_class=school_class)
             if bulk_form.is_valid():
@@ -882,7 +945,7 @@ def process_bulk_assignment(form, school_class):
             
             if day_hours > 0:
                 # Trouver des créneaux disponibles
-                available_periods = find_available_periods(school_class, day, day_hours)
+                available_periods = find_available_periods(school_class, day, day_hours, teacher)
                 for period in available_periods:
                     TimetableSlot.objects.create(
                         class_obj=school_class,
@@ -902,7 +965,7 @@ def process_bulk_assignment(form, school_class):
         for day in range(1, min(days_needed + 1, 6)):
             day_hours = min(2, hours_per_week - (day - 1) * 2)
             if day_hours > 0:
-                available_periods = find_available_periods(school_class, day, day_hours)
+                available_periods = find_available_periods(school_class, day, day_hours, teacher)
                 for period in available_periods:
                     TimetableSlot.objects.create(
                         class_obj=school_class,
@@ -927,7 +990,7 @@ def process_bulk_assignment(form, school_class):
         
         for day, hours in days_hours.items():
             if hours > 0:
-                available_periods = find_available_periods(school_class, day, hours)
+                available_periods = find_available_periods(school_class, day, hours, teacher)
                 for period in available_periods:
                     TimetableSlot.objects.create(
                         class_obj=school_class,
@@ -942,23 +1005,11 @@ def process_bulk_assignment(form, school_class):
     
     return slots_created
 
-def find_available_periods(school_class, day, hours_needed):
-    """Trouve des périodes disponibles pour un jour donné"""
-    occupied_periods = set(
-        TimetableSlot.objects.filter(
-            class_obj=school_class,
-            day=day
-        ).values_list('period', flat=True)
-    )
-    
-    available_periods = []
-    for period in range(1, 9):  # 8 périodes par jour
-        if period not in occupied_periods:
-            available_periods.append(period)
-            if len(available_periods) >= hours_needed:
-                break
-    
-    return available_periods
+def find_available_periods(school_class, day, hours_needed, teacher=None):
+    """Trouve des périodes où la classe (et l'enseignant, s'il est donné) sont libres pour un jour donné"""
+    index = occupancy.get_index(school_class.year_id)
+    teacher_id = teacher.pk if teacher else None
+    return index.free_periods(school_class.pk, teacher_id, day)[:hours_needed]
 
 @login_required
 def timetable_slot_edit(request, slot_id):
@@ -968,9 +1019,19 @@ def timetable_slot_edit(request, slot_id):
     if request.method == 'POST':
         form = TimetableSlotForm(request.POST, instance=slot, school_class=slot.class_obj)
         if form.is_valid():
-            form.save()
-            messages.success(request, "Créneau modifié avec succès")
-            return redirect('subjects:timetable_management', class_id=slot.class_obj.id)
+            with transaction.atomic():
+                try:
+                    occupancy.validate_slot(
+                        slot.year_id, slot.class_obj_id, slot.teacher_id, slot.day, slot.period, slot.duration,
+                        exclude=slot.pk,
+                    )
+                except ValidationError as e:
+                    for error in e.messages:
+                        form.add_error(None, error)
+                else:
+                    form.save()
+                messages.success(request, "Créneau modifié avec succès")
+                return redirect('subjects:timetable_management', class_id=slot.class_obj.id)
     else:
         form = TimetableSlotForm(instance=slot, school_class=slot.class_obj)
     
@@ -1038,46 +1099,40 @@ def create_timetable_slots(request, class_id):
         if len(slots) != hours_int:
             return JsonResponse({'success': False, 'error': f'Le nombre de créneaux sélectionnés ({len(slots)}) doit correspondre au nombre d\'heures ({hours_int})'})
         
-        # Supprimer les anciens créneaux pour cette matière et cette classe
-        TimetableSlot.objects.filter(
-            class_obj=school_class,
-            subject=subject
-        ).delete()
-        
         slots_created = 0
         
-        # Créer les créneaux pour chaque créneau sélectionné
-        for slot_info in slots:
-            # Format attendu: "jour-période" (ex: "1-2" pour lundi, 2ème période)
-            day, period = slot_info.split('-')
-            day = int(day)
-            period = int(period)
-            
-            # Vérifier que le créneau n'est pas déjà occupé
-            existing_slot = TimetableSlot.objects.filter(
-                class_obj=school_class,
-                day=day,
-                period=period,
-                year=school_class.year
-            ).first()
-            
-            if existing_slot:
-                return JsonResponse({
-                    'success': False, 
-                    'error': f'Le créneau {existing_slot.get_day_display()} {existing_slot.get_period_display()} est déjà occupé par {existing_slot.subject.name}'
-                })
-            
-            # Créer le créneau
-            TimetableSlot.objects.create(
-                class_obj=school_class,
-                subject=subject,
-                teacher=teacher,
-                day=day,
-                period=period,
-                duration=1,
-                year=school_class.year
-            )
-            slots_created += 1
+        try:
+            # Remplacement annulé en entier si un créneau est en conflit
+            with occupancy.atomic(school_class.year_id):
+                # Supprimer les anciens créneaux pour cette matière et cette classe
+                TimetableSlot.objects.filter(
+                    class_obj=school_class,
+                    subject=subject
+                ).delete()
+                
+                # Créer les créneaux pour chaque créneau sélectionné
+                for slot_info in slots:
+                    # Format attendu: "jour-période" (ex: "1-2" pour lundi, 2ème période)
+                    day, period = slot_info.split('-')
+                    day = int(day)
+                    period = int(period)
+                    
+                    # Vérifier que la classe et l'enseignant sont libres
+                    occupancy.validate_slot(school_class.year_id, school_class.pk, teacher.pk, day, period)
+                    
+                    # Créer le créneau
+                    TimetableSlot.objects.create(
+                        class_obj=school_class,
+                        subject=subject,
+                        teacher=teacher,
+                        day=day,
+                        period=period,
+                        duration=1,
+                        year=school_class.year
+                    )
+                    slots_created += 1
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'error': ' '.join(e.messages)})
         
         if slots_created > 0:
             return JsonResponse({
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TeachersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'teachers'
+
+    def ready(self):
+        """Invalidation du cache des onglets des fiches (scolaris/fragments.py)"""
+        import teachers.signals
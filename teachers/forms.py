@@ -1,5 +1,6 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from .models import Teacher
 from school.services import MatriculeService
 from subjects.models import Subject
@@ -39,7 +40,8 @@ class TeacherForm(forms.ModelForm):
         
         # Si c'est un nouveau teacher, pré-remplir le matricule si génération automatique
         if not self.instance.pk:
-            auto_matricule = MatriculeService.generate_matricule('TEACHER')
+            # Simple aperçu : le numéro n'est réservé qu'à l'enregistrement
+            auto_matricule = MatriculeService.preview_matricule('TEACHER')
             if auto_matricule:
                 self.fields['matricule'].initial = auto_matricule
                 self.fields['matricule'].widget.attrs['readonly'] = True
@@ -47,11 +49,14 @@ class TeacherForm(forms.ModelForm):
 
     def clean_matricule(self):
         matricule = self.cleaned_data.get('matricule')
-        if not matricule:
-            # Générer automatiquement si vide
-            matricule = MatriculeService.generate_matricule('TEACHER')
-            if not matricule:
+        self.generate_matricule = False
+        if not matricule or self.fields['matricule'].widget.attrs.get('readonly'):
+            # Génération automatique si vide ou si l'aperçu a été affiché : le numéro
+            # n'est réservé qu'à l'enregistrement (save), pas à chaque validation
+            if not MatriculeService.preview_matricule('TEACHER'):
                 raise ValidationError("Le matricule est obligatoire quand la génération automatique est désactivée.")
+            self.generate_matricule = True
+            return ''
         
         # Vérifier l'unicité
         if matricule:
@@ -99,9 +104,20 @@ class TeacherForm(forms.ModelForm):
                 raise ValidationError("Aucune année scolaire active disponible.")
         
         if commit:
-            teacher.save()
+            with transaction.atomic():
+                self._reserve_matricule(teacher)
+                teacher.save()
+        else:
+            self._reserve_matricule(teacher)
         return teacher
 
+    def _reserve_matricule(self, teacher):
+        """Réserve le matricule généré, dans la transaction de l'insertion si commit=True"""
+        if getattr(self, 'generate_matricule', False) and not teacher.matricule:
+            teacher.matricule = MatriculeService.generate_matricule('TEACHER')
+            if not teacher.matricule:
+                raise ValidationError("Le matricule est obligatoire quand la génération automatique est désactivée.")
+
 
 class TeachingAssignmentForm(forms.ModelForm):
     class Meta:
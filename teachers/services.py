@@ -0,0 +1,149 @@
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from scolaris.fragments import get_versions
+from .models import Teacher, TeachingAssignment
+
+
+class TeacherWorkloadService:
+    """
+    Charge de travail des enseignants d'une année scolaire
+
+    Pour tous les enseignants à la fois, en une requête groupée par source :
+    - affectations (TeachingAssignment) : heures hebdomadaires prévues, classes,
+      matières et effectif des classes (élèves actifs) ;
+    - emploi du temps (TimetableSlot) : périodes réellement placées ;
+    - évaluations ouvertes (Evaluation) des classes et matières de l'enseignant,
+      et notes restant à saisir (StudentGrade) pour celles déjà passées.
+
+    Le résultat est mis en cache par année, indexé par la version 'workload'
+    (incrémentée par les signaux des affectations, élèves, évaluations et notes)
+    et par la version des créneaux de l'année (classes/occupancy.py), ainsi que
+    par la date du jour : les notes à saisir dépendent des évaluations passées.
+    """
+
+    EMPTY = {
+        'hours_per_week': 0, 'scheduled_periods': 0, 'classes_count': 0, 'subjects_count': 0,
+        'students_count': 0, 'open_evaluations': 0, 'pending_grades': 0, 'is_overloaded': False,
+    }
+
+    @staticmethod
+    def get_max_hours():
+        """Heures hebdomadaires au-delà desquelles un enseignant est surchargé"""
+        return getattr(settings, 'TEACHER_MAX_WEEKLY_HOURS', 24)
+
+    @staticmethod
+    def compute(year_id, today=None):
+        """
+        Calcule la charge de tous les enseignants ayant une affectation dans l'année
+
+        Returns:
+            dict: {teacher_id: {'hours_per_week', 'scheduled_periods', 'classes_count',
+            'subjects_count', 'students_count', 'open_evaluations', 'pending_grades',
+            'is_overloaded'}}
+        """
+        from classes.models import TimetableSlot
+        from notes.models import Evaluation
+        from students.models import Student
+
+        today = today or timezone.localdate()
+        hours = defaultdict(float)
+        classes = defaultdict(set)
+        subjects = defaultdict(set)
+        teachers_by_course = defaultdict(set)
+        assignments = TeachingAssignment.objects.filter(year_id=year_id, teacher__isnull=False).values_list(
+            'teacher_id', 'school_class_id', 'subject_id', 'hours_per_week'
+        ).order_by()
+        for teacher_id, class_id, subject_id, hours_per_week in assignments:
+            hours[teacher_id] += hours_per_week or 0
+            classes[teacher_id].add(class_id)
+            subjects[teacher_id].add(subject_id)
+            teachers_by_course[(class_id, subject_id)].add(teacher_id)
+        class_ids = set().union(*classes.values()) if classes else set()
+
+        class_sizes = dict(
+            Student.objects.filter(current_class_id__in=class_ids, is_active=True).values('current_class_id').annotate(
+                total=Count('id')
+            ).values_list('current_class_id', 'total').order_by()
+        )
+        periods = dict(
+            TimetableSlot.objects.filter(year_id=year_id).values('teacher_id').annotate(
+                periods=Sum('duration')
+            ).values_list('teacher_id', 'periods').order_by()
+        )
+
+        open_evaluations = defaultdict(int)
+        pending_grades = defaultdict(int)
+        # Seules comptent les notes des élèves actuellement dans la classe évaluée (GradeCompletionService)
+        evaluations = Evaluation.objects.filter(
+            trimester__year_id=year_id, is_open=True, school_class_id__in=class_ids
+        ).annotate(graded=Count('grades', filter=Q(
+            grades__student__is_active=True, grades__student__current_class_id=F('school_class_id')
+        ))).values_list('school_class_id', 'subject_id', 'eval_date', 'graded').order_by()
+        for class_id, subject_id, eval_date, graded in evaluations:
+            missing = max(class_sizes.get(class_id, 0) - graded, 0) if eval_date <= today else 0
+            for teacher_id in teachers_by_course.get((class_id, subject_id), ()):
+                open_evaluations[teacher_id] += 1
+                pending_grades[teacher_id] += missing
+
+        max_hours = TeacherWorkloadService.get_max_hours()
+        workloads = {}
+        for teacher_id in hours.keys() | periods.keys():
+            weekly = round(hours.get(teacher_id, 0), 1)
+            scheduled = periods.get(teacher_id) or 0
+            workloads[teacher_id] = {
+                'hours_per_week': weekly,
+                'scheduled_periods': scheduled,
+                'classes_count': len(classes.get(teacher_id, ())),
+                'subjects_count': len(subjects.get(teacher_id, ())),
+                'students_count': sum(class_sizes.get(class_id, 0) for class_id in classes.get(teacher_id, ())),
+                'open_evaluations': open_evaluations.get(teacher_id, 0),
+                'pending_grades': pending_grades.get(teacher_id, 0),
+                'is_overloaded': max(weekly, scheduled) > max_hours,
+            }
+        return workloads
+
+    @staticmethod
+    def get_workloads(year_id):
+        """Charge des enseignants de l'année, depuis le cache si elle est à jour"""
+        from classes import occupancy
+
+        today = timezone.localdate()
+        versions = [str(occupancy.get_version(year_id))] + get_versions([('workload', year_id)])
+        key = f"teachers:workload:{year_id}:{today.isoformat()}:" + ':'.join(versions)
+        workloads = cache.get(key)
+        if workloads is None:
+            workloads = TeacherWorkloadService.compute(year_id, today)
+            cache.set(key, workloads, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+        return workloads
+
+    @staticmethod
+    def get_workload(teacher):
+        """Charge d'un enseignant pour son année (zéros s'il n'a aucune affectation)"""
+        return TeacherWorkloadService.get_workloads(teacher.year_id).get(teacher.pk, TeacherWorkloadService.EMPTY)
+
+    @staticmethod
+    def attach(teachers):
+        """Ajoute l'attribut `workload` à chaque enseignant (une lecture du cache par année)"""
+        by_year = {}
+        for teacher in teachers:
+            if teacher.year_id not in by_year:
+                by_year[teacher.year_id] = TeacherWorkloadService.get_workloads(teacher.year_id)
+            teacher.workload = by_year[teacher.year_id].get(teacher.pk, TeacherWorkloadService.EMPTY)
+        return teachers
+
+    @staticmethod
+    def get_overloaded(year_id):
+        """Enseignants surchargés de l'année, du plus au moins chargé"""
+        workloads = TeacherWorkloadService.get_workloads(year_id)
+        overloaded = [teacher_id for teacher_id, workload in workloads.items() if workload['is_overloaded']]
+        teachers = list(Teacher.objects.filter(pk__in=overloaded))
+        for teacher in teachers:
+            teacher.workload = workloads[teacher.pk]
+        return sorted(
+            teachers,
+            key=lambda teacher: -max(teacher.workload['hours_per_week'], teacher.workload['scheduled_periods']),
+        )
@@ -0,0 +1,40 @@
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from scolaris.fragments import bump_version
+from .models import Teacher, TeachingAssignment
+from classes.models import SchoolClass
+from subjects.models import Subject
+
+
+@receiver([post_save, post_delete], sender=Teacher)
+def invalidate_teacher_fragments(sender, instance, **kwargs):
+    """Invalide les onglets de la fiche enseignant"""
+    bump_version('teacher', instance.pk)
+
+
+@receiver([post_save, post_delete], sender=TeachingAssignment)
+def invalidate_assignment_teacher_fragments(sender, instance, **kwargs):
+    bump_version('teacher', instance.teacher_id)
+    # Charge des enseignants de l'année (teachers/services.py)
+    bump_version('workload', instance.year_id)
+
+
+@receiver(m2m_changed, sender=Subject.teachers.through)
+def invalidate_subject_teacher_fragments(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Teacher):
+        bump_version('teacher', instance.pk)
+    elif pk_set:
+        bump_version('teacher', *pk_set)
+    else:
+        # post_clear côté matière : enseignants concernés inconnus
+        bump_version('teacher')
+
+
+@receiver([post_save, post_delete], sender=SchoolClass)
+@receiver([post_save, post_delete], sender=Subject)
+def invalidate_all_teacher_fragments(sender, instance, **kwargs):
+    """Classes et matières apparaissent dans les onglets de tous les enseignants"""
+    bump_version('teacher')
@@ -1,3 +1,93 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from classes.models import SchoolClass, TimetableSlot
+from notes.models import Evaluation, StudentGrade, Trimester
+from school.models import EducationSystem, School, SchoolLevel, SchoolType, SchoolYear
+from students.models import Student
+from subjects.models import Subject
+
+from .models import Teacher, TeachingAssignment
+from .services import TeacherWorkloadService
+
+
+# Requêtes comptées hors cache (table de cache en base par défaut)
+@override_settings(
+    TEACHER_MAX_WEEKLY_HOURS=6,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class TeacherWorkloadTestCase(TestCase):
+    """Tests de la charge de travail des enseignants"""
+
+    def setUp(self):
+        cache.clear()
+        self.year = year = SchoolYear.objects.create(annee="2024-2025", statut="EN_COURS")
+        system = EducationSystem.objects.create(name="Francophone", code="FR")
+        school = School.objects.create(
+            name="École Test", code="ET01", address="Douala",
+            type=SchoolType.objects.create(name="Public", code="PUB"), education_system=system,
+        )
+        level = SchoolLevel.objects.create(name="Sixième", system=system, order=1)
+        classes = [
+            SchoolClass.objects.create(name=f"6e M{i}", level=level, year=year, school=school) for i in (1, 2)
+        ]
+        for i in range(3):
+            Student.objects.create(
+                matricule=f"STU{i}", first_name=f"Élève{i}", last_name="Test", birth_date=date(2012, 1, 1),
+                birth_place="Douala", gender='F', year=year, school=school, current_class=classes[i % 2],
+            )
+        self.teacher, self.other = [
+            Teacher.objects.create(
+                matricule=f"ENS{i}", first_name="Paul", last_name=f"Prof{i}", birth_date=date(1980, 1, 1),
+                birth_place="Douala", gender='M', school=school, year=year,
+            )
+            for i in (1, 2)
+        ]
+        math = Subject.objects.create(name="Mathématiques", code="MATH")
+        for school_class in classes:
+            TeachingAssignment.objects.create(
+                teacher=self.teacher, subject=math, school_class=school_class, year=year, hours_per_week=4,
+            )
+        TimetableSlot.objects.create(
+            class_obj=classes[0], year=year, day=1, period=1, duration=2, subject=math, teacher=self.teacher,
+        )
+        trimester = Trimester.objects.create(
+            trimester='1ER', year=year, school=school, start_date=date(2024, 9, 2), end_date=date(2024, 12, 20),
+        )
+        evaluation = Evaluation.objects.create(
+            eval_type='EVAL1', trimester=trimester, subject=math, school_class=classes[0], eval_date=date(2024, 10, 1),
+        )
+        StudentGrade.objects.create(student=classes[0].students.first(), evaluation=evaluation, score=12)
+
+    def test_workloads_for_all_teachers(self):
+        with self.assertNumQueries(4):
+            workloads = TeacherWorkloadService.compute(self.year.pk)
+        self.assertEqual(workloads[self.teacher.pk], {
+            'hours_per_week': 8.0, 'scheduled_periods': 2, 'classes_count': 2, 'subjects_count': 1,
+            'students_count': 3, 'open_evaluations': 1, 'pending_grades': 1, 'is_overloaded': True,
+        })
+        self.assertNotIn(self.other.pk, workloads)
+        self.assertEqual(
+            [teacher.pk for teacher in TeacherWorkloadService.get_overloaded(self.year.pk)], [self.teacher.pk]
+        )
+
+    def test_cached_until_an_assignment_changes(self):
+        TeacherWorkloadService.get_workloads(self.year.pk)
+        with self.assertNumQueries(0):
+            TeacherWorkloadService.get_workloads(self.year.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TeachingAssignment.objects.filter(teacher=self.teacher).first().delete()
+        workload = TeacherWorkloadService.get_workload(self.teacher)
+        self.assertEqual((workload['hours_per_week'], workload['is_overloaded']), (4.0, False))
+        self.assertEqual(TeacherWorkloadService.get_workload(self.other)['classes_count'], 0)
+
+    def test_cache_follows_the_current_date(self):
+        # Évaluation du 1er octobre : notes à saisir une fois la date passée
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2024, 9, 15)):
+            self.assertEqual(TeacherWorkloadService.get_workload(self.teacher)['pending_grades'], 0)
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2024, 10, 15)):
+            self.assertEqual(TeacherWorkloadService.get_workload(self.teacher)['pending_grades'], 1)
@@ -6,6 +6,9 @@ app_name = 'teachers'
 urlpatterns = [
     path('', views.teacher_list, name='teacher_list'),
     path('<int:pk>/', views.teacher_detail, name='teacher_detail'),
+    path('<int:pk>/tab/<slug:tab>/', views.teacher_detail_tab, name='teacher_detail_tab'),
+    path('<int:pk>/timetable/', views.teacher_timetable, name='teacher_timetable'),
+    path('<int:pk>/timetable/pdf/', views.teacher_timetable_pdf, name='teacher_timetable_pdf'),
     path('create/', views.teacher_create_htmx, name='teacher_create_htmx'),
     path('<int:pk>/update/', views.teacher_update_htmx, name='teacher_update_htmx'),
     path('<int:pk>/delete/', views.teacher_delete_htmx, name='teacher_delete_htmx'),
@@ -1,10 +1,13 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
 from .models import TeachingAssignment, Teacher
 from .forms import TeachingAssignmentForm, TeacherForm, TeachingAssignmentCoefForm
+from .services import TeacherWorkloadService
 from classes.models import SchoolClass
 from school.models import SchoolYear
 from subjects.models import Subject
+from scolaris.fragments import render_fragment
 from django.views.decorators.http import require_POST, require_GET, require_http_methods
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
@@ -153,36 +156,119 @@ def teaching_assignment_update_titulaire_htmx(request, pk):
     return HttpResponse(status=204)
 
 def teacher_list(request):
-    teachers = Teacher.objects.select_related('school', 'year', 'main_subject').all()
+    teachers = Teacher.objects.select_related('school', 'year', 'main_subject').prefetch_related(
+        'subjects', 'titular_classes'
+    )
     subjects = Subject.objects.all()
     # Gestion des filtres (exemple simple)
     subject_id = request.GET.get('subject')
     if subject_id and subject_id != 'all':
         teachers = teachers.filter(assignments__subject_id=subject_id).distinct()
+    # Charge de travail (heures, classes, élèves, notes à saisir) calculée pour tous en une passe
+    teachers = TeacherWorkloadService.attach(list(teachers))
+    # Alerte de surcharge réservée à la direction
+    overloaded = []
+    if getattr(request.user, 'role', None) in ('ADMIN', 'DIRECTION'):
+        year = SchoolYear.get_active_year()
+        if year is not None:
+            overloaded = TeacherWorkloadService.get_overloaded(year.pk)
     # Toast de succès si présent dans la session
     toast = request.session.pop('toast', None)
     return render(request, 'teachers/teacher_list.html', {
         'teachers': teachers,
         'subjects': subjects,
+        'overloaded': overloaded,
+        'max_weekly_hours': TeacherWorkloadService.get_max_hours(),
         'toast': toast,
     })
 
+TEACHER_DETAIL_TABS = ['subjects', 'classes']
+
+
 def teacher_detail(request, pk):
     teacher = get_object_or_404(Teacher, pk=pk)
-    # Calculs additionnels pour le template (ex: nombre de matières, classes, années d'expérience)
-    subjects = Subject.objects.filter(assignments__teacher=teacher).distinct()
-    classes = SchoolClass.objects.filter(assignments__teacher=teacher).distinct()
+    # Calculs additionnels pour le template (ex: années d'expérience)
     experience_years = teacher.created_at.year if teacher.created_at else 0
     # Toast de succès si présent dans la session
     toast = request.session.pop('toast', None)
     return render(request, 'teachers/teacher_detail.html', {
         'teacher': teacher,
-        'subjects': subjects,
-        'classes': classes,
+        'workload': TeacherWorkloadService.get_workload(teacher),
         'experience_years': experience_years,
         'toast': toast,
+        # Matières et classes : onglets chargés à la demande (teacher_detail_tab)
+        'tab_urls': {
+            tab: reverse('teachers:teacher_detail_tab', args=[teacher.pk, tab])
+            for tab in TEACHER_DETAIL_TABS
+        },
+    })
+
+@login_required
+def teacher_detail_tab(request, pk, tab):
+    """
+    Onglet de la fiche enseignant chargé par HTMX, servi depuis le cache des
+    fragments (invalidé par teachers/signals.py)
+    """
+    if tab not in TEACHER_DETAIL_TABS:
+        raise Http404("Onglet inconnu")
+    teacher = get_object_or_404(Teacher, pk=pk)
+
+    def get_context():
+        if tab == 'subjects':
+            return {'teacher': teacher}
+        return {
+            'teacher': teacher,
+            'classes': SchoolClass.objects.filter(assignments__teacher=teacher).distinct().order_by('name'),
+        }
+
+    return render_fragment(
+        request,
+        f'teacher:{tab}',
+        [('teacher', teacher.pk)],
+        f'teachers/partials/tabs/{tab}.html',
+        get_context,
+    )
+
+def _get_teacher_timetable(teacher):
+    from classes.timetables import get_compiled_timetable
+
+    compiled = get_compiled_timetable(teacher.year_id)
+    days, rows = compiled.rows('teacher', teacher.pk)
+    return compiled, days, rows
+
+@login_required
+def teacher_timetable(request, pk):
+    """Emploi du temps hebdomadaire d'un enseignant et ses périodes libres"""
+    teacher = get_object_or_404(Teacher.objects.select_related('school', 'year'), pk=pk)
+    compiled, days, rows = _get_teacher_timetable(teacher)
+    day_labels = dict(days)
+    free_periods = {}
+    for day, period in compiled.free_periods('teacher', teacher.pk, days=[day for day, _ in days]):
+        free_periods.setdefault(day_labels[day], []).append(period)
+    return render(request, 'teachers/teacher_timetable.html', {
+        'teacher': teacher,
+        'days': days,
+        'rows': rows,
+        'weekly_periods': compiled.weekly_periods('teacher', teacher.pk),
+        'free_periods': free_periods,
     })
 
+@login_required
+def teacher_timetable_pdf(request, pk):
+    """Emploi du temps imprimable d'un enseignant"""
+    from classes.timetables import timetable_pdf_response
+
+    teacher = get_object_or_404(Teacher.objects.select_related('school', 'year'), pk=pk)
+    _compiled, days, rows = _get_teacher_timetable(teacher)
+    return timetable_pdf_response(request, {
+        'title': f"{teacher.last_name.upper()} {teacher.first_name}",
+        'subtitle': f"Année scolaire {teacher.year.annee}",
+        'school': teacher.school,
+        'days': days,
+        'rows': rows,
+        'mode': 'teacher',
+    }, teacher.matricule or teacher.pk)
+
 def teacher_create_htmx(request):
     if request.method == 'POST':
         form = TeacherForm(request.POST, request.FILES)